@@ -3,6 +3,7 @@ Bot Controller - Main bot interface and command handling
 """
 
 import asyncio
+import html
 import os
 from typing import Dict, Any, Optional
 
@@ -18,6 +19,7 @@ from forwarding_engine import ForwardingEngine
 from keyboards import BotKeyboards
 from security import SecurityManager
 from modules.settings_manager import SettingsManager
+from modules.repositories import Repositories
 from handlers.admin import AdminHandlers
 from handlers.tasks import TaskHandlers
 from handlers.sources import SourceHandlers
@@ -28,6 +30,8 @@ from localization import localization
 from utils.callback_router import CallbackRouter, get_task_router
 from utils.database_cache import DatabaseCache, get_database_cache
 from utils.memory_manager import MemoryManager, get_memory_manager
+from utils.memory_budget import (PRIORITY_CORRECTNESS, PRIORITY_DERIVED, PRIORITY_LOOKUP, PRIORITY_TRACKING,
+                                 container_size, ordered_evictor)
 
 
 class BotStates(StatesGroup):
@@ -53,8 +57,12 @@ class BotController:
         self.security_manager = security_manager
         self.userbot = userbot
         self.session_handler = None
-        self.settings_manager = SettingsManager(database)
         self.keyboards = BotKeyboards()
+        self.repositories = Repositories(database, get_database_cache(database))
+        self.settings_manager = SettingsManager(database, self.repositories.settings)
+        # Settings writes invalidate the task in the shared cache; rendered keyboards follow
+        self.repositories.cache.add_task_listener(self.keyboards.invalidate_task)
+        localization.attach_database(database)
         
         # Import and initialize config
         from config import Config
@@ -103,6 +111,7 @@ class BotController:
             # Register components with memory manager for cleanup
             self.memory_manager.register_session_manager(self)
             self.memory_manager.register_cache_manager(self.database_cache)
+            self._register_memory_budget()
             
             logger.info("Memory manager initialized")
             
@@ -116,8 +125,51 @@ class BotController:
             logger.error(f"Failed to initialize performance utilities: {e}")
             raise
 
+    def _register_memory_budget(self):
+        """Put the engine, security, localization and UI caches under the shared memory budget"""
+        budget = self.memory_manager.budget
+        engine = self.forwarding_engine
+        security = self.security_manager
+        
+        budget.register("keyboards", container_size(lambda: self.keyboards._cache._entries),
+                        self.keyboards._cache.shrink, PRIORITY_DERIVED)
+        budget.register("task_statistics", container_size(lambda: self.task_handlers.statistics_manager.cache),
+                        ordered_evictor(lambda: self.task_handlers.statistics_manager.cache), PRIORITY_DERIVED)
+        budget.register("localization.user_languages", container_size(lambda: localization.user_languages),
+                        ordered_evictor(lambda: localization.user_languages), PRIORITY_LOOKUP)
+        
+        if engine:
+            budget.register("engine.statistics", container_size(lambda: engine.statistics.cache),
+                            ordered_evictor(lambda: engine.statistics.cache), PRIORITY_DERIVED)
+            budget.register("engine.settings_cache", container_size(lambda: engine._settings_cache),
+                            ordered_evictor(lambda: engine._settings_cache,
+                                            lambda task_id: engine._cache_timestamp.pop(task_id, None)),
+                            PRIORITY_LOOKUP)
+            budget.register("engine.duplicate_tracker", container_size(lambda: engine.duplicate_tracker),
+                            ordered_evictor(lambda: engine.duplicate_tracker), PRIORITY_CORRECTNESS)
+            # The active task registry drives forwarding; it is reported but never evicted
+            budget.register("engine.active_tasks", container_size(lambda: engine.active_tasks_cache))
+        
+        if security:
+            budget.register("security.tracking",
+                            lambda: (container_size(lambda: security.user_requests)() +
+                                     container_size(lambda: security.user_sessions)()),
+                            security.shrink_tracking, PRIORITY_TRACKING)
+
+    async def _load_user_language(self, handler, event, data):
+        """Outer middleware: load the sender's saved language before any handler renders text"""
+        user = getattr(event, "from_user", None)
+        if user:
+            await localization.ensure_user_language(user.id)
+        return await handler(event, data)
+
     async def _register_handlers(self):
         """Register all bot handlers"""
+        # Every command, text input and button press renders in the user's language,
+        # which is loaded lazily after a restart
+        self.dispatcher.message.outer_middleware(self._load_user_language)
+        self.dispatcher.callback_query.outer_middleware(self._load_user_language)
+
         # Main command handlers
         self.dispatcher.message.register(
             self.start_command,
@@ -164,6 +216,11 @@ class BotController:
             Command("clearcache")
         )
 
+        self.dispatcher.message.register(
+            self.memory_command,
+            Command("memory")
+        )
+
         # Callback query handlers (main callbacks and fallback for unhandled callbacks)
         self.dispatcher.callback_query.register(
             self.handle_callback,
@@ -332,16 +389,6 @@ class BotController:
 
             await self.database.create_or_update_user(user_data)
 
-            # Load user language preference
-            try:
-                user_lang_result = await self.database.execute_query(
-                    "SELECT language FROM users WHERE telegram_id = $1", user_id
-                )
-                if user_lang_result and user_lang_result[0]['language']:
-                    localization.set_user_language(user_id, user_lang_result[0]['language'])
-            except Exception as e:
-                logger.warning(f"Could not load user language preference: {e}")
-
             # Send welcome message
             welcome_text = self._get_welcome_message(message.from_user.first_name, user_id)
             keyboard = await self.keyboards.get_main_menu_keyboard(user_id)
@@ -649,8 +696,11 @@ Monitoring for forwarding results...
                 cleared_items.append(f"User sessions ({session_count} items)")
             
             # Force reload of tasks
-            await self.forwarding_engine._reload_tasks()
-            cleared_items.append("Task configurations reloaded")
+            reload_report = await self.forwarding_engine._reload_tasks() or {}
+            cleared_items.append(
+                f"Task configurations reloaded (+{len(reload_report.get('added', []))} "
+                f"-{len(reload_report.get('removed', []))} ~{len(reload_report.get('updated', {}))})"
+            )
             
             cache_report = "\n• ".join(cleared_items) if cleared_items else "لا توجد عناصر cache للمسح"
             
@@ -667,6 +717,109 @@ Monitoring for forwarding results...
             logger.error(f"Error clearing cache: {e}")
             await message.answer("❌ خطأ في مسح الـ cache")
 
+    async def memory_command(self, message: Message):
+        """Handle /memory command - Process memory, cache sizes and allocation sites
+
+        /memory          report
+        /memory on [n]   start allocation tracing with n frames per trace
+        /memory snap     take a snapshot now and show growth since the previous one
+        /memory off      stop tracing
+        """
+        try:
+            user_id = message.from_user.id
+            
+            if not await self.security_manager.is_admin(user_id):
+                await message.answer("❌ صلاحيات المدير مطلوبة لعرض تقرير الذاكرة")
+                return
+            
+            if not self.memory_manager:
+                await message.answer("❌ مدير الذاكرة غير مفعل")
+                return
+            
+            profiler = self.memory_manager.profiler
+            args = (message.text or "").split()[1:]
+            action = args[0].lower() if args else ""
+            
+            if action == "on":
+                frames = int(args[1]) if len(args) > 1 and args[1].isdigit() else None
+                if frames == 0:
+                    await message.answer("❌ عدد الإطارات يجب أن يكون 1 على الأقل")
+                    return
+                started = await asyncio.to_thread(profiler.start, frames)
+                await message.answer("🟢 تم تشغيل تتبع التخصيصات" if started else "ℹ️ تتبع التخصيصات يعمل بالفعل")
+                return
+            if action == "off":
+                stopped = profiler.stop()
+                await message.answer("🔴 تم إيقاف تتبع التخصيصات" if stopped else "ℹ️ تتبع التخصيصات غير مفعل")
+                return
+            if action == "snap":
+                if await asyncio.to_thread(profiler.take_snapshot) is None:
+                    await message.answer("ℹ️ شغّل التتبع أولاً: /memory on")
+                    return
+            
+            report = await self.memory_manager.get_profile_report(8)
+            await message.answer(self._format_memory_report(report))
+            
+        except Exception as e:
+            logger.error(f"Error building memory report: {e}")
+            await message.answer("❌ خطأ في إنشاء تقرير الذاكرة")
+
+    def _format_memory_report(self, report: Dict[str, Any]) -> str:
+        """Render get_profile_report() as an HTML message"""
+        process = report['process']
+        lines = [
+            "🧠 <b>تقرير الذاكرة</b>",
+            "",
+            f"• RSS: {process['rss_mb']:.1f} MB ({process['source']})",
+            f"• VMS: {process['vms_mb']:.1f} MB",
+            "",
+            "<b>الـ Caches:</b>",
+        ]
+        for cache in report['caches']:
+            lines.append(
+                f"• {html.escape(cache['name'])}.{html.escape(str(cache['attribute']))}: "
+                f"{cache['entries']} عنصر، {cache['bytes'] / 1024:.1f} KB"
+            )
+        
+        budget = report['budget']
+        lines.append("")
+        lines.append(
+            f"<b>ميزانية الذاكرة:</b> {budget['total_bytes'] / 1048576:.1f} / "
+            f"{budget['budget_bytes'] / 1048576:.0f} MB ({budget['usage_percent']:.0f}%)"
+        )
+        for cache in budget['caches']:
+            lines.append(
+                f"• {html.escape(cache['name'])}: {cache['bytes'] / 1024:.1f} KB "
+                f"(p{cache['priority']}، أُخلي {cache['evicted_bytes'] / 1024:.0f} KB)"
+            )
+        
+        allocations = report['allocations']
+        lines.append("")
+        if not allocations['tracing']:
+            lines.append("تتبع التخصيصات متوقف (/memory on لتشغيله)")
+            return "\n".join(lines)
+        
+        lines.append(
+            f"<b>التخصيصات:</b> {allocations['traced_current_mb']:.1f} MB "
+            f"(الذروة {allocations['traced_peak_mb']:.1f} MB، "
+            f"كلفة التتبع {allocations['tracemalloc_overhead_mb']:.1f} MB)"
+        )
+        for site in allocations['top']:
+            lines.append(f"• <code>{html.escape(site['location'])}</code>: {site['size_bytes'] / 1024:.1f} KB / {site['count']}")
+        if allocations['growth']:
+            lines.append("")
+            lines.append("<b>النمو منذ اللقطة السابقة:</b>")
+            for site in allocations['growth']:
+                lines.append(f"• <code>{html.escape(site['location'])}</code>: +{site['size_diff'] / 1024:.1f} KB (+{site['count_diff']})")
+        
+        # Telegram rejects messages over 4096 characters; drop whole lines so no tag is cut
+        text = ""
+        for line in lines:
+            if len(text) + len(line) > 4000:
+                break
+            text += line + "\n"
+        return text
+
     async def handle_callback(self, callback: CallbackQuery, state: FSMContext):
         """Handle callback queries using performance-optimized router"""
         user_id = callback.from_user.id
@@ -796,6 +949,9 @@ Monitoring for forwarding results...
         # Handle remaining unrouted callbacks
         if data.startswith("popup_info_"):
             await self._handle_popup_callback(callback, state)
+        elif self.task_handlers.router.handles(data):
+            # Task buttons outside the task_ prefixes (kw_, media_, day_toggle_, ...)
+            await self.task_handlers.handle_callback(callback, state)
         else:
             logger.warning(f"Unhandled callback in bot_controller: {data}")
             await callback.answer("❌ Unknown action.", show_alert=True)
@@ -945,10 +1101,7 @@ Monitoring for forwarding results...
                 total_users = len(await self.database.execute_query("SELECT DISTINCT user_id FROM users"))
                 
                 # Get forwarding statistics
-                logs_today = await self.database.execute_query(
-                    "SELECT COUNT(*) as count FROM forwarding_logs WHERE created_at >= CURRENT_DATE"
-                )
-                logs_count = logs_today[0]['count'] if logs_today else 0
+                logs_count = sum((await self.database.get_log_counts("today")).values())
                 
                 settings_text = f"""📊 **إحصائيات البوت**
 
@@ -991,7 +1144,7 @@ Monitoring for forwarding results...
             success = await self.forwarding_engine.process_channel_message(chat_id, message)
 
             if success:
-                logger.success(f"Message {message.message_id} from {chat_id} forwarded successfully")
+                logger.info(f"Message {message.message_id} from {chat_id} queued for forwarding")
             else:
                 logger.warning(f"Message {message.message_id} from {chat_id} was not forwarded")
 
@@ -1218,16 +1371,10 @@ Monitoring for forwarding results...
             data = callback.data
             new_lang = data.split("_")[-1]  # Extract language code from callback data
             
-            # Set user language
-            success = localization.set_user_language(user_id, new_lang)
+            # Set user language (cache and database)
+            success = await localization.save_user_language(user_id, new_lang)
             
             if success:
-                # Update user language in database
-                await self.database.execute_command(
-                    "UPDATE users SET language = $1 WHERE telegram_id = $2",
-                    new_lang, user_id
-                )
-                
                 # Get localized success message
                 lang_name = localization.get_language_name(new_lang)
                 success_text = localization.get_text(user_id, "language_changed", lang=lang_name)
@@ -1372,7 +1519,7 @@ Monitoring for forwarding results...
             user_id = callback.from_user.id
             
             # Generate comprehensive report
-            from datetime import datetime, timedelta
+            from datetime import datetime
             
             # Get task statistics
             tasks = await self.database.get_active_tasks()
@@ -1381,37 +1528,20 @@ Monitoring for forwarding results...
             bot_tasks = len([t for t in tasks if t.get('task_type') == 'bot'])
             userbot_tasks = len([t for t in tasks if t.get('task_type') == 'userbot'])
             
-            # Get forwarding statistics for last 24h, 7d, 30d
+            # Get forwarding statistics for last 24h, 7d, 30d from the log rollups
             now = datetime.now()
-            stats_24h = await self.database.execute_query(
-                "SELECT COUNT(*) as count FROM forwarding_logs WHERE created_at >= $1",
-                now - timedelta(hours=24)
-            )
-            stats_7d = await self.database.execute_query(
-                "SELECT COUNT(*) as count FROM forwarding_logs WHERE created_at >= $1",
-                now - timedelta(days=7)
-            )
-            stats_30d = await self.database.execute_query(
-                "SELECT COUNT(*) as count FROM forwarding_logs WHERE created_at >= $1",
-                now - timedelta(days=30)
-            )
+            counts_7d = await self.database.get_log_counts("7d")
+            stats_24h = sum((await self.database.get_log_counts("24h")).values())
+            stats_7d = sum(counts_7d.values())
+            stats_30d = sum((await self.database.get_log_counts("30d")).values())
             
             # Get user statistics
             total_users = await self.database.execute_query("SELECT COUNT(*) as count FROM users")
             
             # Get success rates
-            success_stats = await self.database.execute_query(
-                """SELECT 
-                    COUNT(*) as total,
-                    COUNT(CASE WHEN status = 'success' THEN 1 END) as successful
-                FROM forwarding_logs 
-                WHERE created_at >= $1""",
-                now - timedelta(days=7)
-            )
-            
             success_rate = 0
-            if success_stats and success_stats[0]['total'] > 0:
-                success_rate = (success_stats[0]['successful'] / success_stats[0]['total']) * 100
+            if stats_7d > 0:
+                success_rate = (counts_7d.get('success', 0) / stats_7d) * 100
 
             report_text = f"""📋 **التقرير المفصل**
 
@@ -1423,9 +1553,9 @@ Monitoring for forwarding results...
 • معدل التفعيل: {(active_tasks/total_tasks*100):.1f}% إذا كان هناك مهام
 
 **📊 إحصائيات التوجيه:**
-• آخر 24 ساعة: {stats_24h[0]['count'] if stats_24h else 0}
-• آخر 7 أيام: {stats_7d[0]['count'] if stats_7d else 0} 
-• آخر 30 يوم: {stats_30d[0]['count'] if stats_30d else 0}
+• آخر 24 ساعة: {stats_24h}
+• آخر 7 أيام: {stats_7d} 
+• آخر 30 يوم: {stats_30d}
 • معدل النجاح (7 أيام): {success_rate:.1f}%
 
 **👥 إحصائيات المستخدمين:**
@@ -65,6 +65,26 @@ class Config:
         self.rate_limit_messages = int(os.getenv("RATE_LIMIT_MESSAGES", "30"))
         self.rate_limit_period = int(os.getenv("RATE_LIMIT_PERIOD", "60"))
         
+        # Startup
+        self.startup_concurrency = int(os.getenv("STARTUP_CONCURRENCY", "10"))
+        self.registry_snapshot_path = os.getenv("REGISTRY_SNAPSHOT_PATH", "data/registry_snapshot.json")
+        
+        # Ingest
+        self.ingest_workers = int(os.getenv("INGEST_WORKERS", "8"))
+        self.outbound_rate = float(os.getenv("OUTBOUND_RATE", "25"))
+        
+        # Sharded worker processes (0 keeps everything in this process)
+        self.shard_workers = int(os.getenv("SHARD_WORKERS", "0"))
+        
+        # Database instrumentation: queries at or over this many milliseconds are logged
+        self.slow_query_ms = float(os.getenv("SLOW_QUERY_MS", "200"))
+        
+        # forwarding_logs retention; on PostgreSQL expired partitions are dropped or detached
+        self.log_retention_days = int(os.getenv("LOG_RETENTION_DAYS", "30"))
+        self.log_partition_days = int(os.getenv("LOG_PARTITION_DAYS", "1"))
+        self.log_partitions_ahead = int(os.getenv("LOG_PARTITIONS_AHEAD", "7"))
+        self.log_retention_mode = os.getenv("LOG_RETENTION_MODE", "drop")
+        
         logger.info("Configuration loaded successfully")
         logger.info(f"Webhook mode: {self.use_webhook}")
         logger.info(f"Admin users: {len(self.admin_user_ids)}")
@@ -3,8 +3,9 @@ Database management for Telegram Forwarding Bot
 """
 
 import asyncio
+import time
 from contextlib import asynccontextmanager
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 import asyncpg
 from loguru import logger
@@ -12,6 +13,167 @@ from sqlalchemy import MetaData, create_engine
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
+from log_partitions import LogPartitionManager
+from utils.query_stats import QueryRegistry
+
+if TYPE_CHECKING:
+    # Imported where the SQLite backend is selected; aiosqlite is the optional `sqlite` extra
+    from sqlite_backend import SQLiteBackend
+
+
+class UnsupportedStatement(ValueError):
+    """PostgreSQL-only SQL with no SQLite equivalent (raised by the SQLite backend)"""
+
+
+# Hot statements, run by name through fetch_named/execute_named
+STATEMENTS = {
+    "task_sources": """
+        SELECT * FROM sources 
+        WHERE task_id = $1 
+        ORDER BY created_at DESC
+    """,
+    "task_targets": """
+        SELECT * FROM targets 
+        WHERE task_id = $1 
+        ORDER BY created_at DESC
+    """,
+    "task_settings": """
+        SELECT task_id, forward_mode, preserve_sender, add_caption, custom_caption,
+               filter_media, filter_text, filter_forwarded, filter_links, keyword_filters,
+               keyword_filter_mode,
+               allow_text, allow_photos, allow_videos, allow_documents, allow_audio, allow_voice,
+               allow_video_notes, allow_stickers, allow_animations, allow_contacts,
+               allow_locations, allow_venues, allow_polls, allow_dice,
+               delay_min, delay_max, remove_links, remove_mentions, replace_text,
+               duplicate_check, max_message_length, length_filter_settings, created_at, updated_at,
+               hashtag_settings, text_cleaner_settings, filter_inline_buttons, filter_duplicates,
+               filter_language, language_filter_mode, allowed_languages, manual_mode, link_preview,
+               pin_messages, silent_mode, sync_edits, preserve_replies, auto_translate, target_language,
+               working_hours_enabled, start_hour, end_hour, timezone, recurring_post_enabled,
+               recurring_post_content, recurring_interval_hours, format_settings,
+               sync_deletes, prefix_text, suffix_text, header_enabled, footer_enabled,
+               inline_buttons_enabled, inline_buttons_config, inline_button_settings,
+               ingest_queue_size, ingest_overflow_policy, ingest_weight,
+               day_filter_enabled, day_filter_settings, out_of_window_mode,
+               sending_limit_enabled, sending_limit_settings,
+               digest_enabled, digest_interval_minutes, digest_max_posts
+        FROM task_settings WHERE task_id = $1
+    """,
+    "task_first_source_chat": "SELECT source_chat_id FROM sources WHERE task_id = $1 LIMIT 1",
+    "log_forwarding": """
+        INSERT INTO forwarding_logs 
+        (task_id, source_chat_id, target_chat_id, message_id, 
+         forwarded_message_id, status, error_message, processed_at)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, NOW())
+    """,
+    "log_rollup_increment": """
+        INSERT INTO log_rollup_hourly (
+            bucket, task_id, target_chat_id, status, message_count,
+            processing_time_total, processing_time_count, processing_time_max, processing_time_min
+        ) VALUES (
+            date_trunc('hour', NOW()), $1, $2, $3, 1,
+            COALESCE($4::int, 0), CASE WHEN $4 IS NULL THEN 0 ELSE 1 END, $4, $4
+        )
+        ON CONFLICT (bucket, task_id, target_chat_id, status)
+        DO UPDATE SET
+            message_count = log_rollup_hourly.message_count + 1,
+            processing_time_total = log_rollup_hourly.processing_time_total + EXCLUDED.processing_time_total,
+            processing_time_count = log_rollup_hourly.processing_time_count + EXCLUDED.processing_time_count,
+            processing_time_max = GREATEST(COALESCE(log_rollup_hourly.processing_time_max, EXCLUDED.processing_time_max),
+                                           COALESCE(EXCLUDED.processing_time_max, log_rollup_hourly.processing_time_max)),
+            processing_time_min = LEAST(COALESCE(log_rollup_hourly.processing_time_min, EXCLUDED.processing_time_min),
+                                        COALESCE(EXCLUDED.processing_time_min, log_rollup_hourly.processing_time_min))
+    """,
+    "task_statistics": "SELECT * FROM task_statistics WHERE task_id = $1",
+    "task_statistics_success": """
+        INSERT INTO task_statistics (
+            task_id, messages_processed, messages_forwarded, messages_failed, 
+            last_activity, created_at
+        ) VALUES ($1, 1, 1, 0, NOW(), NOW())
+        ON CONFLICT (task_id)
+        DO UPDATE SET 
+            messages_processed = COALESCE(task_statistics.messages_processed, 0) + 1,
+            messages_forwarded = COALESCE(task_statistics.messages_forwarded, 0) + 1,
+            last_activity = NOW()
+    """,
+    "task_statistics_failed": """
+        INSERT INTO task_statistics (
+            task_id, messages_processed, messages_forwarded, messages_failed, 
+            last_activity, created_at
+        ) VALUES ($1, 1, 0, 1, NOW(), NOW())
+        ON CONFLICT (task_id)
+        DO UPDATE SET 
+            messages_processed = COALESCE(task_statistics.messages_processed, 0) + 1,
+            messages_failed = COALESCE(task_statistics.messages_failed, 0) + 1,
+            last_activity = NOW()
+    """,
+    "mapping_latest": """
+        SELECT target_message_ids FROM message_tracking 
+        WHERE task_id = $1 AND source_message_id = $2
+        ORDER BY created_at DESC LIMIT 1
+    """,
+    "mapping_recent": """
+        SELECT target_message_ids FROM message_tracking 
+        WHERE task_id = $1 AND source_message_id = $2
+        ORDER BY created_at DESC LIMIT 5
+    """,
+    "mapping_nearby": """
+        SELECT target_message_ids FROM message_tracking 
+        WHERE task_id = $1 
+        AND source_message_id BETWEEN $2 - 10 AND $2 + 10
+        AND target_message_ids IS NOT NULL
+        ORDER BY ABS(source_message_id - $2) ASC
+        LIMIT 10
+    """,
+    "mapping_get": """
+        SELECT target_message_ids FROM message_tracking 
+        WHERE task_id = $1 AND source_message_id = $2 AND source_chat_id = $3
+    """,
+    "mapping_update": """
+        UPDATE message_tracking 
+        SET target_message_ids = $1::jsonb 
+        WHERE task_id = $2 AND source_message_id = $3 AND source_chat_id = $4
+    """,
+    "mapping_insert": """
+        INSERT INTO message_tracking (task_id, source_message_id, source_chat_id, target_message_ids, created_at)
+        VALUES ($1, $2, $3, $4::jsonb, NOW())
+    """,
+    "duplicate_find": "SELECT id FROM message_duplicates WHERE task_id = $1 AND message_hash = $2",
+    "duplicate_touch": "UPDATE message_duplicates SET count = count + 1, last_seen = NOW() WHERE task_id = $1 AND message_hash = $2",
+    "duplicate_insert": "INSERT INTO message_duplicates (task_id, message_hash, first_seen, last_seen, count) VALUES ($1, $2, NOW(), NOW(), 1)",
+    "sending_stats_minute": "SELECT COALESCE(message_count, 0) as count FROM sending_stats WHERE task_id = $1 AND day = $2 AND hour = $3 AND minute = $4",
+    "sending_stats_hour": "SELECT COALESCE(SUM(message_count), 0) as count FROM sending_stats WHERE task_id = $1 AND day = $2 AND hour = $3",
+    "sending_stats_day": "SELECT COALESCE(SUM(message_count), 0) as count FROM sending_stats WHERE task_id = $1 AND day = $2",
+    "sending_stats_increment": """
+        INSERT INTO sending_stats (task_id, day, hour, minute, message_count)
+        VALUES ($1, $2, $3, $4, 1)
+        ON CONFLICT (task_id, day, hour, minute)
+        DO UPDATE SET message_count = sending_stats.message_count + 1
+    """
+}
+
+# Time windows served from log_rollup_hourly alone. Buckets are whole hours, so the
+# rolling windows start at the bucket holding NOW() - interval: "1h" spans the previous
+# and the current hour (60-120 minutes of data), "24h" spans 24-25 hours.
+ROLLUP_WINDOWS = {
+    "1h": "date_trunc('hour', NOW() - INTERVAL '1 hour')",
+    "today": "CURRENT_DATE",
+    "24h": "date_trunc('hour', NOW() - INTERVAL '24 hours')",
+    "7d": "CURRENT_DATE - INTERVAL '7 days'",
+    "30d": "CURRENT_DATE - INTERVAL '30 days'"
+}
+
+# Hourly rollups are folded into log_rollup_daily and kept this long for windowed queries
+HOURLY_ROLLUP_DAYS = 35
+
+ROLLUP_MEASURES = (
+    "message_count, processing_time_total, processing_time_count, processing_time_max, processing_time_min"
+)
+
+# asyncpg prepares every statement it runs and caches it per connection by SQL text;
+# sized so ad-hoc queries cannot evict the registered ones
+STATEMENT_CACHE_SIZE = 4 * len(STATEMENTS) + 100
+
 
 class Base(DeclarativeBase):
     """Base class for all database models"""
@@ -21,7 +183,8 @@ class Base(DeclarativeBase):
 class Database:
     """Database management class"""
 
-    def __init__(self, database_url: str):
+    def __init__(self, database_url: str, slow_query_ms: float = 200.0, log_retention_days: int = 30,
+                 log_partition_days: int = 1, log_partitions_ahead: int = 7, log_retention_mode: str = "drop"):
         # Store original URL
         self.original_url = database_url
         
@@ -46,6 +209,20 @@ class Database:
         self.engine = None
         self.async_session_factory = None
         self.pool = None
+        
+        # Long-lived SQLite connections used instead of per-call sessions
+        self.sqlite: Optional["SQLiteBackend"] = None
+        
+        # Named statements and per-statement call statistics
+        self.queries = QueryRegistry(slow_query_ms=slow_query_ms)
+        self.queries.register_all(STATEMENTS)
+        
+        # forwarding_logs retention; on PostgreSQL the table is range partitioned by day
+        self.log_retention_days = log_retention_days
+        self.log_partition_days = log_partition_days
+        self.log_partitions_ahead = log_partitions_ahead
+        self.log_retention_mode = log_retention_mode
+        self.log_partitions: Optional[LogPartitionManager] = None
 
     async def initialize(self):
         """Initialize database connections and create tables"""
@@ -159,7 +336,9 @@ class Database:
                         ssl=ssl_context,
                         min_size=5,
                         max_size=20,
-                        command_timeout=60
+                        command_timeout=60,
+                        statement_cache_size=STATEMENT_CACHE_SIZE,
+                        max_cached_statement_lifetime=0
                     )
                 except Exception as pool_error:
                     logger.warning(f"Failed to create connection pool with SSL context: {pool_error}")
@@ -173,15 +352,22 @@ class Database:
                             database=parsed_url.path.lstrip('/'),
                             min_size=5,
                             max_size=20,
-                            command_timeout=60
+                            command_timeout=60,
+                            statement_cache_size=STATEMENT_CACHE_SIZE,
+                            max_cached_statement_lifetime=0
                         )
                         logger.info("Connection pool created without SSL context")
                     except Exception as fallback_error:
                         logger.error(f"Failed to create connection pool even without SSL: {fallback_error}")
                         raise
             else:
-                # For SQLite, we'll use the SQLAlchemy session directly
+                # SQLite: raw statements go through the tuned backend, SQLAlchemy only creates tables
                 self.pool = None
+                sqlite_path = self._sqlite_path()
+                if sqlite_path:
+                    from sqlite_backend import SQLiteBackend
+                    self.sqlite = SQLiteBackend(sqlite_path)
+                    await self.sqlite.open()
 
             # Import models to ensure they're registered
             from models import (
@@ -215,9 +401,18 @@ class Database:
             # Create additional tables for advanced features
             await self.create_advanced_tables()
 
+            # Partition forwarding_logs before its indexes are created on the parent
+            await self.create_log_partitions()
+
+            # Hourly/daily rollups that statistics read instead of scanning forwarding_logs
+            await self.create_log_rollups()
+
             # Add missing indexes for performance
             await self.create_performance_indexes()
 
+            # Track row changes so task reloads can be incremental
+            await self.create_change_tracking()
+
             logger.success("Database initialized successfully")
 
         except Exception as e:
@@ -617,6 +812,53 @@ class Database:
         except Exception as e:
             logger.warning(f"Could not add inline buttons columns: {e}")
 
+        # Add ingest queue settings columns
+        try:
+            await self.execute_command("""
+                ALTER TABLE task_settings 
+                ADD COLUMN IF NOT EXISTS ingest_queue_size INTEGER DEFAULT 100,
+                ADD COLUMN IF NOT EXISTS ingest_overflow_policy VARCHAR(20) DEFAULT 'drop_oldest',
+                ADD COLUMN IF NOT EXISTS ingest_weight INTEGER DEFAULT 1
+            """)
+            logger.info("Added ingest queue columns")
+        except Exception as e:
+            logger.warning(f"Could not add ingest queue columns: {e}")
+
+        # Add day filter and out-of-window delivery columns
+        try:
+            await self.execute_command("""
+                ALTER TABLE task_settings 
+                ADD COLUMN IF NOT EXISTS day_filter_enabled BOOLEAN DEFAULT FALSE,
+                ADD COLUMN IF NOT EXISTS day_filter_settings JSONB DEFAULT '{}',
+                ADD COLUMN IF NOT EXISTS out_of_window_mode VARCHAR(10) DEFAULT 'drop'
+            """)
+            logger.info("Added delivery window columns")
+        except Exception as e:
+            logger.warning(f"Could not add delivery window columns: {e}")
+
+        # Add sending limit columns
+        try:
+            await self.execute_command("""
+                ALTER TABLE task_settings 
+                ADD COLUMN IF NOT EXISTS sending_limit_enabled BOOLEAN DEFAULT FALSE,
+                ADD COLUMN IF NOT EXISTS sending_limit_settings JSONB DEFAULT '{}'
+            """)
+            logger.info("Added sending limit columns")
+        except Exception as e:
+            logger.warning(f"Could not add sending limit columns: {e}")
+
+        # Add digest mode columns
+        try:
+            await self.execute_command("""
+                ALTER TABLE task_settings 
+                ADD COLUMN IF NOT EXISTS digest_enabled BOOLEAN DEFAULT FALSE,
+                ADD COLUMN IF NOT EXISTS digest_interval_minutes INTEGER DEFAULT 60,
+                ADD COLUMN IF NOT EXISTS digest_max_posts INTEGER DEFAULT 20
+            """)
+            logger.info("Added digest mode columns")
+        except Exception as e:
+            logger.warning(f"Could not add digest mode columns: {e}")
+
     async def create_advanced_tables(self):
         """Create additional tables for advanced forwarding features"""
         try:
@@ -676,6 +918,23 @@ class Database:
         except Exception as e:
             logger.warning(f"Could not create message_tracking table: {e}")
 
+        try:
+            # Create sending_stats table (per-minute send counters for sending limits)
+            await self.execute_command("""
+                CREATE TABLE IF NOT EXISTS sending_stats (
+                    task_id INTEGER NOT NULL,
+                    day DATE NOT NULL,
+                    hour INTEGER NOT NULL,
+                    minute INTEGER NOT NULL,
+                    message_count INTEGER DEFAULT 0,
+                    PRIMARY KEY (task_id, day, hour, minute),
+                    FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE
+                )
+            """)
+            logger.info("Created sending_stats table")
+        except Exception as e:
+            logger.warning(f"Could not create sending_stats table: {e}")
+
         try:
             # Create recurring_posts table
             await self.execute_command("""
@@ -698,6 +957,182 @@ class Database:
         except Exception as e:
             logger.warning(f"Could not create recurring_posts table: {e}")
 
+        try:
+            await self.execute_command("""
+                ALTER TABLE recurring_posts
+                ADD COLUMN IF NOT EXISTS delete_previous BOOLEAN DEFAULT TRUE
+            """)
+            await self.execute_command("""
+                ALTER TABLE recurring_posts
+                ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            """)
+            await self.execute_command(
+                "CREATE INDEX IF NOT EXISTS idx_recurring_posts_next ON recurring_posts(next_post_time) WHERE is_active = TRUE"
+            )
+        except Exception as e:
+            logger.warning(f"Could not migrate recurring_posts table: {e}")
+
+    async def create_change_tracking(self):
+        """Create updated_at columns, triggers and tombstones used for incremental task reloads"""
+        for table in ("sources", "targets"):
+            try:
+                await self.execute_command(f"""
+                    ALTER TABLE {table} 
+                    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                """)
+            except Exception as e:
+                logger.warning(f"Could not add updated_at column to {table}: {e}")
+
+        if not self.is_postgresql:
+            # SQLite falls back to full reloads with a diff on the engine side
+            return
+
+        try:
+            await self.execute_command("""
+                CREATE TABLE IF NOT EXISTS task_deletions (
+                    task_id INTEGER NOT NULL,
+                    deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+                )
+            """)
+            await self.execute_command(
+                "CREATE INDEX IF NOT EXISTS idx_task_deletions_deleted_at ON task_deletions(deleted_at)"
+            )
+
+            # Stamp every write, including raw UPDATEs that do not set updated_at themselves
+            await self.execute_command("""
+                CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+                BEGIN
+                    NEW.updated_at = NOW();
+                    RETURN NEW;
+                END;
+                $$ LANGUAGE plpgsql
+            """)
+
+            # Removing a source or target must also mark the owning task as changed
+            await self.execute_command("""
+                CREATE OR REPLACE FUNCTION touch_parent_task() RETURNS trigger AS $$
+                BEGIN
+                    UPDATE tasks SET updated_at = NOW() WHERE id = OLD.task_id;
+                    RETURN OLD;
+                END;
+                $$ LANGUAGE plpgsql
+            """)
+
+            await self.execute_command("""
+                CREATE OR REPLACE FUNCTION record_task_deletion() RETURNS trigger AS $$
+                BEGIN
+                    INSERT INTO task_deletions (task_id, deleted_at) VALUES (OLD.id, NOW());
+                    RETURN OLD;
+                END;
+                $$ LANGUAGE plpgsql
+            """)
+
+            for table in ("tasks", "sources", "targets", "task_settings", "recurring_posts"):
+                await self.execute_command(f"DROP TRIGGER IF EXISTS trg_{table}_touch ON {table}")
+                await self.execute_command(f"""
+                    CREATE TRIGGER trg_{table}_touch
+                    BEFORE INSERT OR UPDATE ON {table}
+                    FOR EACH ROW EXECUTE FUNCTION touch_updated_at()
+                """)
+
+            for table in ("sources", "targets", "task_settings"):
+                await self.execute_command(f"DROP TRIGGER IF EXISTS trg_{table}_delete ON {table}")
+                await self.execute_command(f"""
+                    CREATE TRIGGER trg_{table}_delete
+                    AFTER DELETE ON {table}
+                    FOR EACH ROW EXECUTE FUNCTION touch_parent_task()
+                """)
+
+            await self.execute_command("DROP TRIGGER IF EXISTS trg_tasks_delete ON tasks")
+            await self.execute_command("""
+                CREATE TRIGGER trg_tasks_delete
+                AFTER DELETE ON tasks
+                FOR EACH ROW EXECUTE FUNCTION record_task_deletion()
+            """)
+
+            for table in ("tasks", "sources", "targets", "task_settings", "recurring_posts"):
+                await self.execute_command(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_updated_at ON {table}(updated_at)"
+                )
+
+            logger.info("Change tracking triggers created")
+
+        except Exception as e:
+            logger.warning(f"Could not create change tracking triggers: {e}")
+
+    async def create_log_partitions(self):
+        """Convert forwarding_logs to daily range partitions and create upcoming partitions"""
+        if not self.is_postgresql or not self.pool:
+            # SQLite keeps a plain table and row deletes for retention
+            return
+
+        try:
+            manager = LogPartitionManager(
+                self.pool,
+                span_days=self.log_partition_days,
+                ahead_days=self.log_partitions_ahead,
+                retention_mode=self.log_retention_mode
+            )
+            await manager.convert()
+            await manager.ensure_future()
+            self.log_partitions = manager
+            logger.info("forwarding_logs partitions ready")
+        except Exception as e:
+            logger.warning(f"Could not partition forwarding_logs, falling back to row deletes: {e}")
+
+    async def create_log_rollups(self):
+        """Create forwarding_logs rollup tables and backfill them from existing logs once"""
+        try:
+            for table, key in (("log_rollup_hourly", "bucket TIMESTAMP"), ("log_rollup_daily", "day DATE")):
+                await self.execute_command(f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        {key} NOT NULL,
+                        task_id INTEGER NOT NULL,
+                        target_chat_id BIGINT NOT NULL,
+                        status VARCHAR(50) NOT NULL,
+                        message_count BIGINT DEFAULT 0 NOT NULL,
+                        processing_time_total BIGINT DEFAULT 0 NOT NULL,
+                        processing_time_count BIGINT DEFAULT 0 NOT NULL,
+                        processing_time_max INTEGER,
+                        processing_time_min INTEGER,
+                        PRIMARY KEY ({key.split()[0]}, task_id, target_chat_id, status)
+                    )
+                """)
+            await self.execute_command(
+                "CREATE INDEX IF NOT EXISTS idx_log_rollup_hourly_task ON log_rollup_hourly(task_id, bucket)"
+            )
+            await self.execute_command(
+                "CREATE INDEX IF NOT EXISTS idx_log_rollup_daily_task ON log_rollup_daily(task_id, day)"
+            )
+
+            # Days before rolled_through live in log_rollup_daily, later ones only in log_rollup_hourly
+            await self.execute_command("""
+                CREATE TABLE IF NOT EXISTS log_rollup_state (
+                    id INTEGER PRIMARY KEY,
+                    rolled_through DATE NOT NULL
+                )
+            """)
+
+            state = await self.execute_query("SELECT rolled_through FROM log_rollup_state WHERE id = 1")
+            if not state:
+                await self.execute_command(f"""
+                    INSERT INTO log_rollup_hourly (bucket, task_id, target_chat_id, status, {ROLLUP_MEASURES})
+                    SELECT date_trunc('hour', processed_at), task_id, target_chat_id, status, COUNT(*),
+                           COALESCE(SUM(processing_time), 0), COUNT(processing_time),
+                           MAX(processing_time), MIN(processing_time)
+                    FROM forwarding_logs
+                    WHERE processed_at IS NOT NULL
+                    GROUP BY date_trunc('hour', processed_at), task_id, target_chat_id, status
+                    ON CONFLICT DO NOTHING
+                """)
+                await self.execute_command("""
+                    INSERT INTO log_rollup_state (id, rolled_through) VALUES (1, '1970-01-01')
+                    ON CONFLICT DO NOTHING
+                """)
+                logger.info("Backfilled forwarding_logs rollups")
+        except Exception as e:
+            logger.warning(f"Could not create log rollup tables: {e}")
+
     async def create_performance_indexes(self):
         """Create performance indexes for better query speed"""
         try:
@@ -739,48 +1174,108 @@ class Database:
             finally:
                 await session.close()
 
+    def _sqlite_path(self) -> Optional[str]:
+        """File path from a sqlite:/// URL; None for other databases"""
+        if not self.database_url.startswith("sqlite"):
+            return None
+        path = self.database_url.split("://", 1)[-1]
+        # sqlite:///relative.db -> relative.db, sqlite:////abs/path.db -> /abs/path.db
+        path = path[1:] if path.startswith("/") else path
+        return path.split("?", 1)[0] or ":memory:"
+
+    async def _run(self, label: str, sql: str, args: tuple, fetch: bool):
+        """Run a statement and record its latency under the given label"""
+        started = time.perf_counter()
+        error = False
+        try:
+            if self.is_postgresql and self.pool:
+                async with self.pool.acquire() as conn:
+                    if fetch:
+                        rows = await conn.fetch(sql, *args)
+                        return [dict(row) for row in rows]
+                    return await conn.execute(sql, *args)
+            
+            if self.sqlite:
+                if fetch:
+                    return await self.sqlite.fetch(sql, args)
+                return await self.sqlite.execute(sql, args)
+            
+            # Use SQLAlchemy when neither a pool nor the SQLite backend is available
+            async with self.get_session() as session:
+                from sqlalchemy import text
+                result = await session.execute(text(sql), dict(enumerate(args, 1)))
+                if fetch:
+                    return [dict(row._mapping) for row in result.fetchall()]
+                return str(result.rowcount)
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.queries.record(label, (time.perf_counter() - started) * 1000, error, args)
+
     async def execute_query(self, query: str, *args) -> List[Dict[str, Any]]:
         """Execute raw SQL query"""
-        if self.is_postgresql and self.pool:
-            async with self.pool.acquire() as conn:
-                try:
-                    rows = await conn.fetch(query, *args)
-                    return [dict(row) for row in rows]
-                except Exception as e:
-                    logger.error(f"Query execution failed: {e}")
-                    raise
-        else:
-            # Use SQLAlchemy for SQLite or when no pool available
-            async with self.get_session() as session:
-                try:
-                    from sqlalchemy import text
-                    result = await session.execute(text(query), dict(enumerate(args, 1)))
-                    rows = result.fetchall()
-                    return [dict(row._mapping) for row in rows]
-                except Exception as e:
-                    logger.error(f"Query execution failed: {e}")
-                    raise
+        try:
+            return await self._run(self.queries.label_for(query), query, args, fetch=True)
+        except UnsupportedStatement:
+            logger.debug(f"Skipping PostgreSQL-only query on SQLite: {query.strip()[:80]}")
+            raise
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            raise
 
     async def execute_command(self, command: str, *args) -> str:
         """Execute SQL command (INSERT, UPDATE, DELETE)"""
-        if self.is_postgresql and self.pool:
-            async with self.pool.acquire() as conn:
-                try:
-                    result = await conn.execute(command, *args)
-                    return result
-                except Exception as e:
-                    logger.error(f"Command execution failed: {e}")
-                    raise
-        else:
-            # Use SQLAlchemy for SQLite or when no pool available
-            async with self.get_session() as session:
-                try:
+        try:
+            return await self._run(self.queries.label_for(command), command, args, fetch=False)
+        except UnsupportedStatement:
+            logger.debug(f"Skipping PostgreSQL-only command on SQLite: {command.strip()[:80]}")
+            raise
+        except Exception as e:
+            logger.error(f"Command execution failed: {e}")
+            raise
+
+    async def fetch_named(self, name: str, *args) -> List[Dict[str, Any]]:
+        """Run a registered query by name"""
+        try:
+            return await self._run(name, self.queries.get(name), args, fetch=True)
+        except Exception as e:
+            logger.error(f"Query {name} failed: {e}")
+            raise
+
+    async def execute_named(self, name: str, *args) -> str:
+        """Run a registered command by name"""
+        try:
+            return await self._run(name, self.queries.get(name), args, fetch=False)
+        except Exception as e:
+            logger.error(f"Command {name} failed: {e}")
+            raise
+
+    async def execute_named_many(self, *steps: tuple) -> None:
+        """Run registered commands, given as (name, *args), in one transaction"""
+        label = "+".join(step[0] for step in steps)
+        statements = [(self.queries.get(step[0]), tuple(step[1:])) for step in steps]
+        started = time.perf_counter()
+        error = False
+        try:
+            if self.is_postgresql and self.pool:
+                async with self.pool.acquire() as conn:
+                    async with conn.transaction():
+                        for sql, args in statements:
+                            await conn.execute(sql, *args)
+            elif self.sqlite:
+                await self.sqlite.execute_many(statements)
+            else:
+                async with self.get_session() as session:
                     from sqlalchemy import text
-                    result = await session.execute(text(command), dict(enumerate(args, 1)))
-                    return str(result.rowcount)
-                except Exception as e:
-                    logger.error(f"Command execution failed: {e}")
-                    raise
+                    for sql, args in statements:
+                        await session.execute(text(sql), dict(enumerate(args, 1)))
+        except Exception as e:
+            error = True
+            logger.error(f"Commands {label} failed: {e}")
+            raise
+        finally:
+            self.queries.record(label, (time.perf_counter() - started) * 1000, error)
 
     async def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user by Telegram ID"""
@@ -800,7 +1295,6 @@ class Database:
                 username = EXCLUDED.username,
                 first_name = EXCLUDED.first_name,
                 last_name = EXCLUDED.last_name,
-                language = EXCLUDED.language,
                 is_active = EXCLUDED.is_active,
                 updated_at = NOW()
             RETURNING *
@@ -846,65 +1340,125 @@ class Database:
             logger.error(f"Failed to get active tasks with sources/targets: {e}")
             return []
 
+    async def get_change_watermark(self) -> Optional[Any]:
+        """Get the database clock used as a change-tracking watermark"""
+        if not self.is_postgresql:
+            return None
+        try:
+            result = await self.execute_query("SELECT LOCALTIMESTAMP AS now")
+            return result[0]["now"] if result else None
+        except Exception as e:
+            logger.error(f"Failed to get change watermark: {e}")
+            return None
+
+    async def get_task_changes(self, since: Any, overlap_seconds: int = 5) -> Optional[Dict[str, Any]]:
+        """Get tasks whose row, sources, targets or settings changed since a watermark.
+
+        Returns None when change tracking is unavailable and the caller must do a full reload.
+        The overlap re-reads rows stamped just before the watermark by transactions that
+        committed late; applying them twice is harmless because the caller diffs.
+        """
+        if not self.is_postgresql or since is None:
+            return None
+
+        try:
+            watermark = await self.get_change_watermark()
+            if watermark is None:
+                return None
+
+            from datetime import timedelta
+            cutoff = since - timedelta(seconds=overlap_seconds)
+
+            changed_query = """
+                SELECT id AS task_id FROM tasks WHERE updated_at > $1
+                UNION SELECT task_id FROM sources WHERE updated_at > $1
+                UNION SELECT task_id FROM targets WHERE updated_at > $1
+                UNION SELECT task_id FROM task_settings WHERE updated_at > $1
+            """
+            changed_rows = await self.execute_query(changed_query, cutoff)
+            changed_ids = [row["task_id"] for row in changed_rows]
+
+            deleted_rows = await self.execute_query(
+                "SELECT DISTINCT task_id FROM task_deletions WHERE deleted_at > $1", cutoff
+            )
+            deleted_ids = [row["task_id"] for row in deleted_rows]
+
+            tasks: Dict[int, Dict[str, Any]] = {}
+            settings: Dict[int, Optional[Dict[str, Any]]] = {}
+            if changed_ids:
+                task_rows = await self.execute_query(
+                    "SELECT * FROM tasks WHERE id = ANY($1::int[])", changed_ids
+                )
+                for task in task_rows:
+                    task["sources"] = []
+                    task["targets"] = []
+                    tasks[task["id"]] = task
+
+                source_rows = await self.execute_query(
+                    "SELECT * FROM sources WHERE task_id = ANY($1::int[]) ORDER BY created_at DESC", changed_ids
+                )
+                for source in source_rows:
+                    if source["task_id"] in tasks:
+                        tasks[source["task_id"]]["sources"].append(source)
+
+                target_rows = await self.execute_query(
+                    "SELECT * FROM targets WHERE task_id = ANY($1::int[]) ORDER BY created_at DESC", changed_ids
+                )
+                for target in target_rows:
+                    if target["task_id"] in tasks:
+                        tasks[target["task_id"]]["targets"].append(target)
+
+                for task_id in tasks:
+                    settings[task_id] = await self.get_task_settings(task_id)
+
+            # Purge tombstones nobody will ask for again
+            await self.execute_command(
+                "DELETE FROM task_deletions WHERE deleted_at < $1", watermark - timedelta(days=1)
+            )
+
+            return {
+                "watermark": watermark,
+                "changed_ids": changed_ids,
+                "deleted_ids": [task_id for task_id in deleted_ids if task_id not in tasks],
+                "tasks": tasks,
+                "settings": settings
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to get task changes: {e}")
+            return None
+
     async def get_task_sources(self, task_id: int) -> List[Dict[str, Any]]:
         """Get all sources for a task"""
-        query = """
-            SELECT * FROM sources 
-            WHERE task_id = $1 
-            ORDER BY created_at DESC
-        """
-        return await self.execute_query(query, task_id)
+        return await self.fetch_named("task_sources", task_id)
 
     async def get_task_targets(self, task_id: int) -> List[Dict[str, Any]]:
         """Get all targets for a task"""
-        query = """
-            SELECT * FROM targets 
-            WHERE task_id = $1 
-            ORDER BY created_at DESC
-        """
-        return await self.execute_query(query, task_id)
+        return await self.fetch_named("task_targets", task_id)
 
     async def get_task_settings(self, task_id: int) -> Optional[Dict[str, Any]]:
         """Get task settings including all media type columns"""
-        query = """
-            SELECT task_id, forward_mode, preserve_sender, add_caption, custom_caption,
-                   filter_media, filter_text, filter_forwarded, filter_links, keyword_filters,
-                   keyword_filter_mode,
-                   allow_text, allow_photos, allow_videos, allow_documents, allow_audio, allow_voice,
-                   allow_video_notes, allow_stickers, allow_animations, allow_contacts,
-                   allow_locations, allow_venues, allow_polls, allow_dice,
-                   delay_min, delay_max, remove_links, remove_mentions, replace_text,
-                   duplicate_check, max_message_length, length_filter_settings, created_at, updated_at,
-                   hashtag_settings, text_cleaner_settings, filter_inline_buttons, filter_duplicates,
-                   filter_language, language_filter_mode, allowed_languages, manual_mode, link_preview,
-                   pin_messages, silent_mode, sync_edits, preserve_replies, auto_translate, target_language,
-                   working_hours_enabled, start_hour, end_hour, timezone, recurring_post_enabled,
-                   recurring_post_content, recurring_interval_hours, format_settings,
-                   sync_deletes, prefix_text, suffix_text, header_enabled, footer_enabled,
-                   inline_buttons_enabled, inline_buttons_config, inline_button_settings
-            FROM task_settings WHERE task_id = $1
-        """
-        result = await self.execute_query(query, task_id)
+        result = await self.fetch_named("task_settings", task_id)
         return result[0] if result else None
 
     async def log_forwarding(self, log_data: Dict[str, Any]) -> bool:
         """Log forwarding operation"""
         try:
-            query = """
-                INSERT INTO forwarding_logs 
-                (task_id, source_chat_id, target_chat_id, message_id, 
-                 forwarded_message_id, status, error_message, processed_at)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, NOW())
-            """
-            await self.execute_command(
-                query,
-                log_data["task_id"],
-                log_data["source_chat_id"],
-                log_data["target_chat_id"],
-                log_data["message_id"],
-                log_data.get("forwarded_message_id"),
-                log_data["status"],
-                log_data.get("error_message")
+            # One transaction, so the rollups never count a log row that was not written (or miss one that was)
+            await self.execute_named_many(
+                ("log_forwarding",
+                 log_data["task_id"],
+                 log_data["source_chat_id"],
+                 log_data["target_chat_id"],
+                 log_data["message_id"],
+                 log_data.get("forwarded_message_id"),
+                 log_data["status"],
+                 log_data.get("error_message")),
+                ("log_rollup_increment",
+                 log_data["task_id"],
+                 log_data["target_chat_id"],
+                 log_data["status"],
+                 log_data.get("processing_time"))
             )
             return True
         except Exception as e:
@@ -914,32 +1468,8 @@ class Database:
     async def update_task_statistics(self, task_id: int, status: str) -> bool:
         """Update task statistics"""
         try:
-            if status == "success":
-                query = """
-                    INSERT INTO task_statistics (
-                        task_id, messages_processed, messages_forwarded, messages_failed, 
-                        last_activity, created_at
-                    ) VALUES ($1, 1, 1, 0, NOW(), NOW())
-                    ON CONFLICT (task_id)
-                    DO UPDATE SET 
-                        messages_processed = COALESCE(task_statistics.messages_processed, 0) + 1,
-                        messages_forwarded = COALESCE(task_statistics.messages_forwarded, 0) + 1,
-                        last_activity = NOW()
-                """
-            else:
-                query = """
-                    INSERT INTO task_statistics (
-                        task_id, messages_processed, messages_forwarded, messages_failed, 
-                        last_activity, created_at
-                    ) VALUES ($1, 1, 0, 1, NOW(), NOW())
-                    ON CONFLICT (task_id)
-                    DO UPDATE SET 
-                        messages_processed = COALESCE(task_statistics.messages_processed, 0) + 1,
-                        messages_failed = COALESCE(task_statistics.messages_failed, 0) + 1,
-                        last_activity = NOW()
-                """
-
-            await self.execute_command(query, task_id)
+            statement = "task_statistics_success" if status == "success" else "task_statistics_failed"
+            await self.execute_named(statement, task_id)
             return True
         except Exception as e:
             logger.error(f"Failed to update statistics: {e}")
@@ -947,15 +1477,23 @@ class Database:
 
     async def get_task_statistics(self, task_id: int) -> Optional[Dict[str, Any]]:
         """Get task statistics"""
-        query = """
-            SELECT * FROM task_statistics WHERE task_id = $1
-        """
-        result = await self.execute_query(query, task_id)
+        result = await self.fetch_named("task_statistics", task_id)
         return result[0] if result else None
 
-    async def cleanup_old_logs(self, days: int = 30) -> int:
-        """Clean up old forwarding logs"""
+    async def cleanup_old_logs(self, days: Optional[int] = None) -> int:
+        """Remove forwarding logs older than the retention period.
+
+        With partitioning this creates upcoming partitions and drops or detaches whole
+        expired ones; the returned row count is then an estimate.
+        """
+        days = self.log_retention_days if days is None else days
         try:
+            if self.log_partitions:
+                await self.log_partitions.ensure_future()
+                retired, rows = await self.log_partitions.retire(days)
+                logger.info(f"Retired {retired} log partitions (~{rows} rows)")
+                return rows
+
             query = """
                 DELETE FROM forwarding_logs 
                 WHERE processed_at < NOW() - INTERVAL '%s days'
@@ -967,6 +1505,225 @@ class Database:
             logger.error(f"Failed to cleanup logs: {e}")
             return 0
 
+    async def rollup_log_statistics(self) -> int:
+        """Fold finished days of hourly rollups into log_rollup_daily and prune old hourly rows.
+
+        Re-running is safe: a day's daily rows are replaced, not added to.
+        """
+        try:
+            watermark = "(SELECT rolled_through FROM log_rollup_state WHERE id = 1)"
+            result = await self.execute_command(f"""
+                INSERT INTO log_rollup_daily (day, task_id, target_chat_id, status, {ROLLUP_MEASURES})
+                SELECT DATE(bucket), task_id, target_chat_id, status, SUM(message_count),
+                       SUM(processing_time_total), SUM(processing_time_count),
+                       MAX(processing_time_max), MIN(processing_time_min)
+                FROM log_rollup_hourly
+                WHERE bucket >= {watermark} AND bucket < CURRENT_DATE
+                GROUP BY DATE(bucket), task_id, target_chat_id, status
+                ON CONFLICT (day, task_id, target_chat_id, status)
+                DO UPDATE SET
+                    message_count = EXCLUDED.message_count,
+                    processing_time_total = EXCLUDED.processing_time_total,
+                    processing_time_count = EXCLUDED.processing_time_count,
+                    processing_time_max = EXCLUDED.processing_time_max,
+                    processing_time_min = EXCLUDED.processing_time_min
+            """)
+            await self.execute_command(
+                "UPDATE log_rollup_state SET rolled_through = CURRENT_DATE WHERE id = 1 AND rolled_through < CURRENT_DATE"
+            )
+            await self.execute_command(f"""
+                DELETE FROM log_rollup_hourly
+                WHERE bucket < CURRENT_DATE - INTERVAL '{HOURLY_ROLLUP_DAYS} days' AND bucket < {watermark}
+            """)
+            rows = int(result.split()[-1]) if result else 0
+            logger.debug(f"Rolled up {rows} daily log statistics rows")
+            return rows
+        except Exception as e:
+            logger.error(f"Failed to roll up log statistics: {e}")
+            return 0
+
+    def _rollup_source(self, window: Any = None) -> str:
+        """Subquery over rollup rows for a ROLLUP_WINDOWS key, a number of days, or all time"""
+        columns = f"task_id, target_chat_id, status, {ROLLUP_MEASURES}"
+        if isinstance(window, int):
+            since = f"CURRENT_DATE - INTERVAL '{window} days'" if window < HOURLY_ROLLUP_DAYS else None
+            daily_since = f"CURRENT_DATE - INTERVAL '{window} days'"
+        else:
+            since = ROLLUP_WINDOWS[window] if window else None
+            daily_since = None
+
+        if since:
+            return f"SELECT bucket, {columns} FROM log_rollup_hourly WHERE bucket >= {since}"
+
+        watermark = "(SELECT rolled_through FROM log_rollup_state WHERE id = 1)"
+        daily_filter = f" AND day >= {daily_since}" if daily_since else ""
+        return f"""
+            SELECT day AS bucket, {columns} FROM log_rollup_daily WHERE day < {watermark}{daily_filter}
+            UNION ALL
+            SELECT bucket, {columns} FROM log_rollup_hourly WHERE bucket >= {watermark}
+        """
+
+    def _rollup_filters(self, task_id: Optional[int], user_id: Optional[int]):
+        """JOIN and WHERE clauses plus arguments restricting rollup rows to a task or a user's tasks"""
+        join, conditions, args = "", [], []
+        if task_id is not None:
+            args.append(task_id)
+            conditions.append(f"r.task_id = ${len(args)}")
+        if user_id is not None:
+            args.append(user_id)
+            join = "JOIN tasks t ON t.id = r.task_id JOIN users u ON u.id = t.user_id"
+            conditions.append(f"u.telegram_id = ${len(args)}")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return join, where, args
+
+    async def get_log_counts(self, window: Any = None, task_id: Optional[int] = None,
+                             user_id: Optional[int] = None) -> Dict[str, int]:
+        """Message counts by status from the rollups; user_id is a Telegram ID
+
+        Windows are whole hourly buckets (see ROLLUP_WINDOWS), so "1h" counts the
+        previous and the current clock hour.
+        """
+        join, where, args = self._rollup_filters(task_id, user_id)
+        try:
+            rows = await self.execute_query(f"""
+                SELECT r.status, SUM(r.message_count) AS count
+                FROM ({self._rollup_source(window)}) r {join}
+                {where}
+                GROUP BY r.status
+            """, *args)
+            return {row["status"]: int(row["count"] or 0) for row in rows}
+        except Exception as e:
+            logger.error(f"Failed to get log counts: {e}")
+            return {}
+
+    async def get_log_processing_times(self, window: Any = None, task_id: Optional[int] = None) -> Dict[str, float]:
+        """Average, maximum and minimum processing time in milliseconds from the rollups"""
+        join, where, args = self._rollup_filters(task_id, None)
+        try:
+            rows = await self.execute_query(f"""
+                SELECT SUM(r.processing_time_total) * 1.0 / NULLIF(SUM(r.processing_time_count), 0) AS avg_time,
+                       MAX(r.processing_time_max) AS max_time,
+                       MIN(NULLIF(r.processing_time_min, 0)) AS min_time
+                FROM ({self._rollup_source(window)}) r {join}
+                {where}
+            """, *args)
+            row = rows[0] if rows else {}
+            return {key: float(row.get(key) or 0) for key in ("avg_time", "max_time", "min_time")}
+        except Exception as e:
+            logger.error(f"Failed to get processing times: {e}")
+            return {"avg_time": 0.0, "max_time": 0.0, "min_time": 0.0}
+
+    async def get_log_daily_counts(self, days: int) -> List[Dict[str, Any]]:
+        """Per-day total, successful and failed message counts for the last N days"""
+        return await self.execute_query(f"""
+            SELECT DATE(r.bucket) AS date,
+                   SUM(r.message_count) AS total_messages,
+                   SUM(CASE WHEN r.status = 'success' THEN r.message_count ELSE 0 END) AS successful_messages,
+                   SUM(CASE WHEN r.status = 'failed' THEN r.message_count ELSE 0 END) AS failed_messages
+            FROM ({self._rollup_source(days)}) r
+            GROUP BY DATE(r.bucket)
+            ORDER BY date
+        """)
+
+    async def get_log_hourly_distribution(self, days: int, task_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Message counts per hour of day over the last N days (capped at the hourly retention)"""
+        days = min(days, HOURLY_ROLLUP_DAYS - 1)
+        join, where, args = self._rollup_filters(task_id, None)
+        return await self.execute_query(f"""
+            SELECT EXTRACT(HOUR FROM r.bucket) AS hour, SUM(r.message_count) AS message_count
+            FROM ({self._rollup_source(days)}) r {join}
+            {where}
+            GROUP BY EXTRACT(HOUR FROM r.bucket)
+            ORDER BY hour
+        """, *args)
+
+    async def get_task_log_summary(self, days: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Busiest tasks over the last N days with success counts and average processing time"""
+        return await self.execute_query(f"""
+            SELECT t.name,
+                   COALESCE(SUM(r.message_count), 0) AS total_messages,
+                   COALESCE(SUM(CASE WHEN r.status = 'success' THEN r.message_count ELSE 0 END), 0) AS successful_messages,
+                   SUM(r.processing_time_total) * 1.0 / NULLIF(SUM(r.processing_time_count), 0) AS avg_processing_time
+            FROM tasks t
+            LEFT JOIN ({self._rollup_source(days)}) r ON r.task_id = t.id
+            GROUP BY t.id, t.name
+            ORDER BY total_messages DESC
+            LIMIT $1
+        """, limit)
+
+    async def delete_log_rollups(self, task_id: int, status: Optional[str] = None):
+        """Drop a task's rollup rows, optionally only for one status"""
+        for table in ("log_rollup_hourly", "log_rollup_daily"):
+            if status:
+                await self.execute_command(f"DELETE FROM {table} WHERE task_id = $1 AND status = $2", task_id, status)
+            else:
+                await self.execute_command(f"DELETE FROM {table} WHERE task_id = $1", task_id)
+
+    async def get_recurring_schedule(self, since: Any = None) -> List[Dict[str, Any]]:
+        """Get schedule rows for recurring posts, optionally only those changed since a watermark.
+
+        Rows for posts that are paused, whose task is inactive or whose task has recurring
+        posts switched off come back with enabled = FALSE so the caller can drop them.
+        """
+        query = """
+            SELECT r.id, r.next_post_time,
+                   (r.is_active AND t.is_active AND COALESCE(ts.recurring_post_enabled, FALSE)) AS enabled
+            FROM recurring_posts r
+            JOIN tasks t ON t.id = r.task_id
+            LEFT JOIN task_settings ts ON ts.task_id = r.task_id
+        """
+        try:
+            if since is None:
+                return await self.execute_query(query)
+            return await self.execute_query(
+                query + " WHERE r.updated_at > $1 OR t.updated_at > $1 OR ts.updated_at > $1", since
+            )
+        except Exception as e:
+            logger.error(f"Failed to get recurring schedule: {e}")
+            return []
+
+    async def get_recurring_posts(self, post_ids: List[int]) -> List[Dict[str, Any]]:
+        """Get enabled recurring posts with the chat IDs of their task's active targets"""
+        try:
+            return await self.execute_query("""
+                SELECT r.*, LOCALTIMESTAMP AS db_now,
+                       ARRAY(SELECT tg.chat_id FROM targets tg
+                             WHERE tg.task_id = r.task_id AND tg.is_active = TRUE) AS target_chat_ids
+                FROM recurring_posts r
+                JOIN tasks t ON t.id = r.task_id
+                JOIN task_settings ts ON ts.task_id = r.task_id
+                WHERE r.id = ANY($1::int[])
+                  AND r.is_active = TRUE AND t.is_active = TRUE AND ts.recurring_post_enabled = TRUE
+            """, post_ids)
+        except Exception as e:
+            logger.error(f"Failed to get recurring posts: {e}")
+            return []
+
+    async def advance_recurring_posts(self, updates: List[Dict[str, Any]]) -> bool:
+        """Store next/last post times and sent message IDs for many posts in one UPDATE"""
+        if not updates:
+            return True
+        try:
+            import json
+            await self.execute_command("""
+                UPDATE recurring_posts AS r
+                SET next_post_time = u.next_post_time,
+                    last_post_time = u.last_post_time,
+                    previous_message_ids = u.message_ids::jsonb
+                FROM UNNEST($1::int[], $2::timestamp[], $3::timestamp[], $4::text[])
+                     AS u(id, next_post_time, last_post_time, message_ids)
+                WHERE r.id = u.id
+            """,
+                [update["id"] for update in updates],
+                [update["next_post_time"] for update in updates],
+                [update["last_post_time"] for update in updates],
+                [json.dumps(update["message_ids"]) for update in updates]
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Failed to advance recurring posts: {e}")
+            return False
+
     async def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
         try:
@@ -975,12 +1732,7 @@ class Database:
                 "total_tasks": "SELECT COUNT(*) as count FROM tasks",
                 "active_tasks": "SELECT COUNT(*) as count FROM tasks WHERE is_active = true",
                 "total_sources": "SELECT COUNT(*) as count FROM sources",
-                "total_targets": "SELECT COUNT(*) as count FROM targets",
-                "total_logs": "SELECT COUNT(*) as count FROM forwarding_logs",
-                "logs_today": """
-                    SELECT COUNT(*) as count FROM forwarding_logs 
-                    WHERE DATE(processed_at) = CURRENT_DATE
-                """
+                "total_targets": "SELECT COUNT(*) as count FROM targets"
             }
 
             stats = {}
@@ -988,11 +1740,26 @@ class Database:
                 result = await self.execute_query(query)
                 stats[key] = result[0]["count"] if result else 0
 
+            stats["total_logs"] = sum((await self.get_log_counts()).values())
+            stats["logs_today"] = sum((await self.get_log_counts("today")).values())
+
+            stats["queries"] = self.get_query_stats()
+            if self.log_partitions:
+                stats["log_partitions"] = await self.log_partitions.get_stats()
             return stats
         except Exception as e:
             logger.error(f"Failed to get database stats: {e}")
             return {}
 
+    def get_query_stats(self, top: int = 10) -> Dict[str, Any]:
+        """Per-statement call counts, latency percentiles and recent slow queries"""
+        stats = self.queries.get_stats(top)
+        if self.pool:
+            stats["pool"] = {"size": self.pool.get_size(), "idle": self.pool.get_idle_size()}
+        if self.sqlite:
+            stats["sqlite"] = self.sqlite.get_stats()
+        return stats
+
     async def close(self):
         """Close database connections"""
         try:
@@ -1000,6 +1767,11 @@ class Database:
                 await self.pool.close()
                 logger.info("Connection pool closed")
 
+            if self.sqlite:
+                await self.sqlite.close()
+                self.sqlite = None
+                logger.info("SQLite backend closed")
+
             if self.engine:
                 await self.engine.dispose()
                 logger.info("Database engine disposed")
@@ -4,7 +4,9 @@ Forwarding Engine - Core message forwarding logic
 
 import asyncio
 import time
+import html
 from datetime import datetime, timedelta
+from itertools import islice
 from typing import Dict, List, Any, Optional, Set
 import re
 import random
@@ -32,15 +34,44 @@ from googletrans import Translator
 from database import Database
 from security import SecurityManager
 from modules.channel_monitor import ChannelMonitor
+from modules.digest import DigestManager, build_entry, pack_digest
+from modules.delivery_window import DeliveryWindow, DeferredDeliveryQueue, window_fingerprint
+from modules.ingest_scheduler import IngestScheduler
+from modules.leader_election import LeaderElection
+from modules.overflow_spool import OverflowSpool
+from modules.performance_monitor import PerformanceMonitor
+from modules.outbound_scheduler import OutboundScheduler, LANE_URGENT, LANE_NEW, LANE_BACKGROUND
+from modules.recurring_posts import RecurringPostScheduler
+from modules.registry_snapshot import RegistrySnapshot
 from modules.statistics import StatisticsManager
+from modules.message_snapshot import MessageSnapshot
+from utils.job_scheduler import get_job_scheduler
 import json
 
 
+# Media kind -> (Bot method, file parameter, accepts a caption) for re-sending approved posts
+APPROVAL_MEDIA_SENDERS = {
+    'photo': ('send_photo', 'photo', True),
+    'video': ('send_video', 'video', True),
+    'animation': ('send_animation', 'animation', True),
+    'document': ('send_document', 'document', True),
+    'audio': ('send_audio', 'audio', True),
+    'voice': ('send_voice', 'voice', True),
+    'video_note': ('send_video_note', 'video_note', False),
+    'sticker': ('send_sticker', 'sticker', False),
+}
+
+
 class ForwardingEngine:
     """Core forwarding engine for message processing"""
     
     def __init__(self, database: Database, bot: Bot, userbot: Optional[Any], 
-                 security_manager: SecurityManager):
+                 security_manager: SecurityManager, startup_concurrency: int = 10,
+                 snapshot_path: str = "data/registry_snapshot.json", ingest_workers: int = 8,
+                 outbound_rate: float = 25.0, ingest_spill_dir: str = "data/ingest_spill",
+                 deferred_path: str = "data/deferred_delivery.jsonl",
+                 spool_path: str = "data/overflow_spool.jsonl",
+                 digest_path: str = "data/digest_buffers.json"):
         self.database = database
         self.bot = bot
         self.userbot = userbot
@@ -69,7 +100,7 @@ class ForwardingEngine:
         # Advanced features cache with TTL
         self._settings_cache: Dict[int, Dict[str, Any]] = {}
         self._cache_timestamp: Dict[int, float] = {}
-        self.duplicate_tracker: Set[str] = set()
+        self.duplicate_tracker: Dict[str, None] = {}  # Insertion-ordered, so trimming drops the oldest
         self._cache_size_limit = 1000  # Limit cache size
         self._duplicate_cleanup_interval = 3600  # Clean duplicates every hour
         
@@ -78,11 +109,74 @@ class ForwardingEngine:
         self.cache_last_update = None
         self.cache_ttl = 300  # 5 minutes
         
+        # Incremental reload state
+        self.source_routes: Dict[int, List[int]] = {}  # source chat_id -> task ids
+        self._tasks_watermark = None
+        self._reload_lock = asyncio.Lock()
+        self.last_reload_report: Dict[str, Any] = {}
+        
+        # Startup state
+        self.startup_concurrency = max(1, startup_concurrency)
+        self.snapshot = RegistrySnapshot(snapshot_path)
+        self._snapshot_settings: Dict[int, Optional[Dict[str, Any]]] = {}
+        self.warm_started = False
+        self.startup_complete = False
+        self.reconciled = False
+        self.startup_duration = None
+        self.last_heartbeat = None
+        
+        # Ingest layer: per-task queues feeding a fixed worker pool
+        self.ingest = IngestScheduler(
+            self.process_message,
+            workers=ingest_workers,
+            spill_dir=ingest_spill_dir,
+            message_loader=self._load_spilled_message
+        )
+        
+        # Outbound sending capacity shared by all send paths, by priority lane
+        self.outbound = OutboundScheduler(rate_per_second=outbound_rate)
+        
+        # Set by the front process in sharded mode (see modules.sharding)
+        self.shard_router = None
+        
+        # Cluster-wide jobs run only in the elected process
+        self.leader = LeaderElection(database)
+        
+        # Working hours / day filter: compiled windows and the out-of-window holding queue
+        self._delivery_windows: Dict[int, tuple] = {}  # task_id -> (fingerprint, DeliveryWindow or None)
+        self.deferred = DeferredDeliveryQueue(
+            self._release_deferred,
+            path=deferred_path,
+            message_loader=self._load_spilled_message
+        )
+        
+        # Messages over a task's sending limits wait here for quota
+        self.spool = OverflowSpool(
+            self._release_spooled,
+            self._spool_can_send,
+            path=spool_path,
+            message_loader=self._load_spilled_message
+        )
+        
+        # Digest mode: posts are buffered per task and sent as one summary
+        self.digest = DigestManager(self._send_digest, path=digest_path)
+        
+        # Recurring posts go out from the leader only, through the background lane
+        self.recurring = RecurringPostScheduler(database, bot, self.outbound, self.leader)
+        
+        # System metrics in every process; database statistics on the leader only
+        self.performance = PerformanceMonitor(database, self.leader)
+        
+        # Periodic maintenance runs as jobs on the shared scheduler
+        self.jobs = get_job_scheduler()
+        self._job_names: List[str] = []
+        
     async def initialize(self):
         """Initialize the forwarding engine"""
         try:
             await self.statistics.initialize()
-            await self._load_active_tasks()
+            if not self._load_snapshot():
+                await self._load_active_tasks()
             logger.success("Forwarding engine initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize forwarding engine: {e}")
@@ -97,12 +191,31 @@ class ForwardingEngine:
         try:
             self.running = True
             self.start_time = datetime.now()
+            self.last_heartbeat = time.time()
+            
+            await self.leader.start()
+            
+            # Start ingest workers before monitors begin submitting
+            await self.outbound.start()
+            await self.ingest.start()
+            await self.recurring.start()
+            await self.deferred.start()
+            await self.spool.start()
+            await self.digest.start()
             
             # Start monitoring active tasks
             await self._start_monitoring()
             
+            # Catch up with changes made while we were down
+            if self.warm_started:
+                asyncio.create_task(self._reconcile_warm_start())
+            else:
+                self.reconciled = True
+            
             # Start background tasks
-            asyncio.create_task(self._background_tasks())
+            self._register_jobs()
+            await self.performance.start_monitoring()
+            await self.jobs.start()
             
             logger.success("Forwarding engine started successfully")
             
@@ -118,12 +231,26 @@ class ForwardingEngine:
         
         try:
             self.running = False
+            self._unregister_jobs()
+            await self.performance.stop_monitoring()
+            
+            # Persist the registry so the next start can route immediately
+            self._save_snapshot()
             
             # Stop all monitors
             for monitor in self.monitors.values():
                 await monitor.stop()
             
             self.monitors.clear()
+            
+            # Drain or spill whatever is still queued
+            await self.ingest.stop()
+            await self.deferred.stop()
+            await self.spool.stop()
+            await self.digest.stop()
+            await self.recurring.stop()
+            await self.outbound.stop()
+            await self.leader.stop()
             logger.success("Forwarding engine stopped successfully")
             
         except Exception as e:
@@ -132,9 +259,16 @@ class ForwardingEngine:
     async def _load_active_tasks(self):
         """Load active tasks from database"""
         try:
+            # Take the watermark before reading so concurrent writes are picked up next time
+            watermark = await self.database.get_change_watermark()
             tasks = await self.database.get_active_tasks()
             self.active_tasks_cache = {task["id"]: task for task in tasks}
             self.cache_last_update = datetime.now()
+            self._tasks_watermark = watermark
+            
+            self.source_routes = {}
+            for task_id, task in self.active_tasks_cache.items():
+                self._index_task(task_id, task)
             
             logger.info(f"Loaded {len(tasks)} active tasks")
             
@@ -142,25 +276,87 @@ class ForwardingEngine:
             logger.error(f"Failed to load active tasks: {e}")
             raise
     
-    async def _start_monitoring(self):
-        """Start monitoring for all active tasks"""
+    def _load_snapshot(self) -> bool:
+        """Warm-start the task registry from the local snapshot"""
+        data = self.snapshot.load()
+        if not data:
+            return False
+        
+        self.active_tasks_cache = data["tasks"]
+        self._snapshot_settings = data["settings"]
+        self._tasks_watermark = data["watermark"]
+        self.cache_last_update = datetime.now()
+        
+        self.source_routes = {}
         for task_id, task in self.active_tasks_cache.items():
-            try:
-                await self._start_task_monitoring(task_id, task)
-            except Exception as e:
-                logger.error(f"Failed to start monitoring for task {task_id}: {e}")
+            self._index_task(task_id, task)
+        
+        self.warm_started = True
+        logger.info(f"Warm start: loaded {len(self.active_tasks_cache)} tasks from snapshot ({int(data['age_seconds'])}s old)")
+        return True
+    
+    def _save_snapshot(self):
+        """Write the current task registry to the local snapshot"""
+        if not self.startup_complete:
+            return
+        settings = {task_id: monitor.settings for task_id, monitor in self.monitors.items()}
+        self.snapshot.save(self.active_tasks_cache, settings, self._tasks_watermark)
+    
+    async def _reconcile_warm_start(self):
+        """Reconcile a snapshot-based registry with the database in the background"""
+        try:
+            report = await self._reload_tasks()
+            if report.get("error"):
+                # Incremental catch-up failed, fall back to a full diff
+                self._tasks_watermark = None
+                await self._reload_tasks()
+            self.reconciled = True
+            logger.info("Warm start reconciled with database")
+        except Exception as e:
+            logger.error(f"Failed to reconcile warm start: {e}")
+        finally:
+            self._snapshot_settings = {}
     
-    async def _start_task_monitoring(self, task_id: int, task: Dict[str, Any]):
+    async def _start_monitoring(self):
+        """Start monitoring for all active tasks with bounded concurrency"""
+        started = time.time()
+        semaphore = asyncio.Semaphore(self.startup_concurrency)
+        
+        async def start_one(task_id: int, task: Dict[str, Any]):
+            async with semaphore:
+                try:
+                    await self._start_task_monitoring(
+                        task_id, task, settings=self._snapshot_settings.get(task_id)
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to start monitoring for task {task_id}: {e}")
+        
+        await asyncio.gather(*[
+            start_one(task_id, task) for task_id, task in list(self.active_tasks_cache.items())
+        ])
+        
+        self.startup_complete = True
+        self.startup_duration = round(time.time() - started, 2)
+        logger.info(f"Started {len(self.monitors)} monitors in {self.startup_duration}s "
+                    f"(concurrency {self.startup_concurrency}, {'warm' if self.warm_started else 'cold'} start)")
+    
+    async def _start_task_monitoring(self, task_id: int, task: Dict[str, Any],
+                                     settings: Optional[Dict[str, Any]] = None):
         """Start monitoring for a specific task with automatic fallback to Bot API"""
+        sources = []
         try:
-            # Get task sources
-            sources = await self.database.get_task_sources(task_id)
+            # Get task sources, reusing the ones loaded with the task
+            sources = task.get("sources")
+            if sources is None:
+                sources = await self.database.get_task_sources(task_id)
             if not sources:
                 logger.warning(f"No sources found for task {task_id}")
                 return
             
             # Get task settings
-            settings = await self.database.get_task_settings(task_id)
+            if settings is None:
+                settings = await self.database.get_task_settings(task_id)
+            self.ingest.configure_task(task_id, settings)
             
             # Check if userbot is needed and available
             use_userbot = (task["task_type"] == "userbot" and 
@@ -234,22 +430,25 @@ class ForwardingEngine:
             except Exception as e:
                 logger.error(f"Error stopping monitor for task {task_id}: {e}")
     
-    async def process_channel_message(self, chat_id: int, message: Any) -> bool:
-        """Process incoming channel message and check if it needs forwarding"""
+    async def process_channel_message(self, chat_id: int, message: Any, seq: Optional[int] = None) -> bool:
+        """Process incoming channel message and check if it needs forwarding
+
+        In a shard worker, seq is the supervisor's dispatch number; the ingest scheduler
+        reports it settled once the queued message has been handled.
+        """
         try:
+            # In sharded mode the worker owning this chat does the work
+            if self.shard_router and self.shard_router.dispatch("new", chat_id, message):
+                return True
+            
             # Find all tasks that monitor this source channel
-            for task_id, task in self.active_tasks_cache.items():
-                if not task.get("is_active"):
+            for task_id in self.source_routes.get(chat_id, []):
+                task = self.active_tasks_cache.get(task_id)
+                if not task or not task.get("is_active"):
                     continue
                 
-                # Check if this chat_id is a source for this task
-                sources = await self.database.get_task_sources(task_id)
-                source_chat_ids = [s["chat_id"] for s in sources if s["is_active"]]
-                
-                if chat_id in source_chat_ids:
-                    logger.info(f"Processing channel message from {chat_id} for task {task_id}")
-                    success = await self.process_message(task_id, chat_id, message)
-                    return success
+                logger.info(f"Queueing channel message from {chat_id} for task {task_id}")
+                return await self.submit_message(task_id, chat_id, message, seq)
             
             return False  # No matching task found
             
@@ -257,9 +456,24 @@ class ForwardingEngine:
             logger.error(f"Error processing channel message from {chat_id}: {e}")
             return False
 
+    async def submit_message(self, task_id: int, source_chat_id: int, message: Any,
+                             seq: Optional[int] = None) -> bool:
+        """Hand a new message to the ingest scheduler, or process inline if it is not running"""
+        if not self.ingest.running:
+            return await self.process_message(task_id, source_chat_id, message)
+        return self.ingest.submit(task_id, source_chat_id, message, seq)
+    
+    def _load_spilled_message(self, payload: str) -> Any:
+        """Rebuild a Bot API message spilled to disk by the ingest scheduler"""
+        from aiogram.types import Message
+        return Message.model_validate_json(payload).as_(self.bot)
+    
     async def process_edited_message(self, chat_id: int, message: Any) -> bool:
         """Process edited message for synchronization with target channels"""
         try:
+            if self.shard_router and self.shard_router.dispatch("edit", chat_id, message):
+                return True
+            
             logger.info(f"DEBUG: Checking edited message from {chat_id}, active tasks: {list(self.active_tasks_cache.keys())}")
             
             # Find which task this channel belongs to
@@ -362,58 +576,8 @@ class ForwardingEngine:
     async def _store_pending_approval(self, task_id: int, message: Any) -> Optional[int]:
         """Store pending approval in database"""
         try:
-            import json
-            from datetime import datetime
-            
-            # Prepare message data with complete media information
-            message_data = {
-                'message_id': message.message_id,
-                'chat_id': message.chat.id,
-                'text': getattr(message, 'text', None),
-                'caption': getattr(message, 'caption', None),
-                'media_type': self._get_message_media_type(message),
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            # Add media-specific file_id based on media type
-            media_type = message_data['media_type']
-            if media_type == 'photo' and hasattr(message, 'photo') and message.photo:
-                message_data['file_id'] = message.photo[-1].file_id  # Get highest resolution
-            elif media_type == 'video' and hasattr(message, 'video') and message.video:
-                message_data['file_id'] = message.video.file_id
-            elif media_type == 'document' and hasattr(message, 'document') and message.document:
-                message_data['file_id'] = message.document.file_id
-            elif media_type == 'audio' and hasattr(message, 'audio') and message.audio:
-                message_data['file_id'] = message.audio.file_id
-            elif media_type == 'voice' and hasattr(message, 'voice') and message.voice:
-                message_data['file_id'] = message.voice.file_id
-            elif media_type == 'video_note' and hasattr(message, 'video_note') and message.video_note:
-                message_data['file_id'] = message.video_note.file_id
-            elif media_type == 'sticker' and hasattr(message, 'sticker') and message.sticker:
-                message_data['file_id'] = message.sticker.file_id
-            elif media_type == 'animation' and hasattr(message, 'animation') and message.animation:
-                message_data['file_id'] = message.animation.file_id
-            
-            # Store inline keyboard if present
-            if hasattr(message, 'reply_markup') and message.reply_markup:
-                try:
-                    # Convert InlineKeyboardMarkup to dict for JSON storage
-                    keyboard_data = []
-                    if hasattr(message.reply_markup, 'inline_keyboard'):
-                        for row in message.reply_markup.inline_keyboard:
-                            button_row = []
-                            for button in row:
-                                button_data = {
-                                    'text': button.text,
-                                    'url': getattr(button, 'url', None),
-                                    'callback_data': getattr(button, 'callback_data', None)
-                                }
-                                button_row.append(button_data)
-                            keyboard_data.append(button_row)
-                    message_data['inline_keyboard'] = keyboard_data
-                except Exception as e:
-                    logger.error(f"Error storing inline keyboard: {e}")
-                    message_data['inline_keyboard'] = None
+            # Ids, media reference, text and keyboard as compact JSON
+            snapshot = MessageSnapshot.from_message(message)
             
             # Insert into manual_approvals table
             query = """
@@ -422,7 +586,7 @@ class ForwardingEngine:
                 RETURNING id
             """
             result = await self.database.execute_query(
-                query, task_id, message.message_id, message.chat.id, json.dumps(message_data)
+                query, task_id, snapshot.message_id, snapshot.chat_id, snapshot.to_json()
             )
             
             if result:
@@ -493,10 +657,8 @@ class ForwardingEngine:
     async def _process_approved_message(self, approval: dict):
         """Process an approved message for forwarding"""
         try:
-            import json
-            
             task_id = approval['task_id']
-            message_data = json.loads(approval['message_data'])
+            snapshot = MessageSnapshot.from_json(approval['message_data'])
             
             # Get task settings
             settings = await self.database.get_task_settings(task_id)
@@ -514,16 +676,12 @@ class ForwardingEngine:
                 logger.warning(f"No active targets found for approved message in task {task_id}")
                 return
             
-            # Create a mock message object for forwarding
-            class MockMessage:
-                def __init__(self, data):
-                    self.message_id = data['message_id']
-                    self.chat = type('Chat', (), {'id': data['chat_id']})()
-                    self.text = data.get('text')
-                    self.caption = data.get('caption')
-                    self.media_type = data.get('media_type', 'text')
-            
-            mock_message = MockMessage(message_data)
+            # Rebuild the inline keyboard once for all targets
+            try:
+                reply_markup = snapshot.reply_markup()
+            except Exception as e:
+                logger.error(f"Error rebuilding inline keyboard: {e}")
+                reply_markup = None
             
             # Forward to all targets
             success_count = 0
@@ -532,10 +690,13 @@ class ForwardingEngine:
                     # Apply delay
                     await self._apply_delay(settings)
                     
+                    # Approved posts were already held back by a human, send them first
+                    await self.outbound.acquire(LANE_URGENT)
+                    
                     # Forward message with full processing and settings
-                    if message_data.get('text'):
+                    if snapshot.text:
                         # Apply text processing and transformations
-                        processed_text = message_data['text']
+                        processed_text = snapshot.text
                         
                         # Apply text cleaning
                         if settings.get('text_cleaner_settings'):
@@ -548,37 +709,6 @@ class ForwardingEngine:
                         # Apply delay before sending
                         await self._apply_delay(settings)
                         
-                        # Rebuild inline keyboard for text messages too
-                        reply_markup = None
-                        message_data = json.loads(approval['message_data'])
-                        if message_data.get('inline_keyboard'):
-                            try:
-                                from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-                                keyboard_rows = []
-                                for row in message_data['inline_keyboard']:
-                                    button_row = []
-                                    for button_data in row:
-                                        if button_data.get('url'):
-                                            button = InlineKeyboardButton(
-                                                text=button_data['text'],
-                                                url=button_data['url']
-                                            )
-                                        elif button_data.get('callback_data'):
-                                            button = InlineKeyboardButton(
-                                                text=button_data['text'],
-                                                callback_data=button_data['callback_data']
-                                            )
-                                        else:
-                                            continue
-                                        button_row.append(button)
-                                    if button_row:
-                                        keyboard_rows.append(button_row)
-                                if keyboard_rows:
-                                    reply_markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-                            except Exception as e:
-                                logger.error(f"Error rebuilding inline keyboard for text: {e}")
-                                reply_markup = None
-                        
                         result = await self.bot.send_message(
                             chat_id=target['chat_id'],
                             text=processed_text,
@@ -590,16 +720,19 @@ class ForwardingEngine:
                     else:
                         # Handle media messages
                         try:
-                            message_data = json.loads(approval['message_data'])
-                            media_type = message_data.get('media_type', 'unknown')
-                            file_id = message_data.get('file_id')
+                            media_type = snapshot.media_kind
                             
-                            if not file_id:
-                                logger.error(f"No file_id found for media message. Media type: {media_type}, Data: {message_data}")
+                            if not snapshot.file_id:
+                                logger.error(f"No file_id found for media message. Media type: {media_type}, Data: {snapshot}")
+                                continue
+                            
+                            sender = APPROVAL_MEDIA_SENDERS.get(media_type)
+                            if not sender:
+                                logger.warning(f"Unsupported media type: {media_type}")
                                 continue
                                 
                             # Process caption with settings
-                            caption = message_data.get('caption', '')
+                            caption = snapshot.caption
                             if caption and settings.get('text_cleaner_settings'):
                                 caption = await self._apply_text_cleaning(caption, settings.get('text_cleaner_settings', {}))
                             if caption and settings.get('auto_translate', False):
@@ -608,101 +741,16 @@ class ForwardingEngine:
                             # Apply delay before sending
                             await self._apply_delay(settings)
                             
-                            # Rebuild inline keyboard if present
-                            reply_markup = None
-                            if message_data.get('inline_keyboard'):
-                                try:
-                                    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-                                    keyboard_rows = []
-                                    for row in message_data['inline_keyboard']:
-                                        button_row = []
-                                        for button_data in row:
-                                            if button_data.get('url'):
-                                                button = InlineKeyboardButton(
-                                                    text=button_data['text'],
-                                                    url=button_data['url']
-                                                )
-                                            elif button_data.get('callback_data'):
-                                                button = InlineKeyboardButton(
-                                                    text=button_data['text'],
-                                                    callback_data=button_data['callback_data']
-                                                )
-                                            else:
-                                                continue
-                                            button_row.append(button)
-                                        if button_row:
-                                            keyboard_rows.append(button_row)
-                                    if keyboard_rows:
-                                        reply_markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-                                except Exception as e:
-                                    logger.error(f"Error rebuilding inline keyboard: {e}")
-                                    reply_markup = None
-                            
-                            if media_type == 'photo':
-                                result = await self.bot.send_photo(
-                                    chat_id=target["chat_id"],
-                                    photo=file_id,
-                                    caption=caption,
-                                    reply_markup=reply_markup,
-                                    disable_notification=settings.get('silent_mode', False)
-                                )
-                            elif media_type == 'video':
-                                result = await self.bot.send_video(
-                                    chat_id=target["chat_id"],
-                                    video=file_id,
-                                    caption=caption,
-                                    reply_markup=reply_markup,
-                                    disable_notification=settings.get('silent_mode', False)
-                                )
-                            elif media_type == 'document':
-                                result = await self.bot.send_document(
-                                    chat_id=target["chat_id"],
-                                    document=file_id,
-                                    caption=caption,
-                                    reply_markup=reply_markup,
-                                    disable_notification=settings.get('silent_mode', False)
-                                )
-                            elif media_type == 'audio':
-                                result = await self.bot.send_audio(
-                                    chat_id=target["chat_id"],
-                                    audio=file_id,
-                                    caption=caption,
-                                    reply_markup=reply_markup,
-                                    disable_notification=settings.get('silent_mode', False)
-                                )
-                            elif media_type == 'voice':
-                                result = await self.bot.send_voice(
-                                    chat_id=target["chat_id"],
-                                    voice=file_id,
-                                    caption=caption,
-                                    reply_markup=reply_markup,
-                                    disable_notification=settings.get('silent_mode', False)
-                                )
-                            elif media_type == 'video_note':
-                                result = await self.bot.send_video_note(
-                                    chat_id=target["chat_id"],
-                                    video_note=file_id,
-                                    reply_markup=reply_markup,
-                                    disable_notification=settings.get('silent_mode', False)
-                                )
-                            elif media_type == 'sticker':
-                                result = await self.bot.send_sticker(
-                                    chat_id=target["chat_id"],
-                                    sticker=file_id,
-                                    reply_markup=reply_markup,
-                                    disable_notification=settings.get('silent_mode', False)
-                                )
-                            elif media_type == 'animation':
-                                result = await self.bot.send_animation(
-                                    chat_id=target["chat_id"],
-                                    animation=file_id,
-                                    caption=caption,
-                                    reply_markup=reply_markup,
-                                    disable_notification=settings.get('silent_mode', False)
-                                )
-                            else:
-                                logger.warning(f"Unsupported media type: {media_type}")
-                                continue
+                            method, file_param, takes_caption = sender
+                            kwargs = {file_param: snapshot.file_id}
+                            if takes_caption:
+                                kwargs['caption'] = caption
+                            result = await getattr(self.bot, method)(
+                                chat_id=target["chat_id"],
+                                reply_markup=reply_markup,
+                                disable_notification=settings.get('silent_mode', False),
+                                **kwargs
+                            )
                                 
                             forwarded_id = result.message_id if result else None
                             logger.info(f"Media message ({media_type}) forwarded successfully to {target['chat_id']}")
@@ -725,23 +773,7 @@ class ForwardingEngine:
             
         except Exception as e:
             logger.error(f"Error processing approved message: {e}")
-    
-    def _get_message_media_type(self, message) -> str:
-        """Get message media type"""
-        if hasattr(message, 'photo') and message.photo:
-            return 'photo'
-        elif hasattr(message, 'video') and message.video:
-            return 'video'
-        elif hasattr(message, 'document') and message.document:
-            return 'document'
-        elif hasattr(message, 'audio') and message.audio:
-            return 'audio'
-        elif hasattr(message, 'voice') and message.voice:
-            return 'voice'
-        elif hasattr(message, 'video_note') and message.video_note:
-            return 'video_note'
-        else:
-            return 'text'
+
 
     async def _sync_edited_message(self, task_id: int, source_chat_id: int, message: Any) -> bool:
         """Synchronize edited message with all target channels"""
@@ -755,12 +787,7 @@ class ForwardingEngine:
                 return False
             
             # Find all forwarded messages for this original message
-            query = """
-            SELECT target_message_ids FROM message_tracking 
-            WHERE task_id = $1 AND source_message_id = $2
-            ORDER BY created_at DESC LIMIT 1
-            """
-            result = await self.database.execute_query(query, task_id, message_id)
+            result = await self.database.fetch_named("mapping_latest", task_id, message_id)
             
             if not result:
                 logger.info(f"No forwarded messages found for edited message {message_id}")
@@ -805,7 +832,8 @@ class ForwardingEngine:
                     logger.warning(f"No forwarded message found for target {target_chat_id}")
                     continue
                 
-                # Sync the edit
+                # Sync the edit; corrections jump ahead of new posts
+                await self.outbound.acquire(LANE_URGENT)
                 success = await self._sync_edit_to_target(message, target_chat_id, forwarded_message_id, settings)
                 if success:
                     sync_count += 1
@@ -843,12 +871,8 @@ class ForwardingEngine:
                 
                 # Apply caption modifications if needed
                 if settings:
-                    # Create a temporary message object with caption as text for processing
-                    class CaptionMessage:
-                        def __init__(self, caption):
-                            self.text = caption
-                    
-                    temp_message = CaptionMessage(original_message.caption)
+                    # Run the caption through the text pipeline as a text message
+                    temp_message = MessageSnapshot.text_only(original_message.caption)
                     modified_caption = await self._get_modified_text(temp_message, settings)
                     if modified_caption:
                         new_caption = modified_caption
@@ -901,27 +925,155 @@ class ForwardingEngine:
             
         except Exception as e:
             logger.error(f"Error syncing edit to target {target_chat_id}: {e}")
+            self._note_flood_wait(e)
             return False
 
-    async def _check_day_filter(self, settings: Dict[str, Any]) -> bool:
-        """Check if current day is allowed by day filter"""
+    def _get_delivery_window(self, task_id: int, settings: Dict[str, Any]) -> Optional[DeliveryWindow]:
+        """Get the task's compiled delivery window, recompiling only when its settings change"""
+        fingerprint = window_fingerprint(settings)
+        cached = self._delivery_windows.get(task_id)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+        
+        window = DeliveryWindow.compile(settings)
+        self._delivery_windows[task_id] = (fingerprint, window)
+        return window
+    
+    async def _release_deferred(self, task_id: int, source_chat_id: int, message: Any):
+        """Deliver a held message once its window opens; the background lane keeps live posts first"""
+        if task_id in self.active_tasks_cache:
+            await self.process_message(task_id, source_chat_id, message, lane=LANE_BACKGROUND)
+    
+    async def _get_digest_source_name(self, task_id: int, message: Any) -> str:
+        """Name a digest item's source the same way headers do"""
+        chat = getattr(message, "chat", None)
+        if chat:
+            if getattr(chat, "title", None):
+                return chat.title
+            if getattr(chat, "username", None):
+                return f"@{chat.username}"
+        
         try:
-            if not settings.get("day_filter_enabled", False):
-                return True
-            
-            day_filter_settings = settings.get("day_filter_settings", {})
-            if isinstance(day_filter_settings, str):
-                day_filter_settings = json.loads(day_filter_settings)
-            
-            # Get current day of week
-            current_day = datetime.now().strftime('%A').lower()
-            
-            # Check if current day is allowed
-            return day_filter_settings.get(current_day, True)
-            
+            sources = await self.database.get_task_sources(task_id)
+            chat_id = getattr(chat, "id", None)
+            for source in sources or []:
+                if str(source.get("chat_id")) == str(chat_id):
+                    return source.get("name") or "Unknown Source"
         except Exception as e:
-            logger.error(f"Error checking day filter: {e}")
+            logger.warning(f"Could not retrieve source name: {e}")
+        return "Unknown Source"
+    
+    async def _send_digest(self, task_id: int, entries: List[Dict[str, Any]]) -> bool:
+        """Render a task's buffered posts with its header/footer/format settings and send them once
+
+        Each entry remembers the targets it reached (`delivered_to`); if any target fails the
+        digest returns False, is buffered again and the retry only sends what each target missed.
+        """
+        if task_id not in self.active_tasks_cache:
+            # Task went away; nothing to deliver to
             return True
+        
+        settings = await self.database.get_task_settings(task_id) or self._get_default_settings()
+        targets = [t for t in await self.database.get_task_targets(task_id) if t.get("is_active")]
+        if not targets:
+            logger.warning(f"No targets found for digest of task {task_id}")
+            return True
+        
+        # Per-post formatting, then the link (kept outside so remove_all cannot strip it,
+        # and so truncating a long post never cuts into the markup)
+        items = []
+        for entry in entries:
+            text = entry.get("text") or ""
+            if settings.get("format_settings") and text:
+                text = await self._apply_formatting(MessageSnapshot.text_only(text), settings) or text
+            link = f'<a href="{entry["link"]}">↗</a>' if entry.get("link") else ""
+            if link and text:
+                link = f"\n{link}"
+            items.append((f"• {text}", link))
+        
+        now = datetime.now()
+        
+        def render(template: Optional[str], enabled: bool, pending: List[Dict[str, Any]]) -> str:
+            if not template or not template.strip() or not enabled:
+                return ""
+            sources = sorted({entry.get("source") or "Unknown Source" for entry in pending})
+            variables = {
+                "{original}": "",
+                "{source}": html.escape(", ".join(sources)),
+                "{time}": now.strftime("%H:%M"),
+                "{date}": now.strftime("%Y-%m-%d"),
+                "{count}": str(len(pending))
+            }
+            for var, value in variables.items():
+                template = template.replace(var, value)
+            return template.strip()
+        
+        failed_targets = []
+        messages_sent = 0
+        for target in targets:
+            chat_id = target["chat_id"]
+            pending = [i for i, entry in enumerate(entries) if chat_id not in entry.get("delivered_to", ())]
+            if not pending:
+                continue
+            pending_entries = [entries[i] for i in pending]
+            header = render(settings.get("prefix_text"), settings.get("header_enabled", True), pending_entries)
+            footer = render(settings.get("suffix_text"), settings.get("footer_enabled", True), pending_entries)
+            
+            for chunk, chunk_items in pack_digest([items[i] for i in pending], header, footer):
+                try:
+                    await self.outbound.acquire(LANE_NEW)
+                    sent = await self.bot.send_message(chat_id, chunk, disable_web_page_preview=True)
+                except Exception as e:
+                    logger.error(f"Error sending digest for task {task_id} to {chat_id}: {e}")
+                    self._note_flood_wait(e)
+                    await self._log_forwarding(task_id, 0, chat_id, 0, None, "failed", str(e))
+                    # The rest of this target's digest goes out with the retry, in order
+                    failed_targets.append(chat_id)
+                    break
+                messages_sent += 1
+                for i in chunk_items:
+                    entries[pending[i]].setdefault("delivered_to", []).append(chat_id)
+                await self._update_sending_stats(task_id)
+                await self._log_forwarding(task_id, 0, chat_id, 0, sent.message_id, "digest")
+        
+        if messages_sent:
+            logger.info(f"Sent digest of {len(entries)} posts in {messages_sent} messages for task {task_id}")
+        if failed_targets:
+            logger.warning(f"Digest for task {task_id} failed for targets {failed_targets}, will retry")
+            return False
+        self.successful_forwards += len(entries)
+        return True
+    
+    def _get_sending_limit_settings(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse the task's sending limit settings"""
+        sending_limit_settings = settings.get("sending_limit_settings") or {}
+        if isinstance(sending_limit_settings, str):
+            try:
+                sending_limit_settings = json.loads(sending_limit_settings)
+            except ValueError:
+                sending_limit_settings = {}
+        return sending_limit_settings
+    
+    async def _spool_can_send(self, task_id: int) -> bool:
+        """Whether a spooled message of this task fits in its sending limits now"""
+        if task_id not in self.active_tasks_cache:
+            self.spool.remove_task(task_id)
+            return False
+        settings = await self._get_cached_settings(task_id)
+        return await self._check_sending_limits(task_id, settings)
+    
+    async def _get_cached_settings(self, task_id: int) -> Dict[str, Any]:
+        """Task settings for hot paths; reload_tasks drops the entry when the settings change"""
+        settings = self._settings_cache.get(task_id)
+        if settings is None or time.time() - self._cache_timestamp.get(task_id, 0) > self.cache_ttl:
+            settings = await self.database.get_task_settings(task_id) or self._get_default_settings()
+            self._settings_cache[task_id] = settings
+            self._cache_timestamp[task_id] = time.time()
+        return settings
+    
+    async def _release_spooled(self, task_id: int, source_chat_id: int, message: Any):
+        """Deliver a spooled message now that quota has freed up"""
+        await self.process_message(task_id, source_chat_id, message, spooled=True)
     
     async def _check_sending_limits(self, task_id: int, settings: Dict[str, Any]) -> bool:
         """Check if sending limits allow this message"""
@@ -929,9 +1081,7 @@ class ForwardingEngine:
             if not settings.get("sending_limit_enabled", False):
                 return True
             
-            sending_limit_settings = settings.get("sending_limit_settings", {})
-            if isinstance(sending_limit_settings, str):
-                sending_limit_settings = json.loads(sending_limit_settings)
+            sending_limit_settings = self._get_sending_limit_settings(settings)
             
             per_minute = sending_limit_settings.get("per_minute", 10)
             per_hour = sending_limit_settings.get("per_hour", 100)
@@ -943,28 +1093,23 @@ class ForwardingEngine:
             current_day = now.date()
             
             # Check minute limit
-            minute_count = await self.database.execute_query(
-                "SELECT COALESCE(message_count, 0) as count FROM sending_stats WHERE task_id = $1 AND day = $2 AND hour = $3 AND minute = $4",
-                task_id, current_day, current_hour.hour, current_minute.minute
+            minute_count = await self.database.fetch_named(
+                "sending_stats_minute", task_id, current_day, current_hour.hour, current_minute.minute
             )
             
             if minute_count and minute_count[0]['count'] >= per_minute:
                 return False
             
             # Check hour limit
-            hour_count = await self.database.execute_query(
-                "SELECT COALESCE(SUM(message_count), 0) as count FROM sending_stats WHERE task_id = $1 AND day = $2 AND hour = $3",
-                task_id, current_day, current_hour.hour
+            hour_count = await self.database.fetch_named(
+                "sending_stats_hour", task_id, current_day, current_hour.hour
             )
             
             if hour_count and hour_count[0]['count'] >= per_hour:
                 return False
             
             # Check day limit
-            day_count = await self.database.execute_query(
-                "SELECT COALESCE(SUM(message_count), 0) as count FROM sending_stats WHERE task_id = $1 AND day = $2",
-                task_id, current_day
-            )
+            day_count = await self.database.fetch_named("sending_stats_day", task_id, current_day)
             
             if day_count and day_count[0]['count'] >= per_day:
                 return False
@@ -983,18 +1128,15 @@ class ForwardingEngine:
             current_hour = now.hour
             current_minute = now.minute
             
-            await self.database.execute_command(
-                """INSERT INTO sending_stats (task_id, day, hour, minute, message_count)
-                   VALUES ($1, $2, $3, $4, 1)
-                   ON CONFLICT (task_id, day, hour, minute)
-                   DO UPDATE SET message_count = sending_stats.message_count + 1""",
-                task_id, current_day, current_hour, current_minute
+            await self.database.execute_named(
+                "sending_stats_increment", task_id, current_day, current_hour, current_minute
             )
             
         except Exception as e:
             logger.error(f"Error updating sending stats: {e}")
 
-    async def process_message(self, task_id: int, source_chat_id: int, message: Any) -> bool:
+    async def process_message(self, task_id: int, source_chat_id: int, message: Any,
+                              lane: str = LANE_NEW, spooled: bool = False) -> bool:
         """Process a message for forwarding"""
         start_time = time.time()
         
@@ -1012,21 +1154,34 @@ class ForwardingEngine:
             if not settings:
                 settings = self._get_default_settings()
             
-            # Check working hours first
-            if not await self._check_working_hours(task_id, settings):
-                await self._log_forwarding(task_id, source_chat_id, 0, message.message_id, 
-                                         None, "working_hours", "Outside working hours")
-                return False
-            
-            # Check day filter
-            if not await self._check_day_filter(settings):
-                logger.info(f"Message blocked by day filter for task {task_id}")
-                await self._log_forwarding(task_id, source_chat_id, 0, message.message_id, 
-                                         None, "day_filter", "Day filter blocked message")
+            # Check working hours and day filter first
+            window = self._get_delivery_window(task_id, settings)
+            if window and not window.is_open():
+                if settings.get("out_of_window_mode") == "defer":
+                    delay = window.seconds_until_open()
+                    if delay is not None and self.deferred.defer(
+                            task_id, source_chat_id, message, time.time() + delay):
+                        return True
+                
+                reason = window.closed_reason()
+                logger.info(f"Message blocked by {reason} for task {task_id}")
+                await self._log_forwarding(task_id, source_chat_id, 0, message.message_id, None, reason,
+                                         "Outside working hours" if reason == "working_hours"
+                                         else "Day filter blocked message")
                 return False
             
-            # Check sending limits
-            if not await self._check_sending_limits(task_id, settings):
+            # Check sending limits; while a task has a backlog, new messages queue behind it
+            # (spooled messages had their quota checked by the spool, digests are counted when sent)
+            digest_enabled = settings.get("digest_enabled", False)
+            if not spooled and not digest_enabled and (self.spool.pending(task_id) or
+                                not await self._check_sending_limits(task_id, settings)):
+                limits = self._get_sending_limit_settings(settings)
+                if limits.get("overflow_mode", "spool") == "spool" and self.spool.add(
+                        task_id, source_chat_id, message,
+                        max_age=limits.get("spool_max_age", 3600),
+                        keep_latest=limits.get("spool_keep_latest", 100)):
+                    return True
+                
                 logger.info(f"Message blocked by sending limits for task {task_id}")
                 await self._log_forwarding(task_id, source_chat_id, 0, message.message_id, 
                                          None, "sending_limit", "Sending limit reached")
@@ -1051,6 +1206,18 @@ class ForwardingEngine:
                                          None, "pending_approval", "Message sent for manual approval")
                 return True  # Message handled, pending approval
             
+            # Digest mode: buffer the post, it goes out with the next digest
+            if digest_enabled:
+                source_name = await self._get_digest_source_name(task_id, message)
+                self.digest.add(
+                    task_id, build_entry(message, source_name),
+                    interval_minutes=settings.get("digest_interval_minutes") or 60,
+                    max_posts=settings.get("digest_max_posts") or 20
+                )
+                await self._log_forwarding(task_id, source_chat_id, 0, message.message_id,
+                                         None, "digest_pending", "Message buffered for digest")
+                return True
+            
             # Get targets
             targets = await self.database.get_task_targets(task_id)
             active_targets = [t for t in targets if t.get("is_active")]
@@ -1068,6 +1235,9 @@ class ForwardingEngine:
                     # Apply delay
                     await self._apply_delay(settings)
                     
+                    # Wait for sending capacity in this job's lane
+                    await self.outbound.acquire(lane)
+                    
                     # Forward message
                     forwarded_id = await self._forward_message(
                         task, settings, message, target["chat_id"], task_id
@@ -1097,6 +1267,7 @@ class ForwardingEngine:
                         
                 except Exception as e:
                     logger.error(f"Error forwarding to target {target['chat_id']}: {e}")
+                    self._note_flood_wait(e)
                     await self._log_forwarding(
                         task_id, source_chat_id, target["chat_id"], 
                         message.message_id, None, "failed", str(e)
@@ -1424,6 +1595,11 @@ class ForwardingEngine:
             logger.error(f"Error checking message filters: {e}")
             return False
     
+    def _trim_duplicate_tracker(self, keep: int):
+        """Drop the oldest message signatures, keeping the newest `keep`"""
+        for signature in list(islice(self.duplicate_tracker, max(len(self.duplicate_tracker) - keep, 0))):
+            del self.duplicate_tracker[signature]
+    
     async def _is_duplicate(self, task_id: int, message: Any) -> bool:
         """Check if message is a duplicate"""
         try:
@@ -1434,10 +1610,10 @@ class ForwardingEngine:
                 return True
             
             # Add to tracker (with size limit)
-            self.duplicate_tracker.add(signature)
+            self.duplicate_tracker[signature] = None
             if len(self.duplicate_tracker) > 10000:
                 # Remove old entries (simple FIFO)
-                self.duplicate_tracker = set(list(self.duplicate_tracker)[-5000:])
+                self._trim_duplicate_tracker(5000)
             
             return False
             
@@ -1445,39 +1621,6 @@ class ForwardingEngine:
             logger.error(f"Error checking duplicate: {e}")
             return False
 
-    async def _check_working_hours(self, task_id: int, settings: Dict[str, Any]) -> bool:
-        """Check if current time is within working hours for the task"""
-        try:
-            if not settings.get("working_hours_enabled", False):
-                return True
-            
-            timezone_str = settings.get("timezone", "UTC")
-            start_hour = settings.get("start_hour", 0)
-            end_hour = settings.get("end_hour", 23)
-            
-            # Get current time in task timezone
-            tz = pytz.timezone(timezone_str)
-            current_time = datetime.now(tz)
-            current_hour = current_time.hour
-            
-            # Check if current hour is within working hours
-            if start_hour <= end_hour:
-                # Normal case: 9 AM to 5 PM
-                is_working_hours = start_hour <= current_hour <= end_hour
-            else:
-                # Overnight case: 10 PM to 6 AM
-                is_working_hours = current_hour >= start_hour or current_hour <= end_hour
-            
-            if not is_working_hours:
-                logger.info(f"Task {task_id}: Outside working hours ({current_hour}:00 not between {start_hour}:00-{end_hour}:00 {timezone_str})")
-                return False
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error checking working hours for task {task_id}: {e}")
-            return True  # Default to allowing if there's an error
-
     async def _translate_message(self, message_text: str, target_language: str) -> str:
         """Translate message text to target language"""
         try:
@@ -1927,13 +2070,7 @@ class ForwardingEngine:
 
                 # Apply formatting to the modified text
                 if settings.get("format_settings") and modified_text:
-                    # Create a temporary message object for formatting
-                    class TempMessage:
-                        def __init__(self, text):
-                            self.text = text
-                            self.caption = None
-                    
-                    temp_msg = TempMessage(modified_text)
+                    temp_msg = MessageSnapshot.text_only(modified_text)
                     formatted_text = await self._apply_formatting(temp_msg, settings)
                     if formatted_text and formatted_text != modified_text:
                         logger.info(f"Formatting applied to text with headers/footers: '{formatted_text[:100]}...'")
@@ -2198,6 +2335,7 @@ class ForwardingEngine:
             
         except TelegramAPIError as e:
             logger.error(f"Telegram API error: {e}")
+            self._note_flood_wait(e)
             return None
     
     async def _forward_with_userbot(self, message: Any, target_chat_id: int, 
@@ -2305,6 +2443,7 @@ class ForwardingEngine:
                 logger.error(f"Telethon userbot session error: {e} - This indicates STRING_SESSION is invalid or expired")
             else:
                 logger.error(f"Telethon userbot error: {e}")
+            self._note_flood_wait(e)
             return None
 
     async def _process_userbot_text(self, text: str, settings: Dict[str, Any]) -> str:
@@ -2347,13 +2486,7 @@ class ForwardingEngine:
             
             # Apply formatting if enabled
             if settings.get("format_settings"):
-                # Create a temporary message object for formatting
-                class TempMessage:
-                    def __init__(self, text):
-                        self.text = text
-                        self.caption = None
-                
-                temp_msg = TempMessage(processed_text)
+                temp_msg = MessageSnapshot.text_only(processed_text)
                 formatted_text = await self._apply_formatting(temp_msg, settings)
                 if formatted_text and formatted_text != processed_text:
                     logger.info(f"Formatting applied: '{formatted_text}'")
@@ -2446,86 +2579,82 @@ class ForwardingEngine:
             logger.error(f"Error getting modified text: {e}")
             return message.text if hasattr(message, 'text') and message.text else None
 
-    async def _process_message_content(self, message: Any, settings: Dict[str, Any]) -> Any:
-        """Process message content based on settings - NO LENGTH FILTERING HERE"""
+    async def _process_message_content(self, message: Any, settings: Dict[str, Any]) -> MessageSnapshot:
+        """Process message content based on settings - NO LENGTH FILTERING HERE
+        
+        Returns a snapshot with the processed text (or caption); the message itself is left untouched.
+        """
+        snapshot = MessageSnapshot.from_message(message)
         try:
             # Handle None settings gracefully
             if settings is None:
                 settings = {}
+            
+            text = snapshot.text
                 
             # Apply text cleaning first
-            if hasattr(message, 'text') and message.text and settings.get("text_cleaner_settings"):
-                import json
+            if text and settings.get("text_cleaner_settings"):
                 try:
                     cleaner_settings = settings["text_cleaner_settings"]
                     if isinstance(cleaner_settings, str):
                         cleaner_settings = json.loads(cleaner_settings)
                     
-                    message.text = await self._apply_text_cleaning(message.text, cleaner_settings)
+                    text = await self._apply_text_cleaning(text, cleaner_settings)
                 except Exception as e:
                     logger.error(f"Error applying text cleaning: {e}")
             
             # Apply text replacements BEFORE formatting
-            if hasattr(message, 'text') and message.text and settings.get("replace_text"):
+            if text and settings.get("replace_text"):
                 try:
-                    import json
                     replace_rules = settings["replace_text"]
                     if isinstance(replace_rules, str):
                         replace_rules = json.loads(replace_rules)
                     
                     logger.info(f"Applying text replacement rules: {replace_rules}")
-                    original_text = message.text
-                    modified_text = original_text
+                    original_text = text
                     
                     for old_text, new_text in replace_rules.items():
-                        if old_text in modified_text:
-                            modified_text = modified_text.replace(old_text, new_text)
+                        if old_text in text:
+                            text = text.replace(old_text, new_text)
                             logger.info(f"Replaced '{old_text}' with '{new_text}'")
                     
-                    if original_text != modified_text:
-                        logger.info(f"Text replacement completed: '{original_text}' -> '{modified_text}'")
-                        # Create a mock message object with the modified text
-                        class ModifiedMessage:
-                            def __init__(self, original_message, new_text):
-                                # Copy all attributes from original
-                                for attr in dir(original_message):
-                                    if not attr.startswith('_') and attr != 'text':
-                                        try:
-                                            setattr(self, attr, getattr(original_message, attr))
-                                        except:
-                                            pass
-                                self.text = new_text
-                                self.caption = getattr(original_message, 'caption', None)
-                        
-                        message = ModifiedMessage(message, modified_text)
+                    if original_text != text:
+                        logger.info(f"Text replacement completed: '{original_text}' -> '{text}'")
                     
                 except Exception as e:
                     logger.error(f"Error applying text replacements: {e}")
             
+            if text != snapshot.text:
+                snapshot = snapshot.replace(text=text)
+            
             # Apply formatting settings AFTER replacements
-            if (hasattr(message, 'text') and message.text) or (hasattr(message, 'caption') and message.caption):
-                message = await self._apply_formatting(message, settings)
+            if snapshot.content:
+                formatted_text = await self._apply_formatting(snapshot, settings)
+                if formatted_text:
+                    snapshot = snapshot.with_text(formatted_text)
+            
+            text = snapshot.text
             
             # Remove links
-            if settings.get("remove_links", False) and hasattr(message, 'text') and message.text:
-                message.text = re.sub(r'http[s]?://[^\s]+|t\.me/[^\s]+', '', message.text)
+            if settings.get("remove_links", False) and text:
+                text = re.sub(r'http[s]?://[^\s]+|t\.me/[^\s]+', '', text)
             
             # Remove mentions
-            if settings.get("remove_mentions", False) and hasattr(message, 'text') and message.text:
-                message.text = re.sub(r'@\w+', '', message.text)
+            if settings.get("remove_mentions", False) and text:
+                text = re.sub(r'@\w+', '', text)
             
-            # Add custom caption
+            if text != snapshot.text:
+                snapshot = snapshot.replace(text=text)
+            
+            # Add custom caption (to the caption of media, to the text otherwise)
             if settings.get("add_caption", False) and settings.get("custom_caption"):
-                if hasattr(message, 'caption'):
-                    message.caption = (message.caption or "") + "\n\n" + settings["custom_caption"]
-                elif hasattr(message, 'text'):
-                    message.text = (message.text or "") + "\n\n" + settings["custom_caption"]
+                snapshot = snapshot.with_text((snapshot.content or "") + "\n\n" + settings["custom_caption"])
             
-            return message
+            return snapshot
             
         except Exception as e:
             logger.error(f"Error processing message content: {e}")
-            return message
+            return snapshot
     
     async def _apply_formatting(self, message: Any, settings: Dict[str, Any]) -> str:
         """Apply formatting settings to message text and return formatted text"""
@@ -2827,6 +2956,13 @@ class ForwardingEngine:
         except Exception as e:
             logger.error(f"Error applying delay: {e}")
 
+    def _note_flood_wait(self, error: Exception):
+        """Pause outbound sending when Telegram asks us to back off"""
+        # aiogram's TelegramRetryAfter carries retry_after, Telethon's FloodWaitError carries seconds
+        seconds = getattr(error, "retry_after", None) or getattr(error, "seconds", None)
+        if isinstance(seconds, (int, float)) and seconds > 0:
+            self.outbound.pause(seconds)
+    
     async def _check_rate_limit(self, chat_id: int) -> bool:
         """Check if rate limit is exceeded for a chat"""
         try:
@@ -2893,31 +3029,37 @@ class ForwardingEngine:
             "max_message_length": 4096
         }
     
-    async def _background_tasks(self):
-        """Background maintenance tasks"""
-        while self.running:
-            try:
-                # Update task cache every 5 minutes
-                if (not self.cache_last_update or 
-                    datetime.now() - self.cache_last_update > timedelta(seconds=self.cache_ttl)):
-                    await self._reload_tasks()
-                
-                # Clean up caches every 10 minutes
-                if time.time() % 600 < 60:  # Every 10 minutes
-                    await self._cleanup_caches()
-                
-                # Clean up old logs every hour
-                if time.time() % 3600 < 60:  # Once per hour
-                    await self.database.cleanup_old_logs()
-                
-                # Update statistics
-                await self.statistics.update_engine_stats(self.get_stats())
-                
-                await asyncio.sleep(60)  # Check every minute
-                
-            except Exception as e:
-                logger.error(f"Error in background tasks: {e}")
-                await asyncio.sleep(60)
+    def _register_jobs(self):
+        """Register periodic maintenance with the job scheduler"""
+        jobs = [
+            # Heartbeat and statistics push every minute
+            ("heartbeat", self._heartbeat_job, 60, {"run_immediately": True, "max_runtime": 30}),
+            # Refresh the task registry
+            ("reload_tasks", self._reload_tasks, self.cache_ttl, {"max_runtime": 120}),
+            # Clean up caches every 10 minutes
+            ("cleanup_caches", self._cleanup_caches, 600, {"max_runtime": 60}),
+            # Clean up old logs every hour, once per cluster
+            ("cleanup_old_logs", self.database.cleanup_old_logs, 3600,
+             {"max_runtime": 600, "condition": lambda: self.leader.is_leader}),
+            # Fold hourly log rollups into daily ones, once per cluster
+            ("rollup_log_statistics", self.database.rollup_log_statistics, 3600,
+             {"max_runtime": 300, "condition": lambda: self.leader.is_leader}),
+        ]
+        for name, func, interval, options in jobs:
+            job_name = f"forwarding_engine.{name}"
+            self.jobs.register(job_name, func, interval, **options)
+            self._job_names.append(job_name)
+    
+    def _unregister_jobs(self):
+        """Remove this engine's jobs from the scheduler"""
+        for job_name in self._job_names:
+            self.jobs.unregister(job_name)
+        self._job_names.clear()
+    
+    async def _heartbeat_job(self):
+        """Mark the engine alive and push engine statistics"""
+        self.last_heartbeat = time.time()
+        await self.statistics.update_engine_stats(self.get_stats())
 
     async def _cleanup_caches(self):
         """Clean up caches to prevent memory leaks"""
@@ -2946,7 +3088,7 @@ class ForwardingEngine:
             
             # Clean duplicate tracker - keep only recent entries
             if len(self.duplicate_tracker) > 10000:
-                self.duplicate_tracker = set(list(self.duplicate_tracker)[-5000:])
+                self._trim_duplicate_tracker(5000)
             
             # Clean processing times - keep only last 1000 entries
             if len(self.processing_times) > 1000:
@@ -2957,26 +3099,163 @@ class ForwardingEngine:
         except Exception as e:
             logger.error(f"Error cleaning caches: {e}")
     
-    async def _reload_tasks(self):
-        """Reload active tasks and update monitors"""
+    def _index_task(self, task_id: int, task: Dict[str, Any]):
+        """Add a task's active sources to the routing index"""
+        for source in task.get("sources", []):
+            if not source.get("is_active", True):
+                continue
+            routes = self.source_routes.setdefault(source["chat_id"], [])
+            if task_id not in routes:
+                routes.append(task_id)
+    
+    def _unindex_task(self, task_id: int):
+        """Remove a task from the routing index"""
+        for chat_id in list(self.source_routes.keys()):
+            routes = self.source_routes[chat_id]
+            if task_id in routes:
+                routes.remove(task_id)
+                if not routes:
+                    del self.source_routes[chat_id]
+    
+    @staticmethod
+    def _chats_signature(chats: List[Dict[str, Any]]) -> List[tuple]:
+        """Comparable signature of a source/target list"""
+        return sorted((chat["chat_id"], bool(chat.get("is_active", True))) for chat in chats or [])
+    
+    async def _reload_tasks(self) -> Dict[str, Any]:
+        """Reload changed tasks and apply the diff to the routing index and monitors"""
+        async with self._reload_lock:
+            started = time.time()
+            report = {"mode": "incremental", "added": [], "removed": [], "updated": {}, "scanned": 0}
+            
+            try:
+                changes = await self.database.get_task_changes(self._tasks_watermark)
+                
+                if changes is None:
+                    # No change tracking available - diff against a full reload
+                    report["mode"] = "full"
+                    watermark = await self.database.get_change_watermark()
+                    tasks = {task["id"]: task for task in await self.database.get_active_tasks()}
+                    report["scanned"] = len(tasks)
+                    
+                    for task_id in set(self.active_tasks_cache.keys()) - set(tasks.keys()):
+                        await self._apply_task_change(task_id, None, None, report)
+                    
+                    for task_id, task in tasks.items():
+                        settings = None
+                        if task_id in self.monitors:
+                            settings = await self.database.get_task_settings(task_id)
+                        await self._apply_task_change(task_id, task, settings, report)
+                    
+                    self._tasks_watermark = watermark
+                else:
+                    report["scanned"] = len(changes["changed_ids"]) + len(changes["deleted_ids"])
+                    
+                    for task_id in changes["deleted_ids"]:
+                        await self._apply_task_change(task_id, None, None, report)
+                    
+                    for task_id in changes["changed_ids"]:
+                        await self._apply_task_change(
+                            task_id, changes["tasks"].get(task_id), changes["settings"].get(task_id), report
+                        )
+                    
+                    self._tasks_watermark = changes["watermark"]
+                
+                self.cache_last_update = datetime.now()
+                
+            except Exception as e:
+                logger.error(f"Error reloading tasks: {e}")
+                report["error"] = str(e)
+            
+            # Task or settings edits can pause or resume recurring posts
+            self.recurring.request_refresh()
+            
+            # Workers keep their own registries; tell them to catch up too
+            if self.shard_router:
+                self.shard_router.broadcast("reload")
+            
+            report["duration_ms"] = round((time.time() - started) * 1000, 2)
+            report["timestamp"] = datetime.now().isoformat()
+            self.last_reload_report = report
+            
+            if report["added"] or report["removed"] or report["updated"]:
+                updated = ", ".join(f"{task_id}[{'/'.join(parts)}]" for task_id, parts in report["updated"].items())
+                logger.info(
+                    f"Reloaded tasks ({report['mode']}, {report['scanned']} scanned): "
+                    f"added={report['added']} removed={report['removed']} updated={updated or '[]'}"
+                )
+            else:
+                logger.debug(f"Reloaded tasks ({report['mode']}): no changes, {len(self.active_tasks_cache)} active")
+            
+            return report
+    
+    async def _apply_task_change(self, task_id: int, task: Optional[Dict[str, Any]],
+                                 settings: Optional[Dict[str, Any]], report: Dict[str, Any]):
+        """Apply one task's fresh state to the cache, routing index and monitor"""
         try:
-            old_tasks = set(self.active_tasks_cache.keys())
-            await self._load_active_tasks()
-            new_tasks = set(self.active_tasks_cache.keys())
+            old_task = self.active_tasks_cache.get(task_id)
+            
+            # Deleted or deactivated
+            if not task or not task.get("is_active"):
+                if old_task is not None:
+                    await self._stop_task_monitoring(task_id)
+                    self.active_tasks_cache.pop(task_id, None)
+                    self._unindex_task(task_id)
+                    self._settings_cache.pop(task_id, None)
+                    self._delivery_windows.pop(task_id, None)
+                    self.spool.remove_task(task_id)
+                    self.digest.remove_task(task_id)
+                    self._cache_timestamp.pop(task_id, None)
+                    self.ingest.remove_task(task_id)
+                    report["removed"].append(task_id)
+                return
             
-            # Stop monitors for removed tasks
-            for task_id in old_tasks - new_tasks:
-                await self._stop_task_monitoring(task_id)
+            # Newly active
+            if old_task is None:
+                self.active_tasks_cache[task_id] = task
+                self._index_task(task_id, task)
+                if self.running:
+                    await self._start_task_monitoring(task_id, task)
+                report["added"].append(task_id)
+                return
             
-            # Start monitors for new tasks
-            for task_id in new_tasks - old_tasks:
-                task = self.active_tasks_cache[task_id]
-                await self._start_task_monitoring(task_id, task)
+            changes = []
+            if old_task.get("task_type") != task.get("task_type"):
+                changes.append("type")
+            if self._chats_signature(old_task.get("sources")) != self._chats_signature(task.get("sources")):
+                changes.append("sources")
+            if self._chats_signature(old_task.get("targets")) != self._chats_signature(task.get("targets")):
+                changes.append("targets")
+            
+            self.active_tasks_cache[task_id] = task
+            if "sources" in changes:
+                self._unindex_task(task_id)
+                self._index_task(task_id, task)
+            
+            monitor = self.monitors.get(task_id)
+            if monitor is None or "type" in changes:
+                # Monitor mode changed or there was nothing to monitor before
+                if self.running and (monitor is not None or "sources" in changes):
+                    await self._stop_task_monitoring(task_id)
+                    await self._start_task_monitoring(task_id, task)
+            else:
+                monitor.task = task
+                if "sources" in changes:
+                    await monitor.update_sources(task.get("sources", []))
+                if settings is not None and settings != monitor.settings:
+                    await monitor.update_settings(settings)
+                    self.ingest.configure_task(task_id, settings)
+                    changes.append("settings")
             
-            logger.info(f"Reloaded tasks: {len(new_tasks)} active")
+            if "settings" in changes or "type" in changes:
+                self._settings_cache.pop(task_id, None)
+                self._cache_timestamp.pop(task_id, None)
             
+            if changes:
+                report["updated"][task_id] = changes
+                
         except Exception as e:
-            logger.error(f"Error reloading tasks: {e}")
+            logger.error(f"Error applying changes for task {task_id}: {e}")
     
     async def _is_duplicate_message(self, message, task_id: int) -> bool:
         """Check if message is a duplicate"""
@@ -3008,24 +3287,15 @@ class ForwardingEngine:
             message_hash = hashlib.md5(unique_content.encode('utf-8')).hexdigest()
             
             # Check if hash exists in database
-            existing = await self.database.execute_query(
-                "SELECT id FROM message_duplicates WHERE task_id = $1 AND message_hash = $2",
-                task_id, message_hash
-            )
+            existing = await self.database.fetch_named("duplicate_find", task_id, message_hash)
             
             if existing:
                 # Update count and last_seen
-                await self.database.execute_command(
-                    "UPDATE message_duplicates SET count = count + 1, last_seen = NOW() WHERE task_id = $1 AND message_hash = $2",
-                    task_id, message_hash
-                )
+                await self.database.execute_named("duplicate_touch", task_id, message_hash)
                 return True
             else:
                 # Add new duplicate record
-                await self.database.execute_command(
-                    "INSERT INTO message_duplicates (task_id, message_hash, first_seen, last_seen, count) VALUES ($1, $2, NOW(), NOW(), 1)",
-                    task_id, message_hash
-                )
+                await self.database.execute_named("duplicate_insert", task_id, message_hash)
                 return False
                 
         except Exception as e:
@@ -3139,6 +3409,10 @@ class ForwardingEngine:
             await self._stop_task_monitoring(task_id)
             if task_id in self.active_tasks_cache:
                 del self.active_tasks_cache[task_id]
+            self._unindex_task(task_id)
+            self._delivery_windows.pop(task_id, None)
+            self.spool.remove_task(task_id)
+            self.digest.remove_task(task_id)
             logger.info(f"Removed task {task_id} from monitoring")
             
         except Exception as e:
@@ -3155,6 +3429,23 @@ class ForwardingEngine:
         except Exception as e:
             logger.error(f"Error toggling task {task_id}: {e}")
     
+    def get_health(self) -> Dict[str, Any]:
+        """Get liveness and readiness state for health probes"""
+        heartbeat_age = time.time() - self.last_heartbeat if self.last_heartbeat else None
+        # The heartbeat job ticks every minute; three missed ticks means the scheduler is stuck
+        alive = self.running and heartbeat_age is not None and heartbeat_age < 180
+        return {
+            "alive": alive,
+            "ready": alive and self.startup_complete,
+            "reconciled": self.reconciled,
+            "warm_started": self.warm_started,
+            "startup_duration": self.startup_duration,
+            "heartbeat_age": round(heartbeat_age, 1) if heartbeat_age is not None else None,
+            "active_tasks": len(self.active_tasks_cache),
+            "active_monitors": len(self.monitors),
+            "leader": self.leader.is_leader
+        }
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get engine statistics"""
         try:
@@ -3186,7 +3477,19 @@ class ForwardingEngine:
                 "success_rate": success_rate,
                 "avg_processing_time": avg_processing_time,
                 "memory_usage": memory_usage,
-                "duplicate_tracker_size": len(self.duplicate_tracker)
+                "duplicate_tracker_size": len(self.duplicate_tracker),
+                "routed_sources": len(self.source_routes),
+                "ingest": self.ingest.get_stats(),
+                "outbound": self.outbound.get_stats(),
+                "recurring_posts": self.recurring.get_stats(),
+                "deferred_delivery": self.deferred.get_stats(),
+                "overflow_spool": self.spool.get_stats(),
+                "digest": self.digest.get_stats(),
+                "shards": self.shard_router.get_stats() if self.shard_router else None,
+                "leader": self.leader.get_stats(),
+                "database": self.performance.database_stats,
+                "jobs": self.jobs.get_stats(),
+                "last_task_reload": self.last_reload_report
             }
             
         except Exception as e:
@@ -3199,12 +3502,7 @@ class ForwardingEngine:
             import json
             
             # First try: Look for exact match with this target chat
-            query = """
-            SELECT target_message_ids FROM message_tracking 
-            WHERE task_id = $1 AND source_message_id = $2
-            ORDER BY created_at DESC LIMIT 5
-            """
-            result = await self.database.execute_query(query, task_id, original_message_id)
+            result = await self.database.fetch_named("mapping_recent", task_id, original_message_id)
             
             if result:
                 for row in result:
@@ -3239,15 +3537,7 @@ class ForwardingEngine:
                             continue
             
             # Second try: Search by similar timing (messages sent close to each other)
-            query = """
-            SELECT target_message_ids FROM message_tracking 
-            WHERE task_id = $1 
-            AND source_message_id BETWEEN $2 - 10 AND $2 + 10
-            AND target_message_ids IS NOT NULL
-            ORDER BY ABS(source_message_id - $2) ASC
-            LIMIT 10
-            """
-            result = await self.database.execute_query(query, task_id, original_message_id)
+            result = await self.database.fetch_named("mapping_nearby", task_id, original_message_id)
             
             if result:
                 for row in result:
@@ -3278,11 +3568,7 @@ class ForwardingEngine:
             source_chat_id = await self._get_source_chat_id(task_id)
             
             # Check if record exists for this combination
-            check_query = """
-            SELECT target_message_ids FROM message_tracking 
-            WHERE task_id = $1 AND source_message_id = $2 AND source_chat_id = $3
-            """
-            existing = await self.database.execute_query(check_query, task_id, original_message_id, source_chat_id)
+            existing = await self.database.fetch_named("mapping_get", task_id, original_message_id, source_chat_id)
             
             if existing:
                 # Update existing record by adding the new target mapping
@@ -3296,32 +3582,18 @@ class ForwardingEngine:
                     new_mapping = {str(target_chat_id): forwarded_message_id}
                     target_list.append(new_mapping)
                     
-                    update_query = """
-                    UPDATE message_tracking 
-                    SET target_message_ids = $1::jsonb 
-                    WHERE task_id = $2 AND source_message_id = $3 AND source_chat_id = $4
-                    """
-                    await self.database.execute_command(update_query, json.dumps(target_list), task_id, original_message_id, source_chat_id)
+                    await self.database.execute_named("mapping_update", json.dumps(target_list), task_id, original_message_id, source_chat_id)
                     logger.info(f"Updated message mapping: task={task_id}, source={original_message_id} -> target={forwarded_message_id} in chat {target_chat_id}")
                     
                 except (json.JSONDecodeError, TypeError):
                     # If parsing fails, create new record
                     target_ids_json = json.dumps([{str(target_chat_id): forwarded_message_id}])
-                    update_query = """
-                    UPDATE message_tracking 
-                    SET target_message_ids = $1::jsonb 
-                    WHERE task_id = $2 AND source_message_id = $3 AND source_chat_id = $4
-                    """
-                    await self.database.execute_command(update_query, target_ids_json, task_id, original_message_id, source_chat_id)
+                    await self.database.execute_named("mapping_update", target_ids_json, task_id, original_message_id, source_chat_id)
             else:
                 # Create new record
                 target_ids_json = json.dumps([{str(target_chat_id): forwarded_message_id}])
                 
-                insert_query = """
-                INSERT INTO message_tracking (task_id, source_message_id, source_chat_id, target_message_ids, created_at)
-                VALUES ($1, $2, $3, $4::jsonb, NOW())
-                """
-                await self.database.execute_command(insert_query, task_id, original_message_id, source_chat_id, target_ids_json)
+                await self.database.execute_named("mapping_insert", task_id, original_message_id, source_chat_id, target_ids_json)
                 logger.info(f"Created message mapping: task={task_id}, source={original_message_id} -> target={forwarded_message_id} in chat {target_chat_id}")
                 
         except Exception as e:
@@ -3330,8 +3602,7 @@ class ForwardingEngine:
     async def _get_source_chat_id(self, task_id: int) -> int:
         """Get the source chat ID for a task"""
         try:
-            query = "SELECT source_chat_id FROM sources WHERE task_id = $1 LIMIT 1"
-            result = await self.database.execute_query(query, task_id)
+            result = await self.database.fetch_named("task_first_source_chat", task_id)
             if result:
                 return result[0]['source_chat_id']
             return -1002289754739  # fallback to known source chat
@@ -21,6 +21,7 @@ class AdminHandlers:
         self.bot_controller = bot_controller
         self.bot = bot_controller.bot
         self.database = bot_controller.database
+        self.repositories = bot_controller.repositories
         self.security_manager = bot_controller.security_manager
         self.keyboards = bot_controller.keyboards
         self.forwarding_engine = bot_controller.forwarding_engine
@@ -63,6 +64,12 @@ class AdminHandlers:
                 await self._handle_bot_settings(callback, state)
             elif data == "admin_user_settings":
                 await self._handle_user_settings(callback, state)
+            elif data == "admin_db_queries":
+                await self._handle_query_stats(callback, state)
+            elif data == "admin_db_queries_reset":
+                self.database.queries.reset()
+                await callback.answer("✅ Query statistics reset")
+                await self._handle_query_stats(callback, state)
             elif data.startswith("admin_user_"):
                 await self._handle_user_action(callback, state)
             elif data.startswith("admin_ban_"):
@@ -164,41 +171,31 @@ class AdminHandlers:
     async def _handle_admin_statistics(self, callback: CallbackQuery, state: FSMContext):
         """Handle admin statistics"""
         try:
-            # Get comprehensive statistics
-            stats_queries = {
-                "system_stats": """
+            # Entity counts in one query; message figures come from the log rollups
+            all_stats = {}
+            try:
+                all_stats["system_stats"] = await self.database.execute_query("""
                     SELECT 
                         (SELECT COUNT(*) FROM users) as total_users,
                         (SELECT COUNT(*) FROM tasks) as total_tasks,
-                        (SELECT COUNT(*) FROM tasks WHERE is_active = true) as active_tasks,
-                        (SELECT COUNT(*) FROM forwarding_logs) as total_messages,
-                        (SELECT COUNT(*) FROM forwarding_logs WHERE DATE(processed_at) = CURRENT_DATE) as messages_today
-                """,
-                "performance_stats": """
-                    SELECT 
-                        AVG(processing_time) as avg_processing_time,
-                        MAX(processing_time) as max_processing_time,
-                        COUNT(CASE WHEN status = 'success' THEN 1 END) * 100.0 / COUNT(*) as success_rate
-                    FROM forwarding_logs 
-                    WHERE processed_at >= NOW() - INTERVAL '24 hours'
-                """,
-                "error_stats": """
-                    SELECT status, COUNT(*) as count
-                    FROM forwarding_logs 
-                    WHERE processed_at >= NOW() - INTERVAL '24 hours'
-                    GROUP BY status
-                    ORDER BY count DESC
-                """
-            }
-            
-            all_stats = {}
-            for key, query in stats_queries.items():
-                try:
-                    result = await self.database.execute_query(query)
-                    all_stats[key] = result
-                except Exception as e:
-                    logger.error(f"Error executing {key}: {e}")
-                    all_stats[key] = []
+                        (SELECT COUNT(*) FROM tasks WHERE is_active = true) as active_tasks
+                """)
+            except Exception as e:
+                logger.error(f"Error executing system_stats: {e}")
+                all_stats["system_stats"] = []
+            
+            last_day = await self.database.get_log_counts("24h")
+            last_day_total = sum(last_day.values())
+            times = await self.database.get_log_processing_times("24h")
+            all_stats["performance_stats"] = [{
+                "avg_processing_time": times["avg_time"],
+                "max_processing_time": times["max_time"],
+                "success_rate": (last_day.get("success", 0) * 100.0 / last_day_total) if last_day_total else 0
+            }]
+            all_stats["error_stats"] = [
+                {"status": status, "count": count}
+                for status, count in sorted(last_day.items(), key=lambda item: item[1], reverse=True)
+            ]
             
             # Get engine statistics
             engine_stats = await self.forwarding_engine.get_stats()
@@ -206,7 +203,9 @@ class AdminHandlers:
             # Get security statistics
             security_stats = await self.security_manager.get_security_stats()
             
-            system_data = all_stats["system_stats"][0] if all_stats["system_stats"] else {}
+            system_data = dict(all_stats["system_stats"][0]) if all_stats["system_stats"] else {}
+            system_data["total_messages"] = sum((await self.database.get_log_counts()).values())
+            system_data["messages_today"] = sum((await self.database.get_log_counts("today")).values())
             perf_data = all_stats["performance_stats"][0] if all_stats["performance_stats"] else {}
             
             stats_text = f"""
@@ -248,6 +247,9 @@ class AdminHandlers:
                     InlineKeyboardButton(text="📊 Export", callback_data="admin_stats_export"),
                     InlineKeyboardButton(text="📋 Report", callback_data="admin_stats_report")
                 ],
+                [
+                    InlineKeyboardButton(text="🗄️ Database Queries", callback_data="admin_db_queries")
+                ],
                 [
                     InlineKeyboardButton(text="🔙 Back", callback_data="main_settings")
                 ]
@@ -262,6 +264,63 @@ class AdminHandlers:
             logger.error(f"Error in admin statistics: {e}")
             await callback.answer("❌ Error loading statistics.")
     
+    async def _handle_query_stats(self, callback: CallbackQuery, state: FSMContext):
+        """Handle database query statistics"""
+        try:
+            stats = self.database.get_query_stats(top=8)
+            since = datetime.fromtimestamp(stats["since"]).strftime("%Y-%m-%d %H:%M")
+            
+            statements = []
+            for name, item in stats["statements"].items():
+                statements.append(
+                    f"• `{name}`: {item['calls']} calls, avg {item['avg_ms']}ms, "
+                    f"p95 ≤{item['p95_ms']:g}ms, max {item['max_ms']}ms"
+                    + (f", {item['errors']} errors" if item["errors"] else "")
+                )
+            
+            slow = []
+            for item in reversed(stats["slow_queries"][-5:]):
+                at = datetime.fromtimestamp(item["at"]).strftime("%H:%M:%S")
+                slow.append(f"• {at} `{item['statement']}`: {item['ms']}ms")
+            
+            pool = stats.get("pool")
+            pool_line = f"\n• Pool: {pool['size'] - pool['idle']}/{pool['size']} in use" if pool else ""
+            
+            stats_text = f"""
+🗄️ **Database Queries**
+
+**Since {since}:**
+• Calls: {stats['calls']}
+• Errors: {stats['errors']}
+• Named statements: {stats['registered']}
+• Slow threshold: {stats['slow_query_ms']:g}ms{pool_line}
+
+**Heaviest Statements (total time):**
+{chr(10).join(statements) or "No queries recorded."}
+
+**Recent Slow Queries:**
+{chr(10).join(slow) or "None."}
+            """
+            
+            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+            keyboard = [
+                [
+                    InlineKeyboardButton(text="🔄 Refresh", callback_data="admin_db_queries"),
+                    InlineKeyboardButton(text="🧹 Reset", callback_data="admin_db_queries_reset")
+                ],
+                [
+                    InlineKeyboardButton(text="🔙 Back", callback_data="admin_stats")
+                ]
+            ]
+            
+            await callback.message.edit_text(
+                stats_text, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown"
+            )
+            
+        except Exception as e:
+            logger.error(f"Error in query statistics: {e}")
+            await callback.answer("❌ Error loading query statistics.")
+    
     async def _handle_system_settings(self, callback: CallbackQuery, state: FSMContext):
         """Handle system settings"""
         try:
@@ -404,20 +463,17 @@ class AdminHandlers:
                     fl.target_chat_id
                 FROM forwarding_logs fl
                 JOIN tasks t ON fl.task_id = t.id
+                WHERE fl.processed_at >= NOW() - INTERVAL '7 days'
                 ORDER BY fl.processed_at DESC
                 LIMIT 10
             """)
             
             # Get error summary
-            error_summary = await self.database.execute_query("""
-                SELECT 
-                    status,
-                    COUNT(*) as count
-                FROM forwarding_logs 
-                WHERE processed_at >= NOW() - INTERVAL '24 hours'
-                GROUP BY status
-                ORDER BY count DESC
-            """)
+            last_day = await self.database.get_log_counts("24h")
+            error_summary = [
+                {"status": status, "count": count}
+                for status, count in sorted(last_day.items(), key=lambda item: item[1], reverse=True)
+            ]
             
             logs_text = f"""
 📋 **System Logs**
@@ -760,15 +816,7 @@ class AdminHandlers:
             user_id = int(callback.data.split("_")[-1])
             
             # Get user tasks
-            tasks = await self.database.execute_query("""
-                SELECT t.id, t.name, t.description, t.is_active, t.created_at,
-                       (SELECT COUNT(*) FROM forwarding_logs WHERE task_id = t.id) as message_count
-                FROM tasks t 
-                JOIN users u ON t.user_id = u.id
-                WHERE u.telegram_id = $1
-                ORDER BY t.created_at DESC
-                LIMIT 10
-            """, user_id)
+            tasks = (await self.repositories.tasks.for_owner(user_id))[:10]
             
             if not tasks:
                 await callback.answer("❌ No tasks found for this user.")
@@ -779,7 +827,8 @@ class AdminHandlers:
             for i, task in enumerate(tasks, 1):
                 status = "🟢" if task['is_active'] else "🔴"
                 tasks_text += f"{i}. {status} **{task['name']}**\n"
-                tasks_text += f"   • Messages: {task['message_count']}\n"
+                message_count = sum((await self.database.get_log_counts(task_id=task['id'])).values())
+                tasks_text += f"   • Messages: {message_count}\n"
                 tasks_text += f"   • Created: {task['created_at'].strftime('%Y-%m-%d')}\n\n"
             
             keyboard = [[
@@ -26,6 +26,7 @@ class SourceHandlers:
         self.bot_controller = bot_controller
         self.bot = bot_controller.bot
         self.database = bot_controller.database
+        self.repositories = bot_controller.repositories
         self.security_manager = bot_controller.security_manager
         self.keyboards = bot_controller.keyboards
         self.forwarding_engine = bot_controller.forwarding_engine
@@ -85,7 +86,7 @@ class SourceHandlers:
                 return
             
             # Get task sources
-            sources = await self.database.get_task_sources(task_id)
+            sources = await self.repositories.sources.list(task_id)
             
             if not sources:
                 no_sources_text = f"""
@@ -214,16 +215,14 @@ Send the channel information now:
                 return
             
             # Get task to determine mode
-            task = await self.database.execute_query(
-                "SELECT task_type FROM tasks WHERE id = $1", task_id
-            )
+            task = await self.repositories.tasks.get(task_id)
             
             if not task:
                 await message.answer("❌ Task not found.")
                 await state.clear()
                 return
             
-            task_type = task[0]["task_type"]
+            task_type = task["task_type"]
             
             # Try to get channel information
             chat_info = await self._get_channel_info(parsed_id, task_type)
@@ -238,7 +237,7 @@ Send the channel information now:
                 return
             
             # Check if source already exists
-            existing_sources = await self.database.get_task_sources(task_id)
+            existing_sources = await self.repositories.sources.list(task_id)
             if any(s["chat_id"] == chat_info["chat_id"] for s in existing_sources):
                 await message.answer("❌ This channel is already added as a source.")
                 return
@@ -309,17 +308,12 @@ The channel is now being monitored for new messages.
                 return
             
             # Get source information
-            source_info = await self.database.execute_query(
-                "SELECT * FROM sources WHERE id = $1 AND task_id = $2",
-                source_id, task_id
-            )
+            source = await self.repositories.sources.get(task_id, source_id)
             
-            if not source_info:
+            if not source:
                 await callback.answer("❌ Source not found.", show_alert=True)
                 return
             
-            source = source_info[0]
-            
             # Get recent activity
             recent_messages = await self.database.execute_query("""
                 SELECT COUNT(*) as count
@@ -388,17 +382,12 @@ Use the buttons below to manage this source.
                 return
             
             # Get source information
-            source_info = await self.database.execute_query(
-                "SELECT * FROM sources WHERE id = $1 AND task_id = $2",
-                source_id, task_id
-            )
+            source = await self.repositories.sources.get(task_id, source_id)
             
-            if not source_info:
+            if not source:
                 await callback.answer("❌ Source not found.", show_alert=True)
                 return
             
-            source = source_info[0]
-            
             confirm_text = f"""
 🗑️ **Remove Source Confirmation**
 
@@ -437,29 +426,21 @@ Are you sure you want to remove this source?
             source_id = int(parts[4])
             
             # Get source info for chat_id
-            source_info = await self.database.execute_query(
-                "SELECT chat_id FROM sources WHERE id = $1 AND task_id = $2",
-                source_id, task_id
-            )
+            source = await self.repositories.sources.get(task_id, source_id)
             
-            if not source_info:
+            if not source:
                 await callback.answer("❌ Source not found.", show_alert=True)
                 return
             
-            chat_id = source_info[0]["chat_id"]
+            chat_id = source["chat_id"]
             
             # Remove from database
-            await self.database.execute_command(
-                "DELETE FROM sources WHERE id = $1 AND task_id = $2",
-                source_id, task_id
-            )
+            await self.repositories.sources.delete(task_id, source_id)
             
             # Update forwarding engine if task is active
-            task_info = await self.database.execute_query(
-                "SELECT is_active FROM tasks WHERE id = $1", task_id
-            )
+            task_info = await self.repositories.tasks.get(task_id)
             
-            if task_info and task_info[0]["is_active"]:
+            if task_info and task_info["is_active"]:
                 if task_id in self.forwarding_engine.monitors:
                     monitor = self.forwarding_engine.monitors[task_id]
                     await monitor.remove_source(chat_id)
@@ -501,24 +482,12 @@ Are you sure you want to remove this source?
                 return
             
             # Toggle source status
-            await self.database.execute_command(
-                "UPDATE sources SET is_active = NOT is_active WHERE id = $1 AND task_id = $2",
-                source_id, task_id
-            )
-            
-            # Get new status
-            source_info = await self.database.execute_query(
-                "SELECT is_active, chat_id FROM sources WHERE id = $1 AND task_id = $2",
-                source_id, task_id
-            )
+            new_status = await self.repositories.sources.toggle(task_id, source_id)
             
-            if source_info:
-                new_status = source_info[0]["is_active"]
-                chat_id = source_info[0]["chat_id"]
-                
+            if new_status is not None:
                 # Update forwarding engine
                 if task_id in self.forwarding_engine.monitors:
-                    sources = await self.database.get_task_sources(task_id)
+                    sources = await self.repositories.sources.list(task_id)
                     monitor = self.forwarding_engine.monitors[task_id]
                     await monitor.update_sources(sources)
                 
@@ -622,13 +591,7 @@ Connection is working properly!
     async def _verify_task_ownership(self, task_id: int, user_id: int) -> bool:
         """Verify that user owns the task"""
         try:
-            task_info = await self.database.execute_query("""
-                SELECT t.id FROM tasks t
-                JOIN users u ON t.user_id = u.id
-                WHERE t.id = $1 AND u.telegram_id = $2
-            """, task_id, user_id)
-            
-            return len(task_info) > 0
+            return await self.repositories.tasks.is_owned_by(task_id, user_id)
         except Exception as e:
             logger.error(f"Error verifying task ownership: {e}")
             return False
@@ -701,6 +664,7 @@ Connection is working properly!
                 VALUES ($1, $2, $3, $4, $5, $6, NOW())
             """, task_id, chat_info["chat_id"], chat_info["chat_title"], 
                 chat_info["chat_type"], chat_info.get("username"), True)
+            await self.repositories.sources.invalidate(task_id)
             
             return True
         except Exception as e:
@@ -819,6 +783,7 @@ Connection is working properly!
                 chat_info.get("chat_username"),
                 chat_info["chat_type"]
             )
+            await self.repositories.sources.invalidate(task_id)
             
             return True
             
@@ -26,6 +26,7 @@ class TargetHandlers:
         self.bot_controller = bot_controller
         self.bot = bot_controller.bot
         self.database = bot_controller.database
+        self.repositories = bot_controller.repositories
         self.security_manager = bot_controller.security_manager
         self.keyboards = bot_controller.keyboards
         self.forwarding_engine = bot_controller.forwarding_engine
@@ -85,7 +86,7 @@ class TargetHandlers:
                 return
             
             # Get task targets
-            targets = await self.database.get_task_targets(task_id)
+            targets = await self.repositories.targets.list(task_id)
             
             if not targets:
                 no_targets_text = f"""
@@ -216,16 +217,14 @@ Send the channel information now:
                 return
             
             # Get task to determine mode
-            task = await self.database.execute_query(
-                "SELECT task_type FROM tasks WHERE id = $1", task_id
-            )
+            task = await self.repositories.tasks.get(task_id)
             
             if not task:
                 await message.answer("❌ Task not found.")
                 await state.clear()
                 return
             
-            task_type = task[0]["task_type"]
+            task_type = task["task_type"]
             
             # Try to get channel information and test permissions
             chat_info = await self._get_channel_info_and_test(parsed_id, task_type)
@@ -240,7 +239,7 @@ Send the channel information now:
                 return
             
             # Check if target already exists
-            existing_targets = await self.database.get_task_targets(task_id)
+            existing_targets = await self.repositories.targets.list(task_id)
             if any(t["chat_id"] == chat_info["chat_id"] for t in existing_targets):
                 await message.answer("❌ This channel is already added as a target.")
                 return
@@ -300,17 +299,12 @@ Messages will now be forwarded to this channel.
                 return
             
             # Get target information
-            target_info = await self.database.execute_query(
-                "SELECT * FROM targets WHERE id = $1 AND task_id = $2",
-                target_id, task_id
-            )
+            target = await self.repositories.targets.get(task_id, target_id)
             
-            if not target_info:
+            if not target:
                 await callback.answer("❌ Target not found.", show_alert=True)
                 return
             
-            target = target_info[0]
-            
             # Get forwarding statistics
             forwarding_stats = await self.database.execute_query("""
                 SELECT 
@@ -387,17 +381,12 @@ Use the buttons below to manage this target.
                 return
             
             # Get target information
-            target_info = await self.database.execute_query(
-                "SELECT * FROM targets WHERE id = $1 AND task_id = $2",
-                target_id, task_id
-            )
+            target = await self.repositories.targets.get(task_id, target_id)
             
-            if not target_info:
+            if not target:
                 await callback.answer("❌ Target not found.", show_alert=True)
                 return
             
-            target = target_info[0]
-            
             confirm_text = f"""
 🗑️ **Remove Target Confirmation**
 
@@ -436,10 +425,7 @@ Are you sure you want to remove this target?
             target_id = int(parts[4])
             
             # Remove from database
-            await self.database.execute_command(
-                "DELETE FROM targets WHERE id = $1 AND task_id = $2",
-                target_id, task_id
-            )
+            await self.repositories.targets.delete(task_id, target_id)
             
             await callback.answer("✅ Target removed successfully!", show_alert=True)
             
@@ -478,19 +464,9 @@ Are you sure you want to remove this target?
                 return
             
             # Toggle target status
-            await self.database.execute_command(
-                "UPDATE targets SET is_active = NOT is_active WHERE id = $1 AND task_id = $2",
-                target_id, task_id
-            )
+            new_status = await self.repositories.targets.toggle(task_id, target_id)
             
-            # Get new status
-            target_info = await self.database.execute_query(
-                "SELECT is_active FROM targets WHERE id = $1 AND task_id = $2",
-                target_id, task_id
-            )
-            
-            if target_info:
-                new_status = target_info[0]["is_active"]
+            if new_status is not None:
                 status_text = "✅ Target enabled!" if new_status else "⏹️ Target disabled!"
                 await callback.answer(status_text, show_alert=True)
                 
@@ -630,13 +606,7 @@ Target is ready for message forwarding!
     async def _verify_task_ownership(self, task_id: int, user_id: int) -> bool:
         """Verify that user owns the task"""
         try:
-            task_info = await self.database.execute_query("""
-                SELECT t.id FROM tasks t
-                JOIN users u ON t.user_id = u.id
-                WHERE t.id = $1 AND u.telegram_id = $2
-            """, task_id, user_id)
-            
-            return len(task_info) > 0
+            return await self.repositories.tasks.is_owned_by(task_id, user_id)
         except Exception as e:
             logger.error(f"Error verifying task ownership: {e}")
             return False
@@ -710,6 +680,7 @@ Target is ready for message forwarding!
                 VALUES ($1, $2, $3, $4, $5, $6, NOW())
             """, task_id, chat_info["chat_id"], chat_info["chat_title"], 
                 chat_info["chat_type"], chat_info.get("username"), True)
+            await self.repositories.targets.invalidate(task_id)
             
             return True
         except Exception as e:
@@ -838,6 +809,7 @@ Target is ready for message forwarding!
                 chat_info.get("chat_username"),
                 chat_info["chat_type"]
             )
+            await self.repositories.targets.invalidate(task_id)
             
             return True
             
@@ -15,6 +15,7 @@ from loguru import logger
 from modules.task_manager import TaskManager
 from modules.statistics import StatisticsManager
 from utils import extract_chat_id, format_datetime, truncate_text
+from utils.callback_router import TaskCallbackRouter, callback_route
 
 
 class TaskStates(StatesGroup):
@@ -33,6 +34,7 @@ class TaskHandlers:
         self.bot_controller = bot_controller
         self.bot = bot_controller.bot
         self.database = bot_controller.database
+        self.repositories = bot_controller.repositories
         self.security_manager = bot_controller.security_manager
         self.keyboards = bot_controller.keyboards
         self.forwarding_engine = bot_controller.forwarding_engine
@@ -41,6 +43,9 @@ class TaskHandlers:
         self.task_manager = TaskManager(self.database)
         self.statistics_manager = StatisticsManager(self.database)
         
+        # Compiled from the @callback_route declarations below
+        self.router = TaskCallbackRouter(self)
+        
     async def register_handlers(self):
         """Register task handlers"""
         try:
@@ -91,13 +96,7 @@ class TaskHandlers:
     async def handle_callback(self, callback: CallbackQuery, state: FSMContext):
         """Handle task callback queries"""
         data = callback.data
-        user_id = callback.from_user.id
-        logger.info(f"Task callback received: {data}")
-        logger.info(f"Callback data type: {type(data)}, length: {len(data) if data else 0}")
-        
-        # Content button debugging (can be removed in production)
-        if data and data.startswith("content_"):
-            logger.info(f"Content button pressed: {data}")
+        logger.debug(f"Task callback received: {data}")
         
         # Ensure data is not None before processing
         if not data:
@@ -106,898 +105,7 @@ class TaskHandlers:
             return
         
         try:
-            logger.warning(f"=== PROCESSING CALLBACK: {data} ===")
-            logger.error(f"RAW CALLBACK DATA RECEIVED: '{data}' (type: {type(data)})")
-            
-            # HIGHEST PRIORITY: Handle advanced sub-feature buttons first with exhaustive logging
-            if data and "advanced_" in str(data):
-                logger.error(f"CONTAINS 'advanced_': {data}")
-                
-            if data and str(data).startswith("advanced_"):
-                logger.error(f"STARTS WITH 'advanced_': {data}")
-                
-            if data == "advanced_translation_1" or data == "advanced_working_hours_1" or data == "advanced_recurring_1":
-                logger.error(f"EXACT MATCH DETECTED: {data}")
-                
-            # PRIORITY: Handle advanced sub-feature buttons first
-            if data.startswith("advanced_"):
-                logger.error(f"ADVANCED BUTTON DETECTED: {data}")
-                if data == "advanced_translation_1":
-                    await callback.answer("🌐 إعدادات الترجمة تعمل بنجاح!", show_alert=True)
-                    # Create translation interface
-                    from localization import localization
-                    user_id = callback.from_user.id
-                    
-                    text = f"""🌐 **{localization.get_text(user_id, "translation_title")}**
-
-🔘 **{localization.get_text(user_id, "auto_translate")}:** {localization.get_text(user_id, "translation_disabled")}
-🌍 **{localization.get_text(user_id, "source_language")}:** {localization.get_text(user_id, "translate_to_arabic" if localization.get_user_language(user_id) == "ar" else "translate_to_english")}
-🎯 **{localization.get_text(user_id, "target_language")}:** {localization.get_text(user_id, "language_arabic" if localization.get_user_language(user_id) == "ar" else "language_english")}
-
-**{localization.get_text(user_id, "select_language")}**
-• {localization.get_text(user_id, "language_arabic")} • {localization.get_text(user_id, "language_english")} • {localization.get_text(user_id, "language_settings")}
-
-{localization.get_text(user_id, "select_option")}"""
-                    
-                    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                        [InlineKeyboardButton(text=f"🔄 {localization.get_text(user_id, 'auto_translate')}", callback_data="toggle_auto_translate_1")],
-                        [InlineKeyboardButton(text=f"🌍 {localization.get_text(user_id, 'source_language')}", callback_data="source_lang_1")],
-                        [InlineKeyboardButton(text=f"🎯 {localization.get_text(user_id, 'target_language')}", callback_data="target_lang_1")],
-                        [InlineKeyboardButton(text=f"🔙 {localization.get_text(user_id, 'btn_back')}", callback_data="setting_advanced_1")]
-                    ])
-                    await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="Markdown")
-                    return
-                    
-                elif data == "advanced_working_hours_1":
-                    await callback.answer("⏰ إعدادات ساعات العمل تعمل بنجاح!", show_alert=True)
-                    # Create working hours interface
-                    from localization import localization
-                    user_id = callback.from_user.id
-                    
-                    text = f"""⏰ **{localization.get_text(user_id, "working_hours_title")}**
-
-🔘 **{localization.get_text(user_id, "working_hours_enabled" if False else "working_hours_disabled")}**
-🕐 **{localization.get_text(user_id, "start_hour")}:** 09:00
-🕕 **{localization.get_text(user_id, "end_hour")}:** 17:00
-🌍 **{localization.get_text(user_id, "current_timezone")}:** UTC+3
-
-⏱️ **{localization.get_text(user_id, "breaks_settings")}:**
-• 12:00 - 13:00
-
-**{localization.get_text(user_id, "working_days")}:**
-☑️ {localization.get_text(user_id, "monday")} ☑️ {localization.get_text(user_id, "tuesday")} ☑️ {localization.get_text(user_id, "wednesday")} ☑️ {localization.get_text(user_id, "thursday")} ☑️ {localization.get_text(user_id, "friday")}
-☐ {localization.get_text(user_id, "saturday")} ☐ {localization.get_text(user_id, "sunday")}
-
-{localization.get_text(user_id, "select_option")}"""
-                    
-                    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                        [InlineKeyboardButton(text=f"🔄 {localization.get_text(user_id, 'working_hours_enabled')}", callback_data="toggle_workhours_1")],
-                        [InlineKeyboardButton(text=f"🕐 {localization.get_text(user_id, 'set_start_hour')}", callback_data="start_hour_1"), 
-                         InlineKeyboardButton(text=f"🕕 {localization.get_text(user_id, 'set_end_hour')}", callback_data="end_hour_1")],
-                        [InlineKeyboardButton(text=f"🌍 {localization.get_text(user_id, 'set_timezone')}", callback_data="timezone_1")],
-                        [InlineKeyboardButton(text=f"⏱️ {localization.get_text(user_id, 'breaks_settings')}", callback_data="breaks_1")],
-                        [InlineKeyboardButton(text=f"📅 {localization.get_text(user_id, 'working_days')}", callback_data="workdays_1")],
-                        [InlineKeyboardButton(text=f"🔙 {localization.get_text(user_id, 'btn_back')}", callback_data="setting_advanced_1")]
-                    ])
-                    await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="Markdown")
-                    return
-                    
-                elif data == "advanced_recurring_1":
-                    await callback.answer("🔄 إعدادات المنشور المتكرر تعمل بنجاح!", show_alert=True)
-                    # Create recurring posts interface
-                    from localization import localization
-                    user_id = callback.from_user.id
-                    
-                    text = f"""🔄 **{localization.get_text(user_id, "recurring_title")}**
-
-🔘 **{localization.get_text(user_id, "recurring_disabled")}**
-⏰ **{localization.get_text(user_id, "recurring_interval")}:** 24 hours
-📝 **Active posts:** 0
-
-**{localization.get_text(user_id, "recurring_content")}:**
-📋 {localization.get_text(user_id, "no_tasks")}
-
-**Available intervals:**
-• 1 hour • 3 hours • 6 hours
-• 12 hours • 24 hours • Weekly
-
-{localization.get_text(user_id, "select_option")}"""
-                    
-                    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                        [InlineKeyboardButton(text=f"🔄 {localization.get_text(user_id, 'recurring_enabled')}", callback_data="toggle_recurring_1")],
-                        [InlineKeyboardButton(text=f"➕ {localization.get_text(user_id, 'btn_create')}", callback_data="add_recurring_1")],
-                        [InlineKeyboardButton(text=f"📋 {localization.get_text(user_id, 'btn_view_all')}", callback_data="list_recurring_1")],
-                        [InlineKeyboardButton(text=f"⏰ {localization.get_text(user_id, 'recurring_interval')}", callback_data="interval_recurring_1")],
-                        [InlineKeyboardButton(text=f"🔙 {localization.get_text(user_id, 'btn_back')}", callback_data="setting_advanced_1")]
-                    ])
-                    await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="Markdown")
-                    return
-            
-            # URGENT: Direct handlers for advanced sub-feature buttons with full interfaces
-            if data == "advanced_translation_1":
-                logger.error(f"DIRECT MATCH: advanced_translation_1 detected!")
-                await self._handle_advanced_translation(callback, 1, state)
-                return
-            elif data == "advanced_working_hours_1":
-                logger.error(f"DIRECT MATCH: advanced_working_hours_1 detected!")
-                await self._handle_working_hours_setting(callback, 1, state)
-                return
-            elif data == "advanced_recurring_1":
-                logger.error(f"DIRECT MATCH: advanced_recurring_1 detected!")
-                await self._handle_recurring_post_setting(callback, 1, state)
-                return
-            
-            # Special logging for advanced settings debugging
-            if "setting_advanced_" in data:
-                logger.warning(f"DEBUGGING: Advanced setting callback detected: {data}")
-            
-            # Special logging for advanced sub-features
-            if "advanced_translation_" in data or "advanced_working_hours_" in data or "advanced_recurring_" in data:
-                logger.warning(f"DEBUGGING: Advanced sub-feature callback detected: {data}")
-                
-            # Special logging for length filter debugging
-            if "length" in data or "len_" in data:
-                logger.warning(f"DEBUGGING: Length filter callback detected: {data}")
-            
-            if data == "task_create":
-                await self._handle_task_creation_start(callback, state)
-            elif data == "task_list":
-                await self._handle_task_list(callback, state)
-            elif data == "task_refresh":
-                await self._handle_task_refresh(callback, state)
-            elif data == "task_stats":
-                await self._handle_task_statistics_overview(callback, state)
-            elif data.startswith("task_create_"):
-                await self._handle_task_type_selection(callback, state)
-            elif data.startswith("task_view_"):
-                await self._handle_task_view(callback, state)
-            elif data.startswith("task_edit_"):
-                await self._handle_task_edit(callback, state)
-            elif data.startswith("task_toggle_"):
-                await self._handle_task_toggle(callback, state)
-            elif data.startswith("task_mode_toggle_"):
-                await self._handle_task_mode_toggle(callback, state)
-            elif data.startswith("task_delete_"):
-                await self._handle_task_delete(callback, state)
-            elif data.startswith("task_statistics_"):
-                await self._handle_task_statistics(callback, state)
-            elif data.startswith("task_settings_"):
-                await self._handle_task_settings(callback, state)
-            elif data.startswith("task_info_"):
-                await self._handle_task_info(callback, state)
-            elif data.startswith("task_edit_name_"):
-                await self._handle_task_edit_name(callback, state)
-            elif data.startswith("task_edit_desc_"):
-                await self._handle_task_edit_description(callback, state)
-            elif data.startswith("task_edit_type_"):
-                await self._handle_task_change_type(callback, state)
-            elif data.startswith("task_list_page_"):
-                await self._handle_task_list_pagination(callback, state)
-            elif data.startswith("task_delete_"):
-                await self._handle_task_delete(callback, state)
-            elif data.startswith("confirm_delete_task"):
-                await self._handle_confirm_task_delete(callback, state)
-            elif data.startswith("cancel_delete_task"):
-                await self._handle_cancel_task_delete(callback, state)
-            elif data.startswith("setting_forward_mode_"):
-                await self._handle_forward_mode_setting(callback, state)
-            elif data.startswith("setting_delays_"):
-                await self._handle_delay_setting(callback, state)
-            elif data.startswith("setting_limits_"):
-                await self._handle_limits_setting(callback, state)
-            elif data.startswith("setting_filters_"):
-                await self._handle_filters_setting(callback, state)
-            elif data.startswith("setting_content_"):
-                await self._handle_content_setting(callback, state)
-            elif data.startswith("setting_forward_"):
-                await self._handle_forward_setting(callback, state)
-            elif data.startswith("setting_advanced_"):
-                logger.warning(f"MATCHED setting_advanced_: {data}")
-                task_id = int(data.split("_")[-1])
-                logger.warning(f"Extracted task_id: {task_id}")
-                await self._handle_advanced_setting(callback, task_id, state)
-                logger.warning(f"Completed _handle_advanced_setting call")
-            
-            # Handle advanced sub-feature buttons - Fixed task_id extraction
-            elif data.startswith("advanced_translation_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_advanced_translation(callback, task_id, state)
-                
-            elif data.startswith("advanced_working_hours_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_advanced_working_hours(callback, task_id, state)
-                
-            elif data.startswith("advanced_recurring_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_advanced_recurring(callback, task_id, state)
-            elif data.startswith("setting_translation_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_translation_setting(callback, task_id, state)
-            elif data.startswith("setting_working_hours_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_working_hours_setting(callback, task_id, state)
-            elif data.startswith("setting_recurring_post_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_recurring_post_setting(callback, task_id, state)
-            elif data.startswith("advanced_quick_settings_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_advanced_quick_settings(callback, task_id, state)
-            elif data.startswith("advanced_statistics_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_advanced_statistics(callback, task_id, state)
-            elif data.startswith("reset_advanced_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_reset_advanced_settings(callback, task_id, state)
-            elif data.startswith("save_advanced_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_save_advanced_settings(callback, task_id, state)
-
-            elif data.startswith("advanced_day_filter_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_day_filter_setting(callback, task_id, state)
-            elif data.startswith("advanced_sending_limit_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_sending_limit_setting(callback, task_id, state)
-            elif data.startswith("day_filter_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_day_filter(callback, task_id, state)
-            elif data.startswith("day_toggle_"):
-                parts = data.split("_")
-                task_id = int(parts[-1])
-                day = parts[2]
-                await self._toggle_day_selection(callback, task_id, day, state)
-            elif data.startswith("sending_limit_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_sending_limit(callback, task_id, state)
-            elif data.startswith("sending_limit_edit_"):
-                task_id = int(data.split("_")[-1])
-                await self._edit_sending_limit(callback, task_id, state)
-            elif data.startswith("day_enable_all_"):
-                task_id = int(data.split("_")[-1])
-                await self._enable_all_days(callback, task_id, state)
-            elif data.startswith("day_disable_all_"):
-                task_id = int(data.split("_")[-1])
-                await self._disable_all_days(callback, task_id, state)
-            # Translation sub-buttons
-            elif data.startswith("toggle_auto_translate_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_toggle_auto_translate(callback, task_id, state)
-            elif data.startswith("set_source_lang_"):
-                await self._handle_set_source_language(callback, state)
-            elif data.startswith("set_target_lang_"):
-                await self._handle_set_target_language(callback, state)
-            
-            # Working hours sub-buttons
-            elif data.startswith("toggle_working_hours_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_toggle_working_hours(callback, task_id, state)
-            elif data.startswith("set_start_hour_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_set_start_hour(callback, task_id, state)
-            elif data.startswith("set_end_hour_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_set_end_hour(callback, task_id, state)
-            elif data.startswith("set_timezone_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_set_timezone(callback, task_id, state)
-            
-            # Recurring post sub-buttons
-            elif data.startswith("toggle_recurring_post_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_toggle_recurring_post(callback, task_id, state)
-            elif data.startswith("set_recurring_interval_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_set_recurring_interval(callback, task_id, state)
-            elif data.startswith("add_recurring_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_add_recurring_post(callback, task_id, state)
-            elif data.startswith("list_recurring_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_list_recurring_posts(callback, task_id, state)
-            elif data.startswith("interval_recurring_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_set_recurring_interval(callback, task_id, state)
-            elif data.startswith("toggle_recurring_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_toggle_recurring_post(callback, task_id, state)
-            elif data.startswith("set_interval_"):
-                parts = data.split("_")
-                hours = int(parts[2])
-                task_id = int(parts[3])
-                await self._handle_set_interval_hours(callback, task_id, hours, state)
-            elif data.startswith("add_recurring_post_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_add_recurring_post(callback, task_id, state)
-            elif data.startswith("list_recurring_posts_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_list_recurring_posts(callback, task_id, state)
-            elif data.startswith("edit_recurring_post_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_edit_recurring_post(callback, task_id, state)
-            elif data.startswith("delete_recurring_post_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_delete_recurring_post(callback, task_id, state)
-            elif data.startswith("recurring_stats_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_recurring_stats(callback, task_id, state)
-            elif data.startswith("run_recurring_now_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_run_recurring_now(callback, task_id, state)
-            # Working hours additional sub-buttons
-            elif data.startswith("set_break_start_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_set_break_start(callback, task_id, state)
-            elif data.startswith("set_break_end_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_set_break_end(callback, task_id, state)
-            elif data.startswith("working_hours_report_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_working_hours_report(callback, task_id, state)
-            elif data.startswith("test_current_time_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_test_current_time(callback, task_id, state)
-            # User filter sub-buttons
-            elif data.startswith("user_verified_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_toggle_verified_filter(callback, task_id, state)
-            elif data.startswith("user_nobots_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_toggle_bot_filter(callback, task_id, state)
-            elif data.startswith("user_whitelist_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_user_whitelist(callback, task_id, state)
-            elif data.startswith("user_blacklist_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_user_blacklist(callback, task_id, state)
-            elif data.startswith("content_prefix_"):
-                await self._handle_prefix_suffix_setting(callback, int(data.split("_")[-1]), state)
-            elif data.startswith("content_replace_"):
-                await self._handle_text_replace_setting(callback, int(data.split("_")[-1]), state)
-
-            elif data.startswith("content_formatting_"):
-                await self._handle_formatting_setting(callback, int(data.split("_")[-1]), state)
-            elif data.startswith("content_links_"):
-                await self._handle_links_setting(callback, int(data.split("_")[-1]), state)
-            elif data.startswith("content_cleaner_"):
-                await self._handle_text_cleaner_setting(callback, int(data.split("_")[-1]), state)
-
-            elif data.startswith("setting_prefix_suffix_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_prefix_suffix_setting(callback, task_id, state)
-            elif data.startswith("setting_reset_"):
-                await self._handle_reset_setting(callback, state)
-            elif data.startswith("setting_save_"):
-                await self._handle_save_setting(callback, state)
-            elif data.startswith("setting_view_"):
-                await self._handle_view_all_settings(callback, state)
-            elif data.startswith("set_forward_mode_"):
-                await self._handle_set_forward_mode(callback, state)
-            elif data.startswith("forward_mode_"):
-                await self._handle_forward_mode_actions(callback, state)
-            elif data.startswith("set_delay_"):
-                await self._handle_set_delay(callback, state)
-            elif data.startswith("delay_"):
-                await self._handle_delay_actions(callback, state)
-
-            elif data.startswith("filter_length_"):
-                # Handle length filter main interface
-                logger.info(f"Routing to length filter main interface: {data}")
-                await self._handle_length_filter(callback, int(data.split("_")[-1]), state)
-            elif data.startswith("len_"):
-                # Handle length preset buttons first (len_280, len_1000, etc)
-                logger.info(f"Routing to length preset setting: {data}")
-                await self._handle_length_setting(callback, state)
-            elif data.startswith("set_min_") or data.startswith("set_max_"):
-                # Handle setting min/max values
-                logger.info(f"Routing to length value setting: {data}")
-                await self._handle_length_value_setting(callback, state)
-            elif data.startswith("set_action_"):
-                # Handle setting action mode
-                logger.info(f"Routing to action mode setting: {data}")
-                await self._handle_action_mode_setting(callback, state)
-            elif data.startswith("length_"):
-                # Handle all other length filter actions
-                logger.info(f"Routing to length filter actions: {data}")
-                await self._handle_length_actions(callback, state)
-            elif data.startswith("filter_languages_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_language_filter_management(callback, task_id, state)
-            elif data.startswith("toggle_filter_forwarded_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_forwarded_filter(callback, task_id, state)
-            elif data.startswith("toggle_filter_links_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_links_filter(callback, task_id, state)
-            elif data.startswith("toggle_filter_buttons_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_buttons_filter(callback, task_id, state)
-            elif data.startswith("toggle_filter_duplicates_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_duplicates_filter(callback, task_id, state)
-            elif data.startswith("toggle_filter_language_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_language_filter(callback, task_id, state)
-            # toggle_filter_bots removed - not implemented
-            elif data.startswith("clear_duplicates_"):
-                task_id = int(data.split("_")[-1])
-                await self._clear_duplicates(callback, task_id, state)
-            # Advanced forward settings toggles
-            elif data.startswith("toggle_manual_mode_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_toggle_manual_mode(callback, task_id, state)
-            elif data.startswith("toggle_link_preview_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_toggle_link_preview(callback, task_id, state)
-            elif data.startswith("toggle_pin_messages_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_toggle_pin_messages(callback, task_id, state)
-            elif data.startswith("toggle_silent_mode_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_toggle_silent_mode(callback, task_id, state)
-            elif data.startswith("toggle_sync_edits_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_toggle_sync_edits(callback, task_id, state)
-            elif data.startswith("toggle_sync_deletes_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_toggle_sync_deletes(callback, task_id, state)
-            elif data.startswith("toggle_preserve_replies_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_toggle_preserve_replies(callback, task_id, state)
-            elif data.startswith("forward_other_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_forward_other_settings(callback, task_id, state)
-            
-            # Media filter actions
-            elif data.startswith("media_enable_all_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_media_enable_all(callback, task_id, state)
-            elif data.startswith("media_disable_all_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_media_disable_all(callback, task_id, state)
-            elif data.startswith("media_reset_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_media_reset(callback, task_id, state)
-            elif data.startswith("media_save_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_media_save(callback, task_id, state)
-            elif data.startswith("media_type_"):
-                parts = data.split("_")
-                task_id = int(parts[-2])
-                media_type = parts[-1]
-                await self._handle_media_type_toggle(callback, task_id, media_type, state)
-            
-            # Filter management
-            elif data.startswith("filter_clear_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_filter_clear_all(callback, task_id, state)
-            # Text Cleaner handlers
-            elif data.startswith("cleaner_links_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_links(callback, task_id, state)
-            elif data.startswith("cleaner_emojis_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_emojis(callback, task_id, state)
-            elif data.startswith("cleaner_hashtags_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_hashtags(callback, task_id, state)
-            elif data.startswith("cleaner_mentions_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_mentions(callback, task_id, state)
-            elif data.startswith("cleaner_emails_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_emails(callback, task_id, state)
-            elif data.startswith("cleaner_numbers_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_numbers(callback, task_id, state)
-            elif data.startswith("cleaner_punctuation_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_punctuation(callback, task_id, state)
-            elif data.startswith("cleaner_empty_lines_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_empty_lines(callback, task_id, state)
-            elif data.startswith("cleaner_extra_lines_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_extra_lines(callback, task_id, state)
-            elif data.startswith("cleaner_whitespace_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_whitespace(callback, task_id, state)
-            elif data.startswith("cleaner_duplicate_lines_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_duplicate_lines(callback, task_id, state)
-            elif data.startswith("cleaner_target_words_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_target_words(callback, task_id, state)
-            elif data.startswith("cleaner_words_manage_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_cleaner_words_manage(callback, task_id, state)
-            elif data.startswith("cleaner_test_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_cleaner_test(callback, task_id, state)
-            elif data.startswith("cleaner_reset_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_cleaner_reset(callback, task_id, state)
-            elif data.startswith("links_remove_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_links(callback, task_id, state)
-            # Advanced features handlers
-            elif data.startswith("setting_translation_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_translation_setting(callback, task_id, state)
-            elif data.startswith("setting_working_hours_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_working_hours_setting(callback, task_id, state)
-            elif data.startswith("setting_recurring_post_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_recurring_post_setting(callback, task_id, state)
-            elif data.startswith("toggle_translation_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_translation(callback, task_id, state)
-            elif data.startswith("toggle_working_hours_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_working_hours(callback, task_id, state)
-            elif data.startswith("toggle_recurring_post_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_recurring_post(callback, task_id, state)
-            elif data.startswith("set_target_lang_"):
-                parts = data.split("_")
-                task_id = int(parts[-1])
-                language = parts[-2]
-                await self._set_target_language(callback, task_id, language, state)
-            elif data.startswith("set_start_hour_"):
-                task_id = int(data.split("_")[-1])
-                await self._set_start_hour(callback, task_id, state)
-            elif data.startswith("set_end_hour_"):
-                task_id = int(data.split("_")[-1])
-                await self._set_end_hour(callback, task_id, state)
-            elif data.startswith("set_timezone_"):
-                task_id = int(data.split("_")[-1])
-                await self._set_timezone(callback, task_id, state)
-            elif data.startswith("set_recurring_interval_"):
-                task_id = int(data.split("_")[-1])
-                await self._set_recurring_interval(callback, task_id, state)
-            elif data.startswith("edit_recurring_content_"):
-                task_id = int(data.split("_")[-1])
-                await self._edit_recurring_content(callback, task_id, state)
-            elif data.startswith("view_recurring_content_"):
-                task_id = int(data.split("_")[-1])
-                await self._view_recurring_content(callback, task_id, state)
-            # Header/Footer handlers
-            elif data.startswith("header_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_header(callback, task_id, state)
-            elif data.startswith("footer_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_footer(callback, task_id, state)
-            elif data.startswith("header_edit_"):
-                task_id = int(data.split("_")[-1])
-                await self._edit_header(callback, task_id, state)
-            elif data.startswith("footer_edit_"):
-                task_id = int(data.split("_")[-1])
-                await self._edit_footer(callback, task_id, state)
-            elif data.startswith("header_delete_"):
-                task_id = int(data.split("_")[-1])
-                await self._delete_header(callback, task_id, state)
-            elif data.startswith("footer_delete_"):
-                task_id = int(data.split("_")[-1])
-                await self._delete_footer(callback, task_id, state)
-            elif data.startswith("header_footer_view_"):
-                logger.warning(f"HEADER_FOOTER_VIEW callback detected: {data}")
-                task_id = int(data.split("_")[-1])
-                logger.warning(f"Calling _view_header_footer for task {task_id}")
-                await self._view_header_footer(callback, task_id, state)
-                logger.warning(f"Completed _view_header_footer call")
-            elif data.startswith("header_footer_examples_"):
-                task_id = int(data.split("_")[-1])
-                await self._show_header_footer_examples(callback, task_id, state)
-
-            # Manual approval handlers
-            elif data.startswith("approve_message_"):
-                approval_id = int(data.split("_")[-1])
-                await self._approve_manual_message(callback, approval_id, state)
-            elif data.startswith("reject_message_"):
-                approval_id = int(data.split("_")[-1])
-                await self._reject_manual_message(callback, approval_id, state)
-            elif data.startswith("edit_before_forward_"):
-                approval_id = int(data.split("_")[-1])
-                await self._edit_before_forward(callback, approval_id, state)
-            # Advanced settings handlers
-            elif data.startswith("setting_advanced_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_advanced_setting(callback, task_id, state)
-            elif data.startswith("setting_translation_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_translation_setting(callback, task_id, state)
-            elif data.startswith("setting_working_hours_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_working_hours_setting(callback, task_id, state)
-            elif data.startswith("setting_recurring_post_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_recurring_post_setting(callback, task_id, state)
-            elif data.startswith("toggle_translation_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_translation(callback, task_id, state)
-            elif data.startswith("set_target_language_"):
-                parts = data.split("_")
-                task_id = int(parts[-2])
-                language = parts[-1]
-                await self._set_target_language(callback, task_id, language, state)
-            elif data.startswith("toggle_working_hours_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_working_hours(callback, task_id, state)
-            elif data.startswith("set_start_hour_"):
-                task_id = int(data.split("_")[-1])
-                await self._set_start_hour(callback, task_id, state)
-            elif data.startswith("set_end_hour_"):
-                task_id = int(data.split("_")[-1])
-                await self._set_end_hour(callback, task_id, state)
-            elif data.startswith("set_timezone_"):
-                task_id = int(data.split("_")[-1])
-                await self._set_timezone(callback, task_id, state)
-            elif data.startswith("toggle_recurring_post_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_recurring_post(callback, task_id, state)
-            elif data.startswith("set_recurring_interval_"):
-                task_id = int(data.split("_")[-1])
-                await self._set_recurring_interval(callback, task_id, state)
-            elif data.startswith("edit_recurring_content_"):
-                task_id = int(data.split("_")[-1])
-                await self._edit_recurring_content(callback, task_id, state)
-            elif data.startswith("view_recurring_content_"):
-                task_id = int(data.split("_")[-1])
-                await self._view_recurring_content(callback, task_id, state)
-            elif data.startswith("toggle_filter_language_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_filter_language(callback, task_id, state)
-            
-            # Inline buttons handlers - must be before generic content handlers
-            elif data.startswith("content_inline_buttons_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_inline_buttons_setting(callback, task_id, state)
-            elif data.startswith("content_cleaner_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_text_cleaner_setting(callback, task_id, state)
-            elif data.startswith("inline_buttons_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_inline_buttons(callback, task_id, state)
-            elif data.startswith("inline_button_add_"):
-                task_id = int(data.split("_")[-1])
-                await self._add_inline_button(callback, task_id, state)
-            elif data.startswith("inline_button_edit_"):
-                parts = data.split("_")
-                task_id = int(parts[-2])
-                button_id = int(parts[-1])
-                await self._edit_inline_button(callback, task_id, button_id, state)
-            elif data.startswith("inline_button_delete_"):
-                parts = data.split("_")
-                task_id = int(parts[-2])
-                button_id = int(parts[-1])
-                await self._delete_inline_button(callback, task_id, button_id, state)
-            elif data.startswith("inline_buttons_preview_"):
-                task_id = int(data.split("_")[-1])
-                await self._preview_inline_buttons(callback, task_id, state)
-            elif data.startswith("inline_buttons_clear_"):
-                task_id = int(data.split("_")[-1])
-                await self._clear_inline_buttons(callback, task_id, state)
-            elif data.startswith("replace_add_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_replacement_add(callback, task_id, state)
-            elif data.startswith("replace_list_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_replacement_list(callback, task_id, state)
-            elif data.startswith("replace_clear_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_replacement_clear(callback, task_id, state)
-            elif data.startswith("format_hyperlink_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_format_hyperlink(callback, task_id, state)
-            
-            # Text Cleaner handlers
-            elif data.startswith("content_cleaner_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_text_cleaner_setting(callback, task_id, state)
-            elif data.startswith("cleaner_buttons_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_setting(task_id, "remove_inline_buttons", callback)
-            elif data.startswith("cleaner_emojis_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_setting(task_id, "remove_emojis", callback)
-            elif data.startswith("cleaner_lines_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_setting(task_id, "remove_extra_lines", callback)
-            elif data.startswith("cleaner_words_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_setting(task_id, "remove_lines_with_words", callback)
-            elif data.startswith("cleaner_hashtags_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_setting(task_id, "remove_hashtags", callback)
-            elif data.startswith("cleaner_links_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_links(callback, task_id, state)
-            elif data.startswith("cleaner_mentions_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_mentions(callback, task_id, state)
-            elif data.startswith("cleaner_numbers_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_numbers(callback, task_id, state)
-            elif data.startswith("cleaner_punctuation_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_punctuation(callback, task_id, state)
-            elif data.startswith("cleaner_empty_lines_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_empty_lines(callback, task_id, state)
-            elif data.startswith("cleaner_extra_lines_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_extra_lines(callback, task_id, state)
-            elif data.startswith("cleaner_whitespace_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_whitespace(callback, task_id, state)
-            elif data.startswith("cleaner_duplicate_lines_toggle_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_cleaner_duplicate_lines(callback, task_id, state)
-            elif data.startswith("cleaner_test_"):
-                task_id = int(data.split("_")[-1])
-                await self._test_text_cleaner(callback, task_id, state)
-            elif data.startswith("cleaner_reset_"):
-                task_id = int(data.split("_")[-1])
-                await self._reset_text_cleaner(callback, task_id, state)
-            elif data.startswith("cleaner_caption_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_caption_removal(callback, task_id, state)
-            elif data.startswith("toggle_lang_mode_"):
-                task_id = int(data.split("_")[-1])
-                await self._toggle_lang_mode(callback, task_id, state)
-            elif data.startswith("filter_languages_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_filter_languages(callback, task_id, state)
-            elif data.startswith("toggle_lang_"):
-                parts = data.split("_")
-                task_id = int(parts[2])
-                lang_code = parts[3]
-                await self._toggle_language_selection(callback, task_id, lang_code, state)
-            elif data.startswith("select_all_langs_"):
-                task_id = int(data.split("_")[-1])
-                await self._select_all_languages(callback, task_id, state)
-            elif data.startswith("deselect_all_langs_"):
-                task_id = int(data.split("_")[-1])
-                await self._deselect_all_languages(callback, task_id, state)
-            elif data.startswith("filter_language_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_language_filter(callback, task_id, state)
-            elif data.startswith("filter_forwarded_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_forwarded_filter(callback, task_id, state)
-            elif data.startswith("filter_links_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_links_filter(callback, task_id, state)
-            elif data.startswith("filter_buttons_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_buttons_filter(callback, task_id, state)
-            elif data.startswith("filter_duplicates_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_duplicates_filter(callback, task_id, state)
-            elif data.startswith("filter_language_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_language_filter(callback, task_id, state)
-            elif data.startswith("filter_days_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_day_filter_setting(callback, task_id, state)
-            elif data.startswith("user_filter_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_user_filter(callback, task_id, state)
-            elif data.startswith("filter_length_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_length_filter_setting(callback, task_id, state)
-            elif data.startswith("filter_clear_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_filter_clear(callback, task_id, state)
-            elif data.startswith("filter_"):
-                await self._handle_filter_submenu(callback, state)
-            elif data.startswith("kw_set_") or data.startswith("kw_clear_") or data.startswith("kw_"):
-                await self._handle_keyword_actions(callback, state)
-            elif data.startswith("kw_confirm_clear_"):
-                task_id = int(data.split("_")[-1])
-                # Clear all keywords
-                await self.database.execute_command(
-                    "UPDATE task_settings SET keyword_filters = NULL WHERE task_id = $1",
-                    task_id
-                )
-                await callback.answer("🗑️ All keywords cleared!", show_alert=True)
-                await self._handle_keyword_filter(callback, task_id, state)
-            elif data.startswith("media_toggle_"):
-                await self._handle_media_toggle(callback, state)
-            elif data.startswith("text_toggle_"):
-                await self._handle_text_toggle(callback, state)
-            elif data.startswith("set_action_"):
-                await self._handle_action_mode_setting(callback, state)
-            elif data.startswith("media_type_"):
-                await self._handle_media_type_toggle(callback, state)
-            elif data.startswith("media_enable_all_"):
-                await self._handle_media_enable_all(callback, state)
-            elif data.startswith("media_disable_all_"):
-                await self._handle_media_disable_all(callback, state)
-            elif data.startswith("media_reset_"):
-                await self._handle_media_reset(callback, state)
-            elif data.startswith("media_save_"):
-                await self._handle_media_save(callback, state)
-            # Advanced Features Handlers
-            elif data.startswith("toggle_translation_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_translation_toggle(callback, task_id, state)
-            elif data.startswith("set_target_lang_"):
-                parts = data.split("_")
-                language_code = parts[3]
-                task_id = int(parts[4])
-                await self._handle_set_target_language(callback, state)
-            elif data.startswith("toggle_working_hours_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_working_hours_toggle(callback, task_id, state)
-            elif data.startswith("set_start_hour_"):
-                parts = data.split("_")
-                hour = int(parts[3])
-                task_id = int(parts[4])
-                await self._handle_set_start_hour(callback, task_id, hour, state)
-            elif data.startswith("set_end_hour_"):
-                parts = data.split("_")
-                hour = int(parts[3])
-                task_id = int(parts[4])
-                await self._handle_set_end_hour(callback, task_id, hour, state)
-            elif data.startswith("set_timezone_"):
-                parts = data.split("_")
-                timezone = "_".join(parts[2:-1])  # Rejoin timezone parts
-                task_id = int(parts[-1])
-                await self._handle_set_timezone(callback, task_id, timezone, state)
-            elif data.startswith("toggle_recurring_post_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_recurring_post_toggle(callback, task_id, state)
-            elif data.startswith("set_recurring_interval_"):
-                parts = data.split("_")
-                interval_hours = int(parts[3])
-                task_id = int(parts[4])
-                await self._handle_set_recurring_interval(callback, task_id, interval_hours, state)
-            elif data.startswith("user_verified_") or data.startswith("user_nobots_"):
-                await self._handle_user_filter_actions(callback, state)
-            elif data.startswith("user_whitelist_") and data.count("_") == 2:  # Exact pattern: user_whitelist_X
-                task_id = int(data.split("_")[2])
-                await self._handle_user_whitelist_management(callback, task_id, state)
-            elif data.startswith("user_blacklist_") and data.count("_") == 2:  # Exact pattern: user_blacklist_X
-                task_id = int(data.split("_")[2])
-                await self._handle_user_blacklist_management(callback, task_id, state)
-            elif data.startswith("suffix_add_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_suffix_add(callback, task_id, state)
-            elif data.startswith("suffix_edit_"):
-                task_id = int(data.split("_")[-1])
-                await self._handle_suffix_edit(callback, task_id, state)
-            elif data.startswith("cleaner_"):
-                await self._handle_text_cleaner_actions(callback, state)
-            elif (data.startswith("prefix_") or data.startswith("suffix_") or 
-                  data.startswith("replace_") or data.startswith("format_") or data.startswith("links_")):
-                await self._handle_content_actions(callback, state)
-            elif data.startswith("clear_") or data.startswith("enable_") or data.startswith("disable_") or data.startswith("reset_") or data.startswith("save_") or data.startswith("view_") or data.startswith("toggle_"):
-                await self._handle_filter_actions(callback, state)
-            elif data.startswith("verified_") or data.startswith("nobots_") or data.startswith("bots_"):
-                await self._handle_user_filter_specific_actions(callback, state)
-            elif data.startswith("photo_") or data.startswith("video_") or data.startswith("audio_") or data.startswith("document_") or data.startswith("voice_") or data.startswith("sticker_") or data.startswith("animation_") or data.startswith("poll_") or data.startswith("contact_") or data.startswith("location_") or data.startswith("venue_") or data.startswith("game_"):
-                await self._handle_media_type_actions(callback, state)
-            elif (data.startswith("mode_") or data.startswith("apply_") or data.startswith("load_") or 
-                  data.startswith("delete_") or data.startswith("copy_") or data.startswith("import_") or 
-                  data.startswith("export_") or data.startswith("add_") or data.startswith("remove_") or
-                  data.startswith("edit_") or data.startswith("test_") or data.startswith("back_") or
-                  data.startswith("next_") or data.startswith("prev_") or data.startswith("select_") or
-                  data.startswith("instant_") or data.startswith("short_") or data.startswith("medium_") or
-                  data.startswith("long_") or data.startswith("random_") or data.startswith("bold_") or
-                  data.startswith("italic_") or data.startswith("underline_") or data.startswith("strike_") or
-                  data.startswith("spoiler_") or data.startswith("code_") or data.startswith("mono_") or
-                  data.startswith("preserve_") or data.startswith("strip_") or data.startswith("extract_") or
-                  data.startswith("limit_") or data.startswith("min_") or data.startswith("max_") or
-                  data.startswith("keyword_") or data.startswith("length_") or data.startswith("sender_") or
-                  data.startswith("all_") or data.startswith("none_") or data.startswith("default_")):
-                await self._handle_additional_actions(callback, state)
-            else:
-                # Special check for content buttons that reach here
-                if data and data.startswith("content_"):
-                    logger.error(f"CRITICAL: Content button {data} reached else clause - no handler matched!")
-                    logger.error(f"This means all content_ conditions failed to match")
+            if not await self.router.route(callback, state):
                 logger.warning(f"Unhandled task callback: {data}")
                 await callback.answer("❌ Unknown task action.", show_alert=True)
                 
@@ -1005,6 +113,7 @@ class TaskHandlers:
             logger.error(f"Error in task callback {data}: {e}")
             await callback.answer("❌ An error occurred.", show_alert=True)
     
+    @callback_route("task_create")
     async def _handle_task_creation_start(self, callback: CallbackQuery, state: FSMContext):
         """Handle task creation start"""
         try:
@@ -1035,6 +144,7 @@ Choose the type of task you want to create:
             logger.error(f"Error starting task creation: {e}")
             await callback.answer("❌ Error starting task creation.")
     
+    @callback_route("task_create_*")
     async def _handle_task_type_selection(self, callback: CallbackQuery, state: FSMContext):
         """Handle task type selection"""
         try:
@@ -1170,6 +280,7 @@ Choose an option below:
             await message.answer("❌ An error occurred creating the task.")
             await state.clear()
     
+    @callback_route("task_list")
     async def _handle_task_list(self, callback: CallbackQuery, state: FSMContext, page: int = 0):
         """Handle task list display"""
         try:
@@ -1223,31 +334,27 @@ Select a task below to view details and manage it.
             logger.error(f"Error displaying task list: {e}")
             await callback.answer("❌ Error loading task list.")
     
+    @callback_route("task_view_*")
     async def _handle_task_view(self, callback: CallbackQuery, state: FSMContext):
         """Handle task view"""
         try:
             task_id = int(callback.data.split("_")[-1])
             
-            # Get fresh task data directly from database to avoid cache issues
-            task_data = await self.database.execute_query(
-                "SELECT t.*, u.telegram_id as user_telegram_id FROM tasks t JOIN users u ON t.user_id = u.id WHERE t.id = $1", 
-                task_id
-            )
+            # Task writes invalidate the cached row, so this is never stale
+            task = await self.repositories.tasks.owner(task_id)
             
-            if not task_data:
+            if not task:
                 await callback.answer("❌ Task not found.", show_alert=True)
                 return
             
-            task = task_data[0]
-            
             # Check if user owns the task
             if task["user_telegram_id"] != callback.from_user.id:
                 await callback.answer("❌ Access denied.", show_alert=True)
                 return
             
             # Get sources, targets and statistics
-            sources = await self.database.get_task_sources(task_id)
-            targets = await self.database.get_task_targets(task_id)
+            sources = await self.repositories.sources.list(task_id)
+            targets = await self.repositories.targets.list(task_id)
             statistics = await self.database.get_task_statistics(task_id)
             
             # Format task details
@@ -1264,6 +371,7 @@ Select a task below to view details and manage it.
             logger.error(f"Error viewing task: {e}")
             await callback.answer("❌ Error loading task details.")
     
+    @callback_route("task_toggle_*")
     async def _handle_task_toggle(self, callback: CallbackQuery, state: FSMContext):
         """Handle task activation/deactivation"""
         try:
@@ -1381,6 +489,7 @@ Will be permanently deleted.
             logger.error(f"Error cancelling task deletion: {e}")
             await callback.answer("❌ Error cancelling deletion.")
     
+    @callback_route("task_statistics_*")
     async def _handle_task_statistics(self, callback: CallbackQuery, state: FSMContext):
         """Handle task statistics"""
         try:
@@ -1417,6 +526,7 @@ Will be permanently deleted.
             logger.error(f"Error displaying task statistics: {e}")
             await callback.answer("❌ Error loading task statistics.")
     
+    @callback_route("task_settings_*")
     async def _handle_task_settings(self, callback: CallbackQuery, state: FSMContext):
         """Handle task settings"""
         try:
@@ -1454,6 +564,7 @@ Select a category below to configure:
             logger.error(f"Error displaying task settings: {e}")
             await callback.answer("❌ Error loading task settings.")
     
+    @callback_route("task_info_*")
     async def _handle_task_info(self, callback: CallbackQuery, state: FSMContext):
         """Handle task information display"""
         try:
@@ -1498,6 +609,7 @@ Select a category below to configure:
             logger.error(f"Error displaying task info: {e}")
             await callback.answer("❌ Error loading task information.")
     
+    @callback_route("task_list_page_*")
     async def _handle_task_list_pagination(self, callback: CallbackQuery, state: FSMContext):
         """Handle task list pagination"""
         try:
@@ -1508,6 +620,7 @@ Select a category below to configure:
             logger.error(f"Error in task list pagination: {e}")
             await callback.answer("❌ Error loading page.")
     
+    @callback_route("task_refresh")
     async def _handle_task_refresh(self, callback: CallbackQuery, state: FSMContext):
         """Handle task list refresh"""
         try:
@@ -1518,6 +631,7 @@ Select a category below to configure:
             logger.error(f"Error refreshing task list: {e}")
             await callback.answer("❌ Error refreshing tasks.")
     
+    @callback_route("task_stats")
     async def _handle_task_statistics_overview(self, callback: CallbackQuery, state: FSMContext):
         """Handle task statistics overview"""
         try:
@@ -1599,6 +713,7 @@ Use the buttons below to manage this task.
             logger.error(f"Error formatting task details: {e}")
             return "❌ Error formatting task details."
     
+    @callback_route("task_edit_*")
     async def _handle_task_edit(self, callback: CallbackQuery, state: FSMContext):
         """Handle task edit"""
         try:
@@ -1606,25 +721,17 @@ Use the buttons below to manage this task.
             task_id = int(callback.data.split("_")[-1])
             
             # Verify task ownership
-            task_owner = await self.database.execute_query(
-                "SELECT u.telegram_id FROM tasks t JOIN users u ON t.user_id = u.id WHERE t.id = $1", 
-                task_id
-            )
-            if not task_owner or task_owner[0]['telegram_id'] != callback.from_user.id:
+            if not await self.repositories.tasks.is_owned_by(task_id, callback.from_user.id):
                 await callback.answer("❌ Access denied.", show_alert=True)
                 return
             
             # Get task information
-            task_info = await self.database.execute_query(
-                "SELECT * FROM tasks WHERE id = $1", task_id
-            )
+            task = await self.repositories.tasks.get(task_id)
             
-            if not task_info:
+            if not task:
                 await callback.answer("❌ Task not found.", show_alert=True)
                 return
             
-            task = task_info[0]
-            
             edit_text = f"""
 ✏️ **Edit Task: {task['name']}**
 
@@ -1660,6 +767,7 @@ Select what you want to modify:
             logger.error(f"Error editing task: {e}")
             await callback.answer("❌ Error loading task edit options.")
     
+    @callback_route("task_delete_*")
     async def _handle_task_delete(self, callback: CallbackQuery, state: FSMContext):
         """Handle task delete confirmation"""
         try:
@@ -1667,15 +775,12 @@ Select what you want to modify:
             task_id = int(callback.data.split("_")[-1])
             
             # Verify task ownership
-            task_owner = await self.database.execute_query(
-                "SELECT u.telegram_id, t.name FROM tasks t JOIN users u ON t.user_id = u.id WHERE t.id = $1", 
-                task_id
-            )
-            if not task_owner or task_owner[0]['telegram_id'] != callback.from_user.id:
+            task_owner = await self.repositories.tasks.owner(task_id)
+            if not task_owner or task_owner['user_telegram_id'] != callback.from_user.id:
                 await callback.answer("❌ Access denied.", show_alert=True)
                 return
             
-            task_name = task_owner[0]['name']
+            task_name = task_owner['name']
             
             confirm_text = f"""
 ⚠️ **Delete Task Confirmation**
@@ -1705,24 +810,23 @@ Will be permanently deleted.
             logger.error(f"Error in task delete: {e}")
             await callback.answer("❌ Error loading delete confirmation.")
     
+    @callback_route("confirm_delete_task*")
     async def _handle_confirm_task_delete(self, callback: CallbackQuery, state: FSMContext):
         """Handle confirmed task deletion"""
         try:
             task_id = int(callback.data.split("_")[-1])
             
             # Verify task ownership one more time
-            task_owner = await self.database.execute_query(
-                "SELECT u.telegram_id, t.name FROM tasks t JOIN users u ON t.user_id = u.id WHERE t.id = $1", 
-                task_id
-            )
-            if not task_owner or task_owner[0]['telegram_id'] != callback.from_user.id:
+            task_owner = await self.repositories.tasks.owner(task_id)
+            if not task_owner or task_owner['user_telegram_id'] != callback.from_user.id:
                 await callback.answer("❌ Access denied.", show_alert=True)
                 return
             
-            task_name = task_owner[0]['name']
+            task_name = task_owner['name']
             
             # Delete task and all related data in correct order
             await self.database.execute_command("DELETE FROM forwarding_logs WHERE task_id = $1", task_id)
+            await self.database.delete_log_rollups(task_id)
             await self.database.execute_command("DELETE FROM task_statistics WHERE task_id = $1", task_id)
             await self.database.execute_command("DELETE FROM manual_approvals WHERE task_id = $1", task_id)
             await self.database.execute_command("DELETE FROM message_tracking WHERE task_id = $1", task_id)
@@ -1731,6 +835,7 @@ Will be permanently deleted.
             await self.database.execute_command("DELETE FROM sources WHERE task_id = $1", task_id)
             await self.database.execute_command("DELETE FROM targets WHERE task_id = $1", task_id)
             await self.database.execute_command("DELETE FROM tasks WHERE id = $1", task_id)
+            await self.repositories.invalidate_task(task_id)
             
             # Remove from forwarding engine
             await self.forwarding_engine.remove_task(task_id)
@@ -1744,6 +849,7 @@ Will be permanently deleted.
             logger.error(f"Error confirming task delete: {e}")
             await callback.answer("❌ Error deleting task.")
     
+    @callback_route("cancel_delete_task*")
     async def _handle_cancel_task_delete(self, callback: CallbackQuery, state: FSMContext):
         """Handle cancelled task deletion"""
         try:
@@ -1756,6 +862,7 @@ Will be permanently deleted.
             logger.error(f"Error cancelling task delete: {e}")
             await callback.answer("❌ Error cancelling deletion.")
     
+    @callback_route("task_mode_toggle_*")
     async def _handle_task_mode_toggle(self, callback: CallbackQuery, state: FSMContext):
         """Handle task mode toggle between bot and userbot"""
         try:
@@ -1780,10 +887,7 @@ Will be permanently deleted.
                 return
             
             # Update task mode in database
-            await self.database.execute_command(
-                "UPDATE tasks SET task_type = $1 WHERE id = $2",
-                new_mode, task_id
-            )
+            await self.repositories.tasks.update(task_id, task_type=new_mode)
             
             # Clear task from cache to force refresh
             async with self.task_manager.cache_lock:
@@ -1800,17 +904,13 @@ Will be permanently deleted.
             # Wait a moment for database to fully commit
             await asyncio.sleep(0.1)
             
-            # Get fresh task data directly from database bypassing cache
-            task_data = await self.database.execute_query(
-                "SELECT * FROM tasks WHERE id = $1", task_id
-            )
+            # The update above invalidated the cached task row
+            task = await self.repositories.tasks.get(task_id)
             
-            if task_data:
-                task = task_data[0]
-                
+            if task:
                 # Get sources and targets
-                sources = await self.database.get_task_sources(task_id)
-                targets = await self.database.get_task_targets(task_id)
+                sources = await self.repositories.sources.list(task_id)
+                targets = await self.repositories.targets.list(task_id)
                 statistics = await self.database.get_task_statistics(task_id)
                 
                 # Format task details with fresh data
@@ -1842,6 +942,7 @@ Will be permanently deleted.
             logger.error(f"Error toggling task mode: {e}")
             await callback.answer("❌ Error switching task mode.")
     
+    @callback_route("setting_forward_mode_*")
     async def _handle_forward_mode_setting(self, callback: CallbackQuery, state: FSMContext):
         """Handle forward mode setting"""
         try:
@@ -1855,9 +956,7 @@ Will be permanently deleted.
                 return
             
             # Get current forward mode
-            settings = await self.database.execute_query(
-                "SELECT forward_mode FROM task_settings WHERE task_id = $1", task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "forward_mode")
             current_mode = settings[0]["forward_mode"] if settings else "copy"
             
             mode_text = f"""
@@ -1902,6 +1001,7 @@ Select new forward mode:
             logger.error(f"Error in forward mode setting: {e}")
             await callback.answer("❌ Error loading forward mode settings.")
     
+    @callback_route("setting_delays_*")
     async def _handle_delay_setting(self, callback: CallbackQuery, state: FSMContext):
         """Handle delay setting"""
         try:
@@ -1915,9 +1015,7 @@ Select new forward mode:
                 return
             
             # Get current delay settings
-            settings = await self.database.execute_query(
-                "SELECT delay_min, delay_max FROM task_settings WHERE task_id = $1", task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "delay_min", "delay_max")
             delay_min = settings[0]["delay_min"] if settings else 0
             delay_max = settings[0]["delay_max"] if settings else 0
             
@@ -1975,10 +1073,7 @@ Select delay preset:
                 return
             
             # Get current filter settings
-            settings = await self.database.execute_query(
-                "SELECT keyword_filters FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "keyword_filters")
             keywords = settings[0]["keyword_filters"] if settings and settings[0]["keyword_filters"] else "None"
             # Remove references to non-existent columns for now
             media_types = "All" 
@@ -2002,7 +1097,7 @@ Configure filters:
             """
             
             # Get current settings for the keyboard
-            current_settings = await self.database.get_task_settings(task_id) or {}
+            current_settings = await self.repositories.settings.get(task_id) or {}
             
             # Use the standardized keyboard from keyboards module
             markup = await self.keyboards.get_filter_settings_keyboard(task_id, current_settings)
@@ -2076,6 +1171,7 @@ Configure content modifications:
     
 
     
+    @callback_route("setting_reset_*")
     async def _handle_reset_setting(self, callback: CallbackQuery, state: FSMContext):
         """Handle reset settings"""
         try:
@@ -2131,7 +1227,7 @@ Are you sure you want to reset all settings?
                 return
             
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             delay_min = settings.get("delay_min", 0) if settings else 0
             delay_max = settings.get("delay_max", 0) if settings else 0
             send_limit = settings.get("send_limit", 0) if settings else 0
@@ -2158,6 +1254,9 @@ Configure forwarding limits and delays:
                 [
                     InlineKeyboardButton(text="🚦 حدود الإرسال", callback_data=f"advanced_sending_limit_{task_id}")
                 ],
+                [
+                    InlineKeyboardButton(text="📰 وضع الملخص", callback_data=f"advanced_digest_{task_id}")
+                ],
                 [
                     InlineKeyboardButton(text="🔙 Back to Settings", callback_data=f"task_settings_{task_id}")
                 ]
@@ -2170,6 +1269,7 @@ Configure forwarding limits and delays:
             logger.error(f"Error in limits setting: {e}")
             await callback.answer("❌ Error loading limits settings.")
 
+    @callback_route("setting_save_*")
     async def _handle_save_setting(self, callback: CallbackQuery, state: FSMContext):
         """Handle save settings"""
         try:
@@ -2191,6 +1291,7 @@ Configure forwarding limits and delays:
             logger.error(f"Error in save setting: {e}")
             await callback.answer("❌ Error saving settings.")
     
+    @callback_route("setting_view_*")
     async def _handle_view_all_settings(self, callback: CallbackQuery, state: FSMContext):
         """Handle view all settings"""
         try:
@@ -2204,10 +1305,7 @@ Configure forwarding limits and delays:
                 return
             
             # Get all current settings
-            settings = await self.database.execute_query(
-                """SELECT forward_mode, delay_min, delay_max, keyword_filters FROM task_settings WHERE task_id = $1""", 
-                task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "forward_mode", "delay_min", "delay_max", "keyword_filters")
             
             if settings:
                 s = settings[0]
@@ -2259,6 +1357,7 @@ Settings are automatically saved.
             logger.error(f"Error in view all settings: {e}")
             await callback.answer("❌ Error loading all settings.")
     
+    @callback_route("set_forward_mode_*")
     async def _handle_set_forward_mode(self, callback: CallbackQuery, state: FSMContext):
         """Handle setting forward mode"""
         try:
@@ -2294,6 +1393,7 @@ Settings are automatically saved.
                 DO UPDATE SET forward_mode = $2, updated_at = NOW()""",
                 task_id, mode
             )
+            await self.repositories.settings.invalidate(task_id)
             
             await callback.answer(f"✅ Forward mode set to {mode.upper()}", show_alert=True)
             
@@ -2304,6 +1404,7 @@ Settings are automatically saved.
             logger.error(f"Error setting forward mode: {e}")
             await callback.answer("❌ Error updating forward mode.")
     
+    @callback_route("set_delay_*")
     async def _handle_set_delay(self, callback: CallbackQuery, state: FSMContext):
         """Handle setting delay presets"""
         try:
@@ -2370,6 +1471,7 @@ Settings are automatically saved.
                 DO UPDATE SET delay_min = $2, delay_max = $3, updated_at = NOW()""",
                 task_id, delay_min, delay_max
             )
+            await self.repositories.settings.invalidate(task_id)
             
             await callback.answer(f"✅ Delay set to {delay_min}-{delay_max}s", show_alert=True)
             
@@ -2407,6 +1509,7 @@ Settings are automatically saved.
     
 
     
+    @callback_route("filter_*")
     async def _handle_filter_submenu(self, callback: CallbackQuery, state: FSMContext):
         """Handle filter submenu actions"""
         try:
@@ -2441,10 +1544,7 @@ Settings are automatically saved.
             import json
             
             # Get current keyword filter settings
-            settings = await self.database.execute_query(
-                "SELECT keyword_filters, filter_text FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "keyword_filters", "filter_text")
             
             # Parse current settings with separate lists for whitelist/blacklist
             whitelist_keywords = []
@@ -2571,10 +1671,7 @@ Settings are automatically saved.
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
             # Get current media filter settings
-            settings = await self.database.execute_query(
-                "SELECT filter_media, filter_text FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "filter_media", "filter_text")
             
             filter_media = False
             filter_text = False
@@ -2583,7 +1680,7 @@ Settings are automatically saved.
                 filter_text = settings[0]["filter_text"] or False
             
             # Get comprehensive settings including all media types
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             
             # Display comprehensive media types keyboard
             keyboard = await self.bot_controller.keyboards.get_media_types_keyboard(task_id, settings)
@@ -2602,6 +1699,7 @@ Settings are automatically saved.
 
 
 
+    @callback_route("user_filter_{task_id:int}")
     async def _handle_user_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle user-based filter configuration"""
         try:
@@ -2609,7 +1707,7 @@ Settings are automatically saved.
             import time
             
             # Get current settings to show button states
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             
             # Check current filter states
             filter_forwarded = settings.get('filter_forwarded', False) if settings else False
@@ -2662,17 +1760,15 @@ _Updated: {timestamp}_
             logger.error(f"Error in user filter: {e}")
             await callback.answer("❌ Error loading user filter settings.")
 
+    @callback_route("user_verified_{task_id:int}")
     async def _handle_toggle_verified_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle verified users only filter"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("filter_verified", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET filter_verified = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, filter_verified=new_value)
             
             status = "تفعيل" if new_value else "إلغاء"
             await callback.answer(f"✅ تم {status} فلتر المستخدمين المؤكدين")
@@ -2682,6 +1778,7 @@ _Updated: {timestamp}_
             logger.error(f"Error toggling verified filter: {e}")
             await callback.answer("❌ خطأ في تبديل فلتر التحقق", show_alert=True)
 
+    @callback_route("user_nobots_{task_id:int}")
     async def _handle_toggle_bot_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle bot filter - Currently not implemented"""
         try:
@@ -2692,6 +1789,7 @@ _Updated: {timestamp}_
             logger.error(f"Error in bot filter toggle: {e}")
             await callback.answer("❌ خطأ في فلتر البوتات", show_alert=True)
 
+    @callback_route("user_whitelist_{task_id:int}")
     async def _handle_user_whitelist(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle user whitelist management"""
         try:
@@ -2701,6 +1799,7 @@ _Updated: {timestamp}_
             logger.error(f"Error in user whitelist: {e}")
             await callback.answer("❌ خطأ في القائمة البيضاء", show_alert=True)
 
+    @callback_route("user_blacklist_{task_id:int}")
     async def _handle_user_blacklist(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle user blacklist management"""
         try:
@@ -2713,7 +1812,7 @@ _Updated: {timestamp}_
     async def _handle_length_filter_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle message length filter settings"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             max_length = settings.get("max_message_length", 0) if settings else 0
             min_length = settings.get("min_message_length", 0) if settings else 0
             
@@ -2753,16 +1852,14 @@ _Updated: {timestamp}_
         """Handle clearing all filters"""
         try:
             # Clear all filter settings for the task
-            await self.database.execute_command(
-                """UPDATE task_settings SET 
-                   keyword_filters = NULL, 
-                   filter_media = FALSE, 
-                   filter_text = FALSE,
-                   filter_forwarded = FALSE,
-                   filter_links = FALSE,
-                   max_message_length = 4096
-                   WHERE task_id = $1""", 
-                task_id
+            await self.repositories.settings.update(
+                task_id,
+                keyword_filters=None,
+                filter_media=False,
+                filter_text=False,
+                filter_forwarded=False,
+                filter_links=False,
+                max_message_length=4096
             )
             
             await callback.answer("🗑️ All filters cleared successfully!", show_alert=True)
@@ -2774,6 +1871,7 @@ _Updated: {timestamp}_
             logger.error(f"Error clearing filters: {e}")
             await callback.answer("❌ Error clearing filters.")
 
+    @callback_route("kw_set_*", "kw_clear_*", "kw_*")
     async def _handle_keyword_actions(self, callback: CallbackQuery, state: FSMContext):
         """Handle keyword filter actions with enhanced features"""
         try:
@@ -2785,10 +1883,7 @@ _Updated: {timestamp}_
                 task_id = int(parts[3])
                 
                 # Get current filter state and mode
-                settings = await self.database.execute_query(
-                    "SELECT keyword_filter_mode, keyword_filters FROM task_settings WHERE task_id = $1", 
-                    task_id
-                )
+                settings = await self.repositories.settings.select(task_id, "keyword_filter_mode", "keyword_filters")
                 
                 current_mode = settings[0]["keyword_filter_mode"] if settings and settings[0]["keyword_filter_mode"] else "none"
                 
@@ -2803,9 +1898,10 @@ _Updated: {timestamp}_
                     status_text = "disabled"
                 
                 # Update both filter_text and keyword_filter_mode
-                await self.database.execute_command(
-                    "UPDATE task_settings SET filter_text = $1, keyword_filter_mode = $2 WHERE task_id = $3",
-                    new_mode != "none", new_mode, task_id
+                await self.repositories.settings.update(
+                    task_id,
+                    filter_text=new_mode != "none",
+                    keyword_filter_mode=new_mode
                 )
                 
                 # Force reload of forwarding engine settings
@@ -2819,10 +1915,7 @@ _Updated: {timestamp}_
                 task_id = int(parts[3])
                 
                 # Get current keywords with separate lists
-                settings = await self.database.execute_query(
-                    "SELECT keyword_filters FROM task_settings WHERE task_id = $1", 
-                    task_id
-                )
+                settings = await self.repositories.settings.select(task_id, "keyword_filters")
                 
                 whitelist_keywords = []
                 blacklist_keywords = []
@@ -2853,10 +1946,7 @@ _Updated: {timestamp}_
                     "blacklist": blacklist_keywords
                 }
                 
-                await self.database.execute_command(
-                    "UPDATE task_settings SET keyword_filters = $1, keyword_filter_mode = $2 WHERE task_id = $3",
-                    json.dumps(keywords_data), "whitelist", task_id
-                )
+                await self.repositories.keywords.save(task_id, keywords_data, mode="whitelist")
                 
                 # Force reload of forwarding engine settings
                 if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -2869,10 +1959,7 @@ _Updated: {timestamp}_
                 task_id = int(parts[3])
                 
                 # Get current keywords with separate lists
-                settings = await self.database.execute_query(
-                    "SELECT keyword_filters FROM task_settings WHERE task_id = $1", 
-                    task_id
-                )
+                settings = await self.repositories.settings.select(task_id, "keyword_filters")
                 
                 whitelist_keywords = []
                 blacklist_keywords = []
@@ -2903,10 +1990,7 @@ _Updated: {timestamp}_
                     "blacklist": blacklist_keywords
                 }
                 
-                await self.database.execute_command(
-                    "UPDATE task_settings SET keyword_filters = $1, keyword_filter_mode = $2 WHERE task_id = $3",
-                    json.dumps(keywords_data), "blacklist", task_id
-                )
+                await self.repositories.keywords.save(task_id, keywords_data, mode="blacklist")
                 
                 # Force reload of forwarding engine settings
                 if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -3008,6 +2092,14 @@ advertisement, spam, annoying
             logger.error(f"Error in keyword actions: {e}")
             await callback.answer("❌ خطأ في معالجة إجراء الكلمات المفتاحية", show_alert=True)
 
+    @callback_route("kw_confirm_clear_{task_id:int}")
+    async def _handle_keyword_confirm_clear(self, callback: CallbackQuery, task_id: int, state: FSMContext):
+        """Clear all keywords after confirmation"""
+        await self.repositories.settings.update(task_id, keyword_filters=None)
+        await callback.answer("🗑️ All keywords cleared!", show_alert=True)
+        await self._handle_keyword_filter(callback, task_id, state)
+
+    @callback_route("media_toggle_*")
     async def _handle_media_toggle(self, callback: CallbackQuery, state: FSMContext):
         """Handle media type toggle"""
         try:
@@ -3016,13 +2108,10 @@ advertisement, spam, annoying
                 parts = data.split("_")
                 task_id = int(parts[2])
                 
-                settings = await self.bot_controller.database.get_task_settings(task_id)
+                settings = await self.repositories.settings.get(task_id)
                 current_media = settings.get('filter_media', False) if settings else False
                 
-                await self.bot_controller.database.execute_command(
-                    "UPDATE task_settings SET filter_media = $1 WHERE task_id = $2",
-                    not current_media, task_id
-                )
+                await self.repositories.settings.update(task_id, filter_media=not current_media)
                 
                 await callback.answer(f"Media filtering {'enabled' if not current_media else 'disabled'}")
                 
@@ -3033,13 +2122,10 @@ advertisement, spam, annoying
                 parts = data.split("_")
                 task_id = int(parts[2])
                 
-                settings = await self.bot_controller.database.get_task_settings(task_id)
+                settings = await self.repositories.settings.get(task_id)
                 current_text = settings.get('filter_text', False) if settings else False
                 
-                await self.bot_controller.database.execute_command(
-                    "UPDATE task_settings SET filter_text = $1 WHERE task_id = $2",
-                    not current_text, task_id
-                )
+                await self.repositories.settings.update(task_id, filter_text=not current_text)
                 
                 await callback.answer(f"Text filtering {'enabled' if not current_text else 'disabled'}")
                 
@@ -3050,6 +2136,7 @@ advertisement, spam, annoying
             logger.error(f"Error toggling media type: {e}")
             await callback.answer("❌ Error toggling media type", show_alert=True)
 
+    @callback_route("len_*")
     async def _handle_length_setting(self, callback: CallbackQuery, state: FSMContext):
         """Handle message length setting"""
         try:
@@ -3059,10 +2146,7 @@ advertisement, spam, annoying
                 task_id = int(parts[1])
                 length = int(parts[2]) if len(parts) > 2 and parts[2] != 'unlimited' else 4096
                 
-                await self.bot_controller.database.execute_command(
-                    "UPDATE task_settings SET max_message_length = $1 WHERE task_id = $2",
-                    length, task_id
-                )
+                await self.repositories.settings.update(task_id, max_message_length=length)
                 
                 if length == 4096:
                     await callback.answer("Length filter removed (unlimited)")
@@ -3076,6 +2160,7 @@ advertisement, spam, annoying
             logger.error(f"Error setting length filter: {e}")
             await callback.answer("❌ Error setting length filter", show_alert=True)
 
+    @callback_route("user_verified_*", "user_nobots_*")
     async def _handle_user_filter_actions(self, callback: CallbackQuery, state: FSMContext):
         """Handle user filter actions"""
         try:
@@ -3084,16 +2169,13 @@ advertisement, spam, annoying
             if data.startswith("user_verified_"):
                 logger.info("Processing user_verified_ callback")
                 task_id = int(data.split("_")[2])
-                settings = await self.bot_controller.database.get_task_settings(task_id)
+                settings = await self.repositories.settings.get(task_id)
                 current_forwarded = settings.get('filter_forwarded', False) if settings else False
                 
                 # Toggle the setting
                 new_forwarded_setting = not current_forwarded
                 
-                await self.bot_controller.database.execute_command(
-                    "UPDATE task_settings SET filter_forwarded = $1 WHERE task_id = $2",
-                    new_forwarded_setting, task_id
-                )
+                await self.repositories.settings.update(task_id, filter_forwarded=new_forwarded_setting)
                 
                 status = "enabled" if new_forwarded_setting else "disabled"
                 await callback.answer(f"Verified only filter: {status}")
@@ -3104,7 +2186,7 @@ advertisement, spam, annoying
             elif data.startswith("user_nobots_"):
                 logger.info("Processing user_nobots_ callback")
                 task_id = int(data.split("_")[2])
-                settings = await self.bot_controller.database.get_task_settings(task_id)
+                settings = await self.repositories.settings.get(task_id)
                 # filter_bots column does not exist, show info message
                 logger.info("Bot filter requested but not implemented")
                 
@@ -3252,6 +2334,7 @@ advertisement, spam, annoying
                         DO UPDATE SET delay_min = $2, delay_max = $3, updated_at = NOW()""",
                         custom_delay_task_id, delay_min, delay_max
                     )
+                    await self.repositories.settings.invalidate(custom_delay_task_id)
                     
                     await message.answer(f"✅ **تم تعيين التأخير المخصص بنجاح!**\n\n"
                                        f"• الحد الأدنى: {delay_min} ثانية\n"
@@ -3303,10 +2386,7 @@ advertisement, spam, annoying
                     return
                 
                 # Get existing keywords with separate lists
-                settings = await self.database.execute_query(
-                    "SELECT keyword_filters FROM task_settings WHERE task_id = $1", 
-                    task_id
-                )
+                settings = await self.repositories.settings.select(task_id, "keyword_filters")
                 
                 whitelist_keywords = []
                 blacklist_keywords = []
@@ -3359,10 +2439,7 @@ advertisement, spam, annoying
                     "blacklist": blacklist_keywords
                 }
                 
-                await self.database.execute_command(
-                    "UPDATE task_settings SET keyword_filters = $1 WHERE task_id = $2",
-                    json.dumps(keywords_data), task_id
-                )
+                await self.repositories.keywords.save(task_id, keywords_data)
                 
                 # Prepare success message
                 success_msg = f"✅ **{list_name} updated successfully!**\n\n"
@@ -3444,10 +2521,7 @@ advertisement, spam, annoying
                     return
                 
                 # Get existing cleaner settings
-                settings = await self.database.execute_query(
-                    "SELECT text_cleaner_settings FROM task_settings WHERE task_id = $1", 
-                    task_id
-                )
+                settings = await self.repositories.settings.select(task_id, "text_cleaner_settings")
                 
                 cleaner_settings = {}
                 if settings and settings[0]["text_cleaner_settings"]:
@@ -3462,10 +2536,7 @@ advertisement, spam, annoying
                 cleaner_settings["target_words"] = updated_words
                 
                 # Save updated settings
-                await self.database.execute_command(
-                    "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                    json.dumps(cleaner_settings), task_id
-                )
+                await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
                 
                 success_msg = f"✅ **تم إضافة الكلمات المستهدفة بنجاح!**\n\n"
                 success_msg += f"• أضيف: {len(new_words)} كلمة جديدة\n"
@@ -3489,10 +2560,7 @@ advertisement, spam, annoying
                 test_text = message.text.strip()
                 
                 # Get cleaner settings
-                settings = await self.database.execute_query(
-                    "SELECT text_cleaner_settings FROM task_settings WHERE task_id = $1", 
-                    task_id
-                )
+                settings = await self.repositories.settings.select(task_id, "text_cleaner_settings")
                 
                 cleaner_settings = {}
                 if settings and settings[0]["text_cleaner_settings"]:
@@ -3526,7 +2594,7 @@ advertisement, spam, annoying
                     import json
                     
                     # Get current format settings
-                    settings = await self.bot_controller.database.get_task_settings(task_id)
+                    settings = await self.repositories.settings.get(task_id)
                     format_settings = {}
                     if settings and settings.get("format_settings"):
                         try:
@@ -3541,10 +2609,7 @@ advertisement, spam, annoying
                     format_settings["remove_all"] = False
                     
                     # Save to database
-                    await self.bot_controller.database.execute_command(
-                        "UPDATE task_settings SET format_settings = $1 WHERE task_id = $2",
-                        json.dumps(format_settings), task_id
-                    )
+                    await self.repositories.settings.update(task_id, format_settings=json.dumps(format_settings))
                     
                     await message.answer(
                         f"✅ **تم تعيين الرابط المخصص بنجاح!**\n\n"
@@ -3567,7 +2632,7 @@ advertisement, spam, annoying
                     from aiogram.types import Message as AiogramMessage
                     
                     # Get current format settings
-                    settings = await self.bot_controller.database.get_task_settings(task_id)
+                    settings = await self.repositories.settings.get(task_id)
                     format_settings = {}
                     if settings and settings.get("format_settings"):
                         try:
@@ -3634,21 +2699,7 @@ advertisement, spam, annoying
             import json
             
             # Get current keywords
-            settings = await self.database.execute_query(
-                "SELECT keyword_filters FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
-            
-            keywords_list = []
-            if settings and settings[0]["keyword_filters"]:
-                try:
-                    keywords_data = json.loads(settings[0]["keyword_filters"]) if isinstance(settings[0]["keyword_filters"], str) else settings[0]["keyword_filters"]
-                    if isinstance(keywords_data, dict):
-                        keywords_list = keywords_data.get("keywords", [])
-                    elif isinstance(keywords_data, list):
-                        keywords_list = keywords_data
-                except:
-                    keywords_list = [kw.strip() for kw in settings[0]["keyword_filters"].split(",") if kw.strip()]
+            keywords_list = await self.repositories.keywords.get(task_id)
             
             if not keywords_list:
                 await callback.answer("❌ لا توجد كلمات للتعديل", show_alert=True)
@@ -3685,24 +2736,9 @@ advertisement, spam, annoying
             import json
             
             # Get keywords
-            settings = await self.database.execute_query(
-                "SELECT keyword_filters FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
-            
-            keywords_list = []
-            current_mode = "blacklist"
-            
-            if settings and settings[0]["keyword_filters"]:
-                try:
-                    keywords_data = json.loads(settings[0]["keyword_filters"]) if isinstance(settings[0]["keyword_filters"], str) else settings[0]["keyword_filters"]
-                    if isinstance(keywords_data, dict):
-                        keywords_list = keywords_data.get("keywords", [])
-                        current_mode = keywords_data.get("mode", "blacklist")
-                    elif isinstance(keywords_data, list):
-                        keywords_list = keywords_data
-                except:
-                    keywords_list = [kw.strip() for kw in settings[0]["keyword_filters"].split(",") if kw.strip()]
+            keywords_data = await self.repositories.keywords.get_data(task_id)
+            keywords_list = await self.repositories.keywords.get(task_id)
+            current_mode = keywords_data.get("mode", "blacklist") if isinstance(keywords_data, dict) else "blacklist"
             
             if not keywords_list:
                 await callback.answer("❌ لا توجد كلمات مفتاحية", show_alert=True)
@@ -3770,24 +2806,9 @@ advertisement, spam, annoying
             import json
             
             # Get keywords
-            settings = await self.database.execute_query(
-                "SELECT keyword_filters FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
-            
-            keywords_list = []
-            current_mode = "blacklist"
-            
-            if settings and settings[0]["keyword_filters"]:
-                try:
-                    keywords_data = json.loads(settings[0]["keyword_filters"]) if isinstance(settings[0]["keyword_filters"], str) else settings[0]["keyword_filters"]
-                    if isinstance(keywords_data, dict):
-                        keywords_list = keywords_data.get("keywords", [])
-                        current_mode = keywords_data.get("mode", "blacklist")
-                    elif isinstance(keywords_data, list):
-                        keywords_list = keywords_data
-                except:
-                    keywords_list = [kw.strip() for kw in settings[0]["keyword_filters"].split(",") if kw.strip()]
+            keywords_data = await self.repositories.keywords.get_data(task_id)
+            keywords_list = await self.repositories.keywords.get(task_id)
+            current_mode = keywords_data.get("mode", "blacklist") if isinstance(keywords_data, dict) else "blacklist"
             
             if not keywords_list:
                 await callback.answer("❌ لا توجد كلمات للتصدير", show_alert=True)
@@ -3944,17 +2965,14 @@ advertisement, spam, annoying
             media_type = "_".join(parts[3:])
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get(media_type, True) if settings else True
             
             # Toggle the value
             new_value = not current_value
             
             # Update in database
-            await self.bot_controller.database.execute_command(
-                f"UPDATE task_settings SET {media_type} = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, **{media_type: new_value})
             
             # Force reload of forwarding engine settings immediately
             if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -3983,7 +3001,7 @@ advertisement, spam, annoying
             await callback.answer(f"{media_name}: {status}")
             
             # Refresh the media types keyboard
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             keyboard = await self.bot_controller.keyboards.get_media_types_keyboard(task_id, settings)
             
             await callback.message.edit_text(
@@ -4014,16 +3032,10 @@ advertisement, spam, annoying
             ]
             
             for media_type in media_types:
-                await self.bot_controller.database.execute_command(
-                    f"UPDATE task_settings SET {media_type} = $1 WHERE task_id = $2",
-                    True, task_id
-                )
+                await self.repositories.settings.update(task_id, **{media_type: True})
             
             # Also enable text
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET allow_text = $1 WHERE task_id = $2",
-                True, task_id
-            )
+            await self.repositories.settings.update(task_id, allow_text=True)
             
             # Force reload of forwarding engine settings immediately
             if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -4032,7 +3044,7 @@ advertisement, spam, annoying
             await callback.answer("✅ تم Enable جميع أنواع الوسائط")
             
             # Refresh keyboard
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             keyboard = await self.bot_controller.keyboards.get_media_types_keyboard(task_id, settings)
             
             await callback.message.edit_reply_markup(reply_markup=keyboard)
@@ -4056,16 +3068,10 @@ advertisement, spam, annoying
             ]
             
             for media_type in media_types:
-                await self.bot_controller.database.execute_command(
-                    f"UPDATE task_settings SET {media_type} = $1 WHERE task_id = $2",
-                    False, task_id
-                )
+                await self.repositories.settings.update(task_id, **{media_type: False})
             
             # Also disable text
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET allow_text = $1 WHERE task_id = $2",
-                False, task_id
-            )
+            await self.repositories.settings.update(task_id, allow_text=False)
             
             # Force reload of forwarding engine settings immediately
             if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -4074,7 +3080,7 @@ advertisement, spam, annoying
             await callback.answer("❌ تم Disable جميع أنواع الوسائط")
             
             # Refresh keyboard
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             keyboard = await self.bot_controller.keyboards.get_media_types_keyboard(task_id, settings)
             
             await callback.message.edit_reply_markup(reply_markup=keyboard)
@@ -4098,16 +3104,10 @@ advertisement, spam, annoying
             ]
             
             for media_type in media_types:
-                await self.bot_controller.database.execute_command(
-                    f"UPDATE task_settings SET {media_type} = $1 WHERE task_id = $2",
-                    True, task_id
-                )
+                await self.repositories.settings.update(task_id, **{media_type: True})
             
             # Also reset text filter
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET allow_text = $1 WHERE task_id = $2",
-                True, task_id
-            )
+            await self.repositories.settings.update(task_id, allow_text=True)
             
             # Force reload of forwarding engine settings immediately
             if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -4116,7 +3116,7 @@ advertisement, spam, annoying
             await callback.answer("🔄 تم إعادة تعيين جميع إعدادات الوسائط للافتراضي")
             
             # Refresh keyboard
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             keyboard = await self.bot_controller.keyboards.get_media_types_keyboard(task_id, settings)
             
             await callback.message.edit_reply_markup(reply_markup=keyboard)
@@ -4141,6 +3141,7 @@ advertisement, spam, annoying
             logger.error(f"Error saving media settings: {e}")
             await callback.answer("❌ خطأ في حفظ الإعدادات", show_alert=True)
 
+    @callback_route("text_toggle_*")
     async def _handle_text_toggle(self, callback: CallbackQuery, state: FSMContext):
         """Handle text message filter toggle"""
         try:
@@ -4149,17 +3150,14 @@ advertisement, spam, annoying
             task_id = int(parts[2])
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("allow_text", True) if settings else True
             
             # Toggle the value
             new_value = not current_value
             
             # Update in database
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET allow_text = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, allow_text=new_value)
             
             # Force reload of forwarding engine settings immediately
             if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -4169,7 +3167,7 @@ advertisement, spam, annoying
             await callback.answer(f"📝 Text messages: {status}")
             
             # Refresh the media types keyboard
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             keyboard = await self.bot_controller.keyboards.get_media_types_keyboard(task_id, settings)
             
             # Get current text status for display
@@ -4201,13 +3199,14 @@ advertisement, spam, annoying
             logger.error(f"Error toggling text filter: {e}")
             await callback.answer("❌ خطأ في تبديل فلتر النص", show_alert=True)
 
+    @callback_route("content_prefix_{task_id:int}", "setting_prefix_suffix_{task_id:int}")
     async def _handle_prefix_suffix_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle header/footer setting configuration"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_prefix = settings.get("prefix_text", "") if settings else ""
             current_suffix = settings.get("suffix_text", "") if settings else ""
             header_enabled = settings.get("header_enabled", True) if settings else True
@@ -4281,18 +3280,16 @@ advertisement, spam, annoying
             logger.error(f"Error in header/footer setting: {e}")
             await callback.answer("❌ خطأ في تحميل إعدادات Header/Footer", show_alert=True)
 
+    @callback_route("header_toggle_{task_id:int}")
     async def _toggle_header(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle header on/off"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_enabled = settings.get("header_enabled", True) if settings else True
             
             # Toggle the enabled status
             new_enabled = not current_enabled
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET header_enabled = $1 WHERE task_id = $2",
-                new_enabled, task_id
-            )
+            await self.repositories.settings.update(task_id, header_enabled=new_enabled)
             
             status = "تم تفعيل" if new_enabled else "تم تعطيل"
             await callback.answer(f"✅ {status} Header")
@@ -4304,18 +3301,16 @@ advertisement, spam, annoying
             logger.error(f"Error toggling header: {e}")
             await callback.answer("❌ خطأ في تبديل Header", show_alert=True)
 
+    @callback_route("footer_toggle_{task_id:int}")
     async def _toggle_footer(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle footer on/off"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_enabled = settings.get("footer_enabled", True) if settings else True
             
             # Toggle the enabled status
             new_enabled = not current_enabled
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET footer_enabled = $1 WHERE task_id = $2",
-                new_enabled, task_id
-            )
+            await self.repositories.settings.update(task_id, footer_enabled=new_enabled)
             
             status = "تم تفعيل" if new_enabled else "تم تعطيل"
             await callback.answer(f"✅ {status} Footer")
@@ -4340,7 +3335,7 @@ advertisement, spam, annoying
                 return
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             buttons_enabled = settings.get("inline_buttons_enabled", False) if settings else False
             
             # Get buttons from inline_button_settings only
@@ -4452,18 +3447,16 @@ advertisement, spam, annoying
             logger.error(f"Error in inline buttons setting: {e}")
             await callback.answer("❌ خطأ في تحميل إعدادات الأزرار الشفافة", show_alert=True)
 
+    @callback_route("inline_buttons_toggle_{task_id:int}")
     async def _toggle_inline_buttons(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle inline buttons feature on/off"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_enabled = settings.get("inline_buttons_enabled", False) if settings else False
             
             # Toggle the enabled status
             new_enabled = not current_enabled
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET inline_buttons_enabled = $1 WHERE task_id = $2",
-                new_enabled, task_id
-            )
+            await self.repositories.settings.update(task_id, inline_buttons_enabled=new_enabled)
             
             status = "تم تفعيل" if new_enabled else "تم تعطيل"
             await callback.answer(f"✅ {status} الأزرار الشفافة")
@@ -4475,6 +3468,7 @@ advertisement, spam, annoying
             logger.error(f"Error toggling inline buttons: {e}")
             await callback.answer("❌ خطأ في تبديل الأزرار الشفافة", show_alert=True)
 
+    @callback_route("inline_button_add_{task_id:int}")
     async def _add_inline_button(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Add new inline button with step-by-step input"""
         try:
@@ -4521,13 +3515,14 @@ advertisement, spam, annoying
             await callback.answer("❌ خطأ في إضافة الزر", show_alert=True)
 
     # Text Cleaner Methods Implementation
+    @callback_route("content_cleaner_{task_id:int}")
     async def _handle_text_cleaner_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle text cleaner settings display and management"""
         try:
             import json
             
             # Get current cleaner settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -4627,7 +3622,7 @@ advertisement, spam, annoying
             import json
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -4642,10 +3637,7 @@ advertisement, spam, annoying
             
             # Save updated settings
             updated_json = json.dumps(cleaner_settings)
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                updated_json, task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=updated_json)
             
             # Force reload forwarding engine
             if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -4667,7 +3659,7 @@ advertisement, spam, annoying
             import json
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -4682,10 +3674,7 @@ advertisement, spam, annoying
             
             # Save updated settings
             updated_json = json.dumps(cleaner_settings)
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                updated_json, task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=updated_json)
             
             # Force reload forwarding engine
             if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -4707,7 +3696,7 @@ advertisement, spam, annoying
             import json
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -4722,10 +3711,7 @@ advertisement, spam, annoying
             
             # Save updated settings
             updated_json = json.dumps(cleaner_settings)
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                updated_json, task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=updated_json)
             
             # Force reload forwarding engine
             if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -4746,7 +3732,7 @@ advertisement, spam, annoying
         try:
             import json
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -4759,10 +3745,7 @@ advertisement, spam, annoying
             cleaner_settings["remove_numbers"] = new_value
             
             updated_json = json.dumps(cleaner_settings)
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                updated_json, task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=updated_json)
             
             if hasattr(self.bot_controller, 'forwarding_engine'):
                 await self.bot_controller.forwarding_engine._reload_tasks()
@@ -4780,7 +3763,7 @@ advertisement, spam, annoying
         try:
             import json
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -4793,10 +3776,7 @@ advertisement, spam, annoying
             cleaner_settings["remove_punctuation"] = new_value
             
             updated_json = json.dumps(cleaner_settings)
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                updated_json, task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=updated_json)
             
             if hasattr(self.bot_controller, 'forwarding_engine'):
                 await self.bot_controller.forwarding_engine._reload_tasks()
@@ -4814,7 +3794,7 @@ advertisement, spam, annoying
         try:
             import json
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -4827,10 +3807,7 @@ advertisement, spam, annoying
             cleaner_settings["remove_empty_lines"] = new_value
             
             updated_json = json.dumps(cleaner_settings)
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                updated_json, task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=updated_json)
             
             if hasattr(self.bot_controller, 'forwarding_engine'):
                 await self.bot_controller.forwarding_engine._reload_tasks()
@@ -4848,7 +3825,7 @@ advertisement, spam, annoying
         try:
             import json
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -4861,10 +3838,7 @@ advertisement, spam, annoying
             cleaner_settings["remove_extra_lines"] = new_value
             
             updated_json = json.dumps(cleaner_settings)
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                updated_json, task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=updated_json)
             
             if hasattr(self.bot_controller, 'forwarding_engine'):
                 await self.bot_controller.forwarding_engine._reload_tasks()
@@ -4882,7 +3856,7 @@ advertisement, spam, annoying
         try:
             import json
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -4895,10 +3869,7 @@ advertisement, spam, annoying
             cleaner_settings["normalize_whitespace"] = new_value
             
             updated_json = json.dumps(cleaner_settings)
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                updated_json, task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=updated_json)
             
             if hasattr(self.bot_controller, 'forwarding_engine'):
                 await self.bot_controller.forwarding_engine._reload_tasks()
@@ -4916,7 +3887,7 @@ advertisement, spam, annoying
         try:
             import json
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -4929,10 +3900,7 @@ advertisement, spam, annoying
             cleaner_settings["remove_duplicate_lines"] = new_value
             
             updated_json = json.dumps(cleaner_settings)
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                updated_json, task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=updated_json)
             
             if hasattr(self.bot_controller, 'forwarding_engine'):
                 await self.bot_controller.forwarding_engine._reload_tasks()
@@ -4945,12 +3913,13 @@ advertisement, spam, annoying
             logger.error(f"Error toggling cleaner duplicate lines: {e}")
             await callback.answer("❌ خطأ في تبديل إعداد الأسطر المكررة", show_alert=True)
 
+    @callback_route("cleaner_target_words_toggle_{task_id:int}")
     async def _toggle_cleaner_target_words(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle remove lines with target words in text cleaner"""
         try:
             import json
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -4963,10 +3932,7 @@ advertisement, spam, annoying
             cleaner_settings["remove_lines_with_words"] = new_value
             
             updated_json = json.dumps(cleaner_settings)
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                updated_json, task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=updated_json)
             
             if hasattr(self.bot_controller, 'forwarding_engine'):
                 await self.bot_controller.forwarding_engine._reload_tasks()
@@ -4979,12 +3945,13 @@ advertisement, spam, annoying
             logger.error(f"Error toggling cleaner target words: {e}")
             await callback.answer("❌ خطأ في تبديل إعداد الكلمات المستهدفة", show_alert=True)
 
+    @callback_route("cleaner_words_manage_{task_id:int}")
     async def _handle_cleaner_words_manage(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle management of target words for cleaning"""
         try:
             import json
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -5095,10 +4062,7 @@ test@email.com
             }
             
             updated_json = json.dumps(default_settings)
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                updated_json, task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=updated_json)
             
             if hasattr(self.bot_controller, 'forwarding_engine'):
                 await self.bot_controller.forwarding_engine._reload_tasks()
@@ -5115,7 +4079,7 @@ test@email.com
         try:
             import json
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -5128,10 +4092,7 @@ test@email.com
             cleaner_settings["remove_emojis"] = new_value
             
             updated_json = json.dumps(cleaner_settings)
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                updated_json, task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=updated_json)
             
             if hasattr(self.bot_controller, 'forwarding_engine'):
                 await self.bot_controller.forwarding_engine._reload_tasks()
@@ -5150,7 +4111,7 @@ test@email.com
         try:
             import json
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -5163,10 +4124,7 @@ test@email.com
             cleaner_settings["remove_hashtags"] = new_value
             
             updated_json = json.dumps(cleaner_settings)
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                updated_json, task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=updated_json)
             
             if hasattr(self.bot_controller, 'forwarding_engine'):
                 await self.bot_controller.forwarding_engine._reload_tasks()
@@ -5184,7 +4142,7 @@ test@email.com
         """Toggle emoji removal in text cleaner"""
         try:
             import json
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -5195,10 +4153,7 @@ test@email.com
             current_value = cleaner_settings.get("remove_emojis", False)
             cleaner_settings["remove_emojis"] = not current_value
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             status = "تم تفعيل" if not current_value else "تم إلغاء"
             await callback.answer(f"🔹 {status} إزالة الرموز التعبيرية")
@@ -5212,7 +4167,7 @@ test@email.com
         """Toggle link removal in text cleaner"""
         try:
             import json
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -5223,10 +4178,7 @@ test@email.com
             current_value = cleaner_settings.get("remove_links", False)
             cleaner_settings["remove_links"] = not current_value
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             status = "تم تفعيل" if not current_value else "تم إلغاء"
             await callback.answer(f"🔗 {status} إزالة الروابط")
@@ -5240,7 +4192,7 @@ test@email.com
         """Toggle mention removal in text cleaner"""
         try:
             import json
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -5251,10 +4203,7 @@ test@email.com
             current_value = cleaner_settings.get("remove_mentions", False)
             cleaner_settings["remove_mentions"] = not current_value
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             # Force reload forwarding engine
             if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -5272,7 +4221,7 @@ test@email.com
         """Toggle email removal in text cleaner"""
         try:
             import json
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -5283,10 +4232,7 @@ test@email.com
             current_value = cleaner_settings.get("remove_emails", False)
             cleaner_settings["remove_emails"] = not current_value
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             # Force reload forwarding engine
             if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -5304,7 +4250,7 @@ test@email.com
         """Toggle hashtag removal in text cleaner"""
         try:
             import json
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -5315,10 +4261,7 @@ test@email.com
             current_value = cleaner_settings.get("remove_hashtags", False)
             cleaner_settings["remove_hashtags"] = not current_value
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             status = "تم تفعيل" if not current_value else "تم إلغاء"
             await callback.answer(f"#️⃣ {status} إزالة الهاشتاغات")
@@ -5332,7 +4275,7 @@ test@email.com
         """Toggle number removal in text cleaner"""
         try:
             import json
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -5343,10 +4286,7 @@ test@email.com
             current_value = cleaner_settings.get("remove_numbers", False)
             cleaner_settings["remove_numbers"] = not current_value
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             status = "تم تفعيل" if not current_value else "تم إلغاء"
             await callback.answer(f"🔢 {status} إزالة الأرقام")
@@ -5360,7 +4300,7 @@ test@email.com
         """Toggle punctuation removal in text cleaner"""
         try:
             import json
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -5371,10 +4311,7 @@ test@email.com
             current_value = cleaner_settings.get("remove_punctuation", False)
             cleaner_settings["remove_punctuation"] = not current_value
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             status = "تم تفعيل" if not current_value else "تم إلغاء"
             await callback.answer(f"📝 {status} إزالة علامات الترقيم")
@@ -5418,10 +4355,7 @@ test@email.com
                 "remove_extra_lines": True
             }
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(default_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(default_settings))
             
             await callback.answer("🔄 تم إعادة تعيين جميع إعدادات التنظيف")
             await self._handle_text_cleaner_setting(callback, task_id, state)
@@ -5430,11 +4364,12 @@ test@email.com
             logger.error(f"Error resetting text cleaner: {e}")
             await callback.answer("❌ خطأ في إعادة التعيين", show_alert=True)
 
+    @callback_route("inline_button_edit_{task_id:int}_{button_id:int}")
     async def _edit_inline_button(self, callback: CallbackQuery, task_id: int, button_id: int, state: FSMContext):
         """Edit existing inline button"""
         try:
             import json
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             buttons_config = []
             
             # Get buttons from inline_button_settings only
@@ -5462,11 +4397,12 @@ test@email.com
             logger.error(f"Error editing inline button: {e}")
             await callback.answer("❌ خطأ في تعديل الزر", show_alert=True)
 
+    @callback_route("inline_button_delete_{task_id:int}_{button_id:int}")
     async def _delete_inline_button(self, callback: CallbackQuery, task_id: int, button_id: int, state: FSMContext):
         """Delete inline button"""
         try:
             import json
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             
             # Get current button settings from the correct column
             button_settings = {}
@@ -5517,10 +4453,7 @@ test@email.com
                 button_settings["enabled"] = False
             
             # Update database with the correct column
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET inline_button_settings = $1 WHERE task_id = $2",
-                json.dumps(button_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, inline_button_settings=json.dumps(button_settings))
             
             await callback.answer(f"✅ تم حذف الزر: {button_text}")
             
@@ -5531,13 +4464,14 @@ test@email.com
             logger.error(f"Error deleting inline button: {e}")
             await callback.answer("❌ خطأ في حذف الزر", show_alert=True)
 
+    @callback_route("inline_buttons_preview_{task_id:int}")
     async def _preview_inline_buttons(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Preview inline buttons"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             import json
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             buttons_config = []
             
             if settings:
@@ -5617,6 +4551,7 @@ _الأزرار أدناه:_"""
             logger.error(f"Error previewing inline buttons: {e}")
             await callback.answer("❌ خطأ في معاينة الأزرار", show_alert=True)
 
+    @callback_route("inline_buttons_clear_{task_id:int}")
     async def _clear_inline_buttons(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Clear all inline buttons"""
         try:
@@ -5630,10 +4565,7 @@ _الأزرار أدناه:_"""
             }
             
             # Clear buttons from the correct column
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET inline_button_settings = $1 WHERE task_id = $2",
-                json.dumps(empty_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, inline_button_settings=json.dumps(empty_settings))
             
 
             
@@ -5646,13 +4578,14 @@ _الأزرار أدناه:_"""
             logger.error(f"Error clearing inline buttons: {e}")
             await callback.answer("❌ خطأ في مسح الأزرار", show_alert=True)
 
+    @callback_route("header_edit_{task_id:int}")
     async def _edit_header(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Edit header text"""
         try:
             await state.set_state("edit_header")
             await state.update_data(task_id=task_id)
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_prefix = settings.get("prefix_text", "") if settings else ""
             
             text = f"""✏️ **تعديل Header - المهمة {task_id}**
@@ -5674,13 +4607,14 @@ _الأزرار أدناه:_"""
             logger.error(f"Error editing header: {e}")
             await callback.answer("❌ خطأ في تعديل Header", show_alert=True)
 
+    @callback_route("footer_edit_{task_id:int}")
     async def _edit_footer(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Edit footer text"""
         try:
             await state.set_state("edit_footer")
             await state.update_data(task_id=task_id)
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_suffix = settings.get("suffix_text", "") if settings else ""
             
             text = f"""✏️ **تعديل Footer - المهمة {task_id}**
@@ -5702,13 +4636,11 @@ _الأزرار أدناه:_"""
             logger.error(f"Error editing footer: {e}")
             await callback.answer("❌ خطأ في تعديل Footer", show_alert=True)
 
+    @callback_route("header_delete_{task_id:int}")
     async def _delete_header(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Delete header completely"""
         try:
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET prefix_text = '' WHERE task_id = $1",
-                task_id
-            )
+            await self.repositories.settings.update(task_id, prefix_text="")
             await callback.answer("✅ تم حذف Header")
             
             # Refresh the page
@@ -5718,13 +4650,11 @@ _الأزرار أدناه:_"""
             logger.error(f"Error deleting header: {e}")
             await callback.answer("❌ خطأ في حذف Header", show_alert=True)
 
+    @callback_route("footer_delete_{task_id:int}")
     async def _delete_footer(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Delete footer completely"""
         try:
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET suffix_text = '' WHERE task_id = $1",
-                task_id
-            )
+            await self.repositories.settings.update(task_id, suffix_text="")
             await callback.answer("✅ تم حذف Footer")
             
             # Refresh the page
@@ -5734,13 +4664,14 @@ _الأزرار أدناه:_"""
             logger.error(f"Error deleting footer: {e}")
             await callback.answer("❌ خطأ في حذف Footer", show_alert=True)
 
+    @callback_route("header_footer_view_{task_id:int}")
     async def _view_header_footer(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """View current header and footer"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             logger.info(f"Viewing header/footer for task {task_id}")
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             logger.info(f"Retrieved settings: {settings}")
             
             current_prefix = settings.get("prefix_text", "") if settings else ""
@@ -5792,6 +4723,7 @@ _الأزرار أدناه:_"""
             logger.error(f"Error viewing header/footer: {e}")
             await callback.answer("❌ خطأ في عرض Header/Footer", show_alert=True)
 
+    @callback_route("header_footer_examples_{task_id:int}")
     async def _show_header_footer_examples(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Show header/footer examples"""
         try:
@@ -5930,10 +4862,7 @@ Footer: `───────────────
                 return
             
             # Get current settings
-            settings = await self.database.execute_query(
-                "SELECT keyword_filters FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "keyword_filters")
             
             current_data = {"mode": keyword_type, "whitelist": [], "blacklist": []}
             if settings and settings[0]["keyword_filters"]:
@@ -5953,9 +4882,10 @@ Footer: `───────────────
             current_data["mode"] = keyword_type
             
             # Update database
-            await self.database.execute_command(
-                "UPDATE task_settings SET keyword_filters = $1, keyword_filter_mode = $2 WHERE task_id = $3",
-                json.dumps(current_data), keyword_type, task_id
+            await self.repositories.settings.update(
+                task_id,
+                keyword_filters=json.dumps(current_data),
+                keyword_filter_mode=keyword_type
             )
             
             await message.answer(f"✅ تم إضافة {len(keywords)} كلمة إلى القائمة {'السوداء' if keyword_type == 'blacklist' else 'البيضاء'}")
@@ -6004,6 +4934,7 @@ Footer: `───────────────
                 DO UPDATE SET delay_min = $2, delay_max = $3, updated_at = NOW()""",
                 task_id, delay_min, delay_max
             )
+            await self.repositories.settings.invalidate(task_id)
             
             await message.answer(f"✅ تم تعيين التأخير المخصص: {delay_min}-{delay_max} ثانية")
             await state.clear()
@@ -6035,10 +4966,7 @@ Footer: `───────────────
                 return
             
             # Get current replacement settings
-            settings = await self.database.execute_query(
-                "SELECT replace_text FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "replace_text")
             
             current_rules = []
             if settings and settings[0]["replace_text"]:
@@ -6052,10 +4980,7 @@ Footer: `───────────────
             current_rules.append(new_rule)
             
             # Update database
-            await self.database.execute_command(
-                "UPDATE task_settings SET replace_text = $1 WHERE task_id = $2",
-                json.dumps(current_rules), task_id
-            )
+            await self.repositories.settings.update(task_id, replace_text=json.dumps(current_rules))
             
             await message.answer(f"✅ تم إضافة قاعدة الاستبدال:\n'{old_text}' ← '{new_text}'")
             await state.clear()
@@ -6091,10 +5016,7 @@ Footer: `───────────────
                 return
             
             # Get current format settings
-            settings = await self.database.execute_query(
-                "SELECT format_settings FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "format_settings")
             
             current_settings = {"apply_link": False, "link_text": "", "link_url": ""}
             if settings and settings[0]["format_settings"]:
@@ -6109,10 +5031,7 @@ Footer: `───────────────
             current_settings["link_url"] = link_url
             
             # Update database
-            await self.database.execute_command(
-                "UPDATE task_settings SET format_settings = $1 WHERE task_id = $2",
-                json.dumps(current_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, format_settings=json.dumps(current_settings))
             
             await message.answer(f"✅ تم تعيين الرابط المخصص:\n[{link_text}]({link_url})")
             await state.clear()
@@ -6128,6 +5047,7 @@ Footer: `───────────────
             logger.error(f"Error handling hyperlink input: {e}")
             await message.answer("❌ خطأ في تعيين الرابط المخصص")
     
+    @callback_route("replace_add_{task_id:int}")
     async def _handle_replacement_add(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle adding replacement rule"""
         try:
@@ -6156,13 +5076,11 @@ Footer: `───────────────
             logger.error(f"Error in replacement add: {e}")
             await callback.answer("❌ خطأ في إضافة قاعدة الاستبدال", show_alert=True)
     
+    @callback_route("replace_list_{task_id:int}")
     async def _handle_replacement_list(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle listing replacement rules"""
         try:
-            settings = await self.database.execute_query(
-                "SELECT replace_text FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "replace_text")
             
             rules_text = f"📋 **قواعد الاستبدال - المهمة {task_id}**\n\n"
             
@@ -6198,13 +5116,11 @@ Footer: `───────────────
             logger.error(f"Error listing replacement rules: {e}")
             await callback.answer("❌ خطأ في عرض قواعد الاستبدال", show_alert=True)
     
+    @callback_route("replace_clear_{task_id:int}")
     async def _handle_replacement_clear(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle clearing all replacement rules"""
         try:
-            await self.database.execute_command(
-                "UPDATE task_settings SET replace_text = $1 WHERE task_id = $2",
-                json.dumps([]), task_id
-            )
+            await self.repositories.settings.update(task_id, replace_text=json.dumps([]))
             
             await callback.answer("🗑️ تم مسح جميع قواعد الاستبدال", show_alert=True)
             
@@ -6215,6 +5131,7 @@ Footer: `───────────────
             logger.error(f"Error clearing replacement rules: {e}")
             await callback.answer("❌ خطأ في مسح قواعد الاستبدال", show_alert=True)
     
+    @callback_route("format_hyperlink_{task_id:int}")
     async def _handle_format_hyperlink(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle hyperlink formatting"""
         try:
@@ -6247,10 +5164,7 @@ Footer: `───────────────
         """Handle adding prefix"""
         try:
             # Update prefix in database
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET prefix_text = $1 WHERE task_id = $2",
-                prefix, task_id
-            )
+            await self.repositories.settings.update(task_id, prefix_text=prefix)
             
             await message.answer(f"✅ تم تحديث Header بنجاح:\n`{prefix}`\n\nيمكنك العودة لإعدادات Header/Footer من قائمة المهام.")
             await state.clear()
@@ -6264,10 +5178,7 @@ Footer: `───────────────
         """Handle adding suffix"""
         try:
             # Update suffix in database
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET suffix_text = $1 WHERE task_id = $2",
-                suffix, task_id
-            )
+            await self.repositories.settings.update(task_id, suffix_text=suffix)
             
             await message.answer(f"✅ تم تحديث Footer بنجاح:\n`{suffix}`\n\nيمكنك العودة لإعدادات Header/Footer من قائمة المهام.")
             await state.clear()
@@ -6290,7 +5201,7 @@ Footer: `───────────────
                 return
             
             # Get current cleaner settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -6308,10 +5219,7 @@ Footer: `───────────────
             cleaner_settings["target_words"] = existing_words
             
             # Save to database
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             # Send confirmation
             words_list = "\n".join([f"• {word}" for word in words])
@@ -6335,10 +5243,7 @@ Footer: `───────────────
         """Send a new prefix/suffix interface message to force UI refresh"""
         try:
             # Get fresh data from database
-            result = await self.bot_controller.database.execute_query(
-                "SELECT prefix_text, suffix_text, header_enabled, footer_enabled FROM task_settings WHERE task_id = $1",
-                task_id
-            )
+            result = await self.repositories.settings.select(task_id, "prefix_text", "suffix_text", "header_enabled", "footer_enabled")
             
             if not result:
                 return
@@ -6421,17 +5326,14 @@ Footer: `───────────────
             filter_name = parts[3]
             
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get(filter_name, False) if settings else False
             
             # Toggle the value
             new_value = not current_value
             
             # Update in database
-            await self.database.execute_command(
-                f"UPDATE task_settings SET {filter_name} = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, **{filter_name: new_value})
             
             # Show confirmation
             filter_names = {
@@ -6448,7 +5350,7 @@ Footer: `───────────────
             await callback.answer(f"{filter_display}: {status}")
             
             # Refresh the filters keyboard
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             keyboard = await self.keyboards.get_filter_settings_keyboard(task_id, settings)
             
             await callback.message.edit_reply_markup(reply_markup=keyboard)
@@ -6457,11 +5359,12 @@ Footer: `───────────────
             logger.error(f"Error toggling filter: {e}")
             await callback.answer("❌ خطأ في تبديل الفلتر", show_alert=True)
 
+    @callback_route("filter_languages_{task_id:int}")
     async def _handle_language_filter_management(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle language filter management interface"""
         try:
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             
             text = f"""🌐 **إعدادات فلتر اللغة - المهمة {task_id}**
 
@@ -6486,23 +5389,20 @@ Footer: `───────────────
             task_id = int(callback.data.split("_")[-1])
             
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_mode = settings.get("language_filter_mode", "blacklist")
             
             # Toggle mode
             new_mode = "whitelist" if current_mode == "blacklist" else "blacklist"
             
             # Update in database
-            await self.database.execute_command(
-                "UPDATE task_settings SET language_filter_mode = $1 WHERE task_id = $2",
-                new_mode, task_id
-            )
+            await self.repositories.settings.update(task_id, language_filter_mode=new_mode)
             
             mode_text = "القائمة البيضاء" if new_mode == "whitelist" else "القائمة السوداء"
             await callback.answer(f"تم تغيير الوضع إلى: {mode_text}")
             
             # Refresh keyboard
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             keyboard = await self.keyboards.get_language_filter_keyboard(task_id, settings)
             
             await callback.message.edit_reply_markup(reply_markup=keyboard)
@@ -6519,7 +5419,7 @@ Footer: `───────────────
             lang_code = parts[3]
             
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             allowed_languages = settings.get("allowed_languages", []) or []
             
             # Toggle language
@@ -6532,15 +5432,12 @@ Footer: `───────────────
             
             # Update database
             import json
-            await self.database.execute_command(
-                "UPDATE task_settings SET allowed_languages = $1 WHERE task_id = $2",
-                json.dumps(allowed_languages), task_id
-            )
+            await self.repositories.settings.update(task_id, allowed_languages=json.dumps(allowed_languages))
             
             await callback.answer(f"اللغة {status}")
             
             # Refresh keyboard
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             keyboard = await self.keyboards.get_language_filter_keyboard(task_id, settings)
             
             await callback.message.edit_reply_markup(reply_markup=keyboard)
@@ -6555,15 +5452,12 @@ Footer: `───────────────
             task_id = int(callback.data.split("_")[-1])
             
             # Clear all languages
-            await self.database.execute_command(
-                "UPDATE task_settings SET allowed_languages = $1 WHERE task_id = $2",
-                "[]", task_id
-            )
+            await self.repositories.settings.update(task_id, allowed_languages="[]")
             
             await callback.answer("🗑️ تم مسح جميع اللغات")
             
             # Refresh keyboard
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             keyboard = await self.keyboards.get_language_filter_keyboard(task_id, settings)
             
             await callback.message.edit_reply_markup(reply_markup=keyboard)
@@ -6572,13 +5466,14 @@ Footer: `───────────────
             logger.error(f"Error clearing languages: {e}")
             await callback.answer("❌ خطأ في مسح اللغات", show_alert=True)
 
+    @callback_route("filter_forwarded_{task_id:int}")
     async def _handle_forwarded_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle forwarded messages filter"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             filter_enabled = settings.get("filter_forwarded", False) if settings else False
             
             status_icon = "✅" if filter_enabled else "❌"
@@ -6612,13 +5507,14 @@ Footer: `───────────────
             logger.error(f"Error in forwarded filter: {e}")
             await callback.answer("❌ خطأ في تحميل فلتر الرسائل المعاد توجيهها", show_alert=True)
 
+    @callback_route("filter_links_{task_id:int}", "filter_links_types_{task_id:int}")
     async def _handle_links_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle links filter"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             filter_enabled = settings.get("filter_links", False) if settings else False
             
             status_icon = "✅" if filter_enabled else "❌"
@@ -6659,13 +5555,14 @@ Footer: `───────────────
             logger.error(f"Error in links filter: {e}")
             await callback.answer("❌ خطأ في تحميل فلتر الروابط", show_alert=True)
 
+    @callback_route("filter_buttons_{task_id:int}", "filter_buttons_types_{task_id:int}")
     async def _handle_buttons_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle inline buttons filter"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
             # Get current filter state from task settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             filter_enabled = False
             if settings:
                 filter_enabled = bool(settings.get('filter_inline_buttons', False))
@@ -6709,13 +5606,14 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in buttons filter: {e}")
             await callback.answer("❌ خطأ في تحميل فلتر الأزرار", show_alert=True)
 
+    @callback_route("filter_duplicates_{task_id:int}")
     async def _handle_duplicates_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle duplicates filter"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             filter_enabled = settings.get("filter_duplicates", False) if settings else False
             
             status_icon = "✅" if filter_enabled else "❌"
@@ -6758,13 +5656,14 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in duplicates filter: {e}")
             await callback.answer("❌ خطأ في تحميل فلتر التكرار", show_alert=True)
 
+    @callback_route("filter_language_{task_id:int}")
     async def _handle_language_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle language filter"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             filter_enabled = settings.get("filter_language", False) if settings else False
             filter_mode = settings.get("language_filter_mode", "blacklist") if settings else "blacklist"
             
@@ -6828,15 +5727,12 @@ _تحديث: {timestamp}_"""
         """Toggle language filter on/off"""
         try:
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("filter_language", False) if settings else False
             new_value = not current_value
             
             # Update database
-            await self.database.execute_command(
-                "UPDATE task_settings SET filter_language = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, filter_language=new_value)
             
             # Show notification
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
@@ -6849,19 +5745,17 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling language filter: {e}")
             await callback.answer("❌ خطأ في تبديل الفلتر", show_alert=True)
 
+    @callback_route("toggle_lang_mode_{task_id:int}")
     async def _toggle_lang_mode(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle language filter mode between whitelist and blacklist"""
         try:
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_mode = settings.get("language_filter_mode", "blacklist") if settings else "blacklist"
             new_mode = "whitelist" if current_mode == "blacklist" else "blacklist"
             
             # Update database
-            await self.database.execute_command(
-                "UPDATE task_settings SET language_filter_mode = $1 WHERE task_id = $2",
-                new_mode, task_id
-            )
+            await self.repositories.settings.update(task_id, language_filter_mode=new_mode)
             
             # Show notification
             mode_text = "القائمة البيضاء" if new_mode == "whitelist" else "القائمة السوداء"
@@ -6880,7 +5774,7 @@ _تحديث: {timestamp}_"""
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             allowed_languages = settings.get("allowed_languages", []) if settings else []
             
             import json
@@ -6957,11 +5851,12 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in language selection: {e}")
             await callback.answer("❌ خطأ في تحميل اللغات", show_alert=True)
 
+    @callback_route("toggle_lang_{task_id:int}_{lang_code}")
     async def _toggle_language_selection(self, callback: CallbackQuery, task_id: int, lang_code: str, state: FSMContext):
         """Toggle individual language selection"""
         try:
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             allowed_languages = settings.get("allowed_languages", []) if settings else []
             
             import json
@@ -6982,10 +5877,7 @@ _تحديث: {timestamp}_"""
                 action = "إضافة"
             
             # Update database
-            await self.database.execute_command(
-                "UPDATE task_settings SET allowed_languages = $1 WHERE task_id = $2",
-                json.dumps(allowed_languages), task_id
-            )
+            await self.repositories.settings.update(task_id, allowed_languages=json.dumps(allowed_languages))
             
             # Show notification
             languages_map = {
@@ -7004,16 +5896,14 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling language {lang_code}: {e}")
             await callback.answer("❌ خطأ في تبديل اللغة", show_alert=True)
 
+    @callback_route("select_all_langs_{task_id:int}")
     async def _select_all_languages(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Select all languages"""
         try:
             all_languages = ["ar", "en", "fr", "de", "es", "ru", "tr", "fa", "ur", "hi", "zh", "ja", "ko", "it", "pt"]
             
             import json
-            await self.database.execute_command(
-                "UPDATE task_settings SET allowed_languages = $1 WHERE task_id = $2",
-                json.dumps(all_languages), task_id
-            )
+            await self.repositories.settings.update(task_id, allowed_languages=json.dumps(all_languages))
             
             await callback.answer("✅ تم تحديد جميع اللغات")
             await self._handle_filter_languages(callback, task_id, state)
@@ -7022,13 +5912,11 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error selecting all languages: {e}")
             await callback.answer("❌ خطأ في تحديد اللغات", show_alert=True)
 
+    @callback_route("deselect_all_langs_{task_id:int}")
     async def _deselect_all_languages(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Deselect all languages"""
         try:
-            await self.database.execute_command(
-                "UPDATE task_settings SET allowed_languages = $1 WHERE task_id = $2",
-                "[]", task_id
-            )
+            await self.repositories.settings.update(task_id, allowed_languages="[]")
             
             await callback.answer("❌ تم إلغاء تحديد جميع اللغات")
             await self._handle_filter_languages(callback, task_id, state)
@@ -7037,19 +5925,17 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error deselecting all languages: {e}")
             await callback.answer("❌ خطأ في إلغاء تحديد اللغات", show_alert=True)
 
+    @callback_route("toggle_filter_forwarded_{task_id:int}")
     async def _toggle_forwarded_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle forwarded messages filter"""
         try:
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("filter_forwarded", False) if settings else False
             new_value = not current_value
             
             # Update database
-            await self.database.execute_command(
-                "UPDATE task_settings SET filter_forwarded = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, filter_forwarded=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"🔄 فلتر الرسائل المعاد توجيهها: {status_text}")
@@ -7088,19 +5974,17 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling forwarded filter: {e}")
             await callback.answer("❌ خطأ في تبديل الفلتر", show_alert=True)
 
+    @callback_route("toggle_filter_links_{task_id:int}")
     async def _toggle_links_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle links filter"""
         try:
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("filter_links", False) if settings else False
             new_value = not current_value
             
             # Update database
-            await self.database.execute_command(
-                "UPDATE task_settings SET filter_links = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, filter_links=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"🔗 فلتر الروابط: {status_text}")
@@ -7146,25 +6030,23 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling links filter: {e}")
             await callback.answer("❌ خطأ في تبديل الفلتر", show_alert=True)
 
+    @callback_route("toggle_filter_buttons_{task_id:int}")
     async def _toggle_buttons_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle inline buttons filter"""
         try:
             # Get current state from database
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = False
             if settings:
                 current_value = bool(settings.get('filter_inline_buttons', False))
             
             new_value = not current_value
             
-            # Update database using execute_query for better control
-            update_result = await self.database.execute_query(
-                "UPDATE task_settings SET filter_inline_buttons = $1 WHERE task_id = $2 RETURNING filter_inline_buttons",
-                new_value, task_id
-            )
+            # Update database
+            await self.repositories.settings.update(task_id, filter_inline_buttons=new_value)
             
             # Verify update
-            verify_settings = await self.database.get_task_settings(task_id)
+            verify_settings = await self.repositories.settings.get(task_id)
             verify_value = verify_settings.get('filter_inline_buttons', False) if verify_settings else False
             
             # Use the verified value for UI instead of new_value
@@ -7216,19 +6098,17 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling buttons filter: {e}")
             await callback.answer("❌ خطأ في تبديل الفلتر", show_alert=True)
 
+    @callback_route("toggle_filter_duplicates_{task_id:int}")
     async def _toggle_duplicates_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle duplicates filter"""
         try:
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("filter_duplicates", False) if settings else False
             new_value = not current_value
             
             # Update database
-            await self.database.execute_command(
-                "UPDATE task_settings SET filter_duplicates = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, filter_duplicates=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"🔁 فلتر التكرار: {status_text}")
@@ -7276,25 +6156,23 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling duplicates filter: {e}")
             await callback.answer("❌ خطأ في تبديل الفلتر", show_alert=True)
 
+    @callback_route("toggle_filter_language_{task_id:int}")
     async def _toggle_language_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle language filter"""
         try:
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("filter_language", False) if settings else False
             new_value = not current_value
             
             # Update database
-            await self.database.execute_command(
-                "UPDATE task_settings SET filter_language = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, filter_language=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"🌍 فلتر اللغة: {status_text}")
             
             # Get updated settings for display
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             filter_mode = settings.get("language_filter_mode", "blacklist") if settings else "blacklist"
             
             import json
@@ -7356,6 +6234,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling language filter: {e}")
             await callback.answer("❌ خطأ في تبديل الفلتر", show_alert=True)
 
+    @callback_route("clear_duplicates_{task_id:int}")
     async def _clear_duplicates(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Clear duplicates tracking data"""
         try:
@@ -7364,6 +6243,7 @@ _تحديث: {timestamp}_"""
                 "DELETE FROM forwarding_logs WHERE task_id = $1 AND status = 'duplicate'",
                 task_id
             )
+            await self.database.delete_log_rollups(task_id, "duplicate")
             
             await callback.answer("🗑️ تم مسح سجل التكرار بنجاح")
             
@@ -7384,33 +6264,31 @@ _تحديث: {timestamp}_"""
                 return
             
             # Reset all filter settings to defaults
-            await self.database.execute_command(
-                """UPDATE task_settings SET 
-                   keyword_filters = NULL,
-                   length_filter_settings = NULL,
-                   hashtag_settings = NULL,
-                   text_cleaner_settings = NULL,
-                   filter_inline_buttons = false,
-                   filter_duplicates = false,
-                   filter_language = false,
-                   language_filter_mode = 'blacklist',
-                   allowed_languages = NULL,
-                   filter_forwarded = false,
-                   filter_links = false,
-                   allow_text = true,
-                   allow_photos = true,
-                   allow_videos = true,
-                   allow_documents = true,
-                   allow_audio = true,
-                   allow_voice = true,
-                   allow_video_notes = true,
-                   allow_stickers = true,
-                   allow_animations = true,
-                   allow_contacts = true,
-                   allow_locations = true,
-                   allow_polls = true
-                   WHERE task_id = $1""",
-                task_id
+            await self.repositories.settings.update(
+                task_id,
+                keyword_filters=None,
+                length_filter_settings=None,
+                hashtag_settings=None,
+                text_cleaner_settings=None,
+                filter_inline_buttons=False,
+                filter_duplicates=False,
+                filter_language=False,
+                language_filter_mode="blacklist",
+                allowed_languages=None,
+                filter_forwarded=False,
+                filter_links=False,
+                allow_text=True,
+                allow_photos=True,
+                allow_videos=True,
+                allow_documents=True,
+                allow_audio=True,
+                allow_voice=True,
+                allow_video_notes=True,
+                allow_stickers=True,
+                allow_animations=True,
+                allow_contacts=True,
+                allow_locations=True,
+                allow_polls=True
             )
             
             # Clear duplicate tracking data
@@ -7428,6 +6306,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error clearing all filters: {e}")
             await callback.answer("❌ خطأ في مسح الفلاتر", show_alert=True)
 
+    @callback_route("setting_forward_*")
     async def _handle_forward_setting(self, callback: CallbackQuery, state: FSMContext):
         """Handle advanced forward settings"""
         try:
@@ -7437,7 +6316,7 @@ _تحديث: {timestamp}_"""
             task_id = int(callback.data.split("_")[-1])
             
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             
             # Create advanced forward settings interface
             text = f"""📡 **إعدادات التوجيه المتقدمة - المهمة {task_id}**
@@ -7466,15 +6345,12 @@ _تحديث: {timestamp}_"""
         """Toggle manual approval mode"""
         try:
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("manual_mode", False) if settings else False
             new_value = not current_value
             
             # Update database
-            await self.database.execute_command(
-                "UPDATE task_settings SET manual_mode = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, manual_mode=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"🔧 الوضع اليدوي: {status_text}")
@@ -7489,14 +6365,11 @@ _تحديث: {timestamp}_"""
     async def _toggle_link_preview(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle link preview"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("link_preview", True) if settings else True
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET link_preview = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, link_preview=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"🔗 معاينة الروابط: {status_text}")
@@ -7510,14 +6383,11 @@ _تحديث: {timestamp}_"""
     async def _toggle_pin_messages(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle pin messages"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("pin_messages", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET pin_messages = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, pin_messages=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"📌 تثبيت الرسائل: {status_text}")
@@ -7531,14 +6401,11 @@ _تحديث: {timestamp}_"""
     async def _toggle_silent_mode(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle silent mode"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("silent_mode", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET silent_mode = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, silent_mode=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"🔕 الوضع الصامت: {status_text}")
@@ -7552,14 +6419,11 @@ _تحديث: {timestamp}_"""
     async def _toggle_sync_edits(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle sync edits"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("sync_edits", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET sync_edits = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, sync_edits=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"🔄 مزامنة التعديل: {status_text}")
@@ -7573,14 +6437,11 @@ _تحديث: {timestamp}_"""
     async def _toggle_sync_deletes(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle sync deletes"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("sync_deletes", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET sync_deletes = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, sync_deletes=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"🗑️ مزامنة الحذف: {status_text}")
@@ -7594,14 +6455,11 @@ _تحديث: {timestamp}_"""
     async def _toggle_preserve_replies(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle preserve reply structure"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("preserve_replies", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET preserve_replies = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, preserve_replies=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"💬 المحافظة على الردود: {status_text}")
@@ -7612,6 +6470,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling preserve replies: {e}")
             await callback.answer("❌ خطأ في تبديل حفظ الردود", show_alert=True)
 
+    @callback_route("approve_message_{approval_id:int}")
     async def _approve_manual_message(self, callback: CallbackQuery, approval_id: int, state: FSMContext):
         """Approve and forward manual message"""
         try:
@@ -7669,6 +6528,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error approving manual message: {e}")
             await callback.answer("❌ خطأ في معالجة الموافقة", show_alert=True)
 
+    @callback_route("reject_message_{approval_id:int}")
     async def _reject_manual_message(self, callback: CallbackQuery, approval_id: int, state: FSMContext):
         """Reject manual message"""
         try:
@@ -7692,6 +6552,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error rejecting manual message: {e}")
             await callback.answer("❌ خطأ في رفض الرسالة", show_alert=True)
 
+    @callback_route("edit_before_forward_{approval_id:int}")
     async def _edit_before_forward(self, callback: CallbackQuery, approval_id: int, state: FSMContext):
         """Start editing message before forwarding"""
         try:
@@ -7724,7 +6585,7 @@ _تحديث: {timestamp}_"""
         """Handle advanced settings menu"""
         try:
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             
             text = f"""⚡ **الإعدادات المتقدمة - المهمة {task_id}**
 
@@ -7743,11 +6604,12 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in advanced setting: {e}")
             await callback.answer("❌ خطأ في تحميل الإعدادات المتقدمة", show_alert=True)
 
+    @callback_route("setting_translation_{task_id:int}")
     async def _handle_translation_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle translation settings"""
         try:
             logger.info(f"Loading translation settings for task {task_id}")
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             auto_translate = settings.get("auto_translate", False) if settings else False
             target_language = settings.get("target_language", "ar") if settings else "ar"
             
@@ -7785,11 +6647,12 @@ _تحديث: {timestamp}_"""
             logger.error(f"Full traceback: {traceback.format_exc()}")
             await callback.answer("❌ خطأ في تحميل إعدادات الترجمة", show_alert=True)
 
+    @callback_route("setting_working_hours_{task_id:int}")
     async def _handle_working_hours_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle working hours settings"""
         try:
             logger.info(f"Loading working hours settings for task {task_id}")
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             working_hours_enabled = settings.get("working_hours_enabled", False) if settings else False
             start_hour = settings.get("start_hour", 0) if settings else 0
             end_hour = settings.get("end_hour", 23) if settings else 23
@@ -7825,11 +6688,12 @@ _تحديث: {timestamp}_"""
             logger.error(f"Full traceback: {traceback.format_exc()}")
             await callback.answer("❌ خطأ في تحميل إعدادات ساعات العمل", show_alert=True)
 
+    @callback_route("setting_recurring_post_{task_id:int}")
     async def _handle_recurring_post_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle recurring post settings"""
         try:
             logger.info(f"Loading recurring post settings for task {task_id}")
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             recurring_post_enabled = settings.get("recurring_post_enabled", False) if settings else False
             recurring_interval_hours = settings.get("recurring_interval_hours", 24) if settings else 24
             
@@ -7861,6 +6725,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Full traceback: {traceback.format_exc()}")
             await callback.answer("❌ خطأ في تحميل إعدادات المنشور المتكرر", show_alert=True)
     
+    @callback_route("advanced_quick_settings_{task_id:int}")
     async def _handle_advanced_quick_settings(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle advanced quick settings"""
         try:
@@ -7885,24 +6750,23 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in advanced quick settings: {e}")
             await callback.answer("❌ خطأ في تحميل الإعدادات السريعة", show_alert=True)
 
+    @callback_route("advanced_statistics_{task_id:int}")
     async def _handle_advanced_statistics(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle advanced statistics display"""
         try:
             # Get comprehensive statistics
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             
-            # Calculate usage statistics
-            total_translated = await self.database.execute_query(
-                "SELECT COUNT(*) as count FROM forwarding_logs WHERE task_id = $1 AND status = 'success' AND message_text LIKE '%[مترجم]%'",
-                task_id
-            )
-            translation_count = total_translated[0]['count'] if total_translated else 0
+            # Calculate usage statistics from the log rollups (last 30 days)
+            translation_count = 0
+            if settings and settings.get('auto_translate'):
+                # Logs do not record translation; while it is on, every successful forward was translated
+                translation_count = (await self.database.get_log_counts("30d", task_id=task_id)).get('success', 0)
             
-            working_hours_stats = await self.database.execute_query(
-                "SELECT COUNT(*) as count FROM forwarding_logs WHERE task_id = $1 AND created_at::time BETWEEN '09:00' AND '17:00'",
-                task_id
+            hourly = await self.database.get_log_hourly_distribution(30, task_id=task_id)
+            working_hours_count = sum(
+                int(row['message_count'] or 0) for row in hourly if 9 <= int(row['hour']) < 17
             )
-            working_hours_count = working_hours_stats[0]['count'] if working_hours_stats else 0
             
             recurring_posts = await self.database.execute_query(
                 "SELECT COUNT(*) as count FROM recurring_posts WHERE task_id = $1",
@@ -7952,23 +6816,23 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in advanced statistics: {e}")
             await callback.answer("❌ خطأ في تحميل الإحصائيات", show_alert=True)
 
+    @callback_route("reset_advanced_{task_id:int}")
     async def _handle_reset_advanced_settings(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle reset advanced settings"""
         try:
             # Reset all advanced settings to default
-            await self.database.execute_command("""
-                UPDATE task_settings SET 
-                    auto_translate = false,
-                    target_language = 'ar',
-                    working_hours_enabled = false,
-                    start_hour = 0,
-                    end_hour = 23,
-                    timezone = 'UTC',
-                    recurring_post_enabled = false,
-                    recurring_post_content = null,
-                    recurring_interval_hours = 24
-                WHERE task_id = $1
-            """, task_id)
+            await self.repositories.settings.update(
+                task_id,
+                auto_translate=False,
+                target_language="ar",
+                working_hours_enabled=False,
+                start_hour=0,
+                end_hour=23,
+                timezone="UTC",
+                recurring_post_enabled=False,
+                recurring_post_content=None,
+                recurring_interval_hours=24
+            )
             
             # Delete recurring posts
             await self.database.execute_command(
@@ -7983,10 +6847,11 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error resetting advanced settings: {e}")
             await callback.answer("❌ خطأ في إعادة التعيين", show_alert=True)
 
+    @callback_route("save_advanced_{task_id:int}")
     async def _handle_save_advanced_settings(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle save advanced settings"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             
             # Create backup of current settings
             backup_data = {
@@ -8009,11 +6874,12 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error saving advanced settings: {e}")
             await callback.answer("❌ خطأ في الحفظ", show_alert=True)
 
+    @callback_route("setting_advanced_{task_id:int}")
     async def _handle_advanced_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle advanced settings main menu"""
         try:
             logger.info(f"Starting advanced settings handler for task {task_id}")
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             logger.info(f"Retrieved settings: {settings}")
             
             text = f"""⚡ **الميزات المتقدمة - المهمة {task_id}**
@@ -8034,6 +6900,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in advanced settings: {e}")
             await callback.answer("❌ خطأ في عرض الإعدادات", show_alert=True)
 
+    @callback_route("advanced_translation_{task_id:int}")
     async def _handle_advanced_translation(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle advanced translation settings"""
         try:
@@ -8046,9 +6913,7 @@ _تحديث: {timestamp}_"""
                 return
 
             # Get current translation settings
-            settings = await self.database.execute_query(
-                "SELECT * FROM task_settings WHERE task_id = $1", task_id
-            )
+            settings = await self.repositories.settings.select(task_id)
             current_settings = settings[0] if settings else {}
             
             # Get translation keyboard
@@ -8079,7 +6944,7 @@ _تحديث: {timestamp}_"""
     async def _toggle_cleaner_buttons(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle cleaner buttons setting"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8090,10 +6955,7 @@ _تحديث: {timestamp}_"""
             current_value = cleaner_settings.get("remove_buttons", False)
             cleaner_settings["remove_buttons"] = not current_value
 
-            await self.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
 
             await callback.answer(f"🔘 إزالة الأزرار: {'مفعل' if not current_value else 'معطل'}")
             await self._handle_text_cleaner_setting(callback, task_id, state)
@@ -8102,10 +6964,11 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling cleaner buttons: {e}")
             await callback.answer("❌ خطأ في تغيير إعداد الأزرار", show_alert=True)
 
+    @callback_route("cleaner_links_toggle_{task_id:int}", "links_remove_{task_id:int}")
     async def _toggle_cleaner_links(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle cleaner links setting"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8116,10 +6979,7 @@ _تحديث: {timestamp}_"""
             current_value = cleaner_settings.get("remove_links", False)
             cleaner_settings["remove_links"] = not current_value
 
-            await self.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
 
             await callback.answer(f"🔗 إزالة الروابط: {'مفعل' if not current_value else 'معطل'}")
             await self._handle_text_cleaner_setting(callback, task_id, state)
@@ -8128,10 +6988,11 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling cleaner links: {e}")
             await callback.answer("❌ خطأ في تغيير إعداد الروابط", show_alert=True)
 
+    @callback_route("cleaner_mentions_toggle_{task_id:int}")
     async def _toggle_cleaner_mentions(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle cleaner mentions setting"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8142,10 +7003,7 @@ _تحديث: {timestamp}_"""
             current_value = cleaner_settings.get("remove_mentions", False)
             cleaner_settings["remove_mentions"] = not current_value
 
-            await self.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
 
             await callback.answer(f"@ إزالة المنشن: {'مفعل' if not current_value else 'معطل'}")
             await self._handle_text_cleaner_setting(callback, task_id, state)
@@ -8154,10 +7012,11 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling cleaner mentions: {e}")
             await callback.answer("❌ خطأ في تغيير إعداد المنشن", show_alert=True)
 
+    @callback_route("cleaner_hashtags_toggle_{task_id:int}")
     async def _toggle_cleaner_hashtags(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle cleaner hashtags setting"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8168,10 +7027,7 @@ _تحديث: {timestamp}_"""
             current_value = cleaner_settings.get("remove_hashtags", False)
             cleaner_settings["remove_hashtags"] = not current_value
 
-            await self.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
 
             await callback.answer(f"#️⃣ إزالة الهاشتاغ: {'مفعل' if not current_value else 'معطل'}")
             await self._handle_text_cleaner_setting(callback, task_id, state)
@@ -8180,10 +7036,11 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling cleaner hashtags: {e}")
             await callback.answer("❌ خطأ في تغيير إعداد الهاشتاغ", show_alert=True)
 
+    @callback_route("cleaner_emojis_toggle_{task_id:int}")
     async def _toggle_cleaner_emojis(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle cleaner emojis setting"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8194,10 +7051,7 @@ _تحديث: {timestamp}_"""
             current_value = cleaner_settings.get("remove_emojis", False)
             cleaner_settings["remove_emojis"] = not current_value
 
-            await self.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
 
             await callback.answer(f"😀 إزالة الإيموجي: {'مفعل' if not current_value else 'معطل'}")
             await self._handle_text_cleaner_setting(callback, task_id, state)
@@ -8206,10 +7060,11 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling cleaner emojis: {e}")
             await callback.answer("❌ خطأ في تغيير إعداد الإيموجي", show_alert=True)
 
+    @callback_route("cleaner_numbers_toggle_{task_id:int}")
     async def _toggle_cleaner_numbers(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle cleaner numbers setting"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8220,10 +7075,7 @@ _تحديث: {timestamp}_"""
             current_value = cleaner_settings.get("remove_numbers", False)
             cleaner_settings["remove_numbers"] = not current_value
 
-            await self.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
 
             await callback.answer(f"🔢 إزالة الأرقام: {'مفعل' if not current_value else 'معطل'}")
             await self._handle_text_cleaner_setting(callback, task_id, state)
@@ -8232,10 +7084,11 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling cleaner numbers: {e}")
             await callback.answer("❌ خطأ في تغيير إعداد الأرقام", show_alert=True)
 
+    @callback_route("cleaner_punctuation_toggle_{task_id:int}")
     async def _toggle_cleaner_punctuation(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle cleaner punctuation setting"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8246,10 +7099,7 @@ _تحديث: {timestamp}_"""
             current_value = cleaner_settings.get("remove_punctuation", False)
             cleaner_settings["remove_punctuation"] = not current_value
 
-            await self.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
 
             await callback.answer(f"⚫ إزالة علامات الترقيم: {'مفعل' if not current_value else 'معطل'}")
             await self._handle_text_cleaner_setting(callback, task_id, state)
@@ -8277,10 +7127,7 @@ _تحديث: {timestamp}_"""
     async def _reset_text_cleaner(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Reset text cleaner settings"""
         try:
-            await self.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = NULL WHERE task_id = $1",
-                task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=None)
 
             await callback.answer("🔄 تم إعادة تعيين جميع إعدادات تنظيف النص")
             await self._handle_text_cleaner_setting(callback, task_id, state)
@@ -8301,9 +7148,7 @@ _تحديث: {timestamp}_"""
                 return
 
             # Get current working hours settings
-            settings = await self.database.execute_query(
-                "SELECT * FROM task_settings WHERE task_id = $1", task_id
-            )
+            settings = await self.repositories.settings.select(task_id)
             current_settings = settings[0] if settings else {}
             
             # Get working hours keyboard
@@ -8341,9 +7186,7 @@ _تحديث: {timestamp}_"""
                 return
 
             # Get current recurring post settings
-            settings = await self.database.execute_query(
-                "SELECT * FROM task_settings WHERE task_id = $1", task_id
-            )
+            settings = await self.repositories.settings.select(task_id)
             current_settings = settings[0] if settings else {}
             
             # Get recurring post keyboard
@@ -8370,10 +7213,11 @@ _تحديث: {timestamp}_"""
 
 
 
+    @callback_route("advanced_working_hours_{task_id:int}")
     async def _handle_advanced_working_hours(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle advanced working hours settings"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             
             working_hours_enabled = settings.get("working_hours_enabled", False) if settings else False
             start_hour = settings.get("start_hour", 9) if settings else 9
@@ -8399,10 +7243,11 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in advanced working hours: {e}")
             await callback.answer("❌ خطأ في تحميل إعدادات ساعات العمل", show_alert=True)
 
+    @callback_route("advanced_recurring_{task_id:int}")
     async def _handle_advanced_recurring(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle advanced recurring post settings"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             
             recurring_enabled = settings.get("recurring_post_enabled", False) if settings else False
             interval_hours = settings.get("recurring_interval_hours", 24) if settings else 24
@@ -8429,13 +7274,14 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in advanced recurring: {e}")
             await callback.answer("❌ خطأ في تحميل إعدادات المنشور المتكرر", show_alert=True)
 
+    @callback_route("advanced_day_filter_{task_id:int}", "filter_days_{task_id:int}")
     async def _handle_day_filter_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle day filter settings"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             import json
             
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             day_filter_enabled = settings.get("day_filter_enabled", False) if settings else False
             day_filter_settings = {}
             
@@ -8517,13 +7363,14 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in day filter setting: {e}")
             await callback.answer("❌ خطأ في تحميل إعدادات فلتر الأيام", show_alert=True)
 
+    @callback_route("advanced_sending_limit_{task_id:int}")
     async def _handle_sending_limit_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle sending limit settings"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             import json
             
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             sending_limit_enabled = settings.get("sending_limit_enabled", False) if settings else False
             sending_limit_settings = {}
             
@@ -8536,6 +7383,14 @@ _تحديث: {timestamp}_"""
             per_minute = sending_limit_settings.get("per_minute", 10)
             per_hour = sending_limit_settings.get("per_hour", 100)
             per_day = sending_limit_settings.get("per_day", 1000)
+            spool_enabled = sending_limit_settings.get("overflow_mode", "spool") == "spool"
+            keep_latest = sending_limit_settings.get("spool_keep_latest", 100)
+            max_age_minutes = sending_limit_settings.get("spool_max_age", 3600) // 60
+            
+            if spool_enabled:
+                overflow_note = f"📥 **الرسائل الزائدة:** تُحفظ وتُرسل عند توفر الحصة (آخر {keep_latest} رسالة، لمدة {max_age_minutes} دقيقة)"
+            else:
+                overflow_note = "⚠️ **ملاحظة:** الرسائل الزائدة سيتم تجاهلها تلقائياً."
             
             text = f"""🚦 **حدود الإرسال - المهمة {task_id}**
 
@@ -8548,7 +7403,7 @@ _تحديث: {timestamp}_"""
 
 يساعد هذا الفلتر في التحكم بسرعة الإرسال ومنع الحظر من تيليجرام.
 
-⚠️ **ملاحظة:** الرسائل الزائدة سيتم تجاهلها تلقائياً."""
+{overflow_note}"""
 
             keyboard = [
                 [
@@ -8560,6 +7415,12 @@ _تحديث: {timestamp}_"""
                 [
                     InlineKeyboardButton(text="✏️ تعديل الحدود", callback_data=f"sending_limit_edit_{task_id}")
                 ],
+                [
+                    InlineKeyboardButton(
+                        text=f"📥 {'حفظ' if spool_enabled else 'تجاهل'} الرسائل الزائدة",
+                        callback_data=f"sending_limit_overflow_{task_id}"
+                    )
+                ],
                 [
                     InlineKeyboardButton(text="📊 إحصائيات الإرسال", callback_data=f"sending_stats_{task_id}"),
                     InlineKeyboardButton(text="🔄 إعادة تعيين", callback_data=f"sending_reset_{task_id}")
@@ -8576,11 +7437,12 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error showing sending limits: {e}")
             await callback.answer("❌ خطأ في عرض حدود الإرسال", show_alert=True)
 
+    @callback_route("cleaner_empty_lines_toggle_{task_id:int}")
     async def _toggle_cleaner_empty_lines(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle empty lines removal in text cleaner"""
         try:
             import json
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8591,10 +7453,7 @@ _تحديث: {timestamp}_"""
             current_value = cleaner_settings.get("remove_empty_lines", False)
             cleaner_settings["remove_empty_lines"] = not current_value
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             status = "تم تفعيل" if not current_value else "تم إلغاء"
             await callback.answer(f"🗑️ {status} إزالة الأسطر الفارغة")
@@ -8608,7 +7467,7 @@ _تحديث: {timestamp}_"""
         """Toggle caption removal in text cleaner"""
         try:
             import json
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8619,10 +7478,7 @@ _تحديث: {timestamp}_"""
             current_value = cleaner_settings.get("remove_captions", False)
             cleaner_settings["remove_captions"] = not current_value
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             status = "تم تفعيل" if not current_value else "تم إلغاء"
             await callback.answer(f"📷 {status} إزالة الكابشن")
@@ -8633,7 +7489,7 @@ _تحديث: {timestamp}_"""
             await callback.answer("❌ خطأ في تبديل إزالة الكابشن", show_alert=True)
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8646,10 +7502,7 @@ _تحديث: {timestamp}_"""
             cleaner_settings["remove_empty_lines"] = not current_value
             
             # Save settings
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             status = "تم تفعيل" if not current_value else "تم إلغاء"
             await callback.answer(f"✅ {status} إزالة الأسطر الفارغة")
@@ -8661,13 +7514,14 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling empty lines cleaner: {e}")
             await callback.answer("❌ خطأ في تبديل إزالة الأسطر الفارغة", show_alert=True)
 
+    @callback_route("cleaner_extra_lines_toggle_{task_id:int}")
     async def _toggle_cleaner_extra_lines(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle extra lines removal in text cleaner"""
         try:
             import json
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8680,10 +7534,7 @@ _تحديث: {timestamp}_"""
             cleaner_settings["remove_extra_lines"] = not current_value
             
             # Save settings
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             status = "تم تفعيل" if not current_value else "تم إلغاء"
             await callback.answer(f"✅ {status} تنظيف الأسطر الإضافية")
@@ -8695,13 +7546,14 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling extra lines cleaner: {e}")
             await callback.answer("❌ خطأ في تبديل تنظيف الأسطر الإضافية", show_alert=True)
 
+    @callback_route("cleaner_whitespace_toggle_{task_id:int}")
     async def _toggle_cleaner_whitespace(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle whitespace normalization in text cleaner"""
         try:
             import json
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8714,10 +7566,7 @@ _تحديث: {timestamp}_"""
             cleaner_settings["normalize_whitespace"] = not current_value
             
             # Save settings
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             status = "تم تفعيل" if not current_value else "تم إلغاء"
             await callback.answer(f"✅ {status} تطبيع المساحات")
@@ -8729,13 +7578,14 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling whitespace normalization: {e}")
             await callback.answer("❌ خطأ في تبديل تطبيع المساحات", show_alert=True)
 
+    @callback_route("cleaner_duplicate_lines_toggle_{task_id:int}")
     async def _toggle_cleaner_duplicate_lines(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle duplicate lines removal in text cleaner"""
         try:
             import json
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8748,10 +7598,7 @@ _تحديث: {timestamp}_"""
             cleaner_settings["remove_duplicate_lines"] = not current_value
             
             # Save settings
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             status = "تم تفعيل" if not current_value else "تم إلغاء"
             await callback.answer(f"✅ {status} إزالة الأسطر المكررة")
@@ -8763,13 +7610,14 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling duplicate lines removal: {e}")
             await callback.answer("❌ خطأ في تبديل إزالة الأسطر المكررة", show_alert=True)
 
+    @callback_route("cleaner_emails_toggle_{task_id:int}")
     async def _toggle_cleaner_emails(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle email removal in text cleaner"""
         try:
             import json
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -8782,10 +7630,7 @@ _تحديث: {timestamp}_"""
             cleaner_settings["remove_emails"] = not current_value
             
             # Save settings
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             status = "تم تفعيل" if not current_value else "تم إلغاء"
             await callback.answer(f"✅ {status} إزالة الإيميلات")
@@ -8797,17 +7642,15 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling email removal: {e}")
             await callback.answer("❌ خطأ في تبديل إزالة الإيميلات", show_alert=True)
 
+    @callback_route("cleaner_caption_{task_id:int}")
     async def _toggle_caption_removal(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle caption removal setting"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("remove_caption", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET remove_caption = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, remove_caption=new_value)
             
             status = "تم تفعيل" if new_value else "تم تعطيل"
             await callback.answer(f"✅ {status} إزالة التعليقات")
@@ -8819,17 +7662,15 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling caption removal: {e}")
             await callback.answer("❌ خطأ في تبديل إزالة التعليقات", show_alert=True)
 
+    @callback_route("day_filter_toggle_{task_id:int}")
     async def _toggle_day_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle day filter on/off"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("day_filter_enabled", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET day_filter_enabled = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, day_filter_enabled=new_value)
             
             status = "تم تفعيل" if new_value else "تم تعطيل"
             await callback.answer(f"✅ {status} فلتر الأيام")
@@ -8841,12 +7682,13 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling day filter: {e}")
             await callback.answer("❌ خطأ في تبديل فلتر الأيام", show_alert=True)
 
+    @callback_route("day_toggle_{day}_{task_id:int}")
     async def _toggle_day_selection(self, callback: CallbackQuery, task_id: int, day: str, state: FSMContext):
         """Toggle specific day selection"""
         try:
             import json
             
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             day_filter_settings = {}
             
             if settings and settings.get("day_filter_settings"):
@@ -8859,10 +7701,7 @@ _تحديث: {timestamp}_"""
             current_value = day_filter_settings.get(day, True)
             day_filter_settings[day] = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET day_filter_settings = $1 WHERE task_id = $2",
-                json.dumps(day_filter_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, day_filter_settings=json.dumps(day_filter_settings))
             
             day_names = {
                 "monday": "الاثنين", "tuesday": "الثلاثاء", "wednesday": "الأربعاء",
@@ -8879,17 +7718,15 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling day selection: {e}")
             await callback.answer("❌ خطأ في تبديل اليوم", show_alert=True)
 
+    @callback_route("sending_limit_toggle_{task_id:int}")
     async def _toggle_sending_limit(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle sending limit on/off"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("sending_limit_enabled", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET sending_limit_enabled = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, sending_limit_enabled=new_value)
             
             status = "تم تفعيل" if new_value else "تم تعطيل"
             await callback.answer(f"✅ {status} حدود الإرسال")
@@ -8901,6 +7738,120 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling sending limit: {e}")
             await callback.answer("❌ خطأ في تبديل حدود الإرسال", show_alert=True)
 
+    @callback_route("sending_limit_overflow_{task_id:int}")
+    async def _toggle_sending_limit_overflow(self, callback: CallbackQuery, task_id: int, state: FSMContext):
+        """Toggle between spooling and dropping messages over the sending limits"""
+        try:
+            import json
+            settings = await self.repositories.settings.get(task_id)
+            sending_limit_settings = {}
+            if settings and settings.get("sending_limit_settings"):
+                try:
+                    sending_limit_settings = json.loads(settings["sending_limit_settings"]) if isinstance(settings["sending_limit_settings"], str) else settings["sending_limit_settings"]
+                except (ValueError, TypeError):
+                    sending_limit_settings = {}
+            
+            spool_enabled = sending_limit_settings.get("overflow_mode", "spool") == "spool"
+            sending_limit_settings["overflow_mode"] = "drop" if spool_enabled else "spool"
+            
+            await self.repositories.settings.update(task_id, sending_limit_settings=json.dumps(sending_limit_settings))
+            
+            status = "سيتم تجاهل الرسائل الزائدة" if spool_enabled else "سيتم حفظ الرسائل الزائدة وإرسالها لاحقاً"
+            await callback.answer(f"✅ {status}")
+            await self._handle_sending_limit_setting(callback, task_id, state)
+            
+        except Exception as e:
+            logger.error(f"Error toggling sending limit overflow mode: {e}")
+            await callback.answer("❌ خطأ في تغيير وضع الرسائل الزائدة", show_alert=True)
+
+    # Choices cycled by the digest buttons
+    DIGEST_OPTIONS = {
+        "digest_interval_minutes": (15, 30, 60, 120, 360, 720, 1440),
+        "digest_max_posts": (5, 10, 20, 50, 100)
+    }
+
+    @callback_route("advanced_digest_{task_id:int}")
+    async def _handle_digest_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
+        """Show digest mode settings"""
+        try:
+            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+            
+            settings = await self.repositories.settings.get(task_id)
+            digest_enabled = settings.get("digest_enabled", False) if settings else False
+            interval = (settings.get("digest_interval_minutes") if settings else None) or 60
+            max_posts = (settings.get("digest_max_posts") if settings else None) or 20
+            
+            text = f"""📰 **وضع الملخص - المهمة {task_id}**
+
+⚙️ **الحالة:** {'مفعل' if digest_enabled else 'معطل'}
+
+**الإعدادات الحالية:**
+• ⏰ **كل:** {interval} دقيقة
+• 📨 **أو عند:** {max_posts} منشور
+
+تُجمع المنشورات وتُرسل كرسالة ملخص واحدة مع الرأس والتذييل والتنسيق الخاص بالمهمة.
+يمكن استخدام {{count}} في الرأس أو التذييل لعدد المنشورات."""
+
+            keyboard = [
+                [
+                    InlineKeyboardButton(
+                        text=f"📰 {'🔴 تعطيل' if digest_enabled else '🟢 تفعيل'} وضع الملخص",
+                        callback_data=f"digest_toggle_{task_id}"
+                    )
+                ],
+                [
+                    InlineKeyboardButton(text=f"⏰ كل {interval} دقيقة", callback_data=f"digest_interval_{task_id}"),
+                    InlineKeyboardButton(text=f"📨 كل {max_posts} منشور", callback_data=f"digest_posts_{task_id}")
+                ],
+                [
+                    InlineKeyboardButton(text="🔙 العودة للميزات المتقدمة", callback_data=f"setting_advanced_{task_id}")
+                ]
+            ]
+            
+            await callback.message.edit_text(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
+            await callback.answer()
+            
+        except Exception as e:
+            logger.error(f"Error showing digest settings: {e}")
+            await callback.answer("❌ خطأ في عرض إعدادات الملخص", show_alert=True)
+
+    @callback_route("digest_toggle_{task_id:int}")
+    async def _toggle_digest(self, callback: CallbackQuery, task_id: int, state: FSMContext):
+        """Toggle digest mode"""
+        try:
+            settings = await self.repositories.settings.get(task_id)
+            digest_enabled = settings.get("digest_enabled", False) if settings else False
+            
+            await self.repositories.settings.update(task_id, digest_enabled=not digest_enabled)
+            
+            status = "معطل" if digest_enabled else "مفعل"
+            await callback.answer(f"✅ وضع الملخص {status}")
+            await self._handle_digest_setting(callback, task_id, state)
+            
+        except Exception as e:
+            logger.error(f"Error toggling digest mode: {e}")
+            await callback.answer("❌ خطأ في تبديل وضع الملخص", show_alert=True)
+
+    @callback_route("digest_interval_{task_id:int}", column="digest_interval_minutes")
+    @callback_route("digest_posts_{task_id:int}", column="digest_max_posts")
+    async def _cycle_digest_option(self, callback: CallbackQuery, task_id: int, column: str, state: FSMContext):
+        """Move a digest setting to its next preset value"""
+        try:
+            choices = self.DIGEST_OPTIONS[column]
+            settings = await self.repositories.settings.get(task_id)
+            current = settings.get(column) if settings else None
+            next_value = next((choice for choice in choices if current is not None and choice > current), choices[0])
+            
+            await self.repositories.settings.update(task_id, **{column: next_value})
+            
+            await callback.answer("✅ تم التحديث")
+            await self._handle_digest_setting(callback, task_id, state)
+            
+        except Exception as e:
+            logger.error(f"Error updating {column}: {e}")
+            await callback.answer("❌ خطأ في تحديث إعدادات الملخص", show_alert=True)
+
+    @callback_route("sending_limit_edit_{task_id:int}")
     async def _edit_sending_limit(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Edit sending limit values"""
         try:
@@ -8931,6 +7882,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error editing sending limit: {e}")
             await callback.answer("❌ خطأ في تعديل حدود الإرسال")
 
+    @callback_route("day_enable_all_{task_id:int}")
     async def _enable_all_days(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Enable all days in day filter"""
         try:
@@ -8946,10 +7898,7 @@ _تحديث: {timestamp}_"""
                 "sunday": True
             }
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET day_filter_settings = $1 WHERE task_id = $2",
-                json.dumps(all_days_enabled), task_id
-            )
+            await self.repositories.settings.update(task_id, day_filter_settings=json.dumps(all_days_enabled))
             
             await callback.answer("✅ تم تفعيل جميع الأيام")
             await self._handle_day_filter_setting(callback, task_id, state)
@@ -8958,6 +7907,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error enabling all days: {e}")
             await callback.answer("❌ خطأ في تفعيل جميع الأيام", show_alert=True)
 
+    @callback_route("day_disable_all_{task_id:int}")
     async def _disable_all_days(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Disable all days in day filter"""
         try:
@@ -8973,10 +7923,7 @@ _تحديث: {timestamp}_"""
                 "sunday": False
             }
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET day_filter_settings = $1 WHERE task_id = $2",
-                json.dumps(all_days_disabled), task_id
-            )
+            await self.repositories.settings.update(task_id, day_filter_settings=json.dumps(all_days_disabled))
             
             await callback.answer("✅ تم تعطيل جميع الأيام")
             await self._handle_day_filter_setting(callback, task_id, state)
@@ -8985,6 +7932,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error disabling all days: {e}")
             await callback.answer("❌ خطأ في تعطيل جميع الأيام", show_alert=True)
 
+    @callback_route("set_source_lang_*")
     async def _handle_set_source_language(self, callback: CallbackQuery, state: FSMContext):
         """Handle source language setting"""
         try:
@@ -8993,10 +7941,7 @@ _تحديث: {timestamp}_"""
                 lang_code = data_parts[3] if data_parts[3] != "auto" else "auto"
                 task_id = int(data_parts[-1])
                 
-                await self.database.execute_command(
-                    "UPDATE task_settings SET source_language = $1 WHERE task_id = $2",
-                    lang_code, task_id
-                )
+                await self.repositories.settings.update(task_id, source_language=lang_code)
                 
                 await callback.answer(f"✅ تم تعيين اللغة المصدر: {lang_code}")
                 await self._handle_advanced_translation(callback, task_id, state)
@@ -9005,6 +7950,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error setting source language: {e}")
             await callback.answer("❌ خطأ في تعيين اللغة المصدر", show_alert=True)
 
+    @callback_route("set_target_lang_*")
     async def _handle_set_target_language(self, callback: CallbackQuery, state: FSMContext):
         """Handle target language setting"""
         try:
@@ -9013,10 +7959,7 @@ _تحديث: {timestamp}_"""
                 lang_code = data_parts[3]
                 task_id = int(data_parts[-1])
                 
-                await self.database.execute_command(
-                    "UPDATE task_settings SET target_language = $1 WHERE task_id = $2",
-                    lang_code, task_id
-                )
+                await self.repositories.settings.update(task_id, target_language=lang_code)
                 
                 await callback.answer(f"✅ تم تعيين اللغة الهدف: {lang_code}")
                 await self._handle_advanced_translation(callback, task_id, state)
@@ -9025,17 +7968,15 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error setting target language: {e}")
             await callback.answer("❌ خطأ في تعيين اللغة الهدف", show_alert=True)
 
+    @callback_route("toggle_auto_translate_{task_id:int}")
     async def _handle_toggle_auto_translate(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle auto translate toggle"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("auto_translate", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET auto_translate = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, auto_translate=new_value)
             
             status = "تم تفعيل" if new_value else "تم إلغاء"
             await callback.answer(f"✅ {status} الترجمة التلقائية")
@@ -9045,17 +7986,15 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling auto translate: {e}")
             await callback.answer("❌ خطأ في تغيير إعداد الترجمة", show_alert=True)
 
+    @callback_route("toggle_working_hours_{task_id:int}")
     async def _handle_toggle_working_hours(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle working hours toggle"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("working_hours_enabled", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET working_hours_enabled = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, working_hours_enabled=new_value)
             
             status = "تم تفعيل" if new_value else "تم إلغاء"
             await callback.answer(f"✅ {status} ساعات العمل")
@@ -9065,77 +8004,33 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling working hours: {e}")
             await callback.answer("❌ خطأ في تغيير إعداد ساعات العمل", show_alert=True)
 
-    async def _handle_set_start_hour(self, callback: CallbackQuery, state: FSMContext):
-        """Handle start hour setting"""
-        try:
-            data_parts = callback.data.split("_")
-            if len(data_parts) >= 4:
-                hour = int(data_parts[3])
-                task_id = int(data_parts[-1])
-                
-                await self.database.execute_command(
-                    "UPDATE task_settings SET start_hour = $1 WHERE task_id = $2",
-                    hour, task_id
-                )
-                
-                await callback.answer(f"✅ تم تعيين وقت البداية: {hour:02d}:00")
-                await self._handle_advanced_working_hours(callback, task_id, state)
-                
-        except Exception as e:
-            logger.error(f"Error setting start hour: {e}")
-            await callback.answer("❌ خطأ في تعيين وقت البداية", show_alert=True)
-
-    async def _handle_set_end_hour(self, callback: CallbackQuery, state: FSMContext):
-        """Handle end hour setting"""
-        try:
-            data_parts = callback.data.split("_")
-            if len(data_parts) >= 4:
-                hour = int(data_parts[3])
-                task_id = int(data_parts[-1])
-                
-                await self.database.execute_command(
-                    "UPDATE task_settings SET end_hour = $1 WHERE task_id = $2",
-                    hour, task_id
-                )
-                
-                await callback.answer(f"✅ تم تعيين وقت التوقف: {hour:02d}:00")
-                await self._handle_advanced_working_hours(callback, task_id, state)
-                
-        except Exception as e:
-            logger.error(f"Error setting end hour: {e}")
-            await callback.answer("❌ خطأ في تعيين وقت التوقف", show_alert=True)
-
-    async def _handle_set_timezone(self, callback: CallbackQuery, state: FSMContext):
-        """Handle timezone setting"""
+    @callback_route("toggle_window_defer_{task_id:int}")
+    async def _handle_toggle_window_defer(self, callback: CallbackQuery, task_id: int, state: FSMContext):
+        """Toggle between dropping and deferring messages outside working hours/days"""
         try:
-            data_parts = callback.data.split("_")
-            if len(data_parts) >= 4:
-                timezone = data_parts[2].replace("_", "/")  # Convert back from Asia_Riyadh to Asia/Riyadh
-                task_id = int(data_parts[-1])
-                
-                await self.database.execute_command(
-                    "UPDATE task_settings SET timezone = $1 WHERE task_id = $2",
-                    timezone, task_id
-                )
-                
-                await callback.answer(f"✅ تم تعيين المنطقة الزمنية: {timezone}")
-                await self._handle_advanced_working_hours(callback, task_id, state)
-                
+            settings = await self.repositories.settings.get(task_id)
+            current_mode = settings.get("out_of_window_mode", "drop") if settings else "drop"
+            new_mode = "drop" if current_mode == "defer" else "defer"
+            
+            await self.repositories.settings.update(task_id, out_of_window_mode=new_mode)
+            
+            status = "سيتم تأجيل الرسائل حتى بداية الوقت المسموح" if new_mode == "defer" else "سيتم تجاهل الرسائل خارج الأوقات"
+            await callback.answer(f"✅ {status}")
+            await self._handle_advanced_working_hours(callback, task_id, state)
+            
         except Exception as e:
-            logger.error(f"Error setting timezone: {e}")
-            await callback.answer("❌ خطأ في تعيين المنطقة الزمنية", show_alert=True)
+            logger.error(f"Error toggling out-of-window mode: {e}")
+            await callback.answer("❌ خطأ في تغيير وضع الرسائل خارج الأوقات", show_alert=True)
 
+    @callback_route("toggle_recurring_post_{task_id:int}", "toggle_recurring_{task_id:int}")
     async def _handle_toggle_recurring_post(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle recurring post toggle"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("recurring_post_enabled", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET recurring_post_enabled = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, recurring_post_enabled=new_value)
             
             status = "تم تفعيل" if new_value else "تم إلغاء"
             await callback.answer(f"✅ {status} المنشور المتكرر")
@@ -9153,10 +8048,7 @@ _تحديث: {timestamp}_"""
                 interval = int(data_parts[2])
                 task_id = int(data_parts[-1])
                 
-                await self.database.execute_command(
-                    "UPDATE task_settings SET recurring_interval_hours = $1 WHERE task_id = $2",
-                    interval, task_id
-                )
+                await self.repositories.settings.update(task_id, recurring_interval_hours=interval)
                 
                 await callback.answer(f"✅ تم تعيين الفترة الزمنية: كل {interval} ساعة")
                 await self._handle_advanced_recurring(callback, task_id, state)
@@ -9165,17 +8057,15 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error setting interval: {e}")
             await callback.answer("❌ خطأ في تعيين الفترة الزمنية", show_alert=True)
 
+    @callback_route("toggle_translation_{task_id:int}")
     async def _toggle_translation(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle auto translation"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("auto_translate", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET auto_translate = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, auto_translate=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"🌐 الترجمة التلقائية: {status_text}")
@@ -9186,40 +8076,14 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling translation: {e}")
             await callback.answer("❌ خطأ في تبديل الترجمة", show_alert=True)
 
-    async def _set_target_language(self, callback: CallbackQuery, task_id: int, language: str, state: FSMContext):
-        """Set target language for translation"""
-        try:
-            await self.database.execute_command(
-                "UPDATE task_settings SET target_language = $1 WHERE task_id = $2",
-                language, task_id
-            )
-            
-            lang_names = {
-                "ar": "العربية", "en": "الإنجليزية", "fr": "الفرنسية",
-                "de": "الألمانية", "es": "الإسبانية", "ru": "الروسية",
-                "tr": "التركية", "fa": "الفارسية"
-            }
-            
-            lang_name = lang_names.get(language, language)
-            await callback.answer(f"🌐 تم تعيين اللغة المستهدفة: {lang_name}")
-            
-            await self._handle_translation_setting(callback, task_id, state)
-            
-        except Exception as e:
-            logger.error(f"Error setting target language: {e}")
-            await callback.answer("❌ خطأ في تعيين اللغة", show_alert=True)
-
     async def _toggle_working_hours(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle working hours"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("working_hours_enabled", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET working_hours_enabled = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, working_hours_enabled=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"⏰ ساعات العمل: {status_text}")
@@ -9230,82 +8094,14 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling working hours: {e}")
             await callback.answer("❌ خطأ في تبديل ساعات العمل", show_alert=True)
 
-    async def _set_start_hour(self, callback: CallbackQuery, task_id: int, state: FSMContext):
-        """Set start hour for working hours"""
-        try:
-            await state.set_state("setting_start_hour")
-            await state.update_data(task_id=task_id)
-            
-            await callback.message.edit_text(
-                "🕐 **تعديل ساعة البداية**\n\n"
-                "أدخل ساعة البداية (0-23):\n"
-                "مثال: 8 للساعة 08:00",
-                parse_mode="Markdown"
-            )
-            
-        except Exception as e:
-            logger.error(f"Error setting start hour: {e}")
-            await callback.answer("❌ خطأ في تعديل ساعة البداية", show_alert=True)
-
-    async def _set_end_hour(self, callback: CallbackQuery, task_id: int, state: FSMContext):
-        """Set end hour for working hours"""
-        try:
-            await state.set_state("setting_end_hour")
-            await state.update_data(task_id=task_id)
-            
-            await callback.message.edit_text(
-                "🕑 **تعديل ساعة النهاية**\n\n"
-                "أدخل ساعة النهاية (0-23):\n"
-                "مثال: 18 للساعة 18:00",
-                parse_mode="Markdown"
-            )
-            
-        except Exception as e:
-            logger.error(f"Error setting end hour: {e}")
-            await callback.answer("❌ خطأ في تعديل ساعة النهاية", show_alert=True)
-
-    async def _set_timezone(self, callback: CallbackQuery, task_id: int, state: FSMContext):
-        """Set timezone for working hours"""
-        try:
-            await state.set_state("setting_timezone")
-            await state.update_data(task_id=task_id)
-            
-            timezones_text = """🌍 **المناطق الزمنية المتاحة:**
-
-**الشرق الأوسط:**
-• Asia/Riyadh (السعودية)
-• Asia/Dubai (الإمارات)
-• Asia/Kuwait (الكويت)
-• Asia/Baghdad (العراق)
-
-**أوروبا:**
-• Europe/London (لندن)
-• Europe/Paris (باريس)
-• Europe/Berlin (برلين)
-
-**أمريكا:**
-• America/New_York (نيويورك)
-• America/Los_Angeles (لوس أنجلوس)
-
-أدخل المنطقة الزمنية أو اكتب UTC للتوقيت العالمي:"""
-            
-            await callback.message.edit_text(timezones_text, parse_mode="Markdown")
-            
-        except Exception as e:
-            logger.error(f"Error setting timezone: {e}")
-            await callback.answer("❌ خطأ في تعديل المنطقة الزمنية", show_alert=True)
-
     async def _toggle_recurring_post(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle recurring post"""
         try:
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("recurring_post_enabled", False) if settings else False
             new_value = not current_value
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET recurring_post_enabled = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, recurring_post_enabled=new_value)
             
             status_text = "تم التفعيل" if new_value else "تم الإلغاء"
             await callback.answer(f"🔄 المنشور المتكرر: {status_text}")
@@ -9316,25 +8112,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling recurring post: {e}")
             await callback.answer("❌ خطأ في تبديل المنشور المتكرر", show_alert=True)
 
-    async def _set_recurring_interval(self, callback: CallbackQuery, task_id: int, state: FSMContext):
-        """Set recurring post interval"""
-        try:
-            await state.set_state("setting_recurring_interval")
-            await state.update_data(task_id=task_id)
-            
-            await callback.message.edit_text(
-                "⏱️ **تعديل فترة النشر المتكرر**\n\n"
-                "أدخل عدد الساعات بين كل منشور:\n"
-                "• الحد الأدنى: 1 ساعة\n"
-                "• الحد الأقصى: 168 ساعة (أسبوع)\n\n"
-                "مثال: 24 لنشر يومي",
-                parse_mode="Markdown"
-            )
-            
-        except Exception as e:
-            logger.error(f"Error setting recurring interval: {e}")
-            await callback.answer("❌ خطأ في تعديل فترة النشر", show_alert=True)
-
+    @callback_route("edit_recurring_content_{task_id:int}")
     async def _edit_recurring_content(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Edit recurring post content"""
         try:
@@ -9355,6 +8133,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error editing recurring content: {e}")
             await callback.answer("❌ خطأ في تعديل المحتوى", show_alert=True)
 
+    @callback_route("view_recurring_content_{task_id:int}")
     async def _view_recurring_content(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """View current recurring post content"""
         try:
@@ -9408,7 +8187,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current replacement rules
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             replace_rules = {}
             if settings and settings.get("replace_text"):
                 try:
@@ -9487,7 +8266,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current formatting settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             format_settings = {}
             if settings and settings.get("format_settings"):
                 try:
@@ -9601,13 +8380,14 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in formatting setting: {e}")
             await callback.answer("❌ خطأ في تحميل إعدادات التنسيق", show_alert=True)
 
+    @callback_route("content_links_{task_id:int}")
     async def _handle_links_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle links setting configuration"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
             # Get current link settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             remove_links = settings.get("remove_links", False) if settings else False
             
             links_text = f"""🔗 **إعدادات الروابط - المهمة {task_id}**
@@ -9656,6 +8436,7 @@ _تحديث: {timestamp}_"""
 
 # Old text cleaner function removed - using comprehensive version at line 4270
 
+    @callback_route("prefix_*", "suffix_*", "replace_*", "format_*", "links_*")
     async def _handle_content_actions(self, callback: CallbackQuery, state: FSMContext):
         """Handle content modification actions"""
         try:
@@ -9705,10 +8486,7 @@ _تحديث: {timestamp}_"""
                 await state.update_data(action="edit_prefix", task_id=task_id)
                 
             elif data.startswith("prefix_clear_"):
-                await self.bot_controller.database.execute_command(
-                    "UPDATE task_settings SET custom_caption = NULL WHERE task_id = $1",
-                    task_id
-                )
+                await self.repositories.settings.update(task_id, custom_caption=None)
                 await callback.answer("📋 تم مسح البادئة")
                 await self._handle_prefix_suffix_setting(callback, task_id, state)
                 
@@ -9768,10 +8546,7 @@ _تحديث: {timestamp}_"""
                 await state.update_data(action="add_suffix", task_id=task_id)
                 
             elif data.startswith("suffix_clear_"):
-                await self.bot_controller.database.execute_command(
-                    "UPDATE task_settings SET suffix_text = NULL WHERE task_id = $1",
-                    task_id
-                )
+                await self.repositories.settings.update(task_id, suffix_text=None)
                 await callback.answer("📋 تم مسح اللاحقة")
                 await self._handle_prefix_suffix_setting(callback, task_id, state)
                 
@@ -9804,7 +8579,7 @@ _تحديث: {timestamp}_"""
                 
             elif data.startswith("replace_list_"):
                 import json
-                settings = await self.bot_controller.database.get_task_settings(task_id)
+                settings = await self.repositories.settings.get(task_id)
                 replace_rules = {}
                 if settings and settings.get("replace_text"):
                     try:
@@ -9826,10 +8601,7 @@ _تحديث: {timestamp}_"""
                 await callback.message.edit_text(rules_text, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
                 
             elif data.startswith("replace_clear_"):
-                await self.bot_controller.database.execute_command(
-                    "UPDATE task_settings SET replace_text = NULL WHERE task_id = $1",
-                    task_id
-                )
+                await self.repositories.settings.update(task_id, replace_text=None)
                 await callback.answer("🗑️ تم مسح جميع قواعد الاستبدال")
                 await self._handle_text_replace_setting(callback, task_id, state)
                 
@@ -9856,7 +8628,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current formatting settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             format_settings = {}
             if settings and settings.get("format_settings"):
                 try:
@@ -9968,10 +8740,7 @@ _تحديث: {timestamp}_"""
             
             # Save updated settings to database
             try:
-                await self.bot_controller.database.execute_command(
-                    "UPDATE task_settings SET format_settings = $1 WHERE task_id = $2",
-                    json.dumps(format_settings), task_id
-                )
+                await self.repositories.settings.update(task_id, format_settings=json.dumps(format_settings))
                 logger.info(f"Format settings saved for task {task_id}: {format_settings}")
             except Exception as e:
                 logger.error(f"Failed to save format settings: {e}")
@@ -10006,13 +8775,10 @@ _تحديث: {timestamp}_"""
             data = callback.data
             if data.startswith("links_remove_"):
                 task_id = int(data.split("_")[-1])
-                settings = await self.bot_controller.database.get_task_settings(task_id)
+                settings = await self.repositories.settings.get(task_id)
                 current_remove = settings.get("remove_links", False) if settings else False
                 
-                await self.bot_controller.database.execute_command(
-                    "UPDATE task_settings SET remove_links = $1 WHERE task_id = $2",
-                    not current_remove, task_id
-                )
+                await self.repositories.settings.update(task_id, remove_links=not current_remove)
                 await callback.answer(f"🔗 إزالة الروابط: {'enabled' if not current_remove else 'تم الDisable'}")
                 
                 # Refresh the links settings
@@ -10024,6 +8790,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in links actions: {e}")
             await callback.answer("❌ خطأ في معالجة الروابط", show_alert=True)
 
+    @callback_route("cleaner_*")
     async def _handle_text_cleaner_actions(self, callback: CallbackQuery, state: FSMContext):
         """Handle text cleaner actions"""
         try:
@@ -10097,7 +8864,7 @@ _تحديث: {timestamp}_"""
                 
             elif data.startswith("cleaner_clear_words_"):
                 task_id = int(data.split("_")[-1])
-                settings = await self.bot_controller.database.get_task_settings(task_id)
+                settings = await self.repositories.settings.get(task_id)
                 cleaner_settings = {}
                 if settings and settings.get("text_cleaner_settings"):
                     try:
@@ -10107,10 +8874,7 @@ _تحديث: {timestamp}_"""
                 
                 cleaner_settings["target_words"] = []
                 
-                await self.bot_controller.database.execute_command(
-                    "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                    json.dumps(cleaner_settings), task_id
-                )
+                await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
                 
                 await callback.answer("🗑️ تم مسح جميع الكلمات المستهدفة")
                 await self._handle_manage_target_words(callback, task_id, state)
@@ -10122,6 +8886,9 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in text cleaner actions: {e}")
             await callback.answer("❌ خطأ في معالجة منظف النص", show_alert=True)
 
+    @callback_route("cleaner_buttons_toggle_{task_id:int}", setting_key="remove_inline_buttons")
+    @callback_route("cleaner_lines_toggle_{task_id:int}", setting_key="remove_extra_lines")
+    @callback_route("cleaner_words_toggle_{task_id:int}", setting_key="remove_lines_with_words")
     async def _toggle_cleaner_setting(self, task_id: int, setting_key: str, callback: CallbackQuery):
         """Toggle a cleaner setting and refresh the interface"""
         try:
@@ -10129,7 +8896,7 @@ _تحديث: {timestamp}_"""
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -10143,10 +8910,7 @@ _تحديث: {timestamp}_"""
             cleaner_settings[setting_key] = new_value
             
             # Save to database
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(cleaner_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(cleaner_settings))
             
             # Show appropriate notification
             setting_names = {
@@ -10261,7 +9025,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current target words
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -10305,6 +9069,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error managing target words: {e}")
             await callback.answer("❌ خطأ في إدارة الكلمات المستهدفة", show_alert=True)
     
+    @callback_route("cleaner_test_{task_id:int}")
     async def _handle_cleaner_test(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle text cleaner test"""
         try:
@@ -10324,6 +9089,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in cleaner test: {e}")
             await callback.answer("❌ خطأ في اختبار منظف النص", show_alert=True)
     
+    @callback_route("cleaner_reset_{task_id:int}")
     async def _handle_cleaner_reset(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle text cleaner reset"""
         try:
@@ -10341,10 +9107,7 @@ _تحديث: {timestamp}_"""
                 "target_words": []
             }
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_cleaner_settings = $1 WHERE task_id = $2",
-                json.dumps(default_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, text_cleaner_settings=json.dumps(default_settings))
             
             await callback.answer("🔄 تم إعادة تعيين جميع إعدادات منظف النص")
             await self._handle_text_cleaner_setting(callback, task_id, state)
@@ -10353,6 +9116,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error resetting text cleaner: {e}")
             await callback.answer("❌ خطأ في إعادة تعيين منظف النص", show_alert=True)
 
+    @callback_route("forward_mode_*")
     async def _handle_forward_mode_actions(self, callback: CallbackQuery, state: FSMContext):
         """Handle forward mode subcategory actions"""
         try:
@@ -10360,20 +9124,14 @@ _تحديث: {timestamp}_"""
             
             if data.startswith("forward_mode_copy_"):
                 task_id = int(data.split("_")[-1])
-                await self.database.execute_command(
-                    "UPDATE task_settings SET forward_mode = $1 WHERE task_id = $2",
-                    "copy", task_id
-                )
+                await self.repositories.settings.update(task_id, forward_mode="copy")
                 await callback.answer("📋 تم تعيين وضع النسخ", show_alert=False)
                 # Refresh forward mode settings
                 await self._handle_forward_mode_setting(callback, state)
                 
             elif data.startswith("forward_mode_forward_"):
                 task_id = int(data.split("_")[-1])
-                await self.database.execute_command(
-                    "UPDATE task_settings SET forward_mode = $1 WHERE task_id = $2",
-                    "forward", task_id
-                )
+                await self.repositories.settings.update(task_id, forward_mode="forward")
                 await callback.answer("🔄 تم تعيين وضع التوجيه", show_alert=False)
                 # Refresh forward mode settings
                 await self._handle_forward_mode_setting(callback, state)
@@ -10385,6 +9143,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in forward mode actions: {e}")
             await callback.answer("❌ خطأ في معالجة وضع التوجيه", show_alert=True)
 
+    @callback_route("delay_*")
     async def _handle_delay_actions(self, callback: CallbackQuery, state: FSMContext):
         """Handle delay subcategory actions"""
         try:
@@ -10400,13 +9159,10 @@ _تحديث: {timestamp}_"""
                 
             elif data.startswith("delay_random_"):
                 task_id = int(data.split("_")[-1])
-                settings = await self.database.get_task_settings(task_id)
+                settings = await self.repositories.settings.get(task_id)
                 current_random = settings.get("random_delay", False) if settings else False
                 
-                await self.database.execute_command(
-                    "UPDATE task_settings SET random_delay = $1 WHERE task_id = $2",
-                    not current_random, task_id
-                )
+                await self.repositories.settings.update(task_id, random_delay=not current_random)
                 await callback.answer(f"🎲 التأخير العشوائي: {'enabled' if not current_random else 'تم الDisable'}")
                 
             else:
@@ -10416,6 +9172,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in delay actions: {e}")
             await callback.answer("❌ خطأ في معالجة إعدادات التأخير", show_alert=True)
 
+    @callback_route("clear_*", "enable_*", "disable_*", "reset_*", "save_*", "view_*", "toggle_*")
     async def _handle_filter_actions(self, callback: CallbackQuery, state: FSMContext):
         """Handle filter subcategory actions"""
         try:
@@ -10440,6 +9197,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in filter actions: {e}")
             await callback.answer("❌ خطأ في معالجة الفلاتر", show_alert=True)
 
+    @callback_route("verified_*", "nobots_*", "bots_*")
     async def _handle_user_filter_specific_actions(self, callback: CallbackQuery, state: FSMContext):
         """Handle user filter specific actions"""
         try:
@@ -10460,6 +9218,10 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in user filter actions: {e}")
             await callback.answer("❌ خطأ في معالجة فلتر المستخدمين", show_alert=True)
 
+    @callback_route(
+        "photo_*", "video_*", "audio_*", "document_*", "voice_*", "sticker_*", "animation_*",
+        "poll_*", "contact_*", "location_*", "venue_*", "game_*"
+    )
     async def _handle_media_type_actions(self, callback: CallbackQuery, state: FSMContext):
         """Handle media type specific actions"""
         try:
@@ -10486,6 +9248,13 @@ _تحديث: {timestamp}_"""
 
 
 
+    @callback_route(
+        "mode_*", "apply_*", "load_*", "delete_*", "copy_*", "import_*", "export_*", "add_*",
+        "remove_*", "edit_*", "test_*", "back_*", "next_*", "prev_*", "select_*", "instant_*",
+        "short_*", "medium_*", "long_*", "random_*", "bold_*", "italic_*", "underline_*",
+        "strike_*", "spoiler_*", "code_*", "mono_*", "preserve_*", "strip_*", "extract_*",
+        "limit_*", "min_*", "max_*", "keyword_*", "sender_*", "all_*", "none_*", "default_*"
+    )
     async def _handle_additional_actions(self, callback: CallbackQuery, state: FSMContext):
         """Handle additional miscellaneous actions"""
         try:
@@ -10641,10 +9410,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current keywords with separate lists
-            settings = await self.database.execute_query(
-                "SELECT keyword_filters FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "keyword_filters")
             
             whitelist_keywords = []
             
@@ -10705,10 +9471,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current keywords with separate lists
-            settings = await self.database.execute_query(
-                "SELECT keyword_filters FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "keyword_filters")
             
             blacklist_keywords = []
             
@@ -10769,10 +9532,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current keywords to preserve blacklist
-            settings = await self.database.execute_query(
-                "SELECT keyword_filters FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "keyword_filters")
             
             blacklist_keywords = []
             current_mode = "blacklist"
@@ -10798,10 +9558,7 @@ _تحديث: {timestamp}_"""
                 "blacklist": blacklist_keywords
             }
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET keyword_filters = $1 WHERE task_id = $2",
-                json.dumps(keywords_data), task_id
-            )
+            await self.repositories.keywords.save(task_id, keywords_data)
             
             await callback.answer("⚪ Whitelist cleared successfully")
             await self._handle_keyword_filter(callback, task_id, state)
@@ -10817,10 +9574,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current keywords to preserve whitelist
-            settings = await self.database.execute_query(
-                "SELECT keyword_filters FROM task_settings WHERE task_id = $1", 
-                task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "keyword_filters")
             
             whitelist_keywords = []
             current_mode = "blacklist"
@@ -10846,10 +9600,7 @@ _تحديث: {timestamp}_"""
                 "blacklist": []
             }
             
-            await self.database.execute_command(
-                "UPDATE task_settings SET keyword_filters = $1 WHERE task_id = $2",
-                json.dumps(keywords_data), task_id
-            )
+            await self.repositories.keywords.save(task_id, keywords_data)
             
             await callback.answer("⚫ تم Clear Blacklist بنجاح")
             await self._handle_keyword_filter(callback, task_id, state)
@@ -10858,6 +9609,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error clearing blacklist: {e}")
             await callback.answer("❌ خطأ في Clear Blacklist")
 
+    @callback_route("filter_length_{task_id:int}")
     async def _handle_length_filter(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle length filter main interface - show enhanced version"""
         try:
@@ -10870,10 +9622,7 @@ _تحديث: {timestamp}_"""
             import time
             
             # Clear any cached data and read directly from database
-            fresh_db_result = await self.database.execute_query(
-                "SELECT length_filter_settings FROM task_settings WHERE task_id = $1",
-                task_id
-            )
+            fresh_db_result = await self.repositories.settings.select(task_id, "length_filter_settings")
             
             length_settings = {}
             if fresh_db_result and fresh_db_result[0] and fresh_db_result[0]['length_filter_settings']:
@@ -10903,12 +9652,7 @@ _تحديث: {timestamp}_"""
                     'max_length': max_length,
                     'action_mode': action_mode
                 }
-                # Update using direct SQL since database doesn't have update_task_settings method
-                await self.database.execute_command(
-                    "UPDATE task_settings SET length_filter_settings = $1 WHERE task_id = $2",
-                    json.dumps(complete_settings),
-                    task_id
-                )
+                await self.repositories.settings.update(task_id, length_filter_settings=json.dumps(complete_settings))
                 logger.info(f"Initialized empty length filter settings for task {task_id}: {complete_settings}")
             
             # Build interface text with timestamp for refresh
@@ -11034,6 +9778,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in length filter interface: {e}")
             await callback.answer("❌ Error loading length filter.")
 
+    @callback_route("length_*")
     async def _handle_length_actions(self, callback: CallbackQuery, state: FSMContext):
         """Handle enhanced length filter actions"""
         try:
@@ -11065,7 +9810,7 @@ _تحديث: {timestamp}_"""
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             length_settings = settings.get('length_filter_settings', {}) if settings else {}
             
             # Parse length_filter_settings if it's a string
@@ -11114,7 +9859,7 @@ _تحديث: {timestamp}_"""
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
             # Get current settings
-            settings = await self.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             length_settings = settings.get('length_filter_settings', {}) if settings else {}
             
             # Parse length_filter_settings if it's a string
@@ -11157,6 +9902,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in max length setting: {e}")
             await callback.answer("❌ Error setting maximum limit.")
 
+    @callback_route("set_min_*", "set_max_*")
     async def _handle_length_value_setting(self, callback: CallbackQuery, state: FSMContext):
         """Handle setting specific min/max values"""
         try:
@@ -11170,10 +9916,7 @@ _تحديث: {timestamp}_"""
             logger.info(f"Setting {value_type} length to {value} for task {task_id}")
             
             # Get current settings from database directly
-            fresh_settings = await self.database.execute_query(
-                "SELECT length_filter_settings FROM task_settings WHERE task_id = $1",
-                task_id
-            )
+            fresh_settings = await self.repositories.settings.select(task_id, "length_filter_settings")
             
             length_settings = {}
             if fresh_settings and fresh_settings[0] and fresh_settings[0]['length_filter_settings']:
@@ -11214,11 +9957,7 @@ _تحديث: {timestamp}_"""
             length_settings['enabled'] = True
             
             # Save to database using simple UPDATE
-            await self.database.execute_command(
-                "UPDATE task_settings SET length_filter_settings = $1 WHERE task_id = $2",
-                json.dumps(length_settings),
-                task_id
-            )
+            await self.repositories.settings.update(task_id, length_filter_settings=json.dumps(length_settings))
             
             # Force reload of forwarding engine settings
             if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -11241,10 +9980,7 @@ _تحديث: {timestamp}_"""
             import time
             
             # Force fresh read from database
-            fresh_settings = await self.database.execute_query(
-                "SELECT length_filter_settings FROM task_settings WHERE task_id = $1",
-                task_id
-            )
+            fresh_settings = await self.repositories.settings.select(task_id, "length_filter_settings")
             
             current_action = 'block'  # default
             if fresh_settings and fresh_settings[0] and fresh_settings[0]['length_filter_settings']:
@@ -11321,6 +10057,7 @@ _تحديث: {timestamp}_"""
         }
         return action_names.get(action_mode, 'Not Set')
 
+    @callback_route("set_action_*")
     async def _handle_action_mode_setting(self, callback: CallbackQuery, state: FSMContext):
         """Handle setting specific action mode values"""
         try:
@@ -11332,10 +10069,7 @@ _تحديث: {timestamp}_"""
             logger.info(f"Setting action mode to {action_type} for task {task_id}")
             
             # Get current settings - force fresh read from database
-            fresh_settings = await self.database.execute_query(
-                "SELECT length_filter_settings FROM task_settings WHERE task_id = $1",
-                task_id
-            )
+            fresh_settings = await self.repositories.settings.select(task_id, "length_filter_settings")
             
             import json
             
@@ -11363,11 +10097,7 @@ _تحديث: {timestamp}_"""
             
             # Save to database
             import json
-            await self.database.execute_command(
-                "UPDATE task_settings SET length_filter_settings = $1 WHERE task_id = $2",
-                json.dumps(length_settings),
-                task_id
-            )
+            await self.repositories.settings.update(task_id, length_filter_settings=json.dumps(length_settings))
             
             # Force reload of forwarding engine settings
             if hasattr(self.bot_controller, 'forwarding_engine'):
@@ -11395,10 +10125,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current settings
-            settings = await self.database.execute_query(
-                "SELECT length_filter_settings FROM task_settings WHERE task_id = $1",
-                task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "length_filter_settings")
             
             current_enabled = False
             length_settings = {}
@@ -11437,6 +10164,7 @@ _تحديث: {timestamp}_"""
                 DO UPDATE SET length_filter_settings = $2, updated_at = NOW()""",
                 task_id, json.dumps(length_settings)
             )
+            await self.repositories.settings.invalidate(task_id)
             
             status_text = "enabled" if new_enabled else "disabled"
             await callback.answer(f"✅ Length filter {status_text}.")
@@ -11544,9 +10272,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current whitelist data from database
-            whitelist_data = await self.bot_controller.database.execute_query(
-                "SELECT user_whitelist FROM task_settings WHERE task_id = $1", task_id
-            )
+            whitelist_data = await self.repositories.settings.select(task_id, "user_whitelist")
             
             current_whitelist = []
             whitelist_enabled = False
@@ -11631,9 +10357,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current blacklist data from database
-            blacklist_data = await self.bot_controller.database.execute_query(
-                "SELECT user_blacklist FROM task_settings WHERE task_id = $1", task_id
-            )
+            blacklist_data = await self.repositories.settings.select(task_id, "user_blacklist")
             
             current_blacklist = []
             blacklist_enabled = False
@@ -11718,9 +10442,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current whitelist data
-            whitelist_data = await self.bot_controller.database.execute_query(
-                "SELECT user_whitelist FROM task_settings WHERE task_id = $1", task_id
-            )
+            whitelist_data = await self.repositories.settings.select(task_id, "user_whitelist")
             
             current_enabled = False
             current_users = []
@@ -11747,10 +10469,7 @@ _تحديث: {timestamp}_"""
                 'users': current_users
             }
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET user_whitelist = $1 WHERE task_id = $2",
-                json.dumps(new_data), task_id
-            )
+            await self.repositories.settings.update(task_id, user_whitelist=json.dumps(new_data))
             
             status = "تم تفعيل" if new_enabled else "تم تعطيل"
             await callback.answer(f"✅ {status} القائمة البيضاء")
@@ -11768,9 +10487,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current blacklist data
-            blacklist_data = await self.bot_controller.database.execute_query(
-                "SELECT user_blacklist FROM task_settings WHERE task_id = $1", task_id
-            )
+            blacklist_data = await self.repositories.settings.select(task_id, "user_blacklist")
             
             current_enabled = False
             current_users = []
@@ -11797,10 +10514,7 @@ _تحديث: {timestamp}_"""
                 'users': current_users
             }
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET user_blacklist = $1 WHERE task_id = $2",
-                json.dumps(new_data), task_id
-            )
+            await self.repositories.settings.update(task_id, user_blacklist=json.dumps(new_data))
             
             status = "تم تفعيل" if new_enabled else "تم تعطيل"
             await callback.answer(f"✅ {status} القائمة السوداء")
@@ -11855,9 +10569,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current whitelist
-            whitelist_data = await self.bot_controller.database.execute_query(
-                "SELECT user_whitelist FROM task_settings WHERE task_id = $1", task_id
-            )
+            whitelist_data = await self.repositories.settings.select(task_id, "user_whitelist")
             
             current_users = []
             if whitelist_data and whitelist_data[0]['user_whitelist']:
@@ -12007,9 +10719,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current blacklist
-            blacklist_data = await self.bot_controller.database.execute_query(
-                "SELECT user_blacklist FROM task_settings WHERE task_id = $1", task_id
-            )
+            blacklist_data = await self.repositories.settings.select(task_id, "user_blacklist")
             
             current_users = []
             if blacklist_data and blacklist_data[0]['user_blacklist']:
@@ -12068,7 +10778,7 @@ _تحديث: {timestamp}_"""
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
             # Get current settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             cleaner_settings = {}
             if settings and settings.get("text_cleaner_settings"):
                 try:
@@ -12188,7 +10898,7 @@ _تحديث: {timestamp}_"""
                 return
 
             # Get current replacements
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_replacements = []
             if settings and settings.get("text_replacements"):
                 try:
@@ -12207,10 +10917,7 @@ _تحديث: {timestamp}_"""
 
             # Save to database
             import json
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_replacements = $1 WHERE task_id = $2",
-                json.dumps(current_replacements), task_id
-            )
+            await self.repositories.settings.update(task_id, text_replacements=json.dumps(current_replacements))
 
             await message.answer(f"✅ تم إضافة استبدال النص: '{old_text}' ← '{new_text}'")
             await state.clear()
@@ -12226,7 +10933,7 @@ _تحديث: {timestamp}_"""
             search_text = input_text.strip()
             
             # Get current replacements
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_replacements = []
             if settings and settings.get("text_replacements"):
                 try:
@@ -12254,10 +10961,7 @@ _تحديث: {timestamp}_"""
 
             # Save updated replacements
             import json
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET text_replacements = $1 WHERE task_id = $2",
-                json.dumps(new_replacements), task_id
-            )
+            await self.repositories.settings.update(task_id, text_replacements=json.dumps(new_replacements))
 
             await message.answer(f"✅ تم حذف {removed_count} استبدال(ات)")
             await state.clear()
@@ -12273,7 +10977,7 @@ _تحديث: {timestamp}_"""
             words = [word.strip() for word in input_text.split('\n') if word.strip()]
             
             # Get current blocked words
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_words = []
             if settings and settings.get("blocked_words"):
                 try:
@@ -12295,10 +10999,7 @@ _تحديث: {timestamp}_"""
 
             # Save to database
             import json
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET blocked_words = $1 WHERE task_id = $2",
-                json.dumps(current_words), task_id
-            )
+            await self.repositories.settings.update(task_id, blocked_words=json.dumps(current_words))
 
             if new_words:
                 await message.answer(f"✅ تم إضافة {len(new_words)} كلمة محظورة")
@@ -12368,7 +11069,7 @@ _تحديث: {timestamp}_"""
                     all_buttons.append(button)
 
             # Get current button settings
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             button_settings = {}
             if settings and settings.get("inline_button_settings"):
                 try:
@@ -12388,10 +11089,7 @@ _تحديث: {timestamp}_"""
 
             # Save to database
             import json
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET inline_button_settings = $1 WHERE task_id = $2",
-                json.dumps(button_settings), task_id
-            )
+            await self.repositories.settings.update(task_id, inline_button_settings=json.dumps(button_settings))
 
             total_buttons = len(all_buttons)
             total_rows = len(button_rows)
@@ -12468,9 +11166,7 @@ _تحديث: {timestamp}_"""
             
             # Get current list data
             column_name = f"user_{list_type}"
-            list_data = await self.bot_controller.database.execute_query(
-                f"SELECT {column_name} FROM task_settings WHERE task_id = $1", task_id
-            )
+            list_data = await self.repositories.settings.select(task_id, column_name)
             
             current_enabled = False
             current_users = []
@@ -12525,10 +11221,7 @@ _تحديث: {timestamp}_"""
                 'users': current_users
             }
             
-            await self.bot_controller.database.execute_command(
-                f"UPDATE task_settings SET {column_name} = $1 WHERE task_id = $2",
-                json.dumps(new_data), task_id
-            )
+            await self.repositories.settings.update(task_id, **{column_name: json.dumps(new_data)})
             
             list_name = "القائمة البيضاء" if list_type == "whitelist" else "القائمة السوداء"
             user_display = username or str(user_id)
@@ -12547,9 +11240,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current whitelist
-            settings = await self.bot_controller.database.execute_query(
-                "SELECT user_whitelist FROM task_settings WHERE task_id = $1", task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "user_whitelist")
             
             current_whitelist = []
             if settings and settings[0]['user_whitelist']:
@@ -12580,10 +11271,7 @@ _تحديث: {timestamp}_"""
                 'users': current_whitelist
             }
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET user_whitelist = $1 WHERE task_id = $2",
-                json.dumps(new_data), task_id
-            )
+            await self.repositories.settings.update(task_id, user_whitelist=json.dumps(new_data))
             
             user_display = removed_user.get('name', 'Unknown') if isinstance(removed_user, dict) else str(removed_user)
             await callback.answer(f"✅ تم حذف '{user_display}' من القائمة البيضاء", show_alert=True)
@@ -12600,7 +11288,7 @@ _تحديث: {timestamp}_"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_whitelist = settings.get('user_whitelist', []) if settings else []
             
             if not current_whitelist:
@@ -12636,7 +11324,7 @@ _تحديث: {timestamp}_"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_whitelist = settings.get('user_whitelist', []) if settings else []
             
             if not current_whitelist:
@@ -12663,7 +11351,7 @@ _تحديث: {timestamp}_"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_whitelist = settings.get('user_whitelist', []) if settings else []
             
             if not current_whitelist:
@@ -12691,7 +11379,7 @@ _تحديث: {timestamp}_"""
     async def _handle_whitelist_export(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Export whitelist as text"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_whitelist = settings.get('user_whitelist', []) if settings else []
             
             if not current_whitelist:
@@ -12756,12 +11444,12 @@ _تحديث: {timestamp}_"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_blacklist = settings.get('user_blacklist', []) if settings else []
             
             if current_blacklist:
                 # Disable blacklist by clearing it
-                await self.bot_controller.database.update_task_settings(task_id, {'user_blacklist': []})
+                await self.repositories.settings.update(task_id, user_blacklist=json.dumps([]))
                 await callback.answer("🔴 تم تعطيل القائمة السوداء")
             else:
                 await callback.answer("⚠️ القائمة السوداء فارغة - أضف مستخدمين أولاً", show_alert=True)
@@ -12807,7 +11495,7 @@ _تحديث: {timestamp}_"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_blacklist = settings.get('user_blacklist', []) if settings else []
             
             if not current_blacklist:
@@ -12843,7 +11531,7 @@ _تحديث: {timestamp}_"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_blacklist = settings.get('user_blacklist', []) if settings else []
             
             if not current_blacklist:
@@ -12870,7 +11558,7 @@ _تحديث: {timestamp}_"""
         try:
             from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
             
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_blacklist = settings.get('user_blacklist', []) if settings else []
             
             if not current_blacklist:
@@ -12898,7 +11586,7 @@ _تحديث: {timestamp}_"""
     async def _handle_blacklist_export(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Export blacklist as text"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_blacklist = settings.get('user_blacklist', []) if settings else []
             
             if not current_blacklist:
@@ -12963,9 +11651,7 @@ _تحديث: {timestamp}_"""
             import json
             
             # Get current blacklist
-            settings = await self.bot_controller.database.execute_query(
-                "SELECT user_blacklist FROM task_settings WHERE task_id = $1", task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "user_blacklist")
             
             current_blacklist = []
             if settings and settings[0]['user_blacklist']:
@@ -12996,10 +11682,7 @@ _تحديث: {timestamp}_"""
                 'users': current_blacklist
             }
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET user_blacklist = $1 WHERE task_id = $2",
-                json.dumps(new_data), task_id
-            )
+            await self.repositories.settings.update(task_id, user_blacklist=json.dumps(new_data))
             
             user_display = removed_user.get('name', 'Unknown') if isinstance(removed_user, dict) else str(removed_user)
             await callback.answer(f"✅ تم حذف '{user_display}' من القائمة السوداء", show_alert=True)
@@ -13048,9 +11731,7 @@ _تحديث: {timestamp}_"""
             from datetime import datetime
             
             # Get current blacklist
-            settings = await self.bot_controller.database.execute_query(
-                "SELECT user_blacklist FROM task_settings WHERE task_id = $1", task_id
-            )
+            settings = await self.repositories.settings.select(task_id, "user_blacklist")
             
             current_blacklist = []
             if settings and settings[0]['user_blacklist']:
@@ -13133,7 +11814,7 @@ _تحديث: {timestamp}_"""
     async def _handle_whitelist_clear_confirm(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Confirm and execute whitelist clear"""
         try:
-            await self.bot_controller.database.update_task_settings(task_id, {'user_whitelist': []})
+            await self.repositories.settings.update(task_id, user_whitelist=json.dumps([]))
             await callback.answer("✅ تم حذف جميع المستخدمين من القائمة البيضاء")
             
             # Return to whitelist management
@@ -13146,7 +11827,7 @@ _تحديث: {timestamp}_"""
     async def _handle_blacklist_clear_confirm(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Confirm and execute blacklist clear"""
         try:
-            await self.bot_controller.database.update_task_settings(task_id, {'user_blacklist': []})
+            await self.repositories.settings.update(task_id, user_blacklist=json.dumps([]))
             await callback.answer("✅ تم حذف جميع المستخدمين من القائمة السوداء")
             
             # Return to blacklist management
@@ -13160,14 +11841,11 @@ _تحديث: {timestamp}_"""
     async def _handle_translation_toggle(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle translation feature"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("auto_translate", False) if settings else False
             new_value = not current_value
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET auto_translate = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, auto_translate=new_value)
             
             status = "تم تفعيل" if new_value else "تم إلغاء"
             await callback.answer(f"✅ {status} الترجمة التلقائية")
@@ -13184,14 +11862,11 @@ _تحديث: {timestamp}_"""
     async def _handle_working_hours_toggle(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle working hours feature"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("working_hours_enabled", False) if settings else False
             new_value = not current_value
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET working_hours_enabled = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, working_hours_enabled=new_value)
             
             status = "تم تفعيل" if new_value else "تم إلغاء"
             await callback.answer(f"✅ {status} ساعات العمل")
@@ -13203,13 +11878,11 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling working hours: {e}")
             await callback.answer("❌ خطأ في تغيير إعدادات ساعات العمل", show_alert=True)
 
+    @callback_route("set_start_hour_{hour:int}_{task_id:int}")
     async def _handle_set_start_hour(self, callback: CallbackQuery, task_id: int, hour: int, state: FSMContext):
         """Set start hour for working hours"""
         try:
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET start_hour = $1 WHERE task_id = $2",
-                hour, task_id
-            )
+            await self.repositories.settings.update(task_id, start_hour=hour)
             
             await callback.answer(f"✅ تم تعيين ساعة البداية إلى {hour:02d}:00")
             
@@ -13220,13 +11893,11 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error setting start hour: {e}")
             await callback.answer("❌ خطأ في تعيين ساعة البداية", show_alert=True)
 
+    @callback_route("set_end_hour_{hour:int}_{task_id:int}")
     async def _handle_set_end_hour(self, callback: CallbackQuery, task_id: int, hour: int, state: FSMContext):
         """Set end hour for working hours"""
         try:
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET end_hour = $1 WHERE task_id = $2",
-                hour, task_id
-            )
+            await self.repositories.settings.update(task_id, end_hour=hour)
             
             await callback.answer(f"✅ تم تعيين ساعة النهاية إلى {hour:02d}:00")
             
@@ -13237,16 +11908,14 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error setting end hour: {e}")
             await callback.answer("❌ خطأ في تعيين ساعة النهاية", show_alert=True)
 
+    @callback_route("set_timezone_{timezone:text}_{task_id:int}")
     async def _handle_set_timezone(self, callback: CallbackQuery, task_id: int, timezone: str, state: FSMContext):
         """Set timezone for working hours"""
         try:
             # Replace underscore back to slash for timezone
             timezone = timezone.replace('_', '/')
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET timezone = $1 WHERE task_id = $2",
-                timezone, task_id
-            )
+            await self.repositories.settings.update(task_id, timezone=timezone)
             
             await callback.answer(f"✅ تم تعيين المنطقة الزمنية إلى {timezone}")
             
@@ -13260,14 +11929,11 @@ _تحديث: {timestamp}_"""
     async def _handle_recurring_post_toggle(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle recurring post feature"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("recurring_post_enabled", False) if settings else False
             new_value = not current_value
             
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET recurring_post_enabled = $1 WHERE task_id = $2",
-                new_value, task_id
-            )
+            await self.repositories.settings.update(task_id, recurring_post_enabled=new_value)
             
             status = "تم تفعيل" if new_value else "تم إلغاء"
             await callback.answer(f"✅ {status} المنشور المتكرر")
@@ -13279,13 +11945,11 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling recurring post: {e}")
             await callback.answer("❌ خطأ في تغيير إعدادات المنشور المتكرر", show_alert=True)
 
+    @callback_route("set_recurring_interval_{interval_hours:int}_{task_id:int}")
     async def _handle_set_recurring_interval(self, callback: CallbackQuery, task_id: int, interval_hours: int, state: FSMContext):
         """Set recurring post interval"""
         try:
-            await self.bot_controller.database.execute_command(
-                "UPDATE task_settings SET recurring_interval_hours = $1 WHERE task_id = $2",
-                interval_hours, task_id
-            )
+            await self.repositories.settings.update(task_id, recurring_interval_hours=interval_hours)
             
             interval_text = f"{interval_hours} ساعة" if interval_hours < 24 else f"{interval_hours // 24} يوم"
             if interval_hours == 168:
@@ -13300,6 +11964,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error setting recurring interval: {e}")
             await callback.answer("❌ خطأ في تعيين الفترة الزمنية", show_alert=True)
 
+    @callback_route("suffix_add_{task_id:int}")
     async def _handle_suffix_add(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle adding suffix"""
         try:
@@ -13334,6 +11999,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in suffix add: {e}")
             await callback.answer("❌ خطأ في إضافة اللاحقة", show_alert=True)
 
+    @callback_route("suffix_edit_{task_id:int}")
     async def _handle_suffix_edit(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle editing suffix"""
         try:
@@ -13346,7 +12012,7 @@ _تحديث: {timestamp}_"""
                 return
             
             # Get current suffix
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_suffix = settings.get("suffix_text", "") if settings else ""
             
             # Set up state for text input
@@ -13374,14 +12040,15 @@ _تحديث: {timestamp}_"""
 
     # === Missing Forward Settings Handlers ===
 
+    @callback_route("toggle_manual_mode_{task_id:int}")
     async def _handle_toggle_manual_mode(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle manual mode for forwarding"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("manual_mode", False) if settings else False
             new_value = not current_value
             
-            await self.bot_controller.database.update_task_settings(task_id, {"manual_mode": new_value})
+            await self.repositories.settings.update(task_id, manual_mode=new_value)
             
             status = "تفعيل" if new_value else "إلغاء"
             await callback.answer(f"✅ تم {status} الوضع اليدوي")
@@ -13393,14 +12060,15 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling manual mode: {e}")
             await callback.answer("❌ خطأ في تغيير الوضع اليدوي", show_alert=True)
 
+    @callback_route("toggle_link_preview_{task_id:int}")
     async def _handle_toggle_link_preview(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle link preview in forwarding"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("link_preview", True) if settings else True
             new_value = not current_value
             
-            await self.bot_controller.database.update_task_settings(task_id, {"link_preview": new_value})
+            await self.repositories.settings.update(task_id, link_preview=new_value)
             
             status = "تفعيل" if new_value else "إلغاء"
             await callback.answer(f"✅ تم {status} معاينة الروابط")
@@ -13412,14 +12080,15 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling link preview: {e}")
             await callback.answer("❌ خطأ في تغيير معاينة الروابط", show_alert=True)
 
+    @callback_route("toggle_pin_messages_{task_id:int}")
     async def _handle_toggle_pin_messages(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle pin messages in forwarding"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("pin_messages", False) if settings else False
             new_value = not current_value
             
-            await self.bot_controller.database.update_task_settings(task_id, {"pin_messages": new_value})
+            await self.repositories.settings.update(task_id, pin_messages=new_value)
             
             status = "تفعيل" if new_value else "إلغاء"
             await callback.answer(f"✅ تم {status} تثبيت الرسائل")
@@ -13431,14 +12100,15 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling pin messages: {e}")
             await callback.answer("❌ خطأ في تغيير تثبيت الرسائل", show_alert=True)
 
+    @callback_route("toggle_silent_mode_{task_id:int}")
     async def _handle_toggle_silent_mode(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle silent mode in forwarding"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("silent_mode", False) if settings else False
             new_value = not current_value
             
-            await self.bot_controller.database.update_task_settings(task_id, {"silent_mode": new_value})
+            await self.repositories.settings.update(task_id, silent_mode=new_value)
             
             status = "تفعيل" if new_value else "إلغاء"
             await callback.answer(f"✅ تم {status} الوضع الصامت")
@@ -13450,14 +12120,15 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling silent mode: {e}")
             await callback.answer("❌ خطأ في تغيير الوضع الصامت", show_alert=True)
 
+    @callback_route("toggle_sync_deletes_{task_id:int}")
     async def _handle_toggle_sync_deletes(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle synchronize deletes in forwarding"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("sync_deletes", False) if settings else False
             new_value = not current_value
             
-            await self.bot_controller.database.update_task_settings(task_id, {"sync_deletes": new_value})
+            await self.repositories.settings.update(task_id, sync_deletes=new_value)
             
             status = "تفعيل" if new_value else "إلغاء"
             await callback.answer(f"✅ تم {status} مزامنة الحذف")
@@ -13469,14 +12140,15 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling sync deletes: {e}")
             await callback.answer("❌ خطأ في تغيير مزامنة الحذف", show_alert=True)
 
+    @callback_route("toggle_preserve_replies_{task_id:int}")
     async def _handle_toggle_preserve_replies(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle preserve replies in forwarding"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("preserve_replies", False) if settings else False
             new_value = not current_value
             
-            await self.bot_controller.database.update_task_settings(task_id, {"preserve_replies": new_value})
+            await self.repositories.settings.update(task_id, preserve_replies=new_value)
             
             status = "تفعيل" if new_value else "إلغاء"
             await callback.answer(f"✅ تم {status} المحافظة على الردود")
@@ -13488,14 +12160,15 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling preserve replies: {e}")
             await callback.answer("❌ خطأ في تغيير المحافظة على الردود", show_alert=True)
 
+    @callback_route("toggle_sync_edits_{task_id:int}")
     async def _handle_toggle_sync_edits(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Toggle synchronize edits in forwarding"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id)
+            settings = await self.repositories.settings.get(task_id)
             current_value = settings.get("sync_edits", False) if settings else False
             new_value = not current_value
             
-            await self.bot_controller.database.update_task_settings(task_id, {"sync_edits": new_value})
+            await self.repositories.settings.update(task_id, sync_edits=new_value)
             
             status = "تفعيل" if new_value else "إلغاء"
             await callback.answer(f"✅ تم {status} مزامنة التعديل")
@@ -13507,10 +12180,11 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error toggling sync edits: {e}")
             await callback.answer("❌ خطأ في تغيير مزامنة التعديل", show_alert=True)
 
+    @callback_route("forward_other_{task_id:int}")
     async def _handle_forward_other_settings(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle other forward settings"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id) or {}
+            settings = await self.repositories.settings.get(task_id) or {}
             
             # Get current values
             protect_content = settings.get("protect_content", False)
@@ -13568,6 +12242,7 @@ _تحديث: {timestamp}_"""
 
     # === Missing Media Filters Handlers ===
 
+    @callback_route("media_enable_all_{task_id:int}")
     async def _handle_media_enable_all(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Enable all media types"""
         try:
@@ -13588,7 +12263,7 @@ _تحديث: {timestamp}_"""
                 "allow_text": True
             }
             
-            await self.bot_controller.database.update_task_settings(task_id, media_settings)
+            await self.repositories.settings.update(task_id, **media_settings)
             await callback.answer("✅ تم تفعيل جميع أنواع الوسائط")
             
             # Refresh media types keyboard
@@ -13598,6 +12273,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error enabling all media: {e}")
             await callback.answer("❌ خطأ في تفعيل الوسائط", show_alert=True)
 
+    @callback_route("media_disable_all_{task_id:int}")
     async def _handle_media_disable_all(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Disable all media types"""
         try:
@@ -13618,7 +12294,7 @@ _تحديث: {timestamp}_"""
                 "allow_text": False
             }
             
-            await self.bot_controller.database.update_task_settings(task_id, media_settings)
+            await self.repositories.settings.update(task_id, **media_settings)
             await callback.answer("❌ تم تعطيل جميع أنواع الوسائط")
             
             # Refresh media types keyboard
@@ -13628,6 +12304,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error disabling all media: {e}")
             await callback.answer("❌ خطأ في تعطيل الوسائط", show_alert=True)
 
+    @callback_route("media_reset_{task_id:int}")
     async def _handle_media_reset(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Reset media types to default"""
         try:
@@ -13649,7 +12326,7 @@ _تحديث: {timestamp}_"""
                 "allow_text": True
             }
             
-            await self.bot_controller.database.update_task_settings(task_id, media_settings)
+            await self.repositories.settings.update(task_id, **media_settings)
             await callback.answer("🔄 تم إعادة تعيين إعدادات الوسائط للافتراضية")
             
             # Refresh media types keyboard
@@ -13659,11 +12336,12 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error resetting media: {e}")
             await callback.answer("❌ خطأ في إعادة تعيين الوسائط", show_alert=True)
 
+    @callback_route("media_save_{task_id:int}")
     async def _handle_media_save(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Save current media settings"""
         try:
             # Get current settings for confirmation
-            settings = await self.bot_controller.database.get_task_settings(task_id) or {}
+            settings = await self.repositories.settings.get(task_id) or {}
             
             enabled_count = sum(1 for key in [
                 "allow_photos", "allow_videos", "allow_documents", "allow_audio",
@@ -13682,14 +12360,15 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error saving media settings: {e}")
             await callback.answer("❌ خطأ في حفظ الإعدادات", show_alert=True)
 
+    @callback_route("media_type_{task_id:int}_{media_type:text}")
     async def _handle_media_type_toggle(self, callback: CallbackQuery, task_id: int, media_type: str, state: FSMContext):
         """Toggle specific media type"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id) or {}
+            settings = await self.repositories.settings.get(task_id) or {}
             current_value = settings.get(media_type, True)
             new_value = not current_value
             
-            await self.bot_controller.database.update_task_settings(task_id, {media_type: new_value})
+            await self.repositories.settings.update(task_id, **{media_type: new_value})
             
             # Get media type display name
             type_names = {
@@ -13722,6 +12401,7 @@ _تحديث: {timestamp}_"""
 
     # === Filter Management Handlers ===
 
+    @callback_route("filter_clear_{task_id:int}")
     async def _handle_filter_clear_all(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Clear all filters"""
         try:
@@ -13871,6 +12551,7 @@ _تحديث: {timestamp}_"""
                 raise ValueError("فشل في إنشاء المهمة")
             
             task_id = result[0]["id"]
+            self.repositories.tasks.invalidate_owner(user_id)
             
             # Import sources
             if "sources" in task_data and isinstance(task_data["sources"], list):
@@ -13900,6 +12581,7 @@ _تحديث: {timestamp}_"""
 
     # === Missing Task Edit Handlers ===
 
+    @callback_route("task_edit_name_*")
     async def _handle_task_edit_name(self, callback: CallbackQuery, state: FSMContext):
         """Handle task name editing"""
         try:
@@ -13932,6 +12614,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in task edit name: {e}")
             await callback.answer("❌ خطأ في تعديل اسم المهمة", show_alert=True)
 
+    @callback_route("task_edit_desc_*")
     async def _handle_task_edit_description(self, callback: CallbackQuery, state: FSMContext):
         """Handle task description editing"""
         try:
@@ -13975,6 +12658,7 @@ _تحديث: {timestamp}_"""
             logger.error(f"Error in task edit description: {e}")
             await callback.answer("❌ خطأ في تعديل وصف المهمة", show_alert=True)
 
+    @callback_route("task_edit_type_*")
     async def _handle_task_change_type(self, callback: CallbackQuery, state: FSMContext):
         """Handle task type changing"""
         try:
@@ -14031,6 +12715,7 @@ _تحديث: {timestamp}_"""
 
     # === Content Setting Handler ===
 
+    @callback_route("setting_content_*")
     async def _handle_content_setting(self, callback: CallbackQuery, state: FSMContext):
         """Handle content settings main menu"""
         try:
@@ -14088,6 +12773,7 @@ _تحديث: {timestamp}_"""
 
     # === Limits Setting Handler ===
 
+    @callback_route("setting_limits_*")
     async def _handle_limits_setting(self, callback: CallbackQuery, state: FSMContext):
         """Handle limits settings"""
         try:
@@ -14104,7 +12790,7 @@ _تحديث: {timestamp}_"""
                 await callback.answer("❌ Access denied.", show_alert=True)
                 return
 
-            settings = await self.bot_controller.database.get_task_settings(task_id) or {}
+            settings = await self.repositories.settings.get(task_id) or {}
             
             # Get current limit settings
             delay_min = settings.get("delay_min", 0)
@@ -14159,10 +12845,11 @@ _تحديث: {timestamp}_"""
 
     # === Missing Text Replace Handler ===
 
+    @callback_route("content_replace_{task_id:int}")
     async def _handle_text_replace_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle text replacement settings"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id) or {}
+            settings = await self.repositories.settings.get(task_id) or {}
             replace_text = settings.get("replace_text", {})
             
             if isinstance(replace_text, str):
@@ -14245,10 +12932,11 @@ _تحديث: {timestamp}_"""
 
     # === Missing Formatting Handler ===
 
+    @callback_route("content_formatting_{task_id:int}")
     async def _handle_formatting_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle text formatting settings"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id) or {}
+            settings = await self.repositories.settings.get(task_id) or {}
             format_settings = settings.get("format_settings", {})
             
             if isinstance(format_settings, str):
@@ -14343,10 +13031,11 @@ _تحديث: {timestamp}_"""
 
     # === Missing Inline Buttons Handler ===
 
+    @callback_route("content_inline_buttons_{task_id:int}")
     async def _handle_inline_buttons_setting(self, callback: CallbackQuery, task_id: int, state: FSMContext):
         """Handle inline buttons settings"""
         try:
-            settings = await self.bot_controller.database.get_task_settings(task_id) or {}
+            settings = await self.repositories.settings.get(task_id) or {}
             inline_buttons = settings.get("inline_buttons", [])
             filter_inline_buttons = settings.get("filter_inline_buttons", False)
             
@@ -14437,6 +13126,7 @@ _تحديث: {timestamp}_"""
 
     # === Missing Filters Handler ===
 
+    @callback_route("setting_filters_*")
     async def _handle_filters_setting(self, callback: CallbackQuery, state: FSMContext):
         """Handle filters settings main menu"""
         try:
@@ -14453,7 +13143,7 @@ _تحديث: {timestamp}_"""
                 await callback.answer("❌ Access denied.", show_alert=True)
                 return
 
-            settings = await self.bot_controller.database.get_task_settings(task_id) or {}
+            settings = await self.repositories.settings.get(task_id) or {}
             
             # Check filter statuses
             filter_media = settings.get("filter_media", False)
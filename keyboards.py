@@ -2,21 +2,185 @@
 Keyboard layouts for Telegram Forwarding Bot
 """
 
+import inspect
+import math
+from collections import OrderedDict
+from functools import wraps
 from typing import List, Optional
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from loguru import logger
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Hashable, Set, Tuple
 
 from database import Database
 from security import SecurityManager
+from utils.memory_profiler import estimate_container_bytes
+
+
+_MISSING = object()
+
+
+def _freeze(value: Any) -> Hashable:
+    """Hashable form of a settings value (lists and dicts included)"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _user_language(user_id: int) -> str:
+    from localization import localization
+    return localization.get_user_language(user_id)
+
+
+class KeyboardCache:
+    """LRU of rendered markups and shared rows, indexed by task so settings changes can drop them"""
+
+    def __init__(self, max_size: int = 2000):
+        self.max_size = max_size
+        # key -> (task_id, value); the task id lets eviction keep the task index in step
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[int], Any]]" = OrderedDict()
+        self._by_task: Dict[int, Set[Hashable]] = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any, task_id: Optional[int] = None):
+        previous = self._entries.get(key)
+        if previous is not None and previous[0] != task_id:
+            self._unindex(key, previous[0])
+        self._entries[key] = (task_id, value)
+        self._entries.move_to_end(key)
+        if task_id is not None:
+            self._by_task.setdefault(task_id, set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._evict_oldest()
+
+    def _unindex(self, key: Hashable, task_id: Optional[int]):
+        if task_id is None:
+            return
+        keys = self._by_task.get(task_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_task[task_id]
+
+    def _evict_oldest(self):
+        key, (task_id, _) = self._entries.popitem(last=False)
+        self._unindex(key, task_id)
+        self.stats['evictions'] += 1
+
+    def invalidate_task(self, task_id: int) -> int:
+        """Drop everything rendered for a task; returns how many entries were dropped"""
+        keys = self._by_task.pop(task_id, set())
+        dropped = 0
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                dropped += 1
+        self.stats['invalidations'] += dropped
+        return dropped
+
+    def shrink(self, bytes_to_free: int) -> int:
+        """Evict the least recently used entries (memory budget); returns estimated bytes freed"""
+        if not self._entries:
+            return 0
+        average = max(estimate_container_bytes(self._entries) / len(self._entries), 1.0)
+        count = min(len(self._entries), math.ceil(bytes_to_free / average))
+        for _ in range(count):
+            self._evict_oldest()
+        return int(count * average)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_task.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hit_rate': (self.stats['hits'] / lookups * 100) if lookups else 0,
+            **self.stats
+        }
+
+
+def memoised_keyboard(*state_keys: str):
+    """
+    Cache a keyboard method's markup in the BotKeyboards cache
+
+    The key is the method, the user's language (from ``user_id``), the plain
+    arguments such as ``task_id``, and for a settings or task dict only the
+    ``state_keys`` the layout shows, so unrelated settings changes still hit.
+    Empty markups, which the builders return on error, are not cached.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+
+            key = [method.__name__]
+            task_id = None
+            for name, value in list(bound.arguments.items())[1:]:
+                if name == "user_id":
+                    key.append(_user_language(value))
+                elif isinstance(value, dict) or (value is None and name.endswith(("settings", "data"))):
+                    state = value or {}
+                    key.append(tuple(_freeze(state.get(state_key, _MISSING)) for state_key in state_keys))
+                else:
+                    key.append(value)
+                if name == "task_id":
+                    task_id = value
+            key = tuple(key)
+
+            markup = self._cache.get(key)
+            if markup is None:
+                markup = await method(self, *args, **kwargs)
+                if markup.inline_keyboard:
+                    self._cache.put(key, markup, task_id)
+            return markup
+
+        return wrapper
+    return decorator
 
 
 class BotKeyboards:
     """Keyboard layouts for the bot interface"""
 
-    def __init__(self):
-        pass
+    def __init__(self, max_cached_keyboards: int = 2000):
+        # Rendered markups are shared between users and never mutated after building
+        self._cache = KeyboardCache(max_cached_keyboards)
+
+    def invalidate_task(self, task_id: int):
+        """Drop cached keyboards of a task, e.g. after its settings changed"""
+        self._cache.invalidate_task(task_id)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        return self._cache.get_stats()
+
+    def _static_rows(self, name: str, task_id: int, build: Callable[[], List[List[InlineKeyboardButton]]]) -> List[List[InlineKeyboardButton]]:
+        """Rows that do not depend on settings, built once and shared by every variant of a keyboard"""
+        key = ("rows", name, task_id)
+        rows = self._cache.get(key)
+        if rows is None:
+            rows = build()
+            self._cache.put(key, rows, task_id)
+        return rows
     
     def _get_localized_text(self, user_id: int, key: str, fallback: str = None) -> str:
         """Get localized text with fallback"""
@@ -26,6 +190,7 @@ class BotKeyboards:
         except:
             return fallback if fallback else key
 
+    @memoised_keyboard()
     async def get_main_menu_keyboard(self, user_id: int) -> InlineKeyboardMarkup:
         """Get main menu keyboard"""
         try:
@@ -60,6 +225,7 @@ class BotKeyboards:
             logger.error(f"Error creating main menu keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard()
     async def get_tasks_keyboard(self, user_id: int) -> InlineKeyboardMarkup:
         """Get tasks management keyboard"""
         try:
@@ -152,6 +318,7 @@ class BotKeyboards:
             logger.error(f"Error creating task list keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard("is_active", "task_type")
     async def get_task_detail_keyboard(self, task_id: int, task_data: dict, user_id: int = 6556918772) -> InlineKeyboardMarkup:
         """Get task detail keyboard"""
         try:
@@ -197,6 +364,7 @@ class BotKeyboards:
             logger.error(f"Error creating task detail keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard()
     async def get_task_creation_keyboard(self, user_id: int = 6556918772) -> InlineKeyboardMarkup:
         """Get task creation keyboard"""
         try:
@@ -300,6 +468,7 @@ class BotKeyboards:
             logger.error(f"Error creating target management keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard()
     async def get_settings_keyboard(self, user_id: int) -> InlineKeyboardMarkup:
         """Get settings keyboard"""
         try:
@@ -325,6 +494,7 @@ class BotKeyboards:
             logger.error(f"Error creating settings keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard()
     async def get_task_settings_keyboard(self, task_id: int, user_id: int = 6556918772) -> InlineKeyboardMarkup:
         """Get task settings keyboard with localization"""
         try:
@@ -358,6 +528,10 @@ class BotKeyboards:
             logger.error(f"Error creating task settings keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard(
+        "manual_mode", "link_preview", "pin_messages", "silent_mode", "sync_edits",
+        "sync_deletes", "preserve_replies", "forward_mode"
+    )
     async def get_forward_settings_keyboard(self, task_id: int, settings: Dict[str, Any] = None) -> InlineKeyboardMarkup:
         """Get advanced forward settings keyboard"""
         try:
@@ -467,7 +641,13 @@ class BotKeyboards:
             logger.error(f"Error creating manual approval keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
-    async def get_media_types_keyboard(self, task_id: int, settings: Dict[str, Any] = None) -> InlineKeyboardMarkup:
+    @memoised_keyboard(
+        "allow_text", "allow_photos", "allow_videos", "allow_documents", "allow_audio",
+        "allow_voice", "allow_video_notes", "allow_stickers", "allow_animations",
+        "allow_contacts", "allow_locations", "allow_venues", "allow_polls", "allow_dice"
+    )
+    async def get_media_types_keyboard(self, task_id: int, settings: Dict[str, Any] = None,
+                                       user_id: int = 6556918772) -> InlineKeyboardMarkup:
         """Get comprehensive media types filter keyboard"""
         try:
             if not settings:
@@ -524,7 +704,7 @@ class BotKeyboards:
                     keyboard.append(row)
 
             # Control buttons
-            keyboard.extend([
+            keyboard.extend(self._static_rows("media_controls", task_id, lambda: [
                 [
                     InlineKeyboardButton(text="✅ تفعيل الكل", callback_data=f"media_enable_all_{task_id}"),
                     InlineKeyboardButton(text="❌ تعطيل الكل", callback_data=f"media_disable_all_{task_id}")
@@ -536,7 +716,7 @@ class BotKeyboards:
                 [
                     InlineKeyboardButton(text="🔙 العودة للفلاتر", callback_data=f"setting_filters_{task_id}")
                 ]
-            ])
+            ]))
 
             return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
@@ -560,6 +740,7 @@ class BotKeyboards:
             logger.error(f"Error creating confirmation keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard()
     async def get_back_to_main_keyboard(self, user_id: int = 6556918772) -> InlineKeyboardMarkup:
         """Get back to main menu keyboard"""
         try:
@@ -577,6 +758,7 @@ class BotKeyboards:
             logger.error(f"Error creating back to main keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard()
     async def get_admin_keyboard(self, user_id: int) -> InlineKeyboardMarkup:
         """Get admin management keyboard"""
         try:
@@ -606,6 +788,7 @@ class BotKeyboards:
             logger.error(f"Error creating admin keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard()
     async def get_forward_mode_keyboard(self, task_id: int, current_mode: str = "copy") -> InlineKeyboardMarkup:
         """Get forward mode selection keyboard"""
         try:
@@ -635,6 +818,7 @@ class BotKeyboards:
             logger.error(f"Error creating forward mode keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard()
     async def get_boolean_setting_keyboard(self, task_id: int, setting_name: str, 
                                          current_value: bool = False) -> InlineKeyboardMarkup:
         """Get boolean setting keyboard"""
@@ -679,6 +863,7 @@ class BotKeyboards:
 
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
+    @memoised_keyboard()
     async def get_filter_settings_keyboard(self, task_id: int, current_settings: dict) -> InlineKeyboardMarkup:
         """Get filter settings keyboard - Updated to include day filter moved from Advanced"""
         try:
@@ -717,6 +902,7 @@ class BotKeyboards:
             logger.error(f"Error creating filter settings keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard("language_filter_mode", "allowed_languages")
     async def get_language_filter_keyboard(self, task_id: int, current_settings: dict) -> InlineKeyboardMarkup:
         """Get language filter management keyboard"""
         try:
@@ -769,7 +955,7 @@ class BotKeyboards:
                 keyboard.append(row)
 
             # Management buttons
-            keyboard.extend([
+            keyboard.extend(self._static_rows("language_filter_controls", task_id, lambda: [
                 [
                     InlineKeyboardButton(text="🔄 Clear All", callback_data=f"lang_clear_{task_id}"),
                     InlineKeyboardButton(text="📋 Add Custom", callback_data=f"lang_custom_{task_id}")
@@ -778,7 +964,7 @@ class BotKeyboards:
                     InlineKeyboardButton(text="💾 Save", callback_data=f"lang_save_{task_id}"),
                     InlineKeyboardButton(text="🔙 Back", callback_data=f"setting_filters_{task_id}")
                 ]
-            ])
+            ]))
 
             return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
@@ -824,6 +1010,7 @@ class BotKeyboards:
             logger.error(f"Error creating pagination keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard()
     async def get_advanced_settings_keyboard(self, task_id: int, settings: Dict[str, Any] = None) -> InlineKeyboardMarkup:
         """Get advanced features settings keyboard - cleaned up after moving buttons to appropriate sections"""
         try:
@@ -848,6 +1035,7 @@ class BotKeyboards:
             logger.error(f"Error creating advanced settings keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard("source_language", "target_language", "auto_translate")
     async def get_advanced_translation_keyboard(self, task_id: int, settings: Dict[str, Any] = None) -> InlineKeyboardMarkup:
         """Get comprehensive translation settings keyboard"""
         try:
@@ -926,6 +1114,10 @@ class BotKeyboards:
             logger.error(f"Error creating advanced translation keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard(
+        "working_hours_enabled", "start_hour", "end_hour", "timezone", "break_start_hour",
+        "break_end_hour", "out_of_window_mode"
+    )
     async def get_advanced_working_hours_keyboard(self, task_id: int, settings: Dict[str, Any] = None) -> InlineKeyboardMarkup:
         """Get comprehensive working hours settings keyboard"""
         try:
@@ -948,6 +1140,12 @@ class BotKeyboards:
                         text=f"{'✅' if working_hours_enabled else '❌'} تفعيل ساعات العمل",
                         callback_data=f"toggle_working_hours_{task_id}"
                     )
+                ],
+                [
+                    InlineKeyboardButton(
+                        text=f"{'⏳ تأجيل' if settings.get('out_of_window_mode') == 'defer' else '🗑️ تجاهل'} الرسائل خارج الأوقات",
+                        callback_data=f"toggle_window_defer_{task_id}"
+                    )
                 ]
             ])
 
@@ -1032,6 +1230,7 @@ class BotKeyboards:
             logger.error(f"Error creating advanced working hours keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard("recurring_post_enabled", "recurring_interval_hours")
     async def get_advanced_recurring_keyboard(self, task_id: int, settings: Dict[str, Any] = None) -> InlineKeyboardMarkup:
         """Get comprehensive recurring post settings keyboard"""
         try:
@@ -1076,7 +1275,7 @@ class BotKeyboards:
                 keyboard.extend(interval_rows)
 
                 # Post management
-                keyboard.extend([
+                keyboard.extend(self._static_rows("recurring_post_management", task_id, lambda: [
                     [InlineKeyboardButton(text="📝 إدارة المنشورات المتكررة", callback_data="dummy")],
                     [
                         InlineKeyboardButton(text="➕ إضافة منشور جديد", callback_data=f"add_recurring_post_{task_id}"),
@@ -1090,7 +1289,7 @@ class BotKeyboards:
                         InlineKeyboardButton(text="📊 إحصائيات المنشورات", callback_data=f"recurring_stats_{task_id}"),
                         InlineKeyboardButton(text="🔄 تشغيل فوري", callback_data=f"run_recurring_now_{task_id}")
                     ]
-                ])
+                ]))
 
                 keyboard.append([InlineKeyboardButton(text="🔙 العودة للميزات المتقدمة", callback_data=f"setting_advanced_{task_id}")])
 
@@ -1100,6 +1299,7 @@ class BotKeyboards:
             logger.error(f"Error creating advanced recurring keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard("auto_translate", "target_language")
     async def get_translation_settings_keyboard(self, task_id: int, settings: Dict[str, Any] = None) -> InlineKeyboardMarkup:
         """Get translation settings keyboard"""
         try:
@@ -1151,6 +1351,7 @@ class BotKeyboards:
             logger.error(f"Error creating translation settings keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard("working_hours_enabled", "start_hour", "end_hour", "timezone")
     async def get_working_hours_keyboard(self, task_id: int, settings: Dict[str, Any] = None) -> InlineKeyboardMarkup:
         """Get working hours settings keyboard"""
         try:
@@ -1211,6 +1412,7 @@ class BotKeyboards:
             logger.error(f"Error creating working hours keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard("recurring_post_enabled", "recurring_interval_hours")
     async def get_recurring_post_keyboard(self, task_id: int, settings: Dict[str, Any] = None) -> InlineKeyboardMarkup:
         """Get recurring post settings keyboard"""
         try:
@@ -1252,32 +1454,22 @@ class BotKeyboards:
                     interval_rows.append(row)
                 keyboard.extend(interval_rows)
 
-                # Custom interval
-                keyboard.append([InlineKeyboardButton(text="⚙️ فترة مخصصة", callback_data=f"set_custom_interval_{task_id}")])
-
-                # Content management
-                keyboard.extend([
+                # Custom interval, content management, scheduling and advanced options
+                keyboard.extend(self._static_rows("recurring_post_options", task_id, lambda: [
+                    [InlineKeyboardButton(text="⚙️ فترة مخصصة", callback_data=f"set_custom_interval_{task_id}")],
                     [InlineKeyboardButton(text="📝 إنشاء محتوى جديد", callback_data=f"create_recurring_content_{task_id}")],
                     [InlineKeyboardButton(text="✏️ تعديل المحتوى", callback_data=f"edit_recurring_content_{task_id}")],
                     [InlineKeyboardButton(text="📋 عرض المحتوى الحالي", callback_data=f"view_recurring_content_{task_id}")],
-                    [InlineKeyboardButton(text="🗂️ قائمة المحتويات", callback_data=f"list_recurring_content_{task_id}")]
-                ])
-
-                # Scheduling options
-                keyboard.append([InlineKeyboardButton(text="📅 خيارات الجدولة", callback_data="dummy")])
-                keyboard.extend([
+                    [InlineKeyboardButton(text="🗂️ قائمة المحتويات", callback_data=f"list_recurring_content_{task_id}")],
+                    [InlineKeyboardButton(text="📅 خيارات الجدولة", callback_data="dummy")],
                     [InlineKeyboardButton(text="🕐 تحديد وقت البداية", callback_data=f"set_recurring_start_time_{task_id}")],
                     [InlineKeyboardButton(text="📊 عرض الجدولة القادمة", callback_data=f"view_recurring_schedule_{task_id}")],
                     [InlineKeyboardButton(text="⏸️ إيقاف مؤقت", callback_data=f"pause_recurring_{task_id}")],
-                    [InlineKeyboardButton(text="🔄 إعادة تشغيل الآن", callback_data=f"restart_recurring_{task_id}")]
-                ])
-
-                # Advanced options
-                keyboard.extend([
+                    [InlineKeyboardButton(text="🔄 إعادة تشغيل الآن", callback_data=f"restart_recurring_{task_id}")],
                     [InlineKeyboardButton(text="🗑️ حذف المنشورات السابقة", callback_data=f"toggle_delete_previous_{task_id}")],
                     [InlineKeyboardButton(text="📈 إحصائيات المنشورات", callback_data=f"recurring_stats_{task_id}")],
                     [InlineKeyboardButton(text="📄 سجل المنشورات", callback_data=f"recurring_log_{task_id}")]
-                ])
+                ]))
 
             keyboard.append([InlineKeyboardButton(text="🔙 العودة للمتقدم", callback_data=f"setting_advanced_{task_id}")])
 
@@ -1287,6 +1479,7 @@ class BotKeyboards:
             logger.error(f"Error creating recurring post keyboard: {e}")
             return InlineKeyboardMarkup(inline_keyboard=[])
 
+    @memoised_keyboard("delay_min", "delay_max", "max_message_length", "send_limit")
     async def get_limits_settings_keyboard(self, task_id: int, settings: Dict[str, Any] = None) -> InlineKeyboardMarkup:
         """Get limits settings keyboard - Updated per user requirements"""
         try:
@@ -1308,6 +1501,9 @@ class BotKeyboards:
                 [
                     InlineKeyboardButton(text="🚦 حدود الإرسال", callback_data=f"advanced_sending_limit_{task_id}")
                 ],
+                [
+                    InlineKeyboardButton(text="📰 وضع الملخص", callback_data=f"advanced_digest_{task_id}")
+                ],
                 [
                     InlineKeyboardButton(text="🔙 Back to Settings", callback_data=f"task_settings_{task_id}")
                 ]
@@ -4,17 +4,66 @@ Supports Arabic and English with dynamic language switching
 """
 
 import json
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from string import Formatter
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional
 from loguru import logger
 
+
+_FORMATTER = Formatter()
+
+
+class _Template:
+    """A catalogue string parsed once, so formatting is a join over its parts"""
+    
+    __slots__ = ("text", "parts", "simple")
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.parts = []  # literal strings and (field, conversion, format_spec) tuples
+        self.simple = True
+        for literal, field, format_spec, conversion in _FORMATTER.parse(text):
+            if literal:
+                self.parts.append(literal)
+            if field is not None:
+                # Positional, attribute and index fields are left to str.format
+                if not field.isidentifier() or (format_spec and "{" in format_spec):
+                    self.simple = False
+                self.parts.append((field, conversion, format_spec))
+    
+    def format(self, values: Dict[str, Any]) -> str:
+        if not self.simple:
+            return self.text.format(**values)
+        out = []
+        for part in self.parts:
+            if part.__class__ is str:
+                out.append(part)
+                continue
+            field, conversion, format_spec = part
+            value = values[field]
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "a":
+                value = ascii(value)
+            elif conversion == "s":
+                value = str(value)
+            out.append(format(value, format_spec) if format_spec else str(value))
+        return "".join(out)
+
+
 class LocalizationManager:
     """Manages multi-language support for the bot"""
     
-    def __init__(self):
+    def __init__(self, max_cached_users: int = 10000):
         self.languages = {}
-        self.user_languages = {}  # Store user language preferences
         self.default_language = "en"
+        # Bounded cache of users.language, loaded lazily and written through
+        self.user_languages: "OrderedDict[int, str]" = OrderedDict()
+        self.max_cached_users = max_cached_users
+        self.database = None
         self._load_translations()
+        self._compile()
     
     def _load_translations(self):
         """Load all translation strings"""
@@ -597,41 +646,96 @@ Choose your preferred language using the settings menu.
         
         logger.info("Localization system initialized with Arabic and English support")
     
+    def _compile(self):
+        """Freeze the catalogue into one table per language with default-language fallbacks filled in"""
+        default = {key: _Template(text) for key, text in self.languages[self.default_language].items()}
+        self._tables: Dict[str, Mapping[str, _Template]] = {}
+        for language, strings in self.languages.items():
+            if language == self.default_language:
+                table = default
+            else:
+                table = dict(default)
+                table.update((key, _Template(text)) for key, text in strings.items())
+            self._tables[language] = MappingProxyType(table)
+        self._missing_keys = set()
+    
+    def attach_database(self, database):
+        """Database holding users.language, used to load and persist preferences"""
+        self.database = database
+    
+    def _remember(self, user_id: int, language: str):
+        self.user_languages[user_id] = language
+        self.user_languages.move_to_end(user_id)
+        while len(self.user_languages) > self.max_cached_users:
+            self.user_languages.popitem(last=False)
+    
     def set_user_language(self, user_id: int, language: str):
-        """Set user's preferred language"""
-        if language in self.languages:
-            self.user_languages[user_id] = language
+        """Set user's preferred language for this process; save_user_language also persists it"""
+        if language in self._tables:
+            self._remember(user_id, language)
             logger.info(f"User {user_id} language set to {language}")
             return True
         return False
     
+    async def save_user_language(self, user_id: int, language: str) -> bool:
+        """Set user's preferred language and write it through to users.language"""
+        if not self.set_user_language(user_id, language):
+            return False
+        if self.database is not None:
+            await self.database.execute_command(
+                "UPDATE users SET language = $1 WHERE telegram_id = $2",
+                language, user_id
+            )
+        return True
+    
+    async def ensure_user_language(self, user_id: int) -> str:
+        """Load the user's language from the database unless it is already cached"""
+        language = self.user_languages.get(user_id)
+        if language is not None:
+            return language
+        if self.database is None:
+            return self.default_language
+        
+        try:
+            rows = await self.database.execute_query(
+                "SELECT language FROM users WHERE telegram_id = $1", user_id
+            )
+        except Exception as e:
+            logger.warning(f"Could not load user language preference: {e}")
+            return self.default_language
+        
+        language = rows[0]["language"] if rows else None
+        if language not in self._tables:
+            language = self.default_language
+        self._remember(user_id, language)
+        return language
+    
     def get_user_language(self, user_id: int) -> str:
         """Get user's preferred language"""
-        return self.user_languages.get(user_id, self.default_language)
+        language = self.user_languages.get(user_id)
+        if language is None:
+            return self.default_language
+        self.user_languages.move_to_end(user_id)
+        return language
     
     def get_text(self, user_id: int, key: str, **kwargs) -> str:
         """Get localized text for user"""
-        language = self.get_user_language(user_id)
-        
-        if language in self.languages and key in self.languages[language]:
-            text = self.languages[language][key]
-            try:
-                return text.format(**kwargs) if kwargs else text
-            except KeyError as e:
-                logger.warning(f"Missing format parameter {e} for key {key}")
-                return text
+        template = self._tables[self.get_user_language(user_id)].get(key)
         
-        # Fallback to default language
-        if key in self.languages[self.default_language]:
-            text = self.languages[self.default_language][key]
-            try:
-                return text.format(**kwargs) if kwargs else text
-            except KeyError:
-                return text
+        if template is None:
+            # Last resort fallback
+            if key not in self._missing_keys:
+                self._missing_keys.add(key)
+                logger.warning(f"Missing translation key: {key}")
+            return key
         
-        # Last resort fallback
-        logger.warning(f"Missing translation key: {key}")
-        return key
+        if not kwargs:
+            return template.text
+        try:
+            return template.format(kwargs)
+        except (KeyError, IndexError) as e:
+            logger.warning(f"Missing format parameter {e} for key {key}")
+            return template.text
     
     def get_available_languages(self) -> Dict[str, str]:
         """Get list of available languages"""
@@ -0,0 +1,230 @@
+"""
+Log partitions - Range partitioning of forwarding_logs by processed_at on PostgreSQL
+"""
+
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+TABLE = "forwarding_logs"
+LEGACY_TABLE = f"{TABLE}_legacy"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+# Arbitrary fixed key so only one replica converts the table
+CONVERT_LOCK_KEY = 0x6C6F6770  # "logp"
+
+# Indexes on the partitioned parent; every partition gets a local copy
+PARENT_INDEXES = (
+    ("idx_log_task_status", "task_id, status"),
+    ("idx_log_processed_at", "processed_at"),
+    ("idx_log_source_message", "source_chat_id, message_id"),
+)
+
+_BOUND = re.compile(r"FROM \((MINVALUE|'[^']+')\) TO \((MAXVALUE|'[^']+')\)")
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+class LogPartitionManager:
+    """Creates, lists and retires range partitions of forwarding_logs.
+
+    Partitions cover ``span_days`` each, aligned to the Unix epoch so every replica
+    picks the same boundaries. Rows outside every range land in a DEFAULT partition
+    instead of failing the insert.
+    """
+
+    def __init__(self, pool, span_days: int = 1, ahead_days: int = 7, retention_mode: str = "drop"):
+        self.pool = pool
+        self.span_days = max(1, span_days)
+        self.ahead_days = max(1, ahead_days)
+        self.retention_mode = retention_mode if retention_mode in ("drop", "detach") else "drop"
+
+    def span_start(self, day: date) -> date:
+        """First day of the partition containing the given day"""
+        return day - timedelta(days=(day - _EPOCH).days % self.span_days)
+
+    def partition_name(self, start: date) -> str:
+        return f"{TABLE}_p{start:%Y%m%d}"
+
+    async def is_partitioned(self, conn) -> bool:
+        relkind = await conn.fetchval(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass($1)", TABLE
+        )
+        return relkind == "p"
+
+    async def convert(self):
+        """Turn a plain forwarding_logs table into a partitioned one, keeping existing rows.
+
+        The old table is renamed and attached as a single partition ending at the close
+        of the current span, so no rows are copied. An empty old table is dropped instead.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", CONVERT_LOCK_KEY)
+                if await self.is_partitioned(conn):
+                    return
+
+                logger.info("Converting forwarding_logs to a partitioned table")
+                await conn.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY_TABLE}")
+
+                # Index and constraint names are schema-wide; free them for the parent
+                for row in await conn.fetch(
+                    "SELECT indexname FROM pg_indexes WHERE tablename = $1", LEGACY_TABLE
+                ):
+                    name = row["indexname"]
+                    if name.endswith("_pkey"):
+                        await conn.execute(
+                            f"ALTER TABLE {LEGACY_TABLE} RENAME CONSTRAINT {name} TO {LEGACY_TABLE}_pkey"
+                        )
+                    else:
+                        await conn.execute(f"ALTER INDEX {name} RENAME TO {name}_legacy")
+
+                await conn.execute(f"""
+                    CREATE TABLE {TABLE} (
+                        LIKE {LEGACY_TABLE} INCLUDING DEFAULTS,
+                        PRIMARY KEY (id, processed_at),
+                        FOREIGN KEY (task_id) REFERENCES tasks(id)
+                    ) PARTITION BY RANGE (processed_at)
+                """)
+
+                # The id sequence must outlive the legacy table once retention drops it
+                sequence = await conn.fetchval("SELECT pg_get_serial_sequence($1, 'id')", LEGACY_TABLE)
+                if sequence:
+                    await conn.execute(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id")
+
+                for name, columns in PARENT_INDEXES:
+                    await conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {TABLE} ({columns})")
+
+                has_rows = await conn.fetchval(f"SELECT EXISTS (SELECT 1 FROM {LEGACY_TABLE})")
+                if has_rows:
+                    today = await conn.fetchval("SELECT CURRENT_DATE")
+                    newest = await conn.fetchval(f"SELECT MAX(processed_at) FROM {LEGACY_TABLE}")
+                    last_day = max(today, newest.date()) if newest else today
+                    upper = self.span_start(last_day) + timedelta(days=self.span_days)
+                    await conn.execute(f"""
+                        ALTER TABLE {TABLE} ATTACH PARTITION {LEGACY_TABLE}
+                        FOR VALUES FROM (MINVALUE) TO ('{upper.isoformat()}')
+                    """)
+                    logger.info(f"Attached existing logs as partition {LEGACY_TABLE} (up to {upper})")
+                else:
+                    await conn.execute(f"DROP TABLE {LEGACY_TABLE}")
+
+                await conn.execute(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+
+    async def list_partitions(self, conn) -> List[Dict[str, Any]]:
+        """Range partitions with their bounds; a None bound means MINVALUE/MAXVALUE"""
+        rows = await conn.fetch("""
+            SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound,
+                   c.reltuples::bigint AS estimated_rows
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass($1)
+            ORDER BY c.relname
+        """, TABLE)
+
+        partitions = []
+        for row in rows:
+            match = _BOUND.search(row["bound"] or "")
+            if not match:
+                continue  # the DEFAULT partition
+            partitions.append({
+                "name": row["name"],
+                "lower": _parse_bound(match.group(1)),
+                "upper": _parse_bound(match.group(2)),
+                "estimated_rows": max(row["estimated_rows"] or 0, 0)
+            })
+        return partitions
+
+    async def ensure_future(self) -> int:
+        """Create partitions from the current span through ``ahead_days`` from today"""
+        created = 0
+        async with self.pool.acquire() as conn:
+            today = await conn.fetchval("SELECT CURRENT_DATE")
+            existing = [(p["lower"], p["upper"]) for p in await self.list_partitions(conn)]
+
+            start = self.span_start(today)
+            horizon = today + timedelta(days=self.ahead_days)
+            while start <= horizon:
+                end = start + timedelta(days=self.span_days)
+                if not self._overlaps(existing, start, end):
+                    name = self.partition_name(start)
+                    try:
+                        await conn.execute(f"""
+                            CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE}
+                            FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')
+                        """)
+                        created += 1
+                    except Exception as e:
+                        # Usually rows for this range already sit in the DEFAULT partition
+                        logger.warning(f"Could not create log partition {name}: {e}")
+                start = end
+
+        if created:
+            logger.info(f"Created {created} forwarding_logs partitions")
+        return created
+
+    @staticmethod
+    def _overlaps(existing: List[Tuple[Optional[datetime], Optional[datetime]]], start: date, end: date) -> bool:
+        start_at = datetime.combine(start, datetime.min.time())
+        end_at = datetime.combine(end, datetime.min.time())
+        for lower, upper in existing:
+            if (lower is None or lower < end_at) and (upper is None or upper > start_at):
+                return True
+        return False
+
+    async def retire(self, retention_days: int) -> Tuple[int, int]:
+        """Drop or detach partitions that end before the retention cutoff.
+
+        Returns (partitions retired, rows removed; estimated for whole partitions). A
+        partition straddling the cutoff is kept until it expires completely, except the
+        open-ended one holding pre-partitioning rows, which is trimmed row by row.
+        """
+        retired, rows = 0, 0
+        async with self.pool.acquire() as conn:
+            today = await conn.fetchval("SELECT CURRENT_DATE")
+            cutoff = datetime.combine(today - timedelta(days=retention_days), datetime.min.time())
+
+            for partition in await self.list_partitions(conn):
+                upper = partition["upper"]
+                name = partition["name"]
+                if upper is None or upper > cutoff:
+                    if partition["lower"] is None:
+                        result = await conn.execute(f"DELETE FROM {name} WHERE processed_at < $1", cutoff)
+                        rows += int(result.split()[-1])
+                    continue
+                try:
+                    if self.retention_mode == "detach":
+                        await conn.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+                    else:
+                        await conn.execute(f"DROP TABLE {name}")
+                    retired += 1
+                    rows += partition["estimated_rows"]
+                    logger.info(f"Retired log partition {name} ({self.retention_mode})")
+                except Exception as e:
+                    logger.warning(f"Could not retire log partition {name}: {e}")
+
+        return retired, rows
+
+    async def get_stats(self) -> Dict[str, Any]:
+        async with self.pool.acquire() as conn:
+            partitions = await self.list_partitions(conn)
+            default_rows = await conn.fetchval(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass($1)", DEFAULT_PARTITION
+            )
+        return {
+            "partitions": len(partitions),
+            "oldest": min((p["lower"] for p in partitions if p["lower"]), default=None),
+            "newest": max((p["upper"] for p in partitions if p["upper"]), default=None),
+            "default_rows": max(default_rows or 0, 0),
+            "span_days": self.span_days,
+            "retention_mode": self.retention_mode
+        }
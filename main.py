@@ -27,6 +27,8 @@ from forwarding_engine import ForwardingEngine
 from security import SecurityManager
 from modules.statistics import StatisticsManager
 from modules.settings_manager import SettingsManager
+from modules.sharding import ShardSupervisor
+from utils.job_scheduler import get_job_scheduler
 
 
 class TelegramForwardingBot:
@@ -42,6 +44,7 @@ class TelegramForwardingBot:
         self.bot_controller = None
         self.security_manager = None
         self.webhook_app = None
+        self.shard_supervisor = None
         self.running = False
 
     async def initialize(self):
@@ -50,7 +53,14 @@ class TelegramForwardingBot:
             logger.info("Initializing Telegram Forwarding Bot...")
 
             # Initialize database
-            self.database = Database(self.config.database_url)
+            self.database = Database(
+                self.config.database_url,
+                slow_query_ms=self.config.slow_query_ms,
+                log_retention_days=self.config.log_retention_days,
+                log_partition_days=self.config.log_partition_days,
+                log_partitions_ahead=self.config.log_partitions_ahead,
+                log_retention_mode=self.config.log_retention_mode
+            )
             await self.database.initialize()
             logger.success("Database initialized successfully")
 
@@ -103,11 +113,22 @@ class TelegramForwardingBot:
                 database=self.database,
                 bot=self.bot,
                 userbot=self.userbot,
-                security_manager=self.security_manager
+                security_manager=self.security_manager,
+                startup_concurrency=self.config.startup_concurrency,
+                snapshot_path=self.config.registry_snapshot_path,
+                ingest_workers=self.config.ingest_workers,
+                outbound_rate=self.config.outbound_rate
             )
             await self.forwarding_engine.initialize()
             logger.success("Forwarding engine initialized")
 
+            # Hand channel updates to worker processes sharded by source chat
+            if self.config.shard_workers > 0:
+                self.shard_supervisor = ShardSupervisor(self.config.shard_workers)
+                await self.shard_supervisor.start()
+                self.forwarding_engine.shard_router = self.shard_supervisor
+                logger.success(f"Sharded mode enabled with {self.config.shard_workers} workers")
+
             # Initialize bot controller
             self.bot_controller = BotController(
                 bot=self.bot,
@@ -259,6 +280,24 @@ class TelegramForwardingBot:
                         headers={"Content-Type": "text/plain"}
                     )
 
+            # Liveness: the process and engine loop are responsive
+            async def liveness_check(request):
+                health = self.forwarding_engine.get_health()
+                return web.json_response(
+                    {"status": "alive" if health["alive"] else "dead", **health},
+                    status=200 if health["alive"] else 503
+                )
+
+            # Readiness: monitors are started and the database answers
+            async def readiness_check(request):
+                health = self.forwarding_engine.get_health()
+                database_ok = await self.database.health_check()
+                ready = health["ready"] and database_ok
+                return web.json_response(
+                    {"status": "ready" if ready else "not_ready", "database": database_ok, **health},
+                    status=200 if ready else 503
+                )
+
             # Add webhook info endpoint
             async def webhook_info(request):
                 try:
@@ -276,6 +315,8 @@ class TelegramForwardingBot:
                     return web.json_response({"error": str(e)}, status=500)
 
             self.webhook_app.router.add_get("/health", health_check)
+            self.webhook_app.router.add_get("/health/live", liveness_check)
+            self.webhook_app.router.add_get("/health/ready", readiness_check)
             self.webhook_app.router.add_get("/webhook-info", webhook_info)
             self.webhook_app.router.add_get("/", lambda r: web.Response(text="Telegram Forwarding Bot", status=200))
 
@@ -293,6 +334,7 @@ class TelegramForwardingBot:
 
                 logger.success(f"Webhook server started on port {self.config.webhook_port}")
                 logger.info(f"Health check available at: http://0.0.0.0:{self.config.webhook_port}/health")
+                logger.info(f"Liveness/readiness available at: /health/live and /health/ready")
                 logger.info(f"Webhook info available at: http://0.0.0.0:{self.config.webhook_port}/webhook-info")
 
             except Exception as server_error:
@@ -340,11 +382,21 @@ class TelegramForwardingBot:
         self.running = False
 
         try:
+            # Stop shard workers first so they can flush their queues
+            if self.shard_supervisor:
+                await self.shard_supervisor.stop()
+                if self.forwarding_engine:
+                    self.forwarding_engine.shard_router = None
+                logger.success("Shard workers stopped")
+
             # Stop forwarding engine
             if self.forwarding_engine:
                 await self.forwarding_engine.stop()
                 logger.success("Forwarding engine stopped")
 
+            # Stop periodic jobs before their resources go away
+            await get_job_scheduler().stop()
+
             # Stop userbot
             if self.userbot and self.userbot.is_connected():
                 await self.userbot.disconnect()
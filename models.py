@@ -81,6 +81,7 @@ class Source(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     added_at = Column(DateTime, default=func.now(), nullable=False)
     created_at = Column(DateTime, default=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # Relationships
     task = relationship("Task", back_populates="sources")
@@ -108,6 +109,7 @@ class Target(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     added_at = Column(DateTime, default=func.now(), nullable=False)
     created_at = Column(DateTime, default=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # Relationships
     task = relationship("Task", back_populates="targets")
@@ -6,10 +6,14 @@ from .task_manager import TaskManager
 from .channel_monitor import ChannelMonitor
 from .statistics import StatisticsManager
 from .settings_manager import SettingsManager
+from .repositories import Repositories
+from .message_snapshot import MessageSnapshot
 
 __all__ = [
     "TaskManager",
     "ChannelMonitor", 
     "StatisticsManager",
-    "SettingsManager"
+    "SettingsManager",
+    "Repositories",
+    "MessageSnapshot"
 ]
@@ -194,17 +194,17 @@ class ChannelMonitor:
             
             self.messages_processed += 1
             
-            # Forward to forwarding engine
-            success = await self.forwarding_engine.process_message(
+            # Queue for the forwarding engine
+            success = await self.forwarding_engine.submit_message(
                 task_id=self.task_id,
                 source_chat_id=message.chat.id,
                 message=message
             )
             
             if success:
-                logger.debug(f"Message processed successfully for task {self.task_id}")
+                logger.debug(f"Message queued for task {self.task_id}")
             else:
-                logger.debug(f"Message processing failed for task {self.task_id}")
+                logger.debug(f"Message could not be queued for task {self.task_id}")
                 
         except Exception as e:
             logger.error(f"Error processing message for task {self.task_id}: {e}")
@@ -0,0 +1,328 @@
+"""
+Delivery Window - Precompiled working-hours/day schedules and a deferred delivery queue
+"""
+
+import asyncio
+import heapq
+import json
+import os
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import pytz
+from loguru import logger
+
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+OUT_OF_WINDOW_MODES = ("drop", "defer")
+
+
+def window_fingerprint(settings: Dict[str, Any]) -> Tuple:
+    """Settings that shape a task's delivery window"""
+    day_filter_settings = settings.get("day_filter_settings")
+    if isinstance(day_filter_settings, dict):
+        day_filter_settings = json.dumps(day_filter_settings, sort_keys=True)
+    return (
+        settings.get("working_hours_enabled", False),
+        settings.get("start_hour", 0),
+        settings.get("end_hour", 23),
+        settings.get("timezone") or "UTC",
+        settings.get("day_filter_enabled", False),
+        day_filter_settings
+    )
+
+
+class DeliveryWindow:
+    """A task's weekly schedule compiled to a minute bitmap in the task's timezone"""
+
+    __slots__ = ("tz", "open_minutes", "minutes_until_open", "allowed_days", "hours_enabled", "days_enabled")
+
+    def __init__(self, tz, open_minutes: bytearray, allowed_days: Tuple[bool, ...],
+                 hours_enabled: bool, days_enabled: bool):
+        self.tz = tz
+        self.open_minutes = open_minutes
+        self.allowed_days = allowed_days
+        self.hours_enabled = hours_enabled
+        self.days_enabled = days_enabled
+
+        # Distance to the next open minute for every minute of the week; 0 when open
+        self.minutes_until_open = None
+        if not any(open_minutes):
+            return
+        self.minutes_until_open = array("H", bytes(2 * MINUTES_PER_WEEK))
+        distance = MINUTES_PER_WEEK
+        for minute in range(2 * MINUTES_PER_WEEK - 1, -1, -1):
+            index = minute % MINUTES_PER_WEEK
+            distance = 0 if open_minutes[index] else distance + 1
+            if minute < MINUTES_PER_WEEK:
+                self.minutes_until_open[index] = distance
+
+    @classmethod
+    def compile(cls, settings: Dict[str, Any]) -> Optional["DeliveryWindow"]:
+        """Build the window for a task; None when no time restriction is enabled"""
+        hours_enabled = bool(settings.get("working_hours_enabled", False))
+        days_enabled = bool(settings.get("day_filter_enabled", False))
+        if not hours_enabled and not days_enabled:
+            return None
+
+        timezone_str = settings.get("timezone") or "UTC"
+        try:
+            tz = pytz.timezone(timezone_str)
+        except Exception:
+            logger.warning(f"Unknown timezone '{timezone_str}', using UTC")
+            tz = pytz.UTC
+
+        # Hours are inclusive on both ends, e.g. 9-17 covers 09:00-17:59
+        hours = [True] * 24
+        if hours_enabled:
+            start_hour = settings.get("start_hour", 0)
+            end_hour = settings.get("end_hour", 23)
+            for hour in range(24):
+                if start_hour <= end_hour:
+                    hours[hour] = start_hour <= hour <= end_hour
+                else:
+                    # Overnight case: 22 to 6
+                    hours[hour] = hour >= start_hour or hour <= end_hour
+
+        allowed_days = tuple([True] * 7)
+        if days_enabled:
+            day_filter_settings = settings.get("day_filter_settings") or {}
+            if isinstance(day_filter_settings, str):
+                try:
+                    day_filter_settings = json.loads(day_filter_settings)
+                except ValueError:
+                    day_filter_settings = {}
+            allowed_days = tuple(bool(day_filter_settings.get(day, True)) for day in DAYS)
+
+        open_minutes = bytearray(MINUTES_PER_WEEK)
+        for day in range(7):
+            if not allowed_days[day]:
+                continue
+            for hour in range(24):
+                if hours[hour]:
+                    start = day * MINUTES_PER_DAY + hour * 60
+                    open_minutes[start:start + 60] = b"\x01" * 60
+
+        return cls(tz, open_minutes, allowed_days, hours_enabled, days_enabled)
+
+    def _now(self, now: Optional[datetime] = None) -> datetime:
+        return now.astimezone(self.tz) if now else datetime.now(self.tz)
+
+    def minute_of_week(self, now: Optional[datetime] = None) -> int:
+        local = self._now(now)
+        return local.weekday() * MINUTES_PER_DAY + local.hour * 60 + local.minute
+
+    def is_open(self, now: Optional[datetime] = None) -> bool:
+        """Whether delivery is allowed right now"""
+        return bool(self.open_minutes[self.minute_of_week(now)])
+
+    def closed_reason(self, now: Optional[datetime] = None) -> str:
+        """Which restriction closed the window: day_filter or working_hours"""
+        if self.days_enabled and not self.allowed_days[self._now(now).weekday()]:
+            return "day_filter"
+        return "working_hours"
+
+    def seconds_until_open(self, now: Optional[datetime] = None) -> Optional[float]:
+        """Seconds until the window next opens; None if it never opens"""
+        if self.minutes_until_open is None:
+            return None
+        local = self._now(now)
+        minutes = self.minutes_until_open[local.weekday() * MINUTES_PER_DAY + local.hour * 60 + local.minute]
+        if not minutes:
+            return 0.0
+        return max(0.0, minutes * 60 - local.second - local.microsecond / 1_000_000)
+
+
+class DeferredDeliveryQueue:
+    """Holds out-of-window messages in per-minute buckets and releases them when the window opens"""
+
+    def __init__(self, handler: Callable[[int, int, Any], Awaitable[Any]], max_items: int = 50000,
+                 release_concurrency: int = 4, path: str = "data/deferred_delivery.jsonl",
+                 message_loader: Optional[Callable[[str], Any]] = None):
+        self.handler = handler
+        self.max_items = max_items
+        self.release_concurrency = max(1, release_concurrency)
+        self.path = path
+        self.message_loader = message_loader
+
+        # release minute (epoch // 60) -> (task_id, source_chat_id, message, deferred_at)
+        self._buckets: Dict[int, Deque[Tuple[int, int, Any, float]]] = {}
+        self._bucket_heap: List[int] = []
+        self._held = 0
+        self._in_flight: set = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.running = False
+
+        self.stats = {
+            "deferred": 0,
+            "released": 0,
+            "dropped": 0,
+            "max_hold_seconds": 0.0
+        }
+
+    async def start(self):
+        """Restore persisted messages and start releasing"""
+        if self.running:
+            return
+        self.running = True
+        self._restore()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop releasing and persist what is still held"""
+        if not self.running:
+            return
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._in_flight:
+            await asyncio.wait(list(self._in_flight), timeout=timeout)
+        self._persist()
+
+    def defer(self, task_id: int, source_chat_id: int, message: Any, release_at: float) -> bool:
+        """Hold a message until release_at (epoch seconds)"""
+        if self._held >= self.max_items:
+            self.stats["dropped"] += 1
+            logger.warning(f"Deferred delivery queue full, dropping message for task {task_id}")
+            return False
+
+        bucket_key = int(release_at // 60)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self._buckets[bucket_key] = deque()
+            heapq.heappush(self._bucket_heap, bucket_key)
+            self._wakeup.set()
+        bucket.append((task_id, source_chat_id, message, time.time()))
+        self._held += 1
+        self.stats["deferred"] += 1
+        return True
+
+    async def _run(self):
+        while self.running:
+            try:
+                if not self._bucket_heap:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                delay = self._bucket_heap[0] * 60 - time.time()
+                if delay > 0:
+                    # Capped so wall-clock jumps are noticed
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, 60))
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                bucket_key = heapq.heappop(self._bucket_heap)
+                bucket = self._buckets.get(bucket_key)
+                try:
+                    if bucket:
+                        await self._release(bucket)
+                finally:
+                    # The bucket stays registered until it is empty, so a cancelled release
+                    # leaves its remaining messages held, counted and persisted
+                    if bucket:
+                        heapq.heappush(self._bucket_heap, bucket_key)
+                    else:
+                        self._buckets.pop(bucket_key, None)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in deferred delivery queue: {e}")
+                await asyncio.sleep(5)
+
+    async def _release(self, bucket: Deque[Tuple[int, int, Any, float]]):
+        """Hand a bucket back to the engine a few at a time; sends are paced by the outbound limiter"""
+        if bucket:
+            logger.info(f"Releasing {len(bucket)} deferred messages")
+        while bucket:
+            while len(self._in_flight) >= self.release_concurrency:
+                await asyncio.wait(list(self._in_flight), return_when=asyncio.FIRST_COMPLETED)
+
+            task_id, source_chat_id, message, deferred_at = bucket.popleft()
+            self._held -= 1
+            self.stats["released"] += 1
+            self.stats["max_hold_seconds"] = max(self.stats["max_hold_seconds"], time.time() - deferred_at)
+
+            release = asyncio.create_task(self._deliver(task_id, source_chat_id, message))
+            self._in_flight.add(release)
+            release.add_done_callback(self._in_flight.discard)
+
+    async def _deliver(self, task_id: int, source_chat_id: int, message: Any):
+        try:
+            await self.handler(task_id, source_chat_id, message)
+        except Exception as e:
+            logger.error(f"Failed to deliver deferred message for task {task_id}: {e}")
+
+    def _persist(self):
+        """Write held messages to disk; only serialisable messages survive a restart"""
+        if not self._held:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            kept = 0
+            with open(self.path, "w", encoding="utf-8") as f:
+                for bucket_key, bucket in self._buckets.items():
+                    for task_id, source_chat_id, message, deferred_at in bucket:
+                        if not hasattr(message, "model_dump_json"):
+                            continue
+                        f.write(json.dumps({
+                            "task_id": task_id,
+                            "source_chat_id": source_chat_id,
+                            "release_at": bucket_key * 60,
+                            "deferred_at": deferred_at,
+                            "payload": message.model_dump_json(exclude_none=True)
+                        }) + "\n")
+                        kept += 1
+            logger.info(f"Persisted {kept}/{self._held} deferred messages")
+        except Exception as e:
+            logger.error(f"Failed to persist deferred messages: {e}")
+
+    def _restore(self):
+        """Reload messages persisted by a previous run"""
+        if not self.message_loader or not os.path.exists(self.path):
+            return
+        try:
+            restored = 0
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        message = self.message_loader(record["payload"])
+                    except Exception as e:
+                        logger.error(f"Dropping unreadable deferred message: {e}")
+                        continue
+                    if self.defer(record["task_id"], record["source_chat_id"], message, record["release_at"]):
+                        restored += 1
+            os.remove(self.path)
+            logger.info(f"Restored {restored} deferred messages")
+        except Exception as e:
+            logger.error(f"Failed to restore deferred messages: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get holding queue size and release counters"""
+        next_release = None
+        if self._bucket_heap:
+            next_release = round(max(0.0, self._bucket_heap[0] * 60 - time.time()), 1)
+        return {
+            "held": self._held,
+            "buckets": len(self._buckets),
+            "releasing": len(self._in_flight),
+            "next_release_in": next_release,
+            **self.stats,
+            "max_hold_seconds": round(self.stats["max_hold_seconds"], 1)
+        }
@@ -0,0 +1,310 @@
+"""
+Digest - Buffers a task's posts and delivers them as periodic summary messages
+"""
+
+import asyncio
+import html
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from loguru import logger
+
+from modules.message_snapshot import MessageSnapshot
+
+
+MAX_MESSAGE_LENGTH = 4096
+MAX_ENTRY_LENGTH = 700
+
+
+# Media shown as a placeholder when a post has no text
+_LABELLED_MEDIA = ("photo", "video", "document", "audio", "voice", "animation")
+
+_HTML_TAG = re.compile(r"<(/?)([a-zA-Z-]+)[^>]*>")
+
+# A rendered item: plain text, or (body, tail) where the tail (e.g. the link) is never cut
+DigestItem = Union[str, Tuple[str, str]]
+
+
+def build_entry(message: Any, source_name: str) -> Dict[str, Any]:
+    """Reduce a source post (message or MessageSnapshot) to what the digest needs"""
+    snapshot = MessageSnapshot.from_message(message)
+    text = snapshot.content or ""
+    if not text and snapshot.media_kind in _LABELLED_MEDIA:
+        text = f"[{snapshot.media_kind}]"
+
+    text = " ".join(text.split())
+    if len(text) > MAX_ENTRY_LENGTH:
+        text = text[:MAX_ENTRY_LENGTH - 1].rstrip() + "…"
+
+    username = snapshot.chat.username
+    message_id = snapshot.message_id
+
+    return {
+        "text": html.escape(text),
+        "link": f"https://t.me/{username}/{message_id}" if username and message_id else None,
+        "source": source_name,
+        "source_chat_id": snapshot.chat_id,
+        "message_id": message_id,
+        "at": time.time()
+    }
+
+
+def truncate_html(text: str, limit: int) -> str:
+    """Cut Telegram HTML to at most limit characters without splitting a tag or entity
+
+    Tags left open by the cut are closed again, so the result still parses.
+    """
+    if len(text) <= limit:
+        return text
+
+    cut = text[:max(0, limit - 1)]
+    # Drop a tag or entity the cut went through
+    for opener, closer in (("<", ">"), ("&", ";")):
+        start = cut.rfind(opener)
+        if start != -1 and cut.find(closer, start) == -1:
+            cut = cut[:start]
+
+    while True:
+        open_tags: List[str] = []
+        for match in _HTML_TAG.finditer(cut):
+            name = match.group(2).lower()
+            if match.group(1):
+                if name in open_tags:
+                    del open_tags[len(open_tags) - 1 - open_tags[::-1].index(name)]
+            else:
+                open_tags.append(name)
+        closing = "".join(f"</{name}>" for name in reversed(open_tags))
+        result = cut.rstrip() + "…" + closing
+        if len(result) <= limit or not cut:
+            return result
+        # The closing tags did not fit; cut further back
+        cut = cut[:len(cut) - (len(result) - limit)]
+        start = cut.rfind("<")
+        if start != -1 and cut.find(">", start) == -1:
+            cut = cut[:start]
+
+
+def render_digest(items: Sequence[DigestItem], header: str = "", footer: str = "",
+                  max_length: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Pack rendered items into as few messages as fit, repeating header and footer on each"""
+    return [message for message, _ in pack_digest(items, header, footer, max_length)]
+
+
+def pack_digest(items: Sequence[DigestItem], header: str = "", footer: str = "",
+                max_length: int = MAX_MESSAGE_LENGTH) -> List[Tuple[str, List[int]]]:
+    """Like render_digest(), but also returns the indexes of the items in each message"""
+    header = f"{header}\n\n" if header else ""
+    footer = f"\n\n{footer}" if footer else ""
+    budget = max(1, max_length - len(header) - len(footer))
+
+    messages: List[Tuple[str, List[int]]] = []
+    current: List[str] = []
+    indexes: List[int] = []
+    size = 0
+    for index, item in enumerate(items):
+        body, tail = (item, "") if isinstance(item, str) else item
+        if len(body) + len(tail) > budget:
+            # Shorten the text, never the link markup after it
+            body = truncate_html(body, max(0, budget - len(tail)))
+        item = body + tail
+        separator = 2 if current else 0
+        if current and size + separator + len(item) > budget:
+            messages.append((header + "\n\n".join(current) + footer, indexes))
+            current, indexes, size, separator = [], [], 0, 0
+        current.append(item)
+        indexes.append(index)
+        size += separator + len(item)
+
+    if current:
+        messages.append((header + "\n\n".join(current) + footer, indexes))
+    return messages
+
+
+class DigestBuffer:
+    """One task's pending digest"""
+
+    def __init__(self, task_id: int, interval_minutes: int, max_posts: int):
+        self.task_id = task_id
+        self.interval_minutes = interval_minutes
+        self.max_posts = max_posts
+        self.entries: List[Dict[str, Any]] = []
+        self.due_at: Optional[float] = None
+
+
+class DigestManager:
+    """Collects posts per task and flushes each buffer every X minutes or every N posts"""
+
+    def __init__(self, flush_handler: Callable[[int, List[Dict[str, Any]]], Awaitable[bool]],
+                 path: str = "data/digest_buffers.json", max_entries: int = 500):
+        self.flush_handler = flush_handler
+        self.path = path
+        # Hard cap so a misconfigured task cannot grow without bound
+        self.max_entries = max_entries
+
+        self.buffers: Dict[int, DigestBuffer] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.running = False
+
+        self.stats = {
+            "buffered": 0,
+            "digests_sent": 0,
+            "posts_digested": 0,
+            "flush_failures": 0,
+            "last_flush": None
+        }
+
+    async def start(self):
+        """Restore buffers from the last run and start flushing"""
+        if self.running:
+            return
+        self.running = True
+        self._restore()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop flushing and keep pending buffers for the next run"""
+        if not self.running:
+            return
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._persist()
+
+    def add(self, task_id: int, entry: Dict[str, Any], interval_minutes: int, max_posts: int):
+        """Buffer a post; the buffer is due after interval_minutes or once it holds max_posts"""
+        buffer = self.buffers.get(task_id)
+        if buffer is None:
+            buffer = self.buffers[task_id] = DigestBuffer(task_id, interval_minutes, max_posts)
+        buffer.interval_minutes = max(1, interval_minutes)
+        buffer.max_posts = max(1, max_posts)
+
+        if len(buffer.entries) >= self.max_entries:
+            buffer.entries.pop(0)
+        buffer.entries.append(entry)
+        self.stats["buffered"] += 1
+
+        if buffer.due_at is None:
+            buffer.due_at = time.time() + buffer.interval_minutes * 60
+            self._wakeup.set()
+        if len(buffer.entries) >= buffer.max_posts:
+            buffer.due_at = time.time()
+            self._wakeup.set()
+
+    def pending(self, task_id: int) -> int:
+        buffer = self.buffers.get(task_id)
+        return len(buffer.entries) if buffer else 0
+
+    def remove_task(self, task_id: int):
+        """Drop a task's pending digest"""
+        self.buffers.pop(task_id, None)
+
+    async def flush(self, task_id: int) -> bool:
+        """Send a task's digest now"""
+        buffer = self.buffers.get(task_id)
+        if not buffer or not buffer.entries:
+            return False
+
+        entries, buffer.entries, buffer.due_at = buffer.entries, [], None
+        try:
+            sent = await self.flush_handler(task_id, entries)
+        except Exception as e:
+            logger.error(f"Digest flush failed for task {task_id}: {e}")
+            sent = False
+
+        self.stats["last_flush"] = datetime.now().isoformat()
+        if sent:
+            self.stats["digests_sent"] += 1
+            self.stats["posts_digested"] += len(entries)
+            return True
+
+        # Keep the posts and try again next interval
+        self.stats["flush_failures"] += 1
+        buffer.entries = (entries + buffer.entries)[-self.max_entries:]
+        buffer.due_at = time.time() + buffer.interval_minutes * 60
+        return False
+
+    async def _run(self):
+        while self.running:
+            try:
+                now = time.time()
+                due = [task_id for task_id, buffer in self.buffers.items()
+                       if buffer.due_at is not None and buffer.due_at <= now]
+                for task_id in due:
+                    await self.flush(task_id)
+                if due:
+                    continue
+
+                deadlines = [buffer.due_at for buffer in self.buffers.values() if buffer.due_at is not None]
+                self._wakeup.clear()
+                try:
+                    timeout = max(0.0, min(deadlines) - time.time()) if deadlines else None
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in digest loop: {e}")
+                await asyncio.sleep(5)
+
+    def _persist(self):
+        pending = {
+            str(task_id): {
+                "interval_minutes": buffer.interval_minutes,
+                "max_posts": buffer.max_posts,
+                "due_at": buffer.due_at,
+                "entries": buffer.entries
+            }
+            for task_id, buffer in self.buffers.items() if buffer.entries
+        }
+        if not pending:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(pending, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            logger.info(f"Persisted digest buffers for {len(pending)} tasks")
+        except Exception as e:
+            logger.error(f"Failed to persist digest buffers: {e}")
+
+    def _restore(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                pending = json.load(f)
+            for task_id, data in pending.items():
+                buffer = DigestBuffer(int(task_id), data["interval_minutes"], data["max_posts"])
+                buffer.entries = data["entries"]
+                buffer.due_at = data.get("due_at") or time.time()
+                self.buffers[buffer.task_id] = buffer
+            os.remove(self.path)
+            logger.info(f"Restored digest buffers for {len(pending)} tasks")
+        except Exception as e:
+            logger.error(f"Failed to restore digest buffers: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get buffer sizes and flush counters"""
+        now = time.time()
+        return {
+            "tasks": {
+                task_id: {
+                    "pending": len(buffer.entries),
+                    "due_in": round(max(0.0, buffer.due_at - now), 1) if buffer.due_at else None
+                }
+                for task_id, buffer in self.buffers.items() if buffer.entries
+            },
+            **self.stats
+        }
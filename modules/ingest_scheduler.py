@@ -0,0 +1,521 @@
+"""
+Ingest Scheduler - Per-task bounded queues with deficit round robin dispatch
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from loguru import logger
+
+
+OVERFLOW_POLICIES = ("drop_oldest", "defer", "spill")
+
+# A spill file is rewritten without its consumed head only past this many consumed bytes
+SPILL_COMPACT_BYTES = 8 * 1024 * 1024
+
+
+class IngestItem:
+    """A message waiting to be processed for a task"""
+
+    __slots__ = ("task_id", "source_chat_id", "message", "enqueued_at", "seq")
+
+    def __init__(self, task_id: int, source_chat_id: int, message: Any, enqueued_at: Optional[float] = None,
+                 seq: Optional[int] = None):
+        self.task_id = task_id
+        self.source_chat_id = source_chat_id
+        self.message = message
+        self.enqueued_at = enqueued_at or time.time()
+        # Shard dispatch sequence number, acknowledged once the item is settled
+        self.seq = seq
+
+
+class TaskQueue:
+    """Queue, overflow state and counters for a single task"""
+
+    def __init__(self, task_id: int, max_size: int, policy: str, weight: int, concurrency: int):
+        self.task_id = task_id
+        self.max_size = max_size
+        self.policy = policy
+        self.weight = weight
+        self.concurrency = concurrency
+
+        self.queue: Deque[IngestItem] = deque()
+        self.deferred: Deque[IngestItem] = deque()
+        self.spilled_pending = 0
+        self.deficit = 0
+        self.in_flight = 0
+        self.in_ready = False
+
+        # Metrics
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.deferred_total = 0
+        self.spilled_total = 0
+        self.max_depth = 0
+        self.wait_times: Deque[float] = deque(maxlen=500)
+
+    def has_backlog(self) -> bool:
+        return bool(self.queue or self.deferred or self.spilled_pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        waits = sorted(self.wait_times)
+        return {
+            "depth": len(self.queue),
+            "deferred": len(self.deferred),
+            "spilled_pending": self.spilled_pending,
+            "in_flight": self.in_flight,
+            "policy": self.policy,
+            "weight": self.weight,
+            "max_size": self.max_size,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "deferred_total": self.deferred_total,
+            "spilled_total": self.spilled_total,
+            "avg_wait": round(sum(waits) / len(waits), 3) if waits else 0,
+            "p95_wait": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0,
+            "max_wait": round(waits[-1], 3) if waits else 0
+        }
+
+
+class IngestScheduler:
+    """Feeds a fixed worker pool from per-task queues using deficit round robin"""
+
+    def __init__(self, handler: Callable[[int, int, Any], Awaitable[Any]], workers: int = 8,
+                 default_queue_size: int = 100, quantum: int = 1,
+                 spill_dir: str = "data/ingest_spill",
+                 message_loader: Optional[Callable[[str], Any]] = None):
+        self.handler = handler
+        self.worker_count = max(1, workers)
+        self.default_queue_size = default_queue_size
+        self.quantum = max(1, quantum)
+        self.spill_dir = spill_dir
+        self.message_loader = message_loader
+
+        self.tasks: Dict[int, TaskQueue] = {}
+        self._ready: Deque[int] = deque()
+        self._wakeup = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+        self.running = False
+        self.busy_workers = 0
+        # seq -> items carrying it that are still queued, deferred or in flight
+        self._pending_seqs: Dict[int, int] = {}
+
+    async def start(self):
+        """Start the worker pool and pick up work spilled by a previous run"""
+        if self.running:
+            return
+
+        self.running = True
+        self._recover_spills()
+        self._workers = [asyncio.create_task(self._worker(n)) for n in range(self.worker_count)]
+        logger.info(f"Ingest scheduler started with {self.worker_count} workers")
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Stop workers, giving queued work a short chance to drain and spilling the rest"""
+        if not self.running:
+            return
+
+        deadline = time.time() + drain_timeout
+        while time.time() < deadline and any(q.queue or q.in_flight for q in self.tasks.values()):
+            await asyncio.sleep(0.1)
+
+        self.running = False
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        lost = 0
+        for task_queue in self.tasks.values():
+            leftovers = list(task_queue.queue) + list(task_queue.deferred)
+            task_queue.queue.clear()
+            task_queue.deferred.clear()
+            if leftovers:
+                # Leftovers arrived before anything already spilled, so they go ahead of it
+                lost += len(leftovers) - self._spill_ahead(task_queue, leftovers)
+            for item in leftovers:
+                self._settle(item)
+
+        if lost:
+            logger.warning(f"Ingest scheduler stopped with {lost} unprocessed messages that could not be spilled")
+        logger.info("Ingest scheduler stopped")
+
+    def configure_task(self, task_id: int, settings: Optional[Dict[str, Any]]):
+        """Apply per-task queue size, overflow policy and weight from task settings"""
+        settings = settings or {}
+        policy = settings.get("ingest_overflow_policy") or "drop_oldest"
+        if policy not in OVERFLOW_POLICIES:
+            logger.warning(f"Unknown overflow policy '{policy}' for task {task_id}, using drop_oldest")
+            policy = "drop_oldest"
+
+        max_size = int(settings.get("ingest_queue_size") or self.default_queue_size)
+        weight = max(1, int(settings.get("ingest_weight") or 1))
+
+        task_queue = self.tasks.get(task_id)
+        if task_queue is None:
+            # One in-flight message per task keeps target order identical to source order
+            self.tasks[task_id] = TaskQueue(task_id, max_size, policy, weight, concurrency=1)
+        else:
+            task_queue.max_size = max_size
+            task_queue.policy = policy
+            task_queue.weight = weight
+
+    def remove_task(self, task_id: int):
+        """Forget a task once its backlog has drained"""
+        task_queue = self.tasks.get(task_id)
+        if task_queue and not task_queue.has_backlog() and not task_queue.in_flight:
+            del self.tasks[task_id]
+
+    def submit(self, task_id: int, source_chat_id: int, message: Any, seq: Optional[int] = None) -> bool:
+        """Queue a message for a task, applying its overflow policy when full"""
+        task_queue = self.tasks.get(task_id)
+        if task_queue is None:
+            self.configure_task(task_id, None)
+            task_queue = self.tasks[task_id]
+
+        item = IngestItem(task_id, source_chat_id, message, seq=seq)
+        task_queue.enqueued += 1
+        if seq is not None:
+            self._pending_seqs[seq] = self._pending_seqs.get(seq, 0) + 1
+
+        # Overflowed messages already waiting keep their place ahead of new ones
+        overflow_waiting = task_queue.deferred or task_queue.spilled_pending
+        if len(task_queue.queue) < task_queue.max_size and (not overflow_waiting or task_queue.policy == "drop_oldest"):
+            task_queue.queue.append(item)
+        elif task_queue.policy == "spill" and self._spill(task_queue, item):
+            self._settle(item)
+        elif task_queue.policy in ("defer", "spill"):
+            # Deferred items are admitted in order as the queue frees up, within a hard cap
+            if len(task_queue.deferred) >= task_queue.max_size * 10:
+                self._settle(task_queue.deferred.popleft())
+                task_queue.dropped += 1
+            task_queue.deferred.append(item)
+            task_queue.deferred_total += 1
+        else:
+            self._settle(task_queue.queue.popleft())
+            task_queue.dropped += 1
+            task_queue.queue.append(item)
+            if task_queue.dropped % 100 == 1:
+                logger.warning(f"Ingest queue full for task {task_id}, dropping oldest messages ({task_queue.dropped} so far)")
+
+        task_queue.max_depth = max(task_queue.max_depth, len(task_queue.queue))
+        self._mark_ready(task_queue)
+        return True
+
+    def _settle(self, item: IngestItem):
+        """Forget an item's seq once it was handled, dropped or spilled"""
+        if item.seq is None:
+            return
+        remaining = self._pending_seqs.get(item.seq, 0) - 1
+        if remaining > 0:
+            self._pending_seqs[item.seq] = remaining
+        else:
+            self._pending_seqs.pop(item.seq, None)
+
+    def oldest_pending_seq(self) -> Optional[int]:
+        """Lowest seq still queued, deferred or in flight; None when every submitted seq is settled"""
+        return min(self._pending_seqs, default=None)
+
+    def _mark_ready(self, task_queue: TaskQueue):
+        """Put a task back into the round robin if it can be served"""
+        if not task_queue.in_ready and task_queue.has_backlog() and task_queue.in_flight < task_queue.concurrency:
+            task_queue.in_ready = True
+            self._ready.append(task_queue.task_id)
+        self._wakeup.set()
+
+    def _refill(self, task_queue: TaskQueue):
+        """Move deferred and spilled messages into the queue as space frees up"""
+        while task_queue.deferred and len(task_queue.queue) < task_queue.max_size:
+            task_queue.queue.append(task_queue.deferred.popleft())
+
+        if task_queue.spilled_pending and not task_queue.deferred and len(task_queue.queue) < task_queue.max_size:
+            self._load_spill(task_queue, task_queue.max_size - len(task_queue.queue))
+
+    def _pick(self) -> Optional[IngestItem]:
+        """Select the next message with deficit round robin across ready tasks"""
+        for _ in range(2 * len(self._ready) + 1):
+            if not self._ready:
+                return None
+
+            task_id = self._ready[0]
+            task_queue = self.tasks.get(task_id)
+            if task_queue is None:
+                self._ready.popleft()
+                continue
+
+            if not task_queue.queue:
+                self._refill(task_queue)
+
+            if not task_queue.queue or task_queue.in_flight >= task_queue.concurrency:
+                # Idle or busy tasks leave the ring and rejoin on enqueue/completion
+                self._ready.popleft()
+                task_queue.in_ready = False
+                if not task_queue.queue:
+                    task_queue.deficit = 0
+                continue
+
+            if task_queue.deficit <= 0:
+                task_queue.deficit += self.quantum * task_queue.weight
+                self._ready.rotate(-1)
+                continue
+
+            task_queue.deficit -= 1
+            task_queue.in_flight += 1
+            item = task_queue.queue.popleft()
+
+            if task_queue.in_flight >= task_queue.concurrency:
+                self._ready.popleft()
+                task_queue.in_ready = False
+
+            return item
+
+        return None
+
+    def _complete(self, item: IngestItem):
+        """Record completion and reschedule the task"""
+        self._settle(item)
+        task_queue = self.tasks.get(item.task_id)
+        if task_queue is None:
+            return
+
+        task_queue.in_flight -= 1
+        task_queue.processed += 1
+        self._refill(task_queue)
+
+        if task_queue.has_backlog() and not task_queue.in_ready:
+            task_queue.in_ready = True
+            if task_queue.deficit > 0:
+                # Unused deficit means this task's turn is not over yet
+                self._ready.appendleft(task_queue.task_id)
+            else:
+                self._ready.append(task_queue.task_id)
+            self._wakeup.set()
+
+    async def _worker(self, worker_id: int):
+        """Process messages handed out by the scheduler"""
+        while self.running:
+            item = self._pick()
+            if item is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            self.busy_workers += 1
+            task_queue = self.tasks.get(item.task_id)
+            if task_queue is not None:
+                task_queue.wait_times.append(time.time() - item.enqueued_at)
+
+            try:
+                await self.handler(item.task_id, item.source_chat_id, item.message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingest worker {worker_id} failed on task {item.task_id}: {e}")
+            finally:
+                self.busy_workers -= 1
+                self._complete(item)
+
+    def _spill_path(self, task_id: int) -> str:
+        return os.path.join(self.spill_dir, f"task_{task_id}.jsonl")
+
+    def _offset_path(self, task_id: int) -> str:
+        return os.path.join(self.spill_dir, f"task_{task_id}.offset")
+
+    def _read_offset(self, task_id: int) -> int:
+        """Bytes of the spill file already loaded back (kept across restarts)"""
+        try:
+            with open(self._offset_path(task_id), "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_offset(self, task_id: int, offset: int):
+        path = self._offset_path(task_id)
+        if not offset:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(offset))
+        os.replace(tmp_path, path)
+
+    def _compact_spill(self, task_id: int, offset: int):
+        """Drop the consumed head of a spill file and start reading from its beginning again"""
+        path = self._spill_path(task_id)
+        tmp_path = path + ".tmp"
+        with open(path, "rb") as source, open(tmp_path, "wb") as target:
+            source.seek(offset)
+            shutil.copyfileobj(source, target)
+        os.replace(tmp_path, path)
+        self._write_offset(task_id, 0)
+
+    def _can_spill(self, item: IngestItem) -> bool:
+        return bool(self.message_loader) and hasattr(item.message, "model_dump_json")
+
+    @staticmethod
+    def _spill_record(item: IngestItem) -> str:
+        record = {
+            "source_chat_id": item.source_chat_id,
+            "enqueued_at": item.enqueued_at,
+            "payload": item.message.model_dump_json(exclude_none=True)
+        }
+        return json.dumps(record) + "\n"
+
+    def _spill(self, task_queue: TaskQueue, item: IngestItem) -> bool:
+        """Append a message to the task's spill file; only serialisable messages can spill"""
+        if not self._can_spill(item):
+            return False
+
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(self._spill_path(task_queue.task_id), "a", encoding="utf-8") as f:
+                f.write(self._spill_record(item))
+
+            task_queue.spilled_pending += 1
+            task_queue.spilled_total += 1
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to spill message for task {task_queue.task_id}: {e}")
+            return False
+
+    def _spill_ahead(self, task_queue: TaskQueue, items: List[IngestItem]) -> int:
+        """Spill items ahead of the unread part of the task's spill file; returns how many were spilled
+
+        The file is rewritten as the items followed by the unread tail, so a restart replays
+        them in arrival order even though newer messages were spilled first.
+        """
+        task_id = task_queue.task_id
+        path = self._spill_path(task_id)
+        tmp_path = path + ".tmp"
+        try:
+            lines = [self._spill_record(item) for item in items if self._can_spill(item)]
+            if not lines:
+                return 0
+
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as target:
+                target.writelines(lines)
+                if os.path.exists(path):
+                    target.flush()
+                    with open(path, "rb") as source:
+                        source.seek(self._read_offset(task_id))
+                        shutil.copyfileobj(source, target.buffer)
+            os.replace(tmp_path, path)
+            self._write_offset(task_id, 0)
+
+            task_queue.spilled_pending += len(lines)
+            task_queue.spilled_total += len(lines)
+            return len(lines)
+
+        except Exception as e:
+            logger.error(f"Failed to spill leftover messages for task {task_id}: {e}")
+            return 0
+
+    def _load_spill(self, task_queue: TaskQueue, limit: int):
+        """Load up to limit spilled messages back into the queue, oldest first
+
+        Reads from the saved offset instead of rewriting the file on every refill; the consumed
+        head is only cut off once it is both large and most of the file.
+        """
+        task_id = task_queue.task_id
+        path = self._spill_path(task_id)
+        try:
+            if not os.path.exists(path):
+                task_queue.spilled_pending = 0
+                self._write_offset(task_id, 0)
+                return
+
+            offset = self._read_offset(task_id)
+            batch = []
+            with open(path, "rb") as f:
+                f.seek(offset)
+                while len(batch) < limit:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        # EOF, or a record still being appended
+                        break
+                    batch.append(line)
+                offset += sum(len(line) for line in batch)
+                size = os.fstat(f.fileno()).st_size
+
+            task_queue.spilled_pending = max(task_queue.spilled_pending - len(batch), 0)
+            if offset >= size:
+                os.remove(path)
+                self._write_offset(task_id, 0)
+                task_queue.spilled_pending = 0
+            elif offset > SPILL_COMPACT_BYTES and offset * 2 > size:
+                self._compact_spill(task_id, offset)
+            else:
+                self._write_offset(task_id, offset)
+
+            for line in batch:
+                try:
+                    record = json.loads(line.decode("utf-8"))
+                    message = self.message_loader(record["payload"])
+                    task_queue.queue.append(IngestItem(
+                        task_queue.task_id, record["source_chat_id"], message, record["enqueued_at"]
+                    ))
+                except Exception as e:
+                    task_queue.dropped += 1
+                    logger.error(f"Dropping unreadable spilled message for task {task_queue.task_id}: {e}")
+
+        except Exception as e:
+            logger.error(f"Failed to load spilled messages for task {task_queue.task_id}: {e}")
+
+    def _recover_spills(self):
+        """Register spill files left by a previous run"""
+        if not os.path.isdir(self.spill_dir):
+            return
+
+        for filename in os.listdir(self.spill_dir):
+            if not (filename.startswith("task_") and filename.endswith(".jsonl")):
+                continue
+            try:
+                task_id = int(filename[len("task_"):-len(".jsonl")])
+                with open(os.path.join(self.spill_dir, filename), "rb") as f:
+                    # Lines before the saved offset were already loaded by the previous run
+                    f.seek(self._read_offset(task_id))
+                    pending = sum(1 for _ in f)
+                if not pending:
+                    continue
+
+                if task_id not in self.tasks:
+                    self.configure_task(task_id, None)
+                task_queue = self.tasks[task_id]
+                task_queue.spilled_pending = pending
+                self._mark_ready(task_queue)
+                logger.info(f"Recovered {pending} spilled messages for task {task_id}")
+
+            except Exception as e:
+                logger.error(f"Failed to recover spill file {filename}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth, wait time and overflow metrics"""
+        try:
+            per_task = {task_id: task_queue.get_stats() for task_id, task_queue in self.tasks.items()}
+            return {
+                "running": self.running,
+                "workers": self.worker_count,
+                "busy_workers": self.busy_workers,
+                "ready_tasks": len(self._ready),
+                "total_depth": sum(stats["depth"] for stats in per_task.values()),
+                "total_deferred": sum(stats["deferred"] for stats in per_task.values()),
+                "total_spilled_pending": sum(stats["spilled_pending"] for stats in per_task.values()),
+                "total_dropped": sum(stats["dropped"] for stats in per_task.values()),
+                "max_wait": max((stats["max_wait"] for stats in per_task.values()), default=0),
+                "tasks": per_task
+            }
+        except Exception as e:
+            logger.error(f"Error getting ingest stats: {e}")
+            return {"running": self.running, "error": str(e)}
@@ -0,0 +1,199 @@
+"""
+Leader Election - Elects one process to run cluster-wide jobs
+"""
+
+import asyncio
+import os
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class LeaderElection:
+    """PostgreSQL advisory-lock leader election with a SQLite file-lock fallback"""
+
+    def __init__(self, database, name: str = "bestforward-leader", renew_interval: float = 5.0,
+                 lease_duration: float = 15.0, lock_path: str = "data/leader.lock"):
+        self.database = database
+        self.name = name
+        self.lock_key = zlib.crc32(name.encode())
+        self.renew_interval = renew_interval
+        self.lease_duration = lease_duration
+        self.lock_path = lock_path
+
+        self._connection = None
+        self._lock_file = None
+        self._lease_expires = 0.0
+        self._leader = False
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[bool], Any]] = []
+        self.running = False
+
+        self.stats = {
+            "elections_won": 0,
+            "leadership_lost": 0,
+            "renew_failures": 0,
+            "leader_since": None
+        }
+
+    @property
+    def is_leader(self) -> bool:
+        """True while we hold the lock and the lease has not run out"""
+        return self._leader and time.monotonic() < self._lease_expires
+
+    def add_listener(self, callback: Callable[[bool], Any]):
+        """Call back with True/False when leadership is gained or lost"""
+        self._listeners.append(callback)
+
+    async def start(self):
+        """Start campaigning for leadership"""
+        if self.running:
+            return
+        self.running = True
+        await self._tick()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Step down and stop campaigning"""
+        if not self.running:
+            return
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._release()
+
+    async def _run(self):
+        while self.running:
+            await asyncio.sleep(self.renew_interval)
+            await self._tick()
+
+    async def _tick(self):
+        """Renew the lease if we lead, otherwise try to take the lock"""
+        try:
+            if self._leader:
+                if await self._renew():
+                    self._lease_expires = time.monotonic() + self.lease_duration
+                else:
+                    self.stats["renew_failures"] += 1
+                    await self._release()
+            elif await self._try_acquire():
+                self._lease_expires = time.monotonic() + self.lease_duration
+                self._set_leader(True)
+        except Exception as e:
+            logger.error(f"Leader election error: {e}")
+            if self._leader:
+                await self._release()
+
+    async def _try_acquire(self) -> bool:
+        if self.database.is_postgresql and self.database.pool:
+            connection = await self.database.pool.acquire()
+            try:
+                # Session-level lock: PostgreSQL frees it the moment our connection dies
+                acquired = await connection.fetchval("SELECT pg_try_advisory_lock($1)", self.lock_key)
+            except Exception:
+                await self.database.pool.release(connection)
+                raise
+            if acquired:
+                self._connection = connection
+                return True
+            await self.database.pool.release(connection)
+            return False
+
+        if fcntl is None:
+            # No cross-process locking available; assume a single process
+            return True
+
+        directory = os.path.dirname(self.lock_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock_file = open(self.lock_path, "a+")
+        try:
+            # The OS drops the lock when the process exits
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._lock_file = lock_file
+        return True
+
+    async def _renew(self) -> bool:
+        if self._connection is None:
+            # File locks have no lease to renew
+            return True
+        try:
+            await asyncio.wait_for(self._connection.fetchval("SELECT 1"), timeout=self.renew_interval)
+            return True
+        except Exception as e:
+            logger.warning(f"Leader lease renewal failed: {e}")
+            return False
+
+    async def _release(self):
+        """Drop the lock and notify listeners if we were leading"""
+        was_leader = self._leader
+        self._leader = False
+        self._lease_expires = 0.0
+
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            try:
+                await asyncio.wait_for(
+                    connection.fetchval("SELECT pg_advisory_unlock($1)", self.lock_key), timeout=2
+                )
+                await self.database.pool.release(connection)
+            except Exception:
+                # A broken connection takes the lock with it when it closes
+                connection.terminate()
+                try:
+                    await self.database.pool.release(connection)
+                except Exception:
+                    pass
+
+        if self._lock_file is not None:
+            try:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+                self._lock_file.close()
+            except Exception:
+                pass
+            self._lock_file = None
+
+        if was_leader:
+            self._set_leader(False)
+
+    def _set_leader(self, leader: bool):
+        self._leader = leader
+        if leader:
+            self.stats["elections_won"] += 1
+            self.stats["leader_since"] = time.time()
+            logger.info(f"This process is now the leader ({self.name})")
+        else:
+            self.stats["leadership_lost"] += 1
+            self.stats["leader_since"] = None
+            logger.warning(f"This process is no longer the leader ({self.name})")
+
+        for callback in self._listeners:
+            try:
+                callback(leader)
+            except Exception as e:
+                logger.error(f"Leader listener failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get leadership state"""
+        return {
+            "is_leader": self.is_leader,
+            "backend": "postgresql" if self.database.is_postgresql else "file",
+            "pid": os.getpid(),
+            **self.stats
+        }
@@ -0,0 +1,294 @@
+"""
+Message Snapshot - Compact, immutable view of a Bot API or Telethon message
+
+Pipeline stages that only need ids, text, entities, a media reference and the
+inline keyboard work on a MessageSnapshot instead of the full message object
+or a throwaway wrapper class, and approvals store its compact JSON form.
+"""
+
+import json
+from dataclasses import dataclass, replace
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from loguru import logger
+
+
+# Checked in this order: a Bot API GIF also carries `document`, so animation comes first
+MEDIA_KINDS = ("photo", "video", "animation", "document", "audio", "voice", "video_note", "sticker")
+
+# Telethon entity class name -> Bot API entity type
+_TELETHON_ENTITY_TYPES = {
+    "MessageEntityBold": "bold",
+    "MessageEntityItalic": "italic",
+    "MessageEntityUnderline": "underline",
+    "MessageEntityStrike": "strikethrough",
+    "MessageEntitySpoiler": "spoiler",
+    "MessageEntityCode": "code",
+    "MessageEntityPre": "pre",
+    "MessageEntityBlockquote": "blockquote",
+    "MessageEntityUrl": "url",
+    "MessageEntityTextUrl": "text_link",
+    "MessageEntityMention": "mention",
+    "MessageEntityMentionName": "text_mention",
+    "MessageEntityHashtag": "hashtag",
+    "MessageEntityCashtag": "cashtag",
+    "MessageEntityBotCommand": "bot_command",
+    "MessageEntityEmail": "email",
+    "MessageEntityPhone": "phone_number",
+    "MessageEntityCustomEmoji": "custom_emoji",
+}
+
+
+class ChatRef(NamedTuple):
+    """The parts of a chat the pipeline reads (`snapshot.chat.id` works like on a message)"""
+    id: Optional[int]
+    title: Optional[str] = None
+    username: Optional[str] = None
+
+    def __bool__(self) -> bool:
+        # A text-only snapshot has no chat; `if message.chat:` must see that
+        return self.id is not None
+
+
+class EntityRef(NamedTuple):
+    """A text entity in Bot API terms"""
+    type: str
+    offset: int
+    length: int
+    url: Optional[str] = None
+    language: Optional[str] = None
+    custom_emoji_id: Optional[str] = None
+
+
+class ButtonRef(NamedTuple):
+    """An inline keyboard button; only URL and callback buttons are kept"""
+    text: str
+    url: Optional[str] = None
+    callback_data: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class MessageSnapshot:
+    """Immutable message summary; derive changed copies with with_text()/replace()"""
+    message_id: Optional[int]
+    chat: ChatRef
+    media_kind: str = "text"
+    file_id: Optional[str] = None
+    file_unique_id: Optional[str] = None
+    text: Optional[str] = None
+    caption: Optional[str] = None
+    entities: Tuple[EntityRef, ...] = ()
+    buttons: Tuple[Tuple[ButtonRef, ...], ...] = ()
+    media_group_id: Optional[str] = None
+    date: Optional[float] = None
+
+    # Construction
+
+    @classmethod
+    def from_message(cls, message: Any) -> "MessageSnapshot":
+        """Snapshot an aiogram message, a Telethon message or another snapshot"""
+        if isinstance(message, cls):
+            return message
+        if getattr(message, "message_id", None) is None and hasattr(message, "peer_id"):
+            return cls._from_telethon(message)
+        return cls._from_bot_api(message)
+
+    @classmethod
+    def text_only(cls, text: Optional[str]) -> "MessageSnapshot":
+        """A chatless text message, for running text through message-based helpers"""
+        return cls(message_id=None, chat=ChatRef(None), text=text)
+
+    @classmethod
+    def _from_bot_api(cls, message: Any) -> "MessageSnapshot":
+        chat = getattr(message, "chat", None)
+        media_kind, media = "text", None
+        for kind in MEDIA_KINDS:
+            media = getattr(message, kind, None)
+            if media:
+                media_kind = kind
+                break
+        if media_kind == "photo":
+            media = media[-1]  # Largest size
+
+        entities = getattr(message, "entities", None) or getattr(message, "caption_entities", None) or ()
+        date = getattr(message, "date", None)
+        return cls(
+            message_id=message.message_id,
+            chat=ChatRef(getattr(chat, "id", None), getattr(chat, "title", None), getattr(chat, "username", None)),
+            media_kind=media_kind,
+            file_id=getattr(media, "file_id", None),
+            file_unique_id=getattr(media, "file_unique_id", None),
+            text=getattr(message, "text", None),
+            caption=getattr(message, "caption", None),
+            entities=tuple(
+                EntityRef(entity.type, entity.offset, entity.length, getattr(entity, "url", None),
+                          getattr(entity, "language", None), getattr(entity, "custom_emoji_id", None))
+                for entity in entities
+            ),
+            buttons=cls._bot_api_buttons(getattr(message, "reply_markup", None)),
+            media_group_id=getattr(message, "media_group_id", None),
+            date=date.timestamp() if hasattr(date, "timestamp") else date,
+        )
+
+    @classmethod
+    def _from_telethon(cls, message: Any) -> "MessageSnapshot":
+        chat = getattr(message, "chat", None)
+        media_kind = "text"
+        if getattr(message, "media", None):
+            for kind in MEDIA_KINDS:
+                # Telethon calls animations `gif`
+                if getattr(message, "gif" if kind == "animation" else kind, None):
+                    media_kind = kind
+                    break
+        file = getattr(message, "file", None) if media_kind != "text" else None
+        body = getattr(message, "message", None) or None
+        date = getattr(message, "date", None)
+        grouped_id = getattr(message, "grouped_id", None)
+
+        return cls(
+            message_id=message.id,
+            chat=ChatRef(getattr(message, "chat_id", None), getattr(chat, "title", None),
+                         getattr(chat, "username", None)),
+            media_kind=media_kind,
+            file_id=getattr(file, "id", None),
+            text=body if media_kind == "text" else None,
+            caption=body if media_kind != "text" else None,
+            entities=tuple(
+                EntityRef(_TELETHON_ENTITY_TYPES.get(type(entity).__name__, "unknown"), entity.offset,
+                          entity.length, getattr(entity, "url", None), getattr(entity, "language", None),
+                          str(entity.document_id) if hasattr(entity, "document_id") else None)
+                for entity in getattr(message, "entities", None) or ()
+            ),
+            buttons=cls._telethon_buttons(getattr(message, "reply_markup", None)),
+            media_group_id=str(grouped_id) if grouped_id else None,
+            date=date.timestamp() if hasattr(date, "timestamp") else date,
+        )
+
+    @staticmethod
+    def _bot_api_buttons(markup: Any) -> Tuple[Tuple[ButtonRef, ...], ...]:
+        rows = []
+        for row in getattr(markup, "inline_keyboard", None) or ():
+            buttons = tuple(
+                ButtonRef(button.text, getattr(button, "url", None), getattr(button, "callback_data", None))
+                for button in row
+                if getattr(button, "url", None) or getattr(button, "callback_data", None)
+            )
+            if buttons:
+                rows.append(buttons)
+        return tuple(rows)
+
+    @staticmethod
+    def _telethon_buttons(markup: Any) -> Tuple[Tuple[ButtonRef, ...], ...]:
+        rows = []
+        for row in getattr(markup, "rows", None) or ():
+            buttons = []
+            for button in getattr(row, "buttons", ()):
+                url = getattr(button, "url", None)
+                data = getattr(button, "data", None)
+                if isinstance(data, bytes):
+                    data = data.decode("utf-8", "replace")
+                if url or data:
+                    buttons.append(ButtonRef(button.text, url, data))
+            if buttons:
+                rows.append(tuple(buttons))
+        return tuple(rows)
+
+    # Derived values and copies
+
+    @property
+    def chat_id(self) -> Optional[int]:
+        return self.chat.id
+
+    @property
+    def content(self) -> Optional[str]:
+        """Text for text messages, caption for media"""
+        return self.text or self.caption
+
+    @property
+    def is_media(self) -> bool:
+        return self.media_kind != "text"
+
+    def with_text(self, text: Optional[str]) -> "MessageSnapshot":
+        """Copy with new content: replaces the text of a text message or the caption of media"""
+        if self.is_media:
+            return replace(self, caption=text)
+        return replace(self, text=text)
+
+    def replace(self, **changes: Any) -> "MessageSnapshot":
+        return replace(self, **changes)
+
+    def reply_markup(self):
+        """Rebuild the inline keyboard as an aiogram markup, or None"""
+        if not self.buttons:
+            return None
+        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+        return InlineKeyboardMarkup(inline_keyboard=[
+            [
+                InlineKeyboardButton(text=button.text, url=button.url) if button.url
+                else InlineKeyboardButton(text=button.text, callback_data=button.callback_data)
+                for button in row
+            ]
+            for row in self.buttons
+        ])
+
+    # Serialisation
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict without empty fields; keys match the approval rows stored before snapshots"""
+        data: Dict[str, Any] = {
+            "message_id": self.message_id,
+            "chat_id": self.chat.id,
+            "media_type": self.media_kind,
+        }
+        for key, value in (("chat_title", self.chat.title), ("chat_username", self.chat.username),
+                           ("file_id", self.file_id), ("file_unique_id", self.file_unique_id),
+                           ("text", self.text), ("caption", self.caption),
+                           ("media_group_id", self.media_group_id), ("date", self.date)):
+            if value is not None:
+                data[key] = value
+        if self.entities:
+            data["entities"] = [list(entity) for entity in self.entities]
+        if self.buttons:
+            data["inline_keyboard"] = [[button._asdict() for button in row] for row in self.buttons]
+        return data
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MessageSnapshot":
+        """Inverse of to_dict(); also reads approval rows written before snapshots existed"""
+        entities = []
+        for entity in data.get("entities") or ():
+            try:
+                entities.append(EntityRef(*entity))
+            except TypeError:
+                logger.warning(f"Dropping unreadable entity in snapshot: {entity!r}")
+        rows = []
+        for row in data.get("inline_keyboard") or ():
+            buttons = tuple(
+                ButtonRef(button["text"], button.get("url"), button.get("callback_data"))
+                for button in row or ()
+                if button.get("text") and (button.get("url") or button.get("callback_data"))
+            )
+            if buttons:
+                rows.append(buttons)
+        return cls(
+            message_id=data.get("message_id"),
+            chat=ChatRef(data.get("chat_id"), data.get("chat_title"), data.get("chat_username")),
+            media_kind=data.get("media_type") or "text",
+            file_id=data.get("file_id"),
+            file_unique_id=data.get("file_unique_id"),
+            text=data.get("text"),
+            caption=data.get("caption"),
+            entities=tuple(entities),
+            buttons=tuple(rows),
+            media_group_id=data.get("media_group_id"),
+            date=data.get("date"),
+        )
+
+    @classmethod
+    def from_json(cls, payload: Any) -> "MessageSnapshot":
+        """Accepts a JSON string or an already-decoded dict (asyncpg returns JSONB columns either way)"""
+        return cls.from_dict(json.loads(payload) if isinstance(payload, (str, bytes)) else payload)
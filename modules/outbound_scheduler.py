@@ -0,0 +1,200 @@
+"""
+Outbound Scheduler - Prioritised sending lanes with reserved capacity
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from loguru import logger
+
+
+# Lanes in priority order, highest first
+LANE_URGENT = "urgent"          # approval-triggered sends and edit syncs
+LANE_DELETE = "delete"          # delete syncs
+LANE_NEW = "new"                # new posts
+LANE_BACKGROUND = "background"  # recurring posts and backfill
+
+LANES = (LANE_URGENT, LANE_DELETE, LANE_NEW, LANE_BACKGROUND)
+
+# Minimum share of recent grants each lane is guaranteed while it has waiters
+DEFAULT_RESERVATIONS = {
+    LANE_URGENT: 0.20,
+    LANE_DELETE: 0.10,
+    LANE_NEW: 0.20,
+    LANE_BACKGROUND: 0.05
+}
+
+
+class OutboundScheduler:
+    """Paces outbound sends and hands out capacity by lane priority"""
+
+    def __init__(self, rate_per_second: float = 25.0, reservations: Optional[Dict[str, float]] = None,
+                 starvation_timeout: float = 30.0, share_window: int = 100):
+        self.rate_per_second = max(0.1, rate_per_second)
+        self.reservations = reservations or dict(DEFAULT_RESERVATIONS)
+        self.starvation_timeout = starvation_timeout
+
+        self._waiters: Dict[str, Deque[Tuple[float, asyncio.Future]]] = {lane: deque() for lane in LANES}
+        self._recent_grants: Deque[str] = deque(maxlen=share_window)
+        self._tokens = self.rate_per_second
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.running = False
+
+        self.stats: Dict[str, Dict[str, Any]] = {
+            lane: {"granted": 0, "total_wait": 0.0, "max_wait": 0.0, "promoted": 0} for lane in LANES
+        }
+        self.flood_waits = 0
+
+    async def start(self):
+        """Start granting send capacity"""
+        if self.running:
+            return
+        self.running = True
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        logger.info(f"Outbound scheduler started ({self.rate_per_second}/s)")
+
+    async def stop(self):
+        """Stop the dispatcher and release everyone still waiting"""
+        if not self.running:
+            return
+        self.running = False
+        self._wakeup.set()
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+
+        for waiters in self._waiters.values():
+            while waiters:
+                _, future = waiters.popleft()
+                if not future.done():
+                    future.set_result(False)
+
+    async def acquire(self, lane: str = LANE_NEW) -> bool:
+        """Wait for a send slot in the given lane"""
+        if not self.running:
+            return True
+        if lane not in self._waiters:
+            lane = LANE_NEW
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append((time.monotonic(), future))
+        self._wakeup.set()
+        return await future
+
+    def pause(self, seconds: float):
+        """Hold all lanes during a flood wait; urgent work goes first once it ends"""
+        until = time.monotonic() + max(0.0, float(seconds))
+        if until > self._paused_until:
+            self._paused_until = until
+            self.flood_waits += 1
+            logger.warning(f"Outbound sending paused for {seconds}s (flood wait)")
+        self._wakeup.set()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.rate_per_second, self._tokens + (now - self._last_refill) * self.rate_per_second)
+        self._last_refill = now
+
+    def _drop_cancelled(self):
+        for waiters in self._waiters.values():
+            while waiters and waiters[0][1].done():
+                waiters.popleft()
+
+    def _choose_lane(self) -> Optional[str]:
+        """Pick the lane to serve next: starving waiters, then reservations, then priority"""
+        now = time.monotonic()
+        waiting = [lane for lane in LANES if self._waiters[lane]]
+        if not waiting:
+            return None
+
+        # Anti-starvation: the longest-waiting request past the timeout wins
+        oldest_lane, oldest_age = None, self.starvation_timeout
+        for lane in waiting:
+            age = now - self._waiters[lane][0][0]
+            if age >= oldest_age:
+                oldest_lane, oldest_age = lane, age
+        if oldest_lane:
+            if oldest_lane != waiting[0]:
+                self.stats[oldest_lane]["promoted"] += 1
+            return oldest_lane
+
+        # Reserved capacity: serve lanes below their guaranteed share
+        total = len(self._recent_grants)
+        if total:
+            for lane in waiting:
+                share = sum(1 for granted in self._recent_grants if granted == lane) / total
+                if share < self.reservations.get(lane, 0.0):
+                    return lane
+
+        return waiting[0]
+
+    async def _dispatch_loop(self):
+        """Grant queued requests at the configured rate"""
+        while self.running:
+            try:
+                self._drop_cancelled()
+                if not any(self._waiters.values()):
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                pause_left = self._paused_until - time.monotonic()
+                if pause_left > 0:
+                    await asyncio.sleep(pause_left)
+                    continue
+
+                self._refill()
+                if self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+                    continue
+
+                lane = self._choose_lane()
+                if lane is None:
+                    continue
+
+                enqueued_at, future = self._waiters[lane].popleft()
+                if future.done():
+                    continue
+
+                self._tokens -= 1
+                self._recent_grants.append(lane)
+                wait = time.monotonic() - enqueued_at
+                lane_stats = self.stats[lane]
+                lane_stats["granted"] += 1
+                lane_stats["total_wait"] += wait
+                lane_stats["max_wait"] = max(lane_stats["max_wait"], wait)
+                future.set_result(True)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in outbound dispatcher: {e}")
+                await asyncio.sleep(1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-lane waiting, grant and wait-time figures"""
+        lanes = {}
+        for lane in LANES:
+            lane_stats = self.stats[lane]
+            granted = lane_stats["granted"]
+            lanes[lane] = {
+                "waiting": len(self._waiters[lane]),
+                "granted": granted,
+                "avg_wait": round(lane_stats["total_wait"] / granted, 3) if granted else 0,
+                "max_wait": round(lane_stats["max_wait"], 3),
+                "promoted": lane_stats["promoted"],
+                "reserved_share": self.reservations.get(lane, 0.0)
+            }
+        return {
+            "running": self.running,
+            "rate_per_second": self.rate_per_second,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            "flood_waits": self.flood_waits,
+            "lanes": lanes
+        }
@@ -0,0 +1,242 @@
+"""
+Overflow Spool - Holds messages over a task's sending limits and drains them as quota frees up
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from loguru import logger
+
+
+class SpoolEntry:
+    """A message waiting for sending quota"""
+
+    __slots__ = ("source_chat_id", "message", "spooled_at")
+
+    def __init__(self, source_chat_id: int, message: Any, spooled_at: float):
+        self.source_chat_id = source_chat_id
+        self.message = message
+        self.spooled_at = spooled_at
+
+
+class TaskSpool:
+    """One task's spool: FIFO, collapsed to the latest N and aged out after max_age"""
+
+    def __init__(self, task_id: int, max_age: float, keep_latest: int):
+        self.task_id = task_id
+        self.max_age = max_age
+        self.entries: Deque[SpoolEntry] = deque(maxlen=max(1, keep_latest))
+        self.spooled = 0
+        self.drained = 0
+        self.expired = 0
+        self.collapsed = 0
+
+    def configure(self, max_age: float, keep_latest: int):
+        """Apply new limits; shrinking keep_latest drops the oldest entries"""
+        self.max_age = max_age
+        keep_latest = max(1, keep_latest)
+        if keep_latest != self.entries.maxlen:
+            overflow = max(0, len(self.entries) - keep_latest)
+            self.collapsed += overflow
+            self.entries = deque(list(self.entries)[overflow:], maxlen=keep_latest)
+
+    def expire(self, now: float) -> int:
+        expired = 0
+        while self.entries and now - self.entries[0].spooled_at > self.max_age:
+            self.entries.popleft()
+            expired += 1
+        self.expired += expired
+        return expired
+
+
+class OverflowSpool:
+    """Per-task overflow spools drained by a background loop as sending limits allow"""
+
+    def __init__(self, handler: Callable[[int, int, Any], Awaitable[Any]],
+                 can_send: Callable[[int], Awaitable[bool]], max_total: int = 20000,
+                 drain_interval: float = 5.0, path: str = "data/overflow_spool.jsonl",
+                 message_loader: Optional[Callable[[str], Any]] = None):
+        self.handler = handler
+        self.can_send = can_send
+        self.max_total = max_total
+        self.drain_interval = drain_interval
+        self.path = path
+        self.message_loader = message_loader
+
+        self.spools: Dict[int, TaskSpool] = {}
+        self._total = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.running = False
+        self.dropped = 0
+
+    async def start(self):
+        """Restore persisted spools and start draining"""
+        if self.running:
+            return
+        self.running = True
+        self._restore()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop draining and persist what is still spooled"""
+        if not self.running:
+            return
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._persist()
+
+    def pending(self, task_id: int) -> int:
+        """Number of messages spooled for a task"""
+        spool = self.spools.get(task_id)
+        return len(spool.entries) if spool else 0
+
+    def add(self, task_id: int, source_chat_id: int, message: Any, max_age: float, keep_latest: int,
+            spooled_at: Optional[float] = None) -> bool:
+        """Spool a message; the oldest one is collapsed away when the task is over keep_latest"""
+        if self._total >= self.max_total:
+            self.dropped += 1
+            logger.warning(f"Overflow spool full, dropping message for task {task_id}")
+            return False
+
+        spool = self.spools.get(task_id)
+        if spool is None:
+            spool = self.spools[task_id] = TaskSpool(task_id, max_age, keep_latest)
+        else:
+            before = len(spool.entries)
+            spool.configure(max_age, keep_latest)
+            self._total -= before - len(spool.entries)
+
+        if len(spool.entries) == spool.entries.maxlen:
+            spool.collapsed += 1
+            self._total -= 1
+        spool.entries.append(SpoolEntry(source_chat_id, message, spooled_at or time.time()))
+        spool.spooled += 1
+        self._total += 1
+        self._wakeup.set()
+        return True
+
+    def remove_task(self, task_id: int):
+        """Forget a task's spool"""
+        spool = self.spools.pop(task_id, None)
+        if spool:
+            self._total -= len(spool.entries)
+
+    async def _run(self):
+        while self.running:
+            try:
+                if not self._total:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                await self._drain()
+                await asyncio.sleep(self.drain_interval)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in overflow spool: {e}")
+                await asyncio.sleep(self.drain_interval)
+
+    async def _drain(self):
+        """Send spooled messages round-robin across tasks until every task is out of quota"""
+        now = time.time()
+        for spool in self.spools.values():
+            self._total -= spool.expire(now)
+
+        ready: List[int] = [task_id for task_id, spool in self.spools.items() if spool.entries]
+        while ready:
+            still_ready = []
+            for task_id in ready:
+                spool = self.spools.get(task_id)
+                if not spool or not spool.entries or not await self.can_send(task_id):
+                    continue
+                entry = spool.entries.popleft()
+                self._total -= 1
+                spool.drained += 1
+                try:
+                    await self.handler(task_id, entry.source_chat_id, entry.message)
+                except Exception as e:
+                    logger.error(f"Failed to deliver spooled message for task {task_id}: {e}")
+                if spool.entries:
+                    still_ready.append(task_id)
+            ready = still_ready
+
+    def _persist(self):
+        """Write spooled messages to disk; only serialisable messages survive a restart"""
+        if not self._total:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            kept = 0
+            with open(self.path, "w", encoding="utf-8") as f:
+                for task_id, spool in self.spools.items():
+                    for entry in spool.entries:
+                        if not hasattr(entry.message, "model_dump_json"):
+                            continue
+                        f.write(json.dumps({
+                            "task_id": task_id,
+                            "source_chat_id": entry.source_chat_id,
+                            "spooled_at": entry.spooled_at,
+                            "max_age": spool.max_age,
+                            "keep_latest": spool.entries.maxlen,
+                            "payload": entry.message.model_dump_json(exclude_none=True)
+                        }) + "\n")
+                        kept += 1
+            logger.info(f"Persisted {kept}/{self._total} spooled messages")
+        except Exception as e:
+            logger.error(f"Failed to persist overflow spool: {e}")
+
+    def _restore(self):
+        """Reload messages persisted by a previous run"""
+        if not self.message_loader or not os.path.exists(self.path):
+            return
+        try:
+            restored = 0
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        message = self.message_loader(record["payload"])
+                    except Exception as e:
+                        logger.error(f"Dropping unreadable spooled message: {e}")
+                        continue
+                    if self.add(record["task_id"], record["source_chat_id"], message,
+                                record["max_age"], record["keep_latest"], record["spooled_at"]):
+                        restored += 1
+            os.remove(self.path)
+            logger.info(f"Restored {restored} spooled messages")
+        except Exception as e:
+            logger.error(f"Failed to restore overflow spool: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get spool depth, age and drain counters"""
+        now = time.time()
+        tasks = {}
+        for task_id, spool in self.spools.items():
+            oldest = spool.entries[0].spooled_at if spool.entries else None
+            tasks[task_id] = {
+                "depth": len(spool.entries),
+                "oldest_age": round(now - oldest, 1) if oldest else 0,
+                "spooled": spool.spooled,
+                "drained": spool.drained,
+                "expired": spool.expired,
+                "collapsed": spool.collapsed
+            }
+        return {
+            "depth": self._total,
+            "max_total": self.max_total,
+            "oldest_age": max((task["oldest_age"] for task in tasks.values()), default=0),
+            "dropped": self.dropped,
+            "tasks": tasks
+        }
@@ -11,14 +11,17 @@ from collections import defaultdict, deque
 from loguru import logger
 
 from database import Database
+from utils.job_scheduler import get_job_scheduler
 
 
 class PerformanceMonitor:
     """Advanced performance monitoring and analytics system"""
     
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, leader=None):
         self.database = database
+        self.leader = leader  # LeaderElection; database-wide collectors run only on the leader
         self.running = False
+        self.jobs = get_job_scheduler()
         
         # Performance metrics
         self.message_stats = defaultdict(int)
@@ -31,6 +34,9 @@ class PerformanceMonitor:
         self.memory_usage_history = deque(maxlen=60)
         self.network_stats = defaultdict(int)
         
+        # Latest database statistics; refreshed by the leader only
+        self.database_stats: Dict[str, Any] = {}
+        
         # Task performance tracking
         self.task_performance = defaultdict(lambda: {
             'total_messages': 0,
@@ -50,14 +56,19 @@ class PerformanceMonitor:
         self.running = True
         logger.info("Starting performance monitoring")
         
-        # Start background monitoring tasks
-        asyncio.create_task(self._system_metrics_collector())
-        asyncio.create_task(self._database_stats_collector())
-        asyncio.create_task(self._cleanup_old_data())
+        # Register background monitoring jobs
+        self.jobs.register("performance_monitor.system_metrics", self._system_metrics_collector, 60,
+                           run_immediately=True, max_runtime=30)
+        self.jobs.register("performance_monitor.database_stats", self._database_stats_collector, 300,
+                           max_runtime=120,
+                           condition=lambda: self.leader is None or self.leader.is_leader)
+        self.jobs.register("performance_monitor.cleanup", self._cleanup_old_data, 3600)
         
     async def stop_monitoring(self):
         """Stop performance monitoring"""
         self.running = False
+        for name in ("system_metrics", "database_stats", "cleanup"):
+            self.jobs.unregister(f"performance_monitor.{name}")
         logger.info("Performance monitoring stopped")
     
     def record_message_processed(self, task_id: int, processing_time: float, success: bool):
@@ -182,72 +193,48 @@ class PerformanceMonitor:
             return {'error': str(e)}
     
     async def _system_metrics_collector(self):
-        """Background task to collect system metrics"""
-        while self.running:
-            try:
-                # Collect CPU and memory usage
-                cpu_percent = psutil.cpu_percent()
-                memory = psutil.virtual_memory()
-                
-                self.cpu_usage_history.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'value': cpu_percent
-                })
-                
-                self.memory_usage_history.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'value': memory.percent
-                })
-                
-                # Network statistics
-                net_io = psutil.net_io_counters()
-                self.network_stats['bytes_sent'] = net_io.bytes_sent
-                self.network_stats['bytes_recv'] = net_io.bytes_recv
-                
-                await asyncio.sleep(60)  # Collect every minute
-                
-            except Exception as e:
-                logger.error(f"Error in system metrics collector: {e}")
-                await asyncio.sleep(60)
+        """Collect system metrics"""
+        # Collect CPU and memory usage
+        cpu_percent = psutil.cpu_percent()
+        memory = psutil.virtual_memory()
+        
+        self.cpu_usage_history.append({
+            'timestamp': datetime.now().isoformat(),
+            'value': cpu_percent
+        })
+        
+        self.memory_usage_history.append({
+            'timestamp': datetime.now().isoformat(),
+            'value': memory.percent
+        })
+        
+        # Network statistics
+        net_io = psutil.net_io_counters()
+        self.network_stats['bytes_sent'] = net_io.bytes_sent
+        self.network_stats['bytes_recv'] = net_io.bytes_recv
     
     async def _database_stats_collector(self):
         """Collect database performance statistics"""
-        while self.running:
-            try:
-                await self._get_database_statistics()
-                await asyncio.sleep(300)  # Every 5 minutes
-                
-            except Exception as e:
-                logger.error(f"Error in database stats collector: {e}")
-                await asyncio.sleep(300)
+        self.database_stats = await self._get_database_statistics()
     
     async def _cleanup_old_data(self):
         """Clean up old performance data"""
-        while self.running:
-            try:
-                # Clean up old response times (keep only last 1000)
-                if len(self.response_times) > 1000:
-                    # Already handled by deque maxlen
-                    pass
-                
-                # Clean up old system metrics (keep only last hour)
-                cutoff_time = datetime.now() - timedelta(hours=1)
-                
-                # CPU usage cleanup is handled by deque maxlen
-                # Memory usage cleanup is handled by deque maxlen
-                
-                await asyncio.sleep(3600)  # Clean up every hour
-                
-            except Exception as e:
-                logger.error(f"Error in cleanup task: {e}")
-                await asyncio.sleep(3600)
+        # Response times and CPU/memory history are bounded by deque maxlen;
+        # drop channel activity that has been idle for over a day
+        cutoff = (datetime.now() - timedelta(days=1)).isoformat()
+        stale = [
+            channel_id for channel_id, activity in self.channel_activity.items()
+            if activity.get('last_activity', '') < cutoff
+        ]
+        for channel_id in stale:
+            del self.channel_activity[channel_id]
     
     async def _get_database_statistics(self) -> Dict[str, Any]:
         """Get database performance statistics"""
         try:
             # Get table sizes
             table_stats = {}
-            tables = ['forwarding_tasks', 'task_sources', 'task_targets', 'forwarding_logs', 'message_tracking']
+            tables = ['forwarding_tasks', 'task_sources', 'task_targets', 'message_tracking']
             
             for table in tables:
                 try:
@@ -258,14 +245,13 @@ class PerformanceMonitor:
                 except:
                     table_stats[table] = 0
             
-            # Get recent activity
-            recent_logs = await self.database.execute_query(
-                "SELECT COUNT(*) as count FROM forwarding_logs WHERE created_at > NOW() - INTERVAL '1 hour'"
-            )
+            # forwarding_logs is the large table: its counts come from the rollups
+            table_stats['forwarding_logs'] = sum((await self.database.get_log_counts()).values())
+            recent_logs = sum((await self.database.get_log_counts("1h")).values())
             
             return {
                 'table_sizes': table_stats,
-                'recent_activity_1h': recent_logs[0]['count'] if recent_logs else 0,
+                'recent_activity_1h': recent_logs,
                 'last_updated': datetime.now().isoformat()
             }
             
@@ -0,0 +1,292 @@
+"""
+Recurring Posts - Timer-driven scheduler for recurring task posts
+"""
+
+import asyncio
+import heapq
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from modules.outbound_scheduler import LANE_BACKGROUND, LANE_DELETE
+
+
+# media_type -> (Bot method, file argument)
+MEDIA_SENDERS = {
+    "photo": ("send_photo", "photo"),
+    "video": ("send_video", "video"),
+    "document": ("send_document", "document"),
+    "animation": ("send_animation", "animation"),
+    "audio": ("send_audio", "audio"),
+    "voice": ("send_voice", "voice")
+}
+
+
+class RecurringPostScheduler:
+    """Keeps due times in a min-heap and sleeps until the earliest one"""
+
+    def __init__(self, database, bot, outbound, leader=None, batch_size: int = 100,
+                 refresh_interval: float = 60.0):
+        self.database = database
+        self.bot = bot
+        self.outbound = outbound
+        self.leader = leader
+        self.batch_size = batch_size
+        self.refresh_interval = refresh_interval
+
+        # (monotonic deadline, post id); superseded entries are skipped lazily
+        self._heap: List[Tuple[float, int]] = []
+        self._deadlines: Dict[int, float] = {}
+        self._watermark = None
+        self._loaded = False
+        self._next_refresh = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.running = False
+
+        self.stats = {
+            "posted": 0,
+            "failed": 0,
+            "deleted_previous": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "last_run": None
+        }
+
+        if leader is not None:
+            leader.add_listener(self._on_leadership_change)
+
+    async def start(self):
+        """Start the scheduler loop"""
+        if self.running:
+            return
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+        logger.info("Recurring post scheduler started")
+
+    async def stop(self):
+        """Stop the scheduler loop"""
+        if not self.running:
+            return
+        self.running = False
+        self._wakeup.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def request_refresh(self):
+        """Pick up schedule changes now instead of at the next refresh"""
+        self._next_refresh = 0.0
+        self._wakeup.set()
+
+    def _on_leadership_change(self, leader: bool):
+        # A new leader rebuilds from the database; a former one forgets its heap
+        self._loaded = False
+        self._heap.clear()
+        self._deadlines.clear()
+        self._wakeup.set()
+
+    def _push(self, post_id: int, next_post_time: Optional[datetime], db_now: datetime):
+        """Schedule a post relative to the database clock"""
+        delay = (next_post_time - db_now).total_seconds() if next_post_time else 0.0
+        deadline = time.monotonic() + max(0.0, delay)
+        self._deadlines[post_id] = deadline
+        heapq.heappush(self._heap, (deadline, post_id))
+
+    async def _refresh(self):
+        """Load the full schedule once, then only rows changed since the last refresh"""
+        db_now = await self.database.get_change_watermark()
+        if db_now is None:
+            # Recurring posts need the PostgreSQL schedule queries
+            self._next_refresh = time.monotonic() + self.refresh_interval
+            return
+
+        full = not self._loaded
+        rows = await self.database.get_recurring_schedule(None if full else self._watermark)
+
+        if full:
+            self._deadlines = {}
+            now = time.monotonic()
+            for row in rows:
+                if row["enabled"]:
+                    delay = (row["next_post_time"] - db_now).total_seconds() if row["next_post_time"] else 0.0
+                    self._deadlines[row["id"]] = now + max(0.0, delay)
+            self._heap = [(deadline, post_id) for post_id, deadline in self._deadlines.items()]
+            heapq.heapify(self._heap)
+            self._loaded = True
+            logger.info(f"Loaded {len(self._deadlines)} recurring post schedules")
+        else:
+            for row in rows:
+                if row["enabled"]:
+                    self._push(row["id"], row["next_post_time"], db_now)
+                else:
+                    self._deadlines.pop(row["id"], None)
+
+            # Rebuild when stale entries dominate the heap
+            if len(self._heap) > 2 * len(self._deadlines) + 1000:
+                self._heap = [(deadline, post_id) for post_id, deadline in self._deadlines.items()]
+                heapq.heapify(self._heap)
+
+        self._watermark = db_now
+        self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def _pop_due(self) -> List[int]:
+        """Pop up to batch_size posts whose deadline has passed"""
+        now = time.monotonic()
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            deadline, post_id = heapq.heappop(self._heap)
+            if self._deadlines.get(post_id) == deadline:
+                del self._deadlines[post_id]
+                due.append(post_id)
+        return due
+
+    async def _run(self):
+        while self.running:
+            try:
+                if self.leader is not None and not self.leader.is_leader:
+                    # Only one process in the cluster posts; wait for leadership
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.refresh_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                if not self._loaded or time.monotonic() >= self._next_refresh:
+                    await self._refresh()
+
+                due = self._pop_due()
+                if due:
+                    await self._post_batch(due)
+                    continue
+
+                # Sleep until the earliest deadline or the next refresh, whichever comes first
+                wake_at = min(self._heap[0][0], self._next_refresh) if self._heap else self._next_refresh
+                delay = wake_at - time.monotonic()
+                if delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in recurring post scheduler: {e}")
+                await asyncio.sleep(5)
+
+    async def _post_batch(self, post_ids: List[int]):
+        """Send a batch of due posts and advance their schedules together"""
+        posts = await self.database.get_recurring_posts(post_ids)
+        results = await asyncio.gather(*(self._post(post) for post in posts), return_exceptions=True)
+
+        updates = []
+        for post, message_ids in zip(posts, results):
+            if isinstance(message_ids, Exception):
+                logger.error(f"Recurring post {post['id']} failed: {message_ids}")
+                # Keep the ids we know about so the next run can still delete them
+                message_ids = self._previous_message_ids(post)
+
+            db_now = post["db_now"]
+            interval = timedelta(hours=max(1, post.get("interval_hours") or 24))
+            next_post_time = post["next_post_time"] or db_now
+            # Skip slots missed while we were down instead of posting them in a burst
+            while next_post_time <= db_now:
+                next_post_time += interval
+
+            updates.append({
+                "id": post["id"],
+                "next_post_time": next_post_time,
+                "last_post_time": db_now,
+                "message_ids": message_ids
+            })
+            self._push(post["id"], next_post_time, db_now)
+
+        if not await self.database.advance_recurring_posts(updates):
+            # The posts went out; the in-memory schedule keeps them from repeating until restart
+            logger.warning(f"Recurring schedules for {len(updates)} posts were not saved")
+
+        self.stats["batches"] += 1
+        self.stats["last_batch_size"] = len(posts)
+        self.stats["last_run"] = time.time()
+
+    @staticmethod
+    def _previous_message_ids(post: Dict[str, Any]) -> Dict[str, int]:
+        previous = post.get("previous_message_ids") or {}
+        if isinstance(previous, str):
+            previous = json.loads(previous)
+        return dict(previous)
+
+    async def _post(self, post: Dict[str, Any]) -> Dict[str, int]:
+        """Post to every target of the task; returns target chat ID -> message ID
+
+        A chat whose send failed (or whose delete was rate limited, so nothing was sent)
+        keeps its previous message ID, so that message is still deleted on the next run.
+        """
+        previous = self._previous_message_ids(post)
+
+        message_ids: Dict[str, int] = {}
+        for chat_id in post.get("target_chat_ids") or []:
+            key = str(chat_id)
+            if post.get("delete_previous", True) and key in previous:
+                await self.outbound.acquire(LANE_DELETE)
+                try:
+                    await self.bot.delete_message(chat_id, previous[key])
+                    self.stats["deleted_previous"] += 1
+                except Exception as e:
+                    retry_after = getattr(e, "retry_after", None)
+                    if retry_after:
+                        # The old post is still there; posting now would leave two
+                        self.outbound.pause(retry_after)
+                        self.stats["failed"] += 1
+                        message_ids[key] = previous[key]
+                        logger.warning(f"Deleting previous recurring post in {chat_id} was rate limited, "
+                                       f"skipping this run")
+                        continue
+                    # Already deleted by an admin or too old to delete
+                    logger.debug(f"Could not delete previous recurring post in {chat_id}: {e}")
+
+            await self.outbound.acquire(LANE_BACKGROUND)
+            try:
+                sent = await self._send(chat_id, post)
+                message_ids[key] = sent.message_id
+                self.stats["posted"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                if key in previous:
+                    message_ids[key] = previous[key]
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after:
+                    self.outbound.pause(retry_after)
+                logger.error(f"Failed to send recurring post {post['id']} to {chat_id}: {e}")
+
+        return message_ids
+
+    async def _send(self, chat_id: int, post: Dict[str, Any]):
+        sender = MEDIA_SENDERS.get(post.get("media_type") or "")
+        if sender and post.get("media_file_id"):
+            method, file_argument = sender
+            return await getattr(self.bot, method)(
+                chat_id, **{file_argument: post["media_file_id"]}, caption=post.get("content") or None
+            )
+        return await self.bot.send_message(chat_id, post["content"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get schedule size and posting counters"""
+        next_due = None
+        if self._deadlines:
+            next_due = round(max(0.0, min(self._deadlines.values()) - time.monotonic()), 1)
+        return {
+            "running": self.running,
+            "active": self.leader is None or self.leader.is_leader,
+            "schedules": len(self._deadlines),
+            "heap_size": len(self._heap),
+            "next_due_in": next_due,
+            **self.stats
+        }
@@ -0,0 +1,92 @@
+"""
+Registry Snapshot - Local snapshot of the task registry for fast warm starts
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+
+class RegistrySnapshot:
+    """Persists tasks, sources, targets and settings between clean restarts"""
+
+    VERSION = 1
+
+    def __init__(self, path: str = "data/registry_snapshot.json", max_age_seconds: int = 6 * 3600):
+        self.path = path
+        # Change tombstones are kept for a day, so older snapshots cannot be reconciled incrementally
+        self.max_age_seconds = max_age_seconds
+
+    def save(self, tasks: Dict[int, Dict[str, Any]], settings: Dict[int, Optional[Dict[str, Any]]],
+             watermark: Any = None) -> bool:
+        """Write the snapshot atomically"""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            payload = {
+                "version": self.VERSION,
+                "saved_at": time.time(),
+                "watermark": watermark.isoformat() if isinstance(watermark, datetime) else None,
+                "tasks": {str(task_id): task for task_id, task in tasks.items()},
+                "settings": {str(task_id): task_settings for task_id, task_settings in settings.items()}
+            }
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.path)
+
+            logger.info(f"Saved registry snapshot with {len(tasks)} tasks to {self.path}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to save registry snapshot: {e}")
+            return False
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Load and consume the snapshot; returns None if missing, stale or invalid"""
+        if not os.path.exists(self.path):
+            return None
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+
+            if payload.get("version") != self.VERSION:
+                logger.warning("Ignoring registry snapshot with unknown version")
+                return None
+
+            age = time.time() - payload.get("saved_at", 0)
+            if age > self.max_age_seconds:
+                logger.warning(f"Ignoring stale registry snapshot ({int(age)}s old)")
+                return None
+
+            watermark = payload.get("watermark")
+            return {
+                "age_seconds": age,
+                "watermark": datetime.fromisoformat(watermark) if watermark else None,
+                "tasks": {int(task_id): task for task_id, task in payload.get("tasks", {}).items()},
+                "settings": {int(task_id): task_settings for task_id, task_settings in payload.get("settings", {}).items()}
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to load registry snapshot: {e}")
+            return None
+
+        finally:
+            # Only a clean shutdown may produce the next snapshot
+            self.discard()
+
+    def discard(self):
+        """Remove the snapshot file"""
+        try:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        except Exception as e:
+            logger.warning(f"Could not remove registry snapshot: {e}")
@@ -0,0 +1,243 @@
+"""
+Repositories - Cached, typed access to tasks, settings, sources, targets and keywords
+
+Handlers read through DatabaseCache and write through these classes, which update the
+cached rows in place or invalidate them, so a settings toggle is a single UPDATE.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from database import Database
+from utils.database_cache import DatabaseCache, get_database_cache, owner_tag, task_tag
+
+
+_IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+# Settings rows change only through handlers; a short TTL bounds staleness across replicas
+SETTINGS_TTL = 60
+
+
+def _check_columns(columns) -> None:
+    """Column names are interpolated into SQL, so only plain identifiers are allowed"""
+    for column in columns:
+        if not _IDENTIFIER.match(column):
+            raise ValueError(f"Invalid column name: {column!r}")
+
+
+class SettingsRepository:
+    """Full task_settings rows, cached per task"""
+
+    def __init__(self, database: Database, cache: DatabaseCache):
+        self.database = database
+        self.cache = cache
+
+    @staticmethod
+    def _key(task_id: int) -> str:
+        return f"settings_row:{task_id}"
+
+    async def get(self, task_id: int, force_refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """The task's settings row, or None if it has none"""
+        async def load():
+            rows = await self.database.execute_query("SELECT * FROM task_settings WHERE task_id = $1", task_id)
+            return rows[0] if rows else None
+
+        return await self.cache.get_or_load(self._key(task_id), load, SETTINGS_TTL, (task_tag(task_id),), force_refresh)
+
+    async def select(self, task_id: int, *columns: str) -> List[Dict[str, Any]]:
+        """Same shape as execute_query: [row] with only the given columns (all if none), or []"""
+        row = await self.get(task_id)
+        if row is None:
+            return []
+        if not columns:
+            return [dict(row)]
+        return [{column: row.get(column) for column in columns}]
+
+    async def value(self, task_id: int, column: str, default: Any = None) -> Any:
+        """One column of the settings row"""
+        row = await self.get(task_id)
+        if row is None or row.get(column) is None:
+            return default
+        return row[column]
+
+    async def update(self, task_id: int, **columns: Any) -> bool:
+        """Set some columns with one UPDATE and patch the cached row instead of re-reading it"""
+        if not columns:
+            return True
+        _check_columns(columns)
+
+        assignments = ", ".join(f"{column} = ${i}" for i, column in enumerate(columns, 1))
+        await self.database.execute_command(
+            f"UPDATE task_settings SET {assignments} WHERE task_id = ${len(columns) + 1}",
+            *columns.values(), task_id
+        )
+
+        key = self._key(task_id)
+        row = self.cache.peek(key)
+        # Anything else derived from this task (engine-facing settings, task lists) is now stale
+        await self.cache.invalidate_task_cache(task_id)
+        if row is not None:
+            self.cache.put(key, {**row, **columns}, SETTINGS_TTL, (task_tag(task_id),))
+        return True
+
+    async def invalidate(self, task_id: int):
+        """Drop cached rows after a write that bypassed update()"""
+        await self.cache.invalidate_task_cache(task_id)
+
+
+class KeywordRepository:
+    """Keyword filters stored as JSON (list, {"keywords": [...]} or lists per mode) or legacy CSV"""
+
+    def __init__(self, settings: SettingsRepository):
+        self.settings = settings
+
+    async def get_data(self, task_id: int) -> Any:
+        """Decoded keyword_filters value; None if unset"""
+        raw = await self.settings.value(task_id, "keyword_filters")
+        if not raw:
+            return None
+        if not isinstance(raw, str):
+            return raw
+        try:
+            return json.loads(raw)
+        except (ValueError, TypeError):
+            return [keyword.strip() for keyword in raw.split(",") if keyword.strip()]
+
+    async def get(self, task_id: int) -> List[str]:
+        """Flat keyword list for list, {"keywords": [...]} and CSV formats"""
+        data = await self.get_data(task_id)
+        if isinstance(data, dict):
+            return data.get("keywords", [])
+        if isinstance(data, list):
+            return data
+        return []
+
+    async def save(self, task_id: int, data: Any, mode: Optional[str] = None) -> bool:
+        """Store keyword data, and the filter mode when given"""
+        columns = {"keyword_filters": json.dumps(data, ensure_ascii=False) if data is not None else None}
+        if mode is not None:
+            columns["keyword_filter_mode"] = mode
+        return await self.settings.update(task_id, **columns)
+
+
+class TaskRepository:
+    """Task rows and ownership"""
+
+    def __init__(self, database: Database, cache: DatabaseCache):
+        self.database = database
+        self.cache = cache
+
+    async def get(self, task_id: int, force_refresh: bool = False) -> Optional[Dict[str, Any]]:
+        return await self.cache.get_task_data(task_id, force_refresh)
+
+    async def owner(self, task_id: int) -> Optional[Dict[str, Any]]:
+        """Task name, type and owner's Telegram ID"""
+        async def load():
+            rows = await self.database.execute_query("""
+                SELECT t.*, u.telegram_id AS user_telegram_id
+                FROM tasks t JOIN users u ON t.user_id = u.id
+                WHERE t.id = $1
+            """, task_id)
+            return rows[0] if rows else None
+
+        return await self.cache.get_or_load(f"task_owner:{task_id}", load, 600, (task_tag(task_id),))
+
+    async def for_owner(self, telegram_id: int) -> List[Dict[str, Any]]:
+        """A user's tasks by Telegram ID, newest first"""
+        async def load():
+            return await self.database.execute_query("""
+                SELECT t.* FROM tasks t JOIN users u ON t.user_id = u.id
+                WHERE u.telegram_id = $1
+                ORDER BY t.created_at DESC
+            """, telegram_id)
+
+        def tags(tasks):
+            # The owner tag also covers an empty list; creating a task invalidates it
+            return [task_tag(task["id"]) for task in tasks or []] + [owner_tag(telegram_id)]
+
+        return await self.cache.get_or_load(f"owner_tasks:{telegram_id}", load, SETTINGS_TTL, tags) or []
+
+    async def is_owned_by(self, task_id: int, telegram_id: int) -> bool:
+        task = await self.owner(task_id)
+        return bool(task) and task["user_telegram_id"] == telegram_id
+
+    async def update(self, task_id: int, **columns: Any) -> bool:
+        if not columns:
+            return True
+        _check_columns(columns)
+        assignments = ", ".join(f"{column} = ${i}" for i, column in enumerate(columns, 1))
+        await self.database.execute_command(
+            f"UPDATE tasks SET {assignments}, updated_at = NOW() WHERE id = ${len(columns) + 1}",
+            *columns.values(), task_id
+        )
+        await self.cache.invalidate_task_cache(task_id)
+        return True
+
+    async def invalidate(self, task_id: int):
+        await self.cache.invalidate_task_cache(task_id)
+
+    def invalidate_owner(self, telegram_id: int):
+        """Drop a user's cached task list, e.g. after creating a task for them"""
+        self.cache.invalidate_tag(owner_tag(telegram_id))
+
+
+class ChatRepository:
+    """Sources or targets of a task, cached as one list per task"""
+
+    def __init__(self, database: Database, cache: DatabaseCache, table: str):
+        self.database = database
+        self.cache = cache
+        self.table = table
+
+    async def list(self, task_id: int) -> List[Dict[str, Any]]:
+        async def load():
+            return await self.database.fetch_named(f"task_{self.table}", task_id)
+
+        return await self.cache.get_or_load(f"{self.table}:{task_id}", load, 300, (task_tag(task_id),)) or []
+
+    async def get(self, task_id: int, row_id: int) -> Optional[Dict[str, Any]]:
+        for row in await self.list(task_id):
+            if row["id"] == row_id:
+                return row
+        return None
+
+    async def delete(self, task_id: int, row_id: int) -> bool:
+        await self.database.execute_command(
+            f"DELETE FROM {self.table} WHERE id = $1 AND task_id = $2", row_id, task_id
+        )
+        await self.cache.invalidate_task_cache(task_id)
+        return True
+
+    async def toggle(self, task_id: int, row_id: int) -> Optional[bool]:
+        """Flip is_active; returns the new value, or None if the row does not exist"""
+        await self.database.execute_command(
+            f"UPDATE {self.table} SET is_active = NOT is_active WHERE id = $1 AND task_id = $2", row_id, task_id
+        )
+        await self.cache.invalidate_task_cache(task_id)
+        row = await self.get(task_id, row_id)
+        return row["is_active"] if row else None
+
+    async def invalidate(self, task_id: int):
+        """Drop the cached list after rows were inserted elsewhere"""
+        await self.cache.invalidate_task_cache(task_id)
+
+
+class Repositories:
+    """Repositories shared by the bot's handlers"""
+
+    def __init__(self, database: Database, cache: Optional[DatabaseCache] = None):
+        self.database = database
+        self.cache = cache or get_database_cache(database)
+        self.tasks = TaskRepository(database, self.cache)
+        self.settings = SettingsRepository(database, self.cache)
+        self.keywords = KeywordRepository(self.settings)
+        self.sources = ChatRepository(database, self.cache, "sources")
+        self.targets = ChatRepository(database, self.cache, "targets")
+
+    async def invalidate_task(self, task_id: int):
+        """Drop everything cached for a task, e.g. after deleting it"""
+        await self.cache.invalidate_task_cache(task_id)
+        logger.debug(f"Repository cache invalidated for task {task_id}")
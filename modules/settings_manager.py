@@ -3,19 +3,24 @@ Settings Manager - Handles bot and task settings
 """
 
 import json
+from datetime import datetime
 from typing import Dict, List, Any, Optional
 
 from loguru import logger
 
 from database import Database
+from modules.repositories import SettingsRepository
 from utils import validate_forward_settings, safe_json_loads, safe_json_dumps
+from utils.database_cache import get_database_cache
 
 
 class SettingsManager:
     """Manages bot and task settings"""
     
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, settings_repository: Optional[SettingsRepository] = None):
         self.database = database
+        # Task settings writes go through the repository so the shared cache and its listeners stay in sync
+        self.settings_repository = settings_repository or SettingsRepository(database, get_database_cache(database))
         self.system_settings_cache: Dict[str, Any] = {}
         self.task_settings_cache: Dict[int, Dict[str, Any]] = {}
         
@@ -197,66 +202,44 @@ class SettingsManager:
             keyword_filters = safe_json_dumps(validated_settings.get("keyword_filters", []))
             replace_text = safe_json_dumps(validated_settings.get("replace_text", {}))
             
+            columns = {
+                "forward_mode": validated_settings.get("forward_mode", "copy"),
+                "preserve_sender": validated_settings.get("preserve_sender", False),
+                "add_caption": validated_settings.get("add_caption", False),
+                "custom_caption": validated_settings.get("custom_caption"),
+                "filter_media": validated_settings.get("filter_media", False),
+                "filter_text": validated_settings.get("filter_text", False),
+                "filter_forwarded": validated_settings.get("filter_forwarded", False),
+                "filter_links": validated_settings.get("filter_links", False),
+                "keyword_filters": keyword_filters,
+                "delay_min": validated_settings.get("delay_min", 0),
+                "delay_max": validated_settings.get("delay_max", 5),
+                "remove_links": validated_settings.get("remove_links", False),
+                "remove_mentions": validated_settings.get("remove_mentions", False),
+                "replace_text": replace_text,
+                "duplicate_check": validated_settings.get("duplicate_check", True),
+                "max_message_length": validated_settings.get("max_message_length", 4096)
+            }
+            
             # Check if settings exist
             existing = await self.database.get_task_settings(task_id)
             
             if existing:
-                # Update existing settings
-                query = """
-                    UPDATE task_settings SET
-                        forward_mode = $2,
-                        preserve_sender = $3,
-                        add_caption = $4,
-                        custom_caption = $5,
-                        filter_media = $6,
-                        filter_text = $7,
-                        filter_forwarded = $8,
-                        filter_links = $9,
-                        keyword_filters = $10,
-                        delay_min = $11,
-                        delay_max = $12,
-                        remove_links = $13,
-                        remove_mentions = $14,
-                        replace_text = $15,
-                        duplicate_check = $16,
-                        max_message_length = $17,
-                        updated_at = NOW()
-                    WHERE task_id = $1
-                """
+                # Update existing settings; the repository patches its cached row and
+                # invalidates the task, so rendered keyboards and task lists follow
+                await self.settings_repository.update(task_id, **columns, updated_at=datetime.now())
             else:
                 # Insert new settings
-                query = """
+                placeholders = ", ".join(f"${i}" for i in range(2, len(columns) + 2))
+                await self.database.execute_command(
+                    f"""
                     INSERT INTO task_settings (
-                        task_id, forward_mode, preserve_sender, add_caption, custom_caption,
-                        filter_media, filter_text, filter_forwarded, filter_links, keyword_filters,
-                        delay_min, delay_max, remove_links, remove_mentions, replace_text,
-                        duplicate_check, max_message_length, created_at, updated_at
-                    ) VALUES (
-                        $1, $2, $3, $4, $5, $6, $7, $8, $9, $10,
-                        $11, $12, $13, $14, $15, $16, $17, NOW(), NOW()
-                    )
-                """
-            
-            await self.database.execute_command(
-                query,
-                task_id,
-                validated_settings.get("forward_mode", "copy"),
-                validated_settings.get("preserve_sender", False),
-                validated_settings.get("add_caption", False),
-                validated_settings.get("custom_caption"),
-                validated_settings.get("filter_media", False),
-                validated_settings.get("filter_text", False),
-                validated_settings.get("filter_forwarded", False),
-                validated_settings.get("filter_links", False),
-                keyword_filters,
-                validated_settings.get("delay_min", 0),
-                validated_settings.get("delay_max", 5),
-                validated_settings.get("remove_links", False),
-                validated_settings.get("remove_mentions", False),
-                replace_text,
-                validated_settings.get("duplicate_check", True),
-                validated_settings.get("max_message_length", 4096)
-            )
+                        task_id, {", ".join(columns)}, created_at, updated_at
+                    ) VALUES ($1, {placeholders}, NOW(), NOW())
+                    """,
+                    task_id, *columns.values()
+                )
+                await self.settings_repository.invalidate(task_id)
             
             # Update cache
             validated_settings["keyword_filters"] = validated_settings.get("keyword_filters", [])
@@ -0,0 +1,428 @@
+"""
+Sharding - Front-process supervisor and worker processes sharded by source chat
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+class ShardSupervisor:
+    """Runs worker processes and routes channel updates to them by source chat ID"""
+
+    def __init__(self, worker_count: int, inbox_size: int = 10000, heartbeat_timeout: float = 30.0,
+                 startup_timeout: float = 180.0):
+        self.worker_count = max(1, worker_count)
+        self.inbox_size = inbox_size
+        self.heartbeat_timeout = heartbeat_timeout
+        # Workers run migrations and load tasks before their first heartbeat
+        self.startup_timeout = startup_timeout
+
+        # Spawn keeps workers free of the front process's event loop and sockets
+        self._ctx = multiprocessing.get_context("spawn")
+        self._outbox = self._ctx.Queue()
+        self.workers: Dict[int, Dict[str, Any]] = {}
+        self.live_workers: List[int] = []
+        # chat_id -> (worker_id, seq of its last queued update); a chat only moves to a new
+        # owner once the previous one has acknowledged that seq, so per-chat order holds
+        self._chat_pins: Dict[int, Tuple[int, int]] = {}
+        self._supervisor_task: Optional[asyncio.Task] = None
+        self.running = False
+
+        self.stats = {
+            "dispatched": 0,
+            "dispatch_failures": 0,
+            "local_fallbacks": 0,
+            "rebalances": 0,
+            "restarts": 0,
+            "handed_over": 0,
+            "pinned_dispatches": 0
+        }
+
+    async def start(self):
+        """Spawn workers and start supervising them"""
+        if self.running:
+            return
+        self.running = True
+        for worker_id in range(self.worker_count):
+            self._spawn(worker_id)
+        self._supervisor_task = asyncio.create_task(self._supervise())
+        logger.info(f"Shard supervisor started {self.worker_count} workers")
+
+    async def stop(self, timeout: float = 15.0):
+        """Ask workers to finish their queues and exit"""
+        if not self.running:
+            return
+        self.running = False
+
+        if self._supervisor_task:
+            self._supervisor_task.cancel()
+            await asyncio.gather(self._supervisor_task, return_exceptions=True)
+
+        for worker in self.workers.values():
+            try:
+                worker["inbox"].put_nowait(None)
+            except Exception:
+                pass
+
+        deadline = time.time() + timeout
+        for worker_id, worker in self.workers.items():
+            process = worker["process"]
+            await asyncio.get_running_loop().run_in_executor(None, process.join, max(0.1, deadline - time.time()))
+            if process.is_alive():
+                logger.warning(f"Shard worker {worker_id} did not exit in time, terminating")
+                process.terminate()
+
+        self.workers.clear()
+        self.live_workers = []
+        self._chat_pins.clear()
+        logger.info("Shard supervisor stopped")
+
+    def _spawn(self, worker_id: int, handover: Optional[List[Any]] = None):
+        """Start (or restart) one worker process, queueing the items a dead predecessor left behind"""
+        previous = self.workers.get(worker_id) or {}
+        handover = handover or []
+        # Room for the handed-over backlog on top of the normal limit, so none of it is lost
+        inbox = self._ctx.Queue(maxsize=self.inbox_size + len(handover))
+        for item in handover:
+            try:
+                inbox.put_nowait(item)
+                self.stats["handed_over"] += 1
+            except queue.Full:
+                self.stats["dispatch_failures"] += 1
+                logger.error(f"Shard worker {worker_id} inbox full during handover, lost update from {item[1]}")
+        process = self._ctx.Process(
+            target=run_shard_worker,
+            args=(worker_id, self.worker_count, inbox, self._outbox),
+            name=f"shard-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self.workers[worker_id] = {
+            "process": process,
+            "inbox": inbox,
+            "started_at": time.time(),
+            "last_heartbeat": time.time(),
+            "dispatched": previous.get("dispatched", 0),
+            # Sequence numbers continue across restarts so pins on this worker stay valid
+            "seq": previous.get("seq", 0),
+            "acked": previous.get("acked", 0),
+            "stats": {}
+        }
+
+    @staticmethod
+    def _drain_inbox(inbox: Any) -> List[Any]:
+        """Take everything still queued in a dead worker's inbox"""
+        items = []
+        while True:
+            try:
+                # A short timeout lets the queue's feeder thread flush what it still buffers
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                return items
+            except Exception as e:
+                logger.error(f"Could not drain shard inbox: {e}")
+                return items
+            if item is not None:
+                items.append(item)
+
+    def _acknowledged(self, worker_id: int, seq: int) -> bool:
+        worker = self.workers.get(worker_id)
+        # A worker that is gone for good cannot hold anything back
+        return worker is None or worker["acked"] >= seq
+
+    def _set_live(self, worker_id: int, live: bool):
+        """Add or remove a worker from the shard ring"""
+        if live and worker_id not in self.live_workers:
+            self.live_workers.append(worker_id)
+            self.live_workers.sort()
+        elif not live and worker_id in self.live_workers:
+            self.live_workers.remove(worker_id)
+        else:
+            return
+        self.stats["rebalances"] += 1
+        logger.info(f"Shard ring {'joined' if live else 'left'} by worker {worker_id}: live={self.live_workers}")
+
+    def shard_for(self, chat_id: int) -> Optional[int]:
+        """Rendezvous hashing: only chats owned by a joining/leaving worker move"""
+        if not self.live_workers:
+            return None
+        # CRC32 is linear, so "chat:0" vs "chat:1" always compare the same way; a real hash spreads chats
+        return max(self.live_workers, key=lambda worker_id: hashlib.blake2b(
+            f"{chat_id}:{worker_id}".encode(), digest_size=8).digest())
+
+    def dispatch(self, kind: str, chat_id: int, message: Any) -> bool:
+        """Send an update to its shard; False means the caller must handle it locally"""
+        if not self.running or not hasattr(message, "model_dump_json"):
+            # Userbot (Telethon) messages cannot cross the process boundary
+            self.stats["local_fallbacks"] += 1
+            return False
+
+        worker_id = self.shard_for(chat_id)
+        if worker_id is None:
+            self.stats["local_fallbacks"] += 1
+            return False
+
+        pin = self._chat_pins.get(chat_id)
+        if pin and pin[0] != worker_id and not self._acknowledged(*pin):
+            # The previous owner still has this chat's updates queued; keep feeding it until it catches up
+            worker_id = pin[0]
+            self.stats["pinned_dispatches"] += 1
+
+        try:
+            worker = self.workers[worker_id]
+            payload = message.model_dump_json(exclude_none=True)
+            seq = worker["seq"] + 1
+            if worker.get("backlog") is not None:
+                # Restarting: queue behind what is being drained from the dead worker's inbox
+                if len(worker["backlog"]) >= self.inbox_size:
+                    raise queue.Full
+                worker["backlog"].append((kind, chat_id, payload, seq))
+            else:
+                worker["inbox"].put_nowait((kind, chat_id, payload, seq))
+            worker["seq"] = seq
+            worker["dispatched"] += 1
+            self._chat_pins[chat_id] = (worker_id, seq)
+            self.stats["dispatched"] += 1
+            return True
+        except queue.Full:
+            # The caller decides what to do with the update; it is not silently dropped here
+            self.stats["dispatch_failures"] += 1
+            logger.error(f"Shard worker {worker_id} inbox full, update from {chat_id} not dispatched")
+            return False
+        except Exception as e:
+            self.stats["dispatch_failures"] += 1
+            logger.error(f"Failed to dispatch update from {chat_id} to worker {worker_id}: {e}")
+            return False
+
+    def broadcast(self, kind: str):
+        """Send a control message (e.g. reload) to every live worker"""
+        for worker_id in list(self.live_workers):
+            try:
+                self.workers[worker_id]["inbox"].put_nowait((kind, None, None, None))
+            except Exception as e:
+                logger.warning(f"Could not send '{kind}' to shard worker {worker_id}: {e}")
+
+    async def _supervise(self):
+        """Collect heartbeats, detect dead workers and restart them"""
+        while self.running:
+            try:
+                while True:
+                    try:
+                        event, worker_id, data = self._outbox.get_nowait()
+                    except queue.Empty:
+                        break
+                    worker = self.workers.get(worker_id)
+                    if not worker:
+                        continue
+                    worker["last_heartbeat"] = time.time()
+                    if event == "ready":
+                        self._set_live(worker_id, True)
+                    elif event == "ack":
+                        worker["acked"] = max(worker["acked"], data or 0)
+                    elif event == "stats":
+                        worker["stats"] = data or {}
+
+                # Pins whose updates were all processed no longer constrain routing
+                self._chat_pins = {
+                    chat_id: pin for chat_id, pin in self._chat_pins.items()
+                    if not self._acknowledged(*pin)
+                }
+
+                for worker_id, worker in list(self.workers.items()):
+                    process = worker["process"]
+                    silent_for = time.time() - worker["last_heartbeat"]
+                    timeout = self.heartbeat_timeout if worker_id in self.live_workers else self.startup_timeout
+                    if process.is_alive() and silent_for < timeout:
+                        continue
+
+                    self._set_live(worker_id, False)
+                    if process.is_alive():
+                        logger.error(f"Shard worker {worker_id} silent for {int(silent_for)}s, restarting")
+                        process.terminate()
+                    else:
+                        logger.error(f"Shard worker {worker_id} exited with code {process.exitcode}, restarting")
+
+                    # Back off if the worker keeps dying right after start
+                    if time.time() - worker["started_at"] < 10:
+                        await asyncio.sleep(5)
+                    # Hand what the dead worker had not taken yet to its replacement, in order
+                    worker["backlog"] = []
+                    handover = await asyncio.get_running_loop().run_in_executor(
+                        None, self._drain_inbox, worker["inbox"]
+                    )
+                    handover.extend(worker.pop("backlog"))
+                    self.stats["restarts"] += 1
+                    self._spawn(worker_id, handover)
+
+                await asyncio.sleep(1)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in shard supervisor: {e}")
+                await asyncio.sleep(5)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-worker state and routing counters"""
+        return {
+            "running": self.running,
+            "workers": self.worker_count,
+            "live_workers": list(self.live_workers),
+            "pinned_chats": len(self._chat_pins),
+            **self.stats,
+            "per_worker": {
+                worker_id: {
+                    "alive": worker["process"].is_alive(),
+                    "pid": worker["process"].pid,
+                    "dispatched": worker["dispatched"],
+                    "queued": worker["seq"] - worker["acked"],
+                    "heartbeat_age": round(time.time() - worker["last_heartbeat"], 1),
+                    "engine": worker["stats"]
+                }
+                for worker_id, worker in self.workers.items()
+            }
+        }
+
+
+def run_shard_worker(worker_id: int, worker_count: int, inbox: Any, outbox: Any):
+    """Process entry point for a shard worker"""
+    logger.remove()
+    logger.add(
+        sys.stdout,
+        level="INFO",
+        format=f"<green>{{time:YYYY-MM-DD HH:mm:ss}}</green> | <level>{{level: <8}}</level> | "
+               f"<magenta>worker-{worker_id}</magenta> | <cyan>{{name}}</cyan>:<cyan>{{function}}</cyan> - <level>{{message}}</level>"
+    )
+    try:
+        asyncio.run(_shard_worker_main(worker_id, worker_count, inbox, outbox))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _shard_worker_main(worker_id: int, worker_count: int, inbox: Any, outbox: Any):
+    """Run a ForwardingEngine slice fed from the inbox queue"""
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.enums import ParseMode
+    from aiogram.types import Message
+
+    from config import Config
+    from database import Database
+    from forwarding_engine import ForwardingEngine
+    from security import SecurityManager
+
+    config = Config()
+    database = Database(
+        config.database_url,
+        slow_query_ms=config.slow_query_ms,
+        log_retention_days=config.log_retention_days,
+        log_partition_days=config.log_partition_days,
+        log_partitions_ahead=config.log_partitions_ahead,
+        log_retention_mode=config.log_retention_mode
+    )
+    await database.initialize()
+
+    security_manager = SecurityManager(database)
+    await security_manager.initialize()
+
+    bot = Bot(token=config.bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+    state_dir = os.path.join("data", f"shard_{worker_id}")
+    engine = ForwardingEngine(
+        database=database,
+        bot=bot,
+        userbot=None,
+        security_manager=security_manager,
+        startup_concurrency=config.startup_concurrency,
+        snapshot_path=os.path.join(state_dir, "registry_snapshot.json"),
+        ingest_workers=config.ingest_workers,
+        # The Bot API limit is per token, so workers split it
+        outbound_rate=config.outbound_rate / max(1, worker_count),
+        ingest_spill_dir=os.path.join(state_dir, "ingest_spill"),
+        deferred_path=os.path.join(state_dir, "deferred_delivery.jsonl"),
+        spool_path=os.path.join(state_dir, "overflow_spool.jsonl"),
+        digest_path=os.path.join(state_dir, "digest_buffers.json")
+    )
+    await engine.initialize()
+    await engine.start()
+
+    loop = asyncio.get_running_loop()
+    outbox.put(("ready", worker_id, None))
+    logger.info(f"Shard worker {worker_id} ready")
+
+    async def heartbeat():
+        while engine.running:
+            stats = engine.get_stats()
+            outbox.put(("stats", worker_id, {
+                "messages_processed": stats.get("messages_processed"),
+                "successful_forwards": stats.get("successful_forwards"),
+                "failed_forwards": stats.get("failed_forwards"),
+                "active_monitors": stats.get("active_monitors")
+            }))
+            await asyncio.sleep(5)
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+
+    # Seq of the last update taken from the inbox; the supervisor moves a chat only after it is acknowledged
+    last_seq = 0
+    acked_seq = 0
+
+    def settled_seq() -> int:
+        """Highest seq with every update up to it fully handled, not just queued for ingest"""
+        pending = engine.ingest.oldest_pending_seq()
+        return last_seq if pending is None else min(last_seq, pending - 1)
+
+    async def acknowledge():
+        nonlocal acked_seq
+        while engine.running:
+            settled = settled_seq()
+            if settled > acked_seq:
+                acked_seq = settled
+                outbox.put(("ack", worker_id, acked_seq))
+            await asyncio.sleep(0.5)
+
+    ack_task = asyncio.create_task(acknowledge())
+
+    try:
+        while True:
+            item = await loop.run_in_executor(None, inbox.get)
+            if item is None:
+                break
+
+            kind, chat_id, payload, seq = item
+            try:
+                if kind == "reload":
+                    await engine._reload_tasks()
+                    continue
+
+                message = Message.model_validate_json(payload).as_(bot)
+                if kind == "edit":
+                    # Edits are awaited so they stay ordered with later edits of the same chat
+                    await engine.process_edited_message(chat_id, message)
+                else:
+                    await engine.process_channel_message(chat_id, message, seq)
+
+            except Exception as e:
+                logger.error(f"Shard worker {worker_id} failed to handle {kind} from {chat_id}: {e}")
+            finally:
+                if seq:
+                    last_seq = seq
+
+    finally:
+        heartbeat_task.cancel()
+        ack_task.cancel()
+        # Stopping the engine drains the ingest queues and spills the rest, settling every seq
+        await engine.stop()
+        if last_seq > acked_seq:
+            outbox.put(("ack", worker_id, last_seq))
+        await bot.session.close()
+        await database.close()
+        logger.info(f"Shard worker {worker_id} stopped")
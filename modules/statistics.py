@@ -37,40 +37,26 @@ class StatisticsManager:
             if await self._is_cache_valid("global"):
                 return self.cache.get("global", {})
             
-            # Database queries for global stats
-            queries = {
-                "total_users": "SELECT COUNT(*) as count FROM users",
-                "active_users": "SELECT COUNT(*) as count FROM users WHERE is_active = true",
-                "admin_users": "SELECT COUNT(*) as count FROM users WHERE is_admin = true",
-                "total_tasks": "SELECT COUNT(*) as count FROM tasks",
-                "active_tasks": "SELECT COUNT(*) as count FROM tasks WHERE is_active = true",
-                "total_sources": "SELECT COUNT(*) as count FROM sources",
-                "total_targets": "SELECT COUNT(*) as count FROM targets",
-                "total_messages": "SELECT COUNT(*) as count FROM forwarding_logs",
-                "successful_messages": "SELECT COUNT(*) as count FROM forwarding_logs WHERE status = 'success'",
-                "failed_messages": "SELECT COUNT(*) as count FROM forwarding_logs WHERE status = 'failed'",
-                "messages_today": """
-                    SELECT COUNT(*) as count FROM forwarding_logs 
-                    WHERE DATE(processed_at) = CURRENT_DATE
-                """,
-                "messages_this_week": """
-                    SELECT COUNT(*) as count FROM forwarding_logs 
-                    WHERE processed_at >= CURRENT_DATE - INTERVAL '7 days'
-                """,
-                "messages_this_month": """
-                    SELECT COUNT(*) as count FROM forwarding_logs 
-                    WHERE processed_at >= CURRENT_DATE - INTERVAL '30 days'
-                """
-            }
-            
-            stats = {}
-            for key, query in queries.items():
-                try:
-                    result = await self.database.execute_query(query)
-                    stats[key] = result[0]["count"] if result else 0
-                except Exception as e:
-                    logger.error(f"Error executing query for {key}: {e}")
-                    stats[key] = 0
+            # Entity counts in one round trip; message counts come from the log rollups
+            counts = await self.database.execute_query("""
+                SELECT
+                    (SELECT COUNT(*) FROM users) as total_users,
+                    (SELECT COUNT(*) FROM users WHERE is_active = true) as active_users,
+                    (SELECT COUNT(*) FROM users WHERE is_admin = true) as admin_users,
+                    (SELECT COUNT(*) FROM tasks) as total_tasks,
+                    (SELECT COUNT(*) FROM tasks WHERE is_active = true) as active_tasks,
+                    (SELECT COUNT(*) FROM sources) as total_sources,
+                    (SELECT COUNT(*) FROM targets) as total_targets
+            """)
+            stats = dict(counts[0]) if counts else {}
+            
+            by_status = await self.database.get_log_counts()
+            stats["total_messages"] = sum(by_status.values())
+            stats["successful_messages"] = by_status.get("success", 0)
+            stats["failed_messages"] = by_status.get("failed", 0)
+            for key, window in (("messages_today", "today"), ("messages_this_week", "7d"),
+                                ("messages_this_month", "30d")):
+                stats[key] = sum((await self.database.get_log_counts(window)).values())
             
             # Calculate derived statistics
             stats["success_rate"] = (
@@ -80,7 +66,7 @@ class StatisticsManager:
             
             stats["avg_messages_per_task"] = (
                 (stats["total_messages"] / stats["total_tasks"])
-                if stats["total_tasks"] > 0 else 0
+                if stats.get("total_tasks") else 0
             )
             
             # Cache the results
@@ -107,20 +93,15 @@ class StatisticsManager:
             if not task_stats:
                 return {}
             
-            # Get additional statistics
+            # Counts and timings come from the log rollups
+            additional_stats = {
+                "messages_today": sum((await self.database.get_log_counts("today", task_id=task_id)).values()),
+                "messages_this_week": sum((await self.database.get_log_counts("7d", task_id=task_id)).values()),
+                "avg_processing_time": (await self.database.get_log_processing_times(task_id=task_id))["avg_time"]
+            }
+            
+            # Details the rollups do not keep, read from recent log partitions only
             additional_queries = {
-                "messages_today": """
-                    SELECT COUNT(*) as count FROM forwarding_logs 
-                    WHERE task_id = $1 AND DATE(processed_at) = CURRENT_DATE
-                """,
-                "messages_this_week": """
-                    SELECT COUNT(*) as count FROM forwarding_logs 
-                    WHERE task_id = $1 AND processed_at >= CURRENT_DATE - INTERVAL '7 days'
-                """,
-                "avg_processing_time": """
-                    SELECT AVG(processing_time) as avg_time FROM forwarding_logs 
-                    WHERE task_id = $1 AND processing_time IS NOT NULL
-                """,
                 "last_successful_forward": """
                     SELECT processed_at FROM forwarding_logs 
                     WHERE task_id = $1 AND status = 'success' 
@@ -130,19 +111,19 @@ class StatisticsManager:
                     SELECT error_message, COUNT(*) as count 
                     FROM forwarding_logs 
                     WHERE task_id = $1 AND status = 'failed' AND error_message IS NOT NULL
+                      AND processed_at >= CURRENT_DATE - INTERVAL '7 days'
                     GROUP BY error_message 
                     ORDER BY count DESC LIMIT 5
                 """
             }
             
-            additional_stats = {}
             for key, query in additional_queries.items():
                 try:
                     result = await self.database.execute_query(query, task_id)
                     if key == "error_types":
                         additional_stats[key] = result
                     elif result:
-                        additional_stats[key] = result[0].get("count") or result[0].get("avg_time") or result[0].get("processed_at")
+                        additional_stats[key] = result[0].get("processed_at")
                     else:
                         additional_stats[key] = None
                 except Exception as e:
@@ -204,32 +185,14 @@ class StatisticsManager:
                     JOIN users u ON t.user_id = u.id
                     WHERE u.telegram_id = $1
                 """,
-                "total_messages": """
-                    SELECT COUNT(*) as count FROM forwarding_logs fl
-                    JOIN tasks t ON fl.task_id = t.id
-                    JOIN users u ON t.user_id = u.id
-                    WHERE u.telegram_id = $1
-                """,
-                "successful_messages": """
-                    SELECT COUNT(*) as count FROM forwarding_logs fl
-                    JOIN tasks t ON fl.task_id = t.id
-                    JOIN users u ON t.user_id = u.id
-                    WHERE u.telegram_id = $1 AND fl.status = 'success'
-                """,
-                "messages_today": """
-                    SELECT COUNT(*) as count FROM forwarding_logs fl
-                    JOIN tasks t ON fl.task_id = t.id
-                    JOIN users u ON t.user_id = u.id
-                    WHERE u.telegram_id = $1 AND DATE(fl.processed_at) = CURRENT_DATE
-                """,
                 "first_activity": """
                     SELECT MIN(created_at) as first_date FROM tasks t
                     JOIN users u ON t.user_id = u.id
                     WHERE u.telegram_id = $1
                 """,
                 "last_activity": """
-                    SELECT MAX(fl.processed_at) as last_date FROM forwarding_logs fl
-                    JOIN tasks t ON fl.task_id = t.id
+                    SELECT MAX(ts.last_activity) as last_date FROM task_statistics ts
+                    JOIN tasks t ON ts.task_id = t.id
                     JOIN users u ON t.user_id = u.id
                     WHERE u.telegram_id = $1
                 """
@@ -247,6 +210,11 @@ class StatisticsManager:
                     logger.error(f"Error executing user query for {key}: {e}")
                     stats[key] = 0 if key not in ["first_activity", "last_activity"] else None
             
+            by_status = await self.database.get_log_counts(user_id=user_id)
+            stats["total_messages"] = sum(by_status.values())
+            stats["successful_messages"] = by_status.get("success", 0)
+            stats["messages_today"] = sum((await self.database.get_log_counts("today", user_id=user_id)).values())
+            
             # Calculate derived statistics with safe division
             total_msgs = stats.get("total_messages", 0) or 0
             successful_msgs = stats.get("successful_messages", 0) or 0
@@ -275,59 +243,22 @@ class StatisticsManager:
     async def get_performance_statistics(self) -> Dict[str, Any]:
         """Get performance statistics"""
         try:
-            # Performance queries
-            perf_queries = {
-                "avg_processing_time": """
-                    SELECT AVG(processing_time) as avg_time FROM forwarding_logs 
-                    WHERE processing_time IS NOT NULL
-                """,
-                "max_processing_time": """
-                    SELECT MAX(processing_time) as max_time FROM forwarding_logs 
-                    WHERE processing_time IS NOT NULL
-                """,
-                "min_processing_time": """
-                    SELECT MIN(processing_time) as min_time FROM forwarding_logs 
-                    WHERE processing_time IS NOT NULL AND processing_time > 0
-                """,
-                "messages_per_hour": """
-                    SELECT COUNT(*) / 
-                    GREATEST(EXTRACT(EPOCH FROM (MAX(processed_at) - MIN(processed_at))) / 3600, 1) as rate
-                    FROM forwarding_logs 
-                    WHERE processed_at >= NOW() - INTERVAL '24 hours'
-                """,
-                "error_rate": """
-                    SELECT 
-                        COUNT(CASE WHEN status = 'failed' THEN 1 END) * 100.0 / COUNT(*) as error_rate
-                    FROM forwarding_logs 
-                    WHERE processed_at >= NOW() - INTERVAL '24 hours'
-                """,
-                "peak_hour": """
-                    SELECT EXTRACT(HOUR FROM processed_at) as hour, COUNT(*) as count
-                    FROM forwarding_logs 
-                    WHERE processed_at >= NOW() - INTERVAL '7 days'
-                    GROUP BY EXTRACT(HOUR FROM processed_at)
-                    ORDER BY count DESC
-                    LIMIT 1
-                """
-            }
-            
             stats = {}
-            for key, query in perf_queries.items():
-                try:
-                    result = await self.database.execute_query(query)
-                    if key == "peak_hour":
-                        if result:
-                            stats["peak_hour"] = int(result[0]["hour"])
-                            stats["peak_hour_count"] = result[0]["count"]
-                        else:
-                            stats["peak_hour"] = None
-                            stats["peak_hour_count"] = 0
-                    else:
-                        value = result[0][list(result[0].keys())[0]] if result else 0
-                        stats[key] = float(value) if value is not None else 0
-                except Exception as e:
-                    logger.error(f"Error executing performance query for {key}: {e}")
-                    stats[key] = 0
+            
+            times = await self.database.get_log_processing_times()
+            stats["avg_processing_time"] = times["avg_time"]
+            stats["max_processing_time"] = times["max_time"]
+            stats["min_processing_time"] = times["min_time"]
+            
+            last_day = await self.database.get_log_counts("24h")
+            total = sum(last_day.values())
+            stats["messages_per_hour"] = total / 24
+            stats["error_rate"] = (last_day.get("failed", 0) * 100.0 / total) if total > 0 else 0
+            
+            hourly = await self.database.get_log_hourly_distribution(7)
+            peak = max(hourly, key=lambda row: row["message_count"] or 0, default=None)
+            stats["peak_hour"] = int(peak["hour"]) if peak else None
+            stats["peak_hour_count"] = int(peak["message_count"] or 0) if peak else 0
             
             return stats
             
@@ -338,55 +269,10 @@ class StatisticsManager:
     async def get_trending_data(self, days: int = 7) -> Dict[str, Any]:
         """Get trending data for charts"""
         try:
-            # Daily message counts
-            daily_query = """
-                SELECT 
-                    DATE(processed_at) as date,
-                    COUNT(*) as total_messages,
-                    COUNT(CASE WHEN status = 'success' THEN 1 END) as successful_messages,
-                    COUNT(CASE WHEN status = 'failed' THEN 1 END) as failed_messages
-                FROM forwarding_logs 
-                WHERE processed_at >= CURRENT_DATE - INTERVAL '{} days'
-                GROUP BY DATE(processed_at)
-                ORDER BY date
-            """.format(days)
-            
-            daily_data = await self.database.execute_query(daily_query)
-            
-            # Hourly distribution
-            hourly_query = """
-                SELECT 
-                    EXTRACT(HOUR FROM processed_at) as hour,
-                    COUNT(*) as message_count
-                FROM forwarding_logs 
-                WHERE processed_at >= NOW() - INTERVAL '{} days'
-                GROUP BY EXTRACT(HOUR FROM processed_at)
-                ORDER BY hour
-            """.format(days)
-            
-            hourly_data = await self.database.execute_query(hourly_query)
-            
-            # Task performance
-            task_perf_query = """
-                SELECT 
-                    t.name,
-                    COUNT(fl.*) as total_messages,
-                    COUNT(CASE WHEN fl.status = 'success' THEN 1 END) as successful_messages,
-                    AVG(fl.processing_time) as avg_processing_time
-                FROM tasks t
-                LEFT JOIN forwarding_logs fl ON t.id = fl.task_id
-                WHERE fl.processed_at >= NOW() - INTERVAL '{} days' OR fl.processed_at IS NULL
-                GROUP BY t.id, t.name
-                ORDER BY total_messages DESC
-                LIMIT 10
-            """.format(days)
-            
-            task_data = await self.database.execute_query(task_perf_query)
-            
             return {
-                "daily_data": daily_data,
-                "hourly_data": hourly_data,
-                "task_performance": task_data
+                "daily_data": await self.database.get_log_daily_counts(days),
+                "hourly_data": await self.database.get_log_hourly_distribution(days),
+                "task_performance": await self.database.get_task_log_summary(days)
             }
             
         except Exception as e:
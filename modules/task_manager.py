@@ -10,6 +10,7 @@ from loguru import logger
 
 from database import Database
 from utils import validate_forward_settings, generate_task_name
+from utils.database_cache import get_database_cache, owner_tag
 
 
 class TaskManager:
@@ -81,6 +82,9 @@ class TaskManager:
                 
                 # Update cache
                 await self._refresh_task_cache(task_id)
+                cache = get_database_cache()
+                if cache:
+                    cache.invalidate_tag(owner_tag(user_id))
                 
                 logger.info(f"Created task {task_id} for user {user_id}")
                 return task_id
@@ -197,10 +201,12 @@ class TaskManager:
             
             for query in delete_queries:
                 await self.database.execute_command(query, task_id)
+            await self.database.delete_log_rollups(task_id)
             
             # Remove from cache
             async with self.cache_lock:
                 self.task_cache.pop(task_id, None)
+            await self._invalidate_shared_cache(task_id)
             
             logger.info(f"Deleted task {task_id}")
             return True
@@ -254,6 +260,7 @@ class TaskManager:
                 chat_data.get("chat_type", "unknown")
             )
             
+            await self._invalidate_shared_cache(task_id)
             logger.info(f"Added source {chat_data['chat_id']} to task {task_id}")
             return True
             
@@ -267,6 +274,7 @@ class TaskManager:
             query = "DELETE FROM sources WHERE task_id = $1 AND chat_id = $2"
             await self.database.execute_command(query, task_id, chat_id)
             
+            await self._invalidate_shared_cache(task_id)
             logger.info(f"Removed source {chat_id} from task {task_id}")
             return True
             
@@ -296,6 +304,7 @@ class TaskManager:
                 chat_data.get("chat_type", "unknown")
             )
             
+            await self._invalidate_shared_cache(task_id)
             logger.info(f"Added target {chat_data['chat_id']} to task {task_id}")
             return True
             
@@ -309,6 +318,7 @@ class TaskManager:
             query = "DELETE FROM targets WHERE task_id = $1 AND chat_id = $2"
             await self.database.execute_command(query, task_id, chat_id)
             
+            await self._invalidate_shared_cache(task_id)
             logger.info(f"Removed target {chat_id} from task {task_id}")
             return True
             
@@ -369,6 +379,7 @@ class TaskManager:
                 validated_settings.get("max_message_length", 4096)
             )
             
+            await self._invalidate_shared_cache(task_id)
             logger.info(f"Updated settings for task {task_id}")
             return True
             
@@ -469,10 +480,18 @@ class TaskManager:
                     self.task_cache[task_id] = result[0]
                 else:
                     self.task_cache.pop(task_id, None)
+            
+            await self._invalidate_shared_cache(task_id)
                     
         except Exception as e:
             logger.error(f"Error refreshing task cache for {task_id}: {e}")
     
+    async def _invalidate_shared_cache(self, task_id: int):
+        """Drop the task's rows from the DatabaseCache that handler repositories read through"""
+        cache = get_database_cache()
+        if cache:
+            await cache.invalidate_task_cache(task_id)
+    
     async def get_task_summary(self, task_id: int) -> str:
         """Get formatted task summary"""
         try:
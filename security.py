@@ -4,6 +4,7 @@ Security Manager - Authentication and access control
 
 import hashlib
 import hmac
+import sys
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Set
@@ -438,6 +439,29 @@ class SecurityManager:
             logger.error(f"Error getting security stats: {e}")
             return {}
     
+    def shrink_tracking(self, bytes_to_free: int) -> int:
+        """Drop idle rate-limit windows and expired sessions (memory budget); returns estimated bytes freed"""
+        current_time = time.time()
+        cutoff_time = current_time - self.rate_limit_window
+        now = datetime.now()
+        freed = 0
+        
+        for user_id, requests in list(self.user_requests.items()):
+            if freed >= bytes_to_free:
+                break
+            if not requests or requests[-1] <= cutoff_time:
+                freed += sys.getsizeof(requests) + 8 * len(requests)
+                del self.user_requests[user_id]
+        
+        for user_id, session in list(self.user_sessions.items()):
+            if freed >= bytes_to_free:
+                break
+            if now > session["expires_at"]:
+                freed += sys.getsizeof(session)
+                del self.user_sessions[user_id]
+        
+        return freed
+    
     async def cleanup_expired_sessions(self):
         """Clean up expired sessions"""
         try:
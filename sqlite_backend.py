@@ -0,0 +1,370 @@
+"""
+SQLite backend - Long-lived tuned SQLite connections with a batching single writer
+"""
+
+import asyncio
+import re
+import sqlite3
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import aiosqlite
+from loguru import logger
+
+from database import UnsupportedStatement
+
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA cache_size=-65536",  # 64 MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON"
+)
+
+
+# Statements that only make sense on PostgreSQL; callers already treat them as optional
+_UNSUPPORTED = re.compile(
+    r"information_schema|\bpg_\w+|plpgsql|CREATE\s+OR\s+REPLACE\s+FUNCTION|EXECUTE\s+FUNCTION|"
+    r"\bANY\s*\(|\bUNNEST\s*\(|\bDO\s+\$\$|EXTRACT\s*\(\s*EPOCH|PARTITION\s+(?:BY|OF)",
+    re.IGNORECASE
+)
+
+_INTERVAL_UNITS = {
+    "second": "seconds", "minute": "minutes", "hour": "hours",
+    "day": "days", "week": "days", "month": "months", "year": "years"
+}
+
+_STRFTIME = {"HOUR": "%H", "MINUTE": "%M", "DAY": "%d", "MONTH": "%m", "YEAR": "%Y", "DOW": "%w"}
+
+_ALTER = re.compile(r"^\s*ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(\w+)\s+(.*)$", re.IGNORECASE | re.DOTALL)
+_ALTER_ACTION = re.compile(r"^(ADD|DROP)\s+COLUMN\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(.*)$", re.IGNORECASE | re.DOTALL)
+
+
+def _rewrite_interval(match: re.Match) -> str:
+    anchor, sign, amount, unit = match.groups()
+    unit = unit.lower().rstrip("s")
+    if unit not in _INTERVAL_UNITS:
+        raise UnsupportedStatement(f"Unsupported interval unit '{unit}'")
+    if unit == "week":
+        amount = str(int(amount) * 7)
+    modifiers = f"'{sign}{amount} {_INTERVAL_UNITS[unit]}'"
+    if anchor.upper() == "CURRENT_DATE":
+        return f"datetime('now', 'start of day', {modifiers})"
+    if anchor.upper() == "LOCALTIMESTAMP":
+        return f"datetime('now', 'localtime', {modifiers})"
+    return f"datetime('now', {modifiers})"
+
+
+def _rewrite_extract(match: re.Match) -> str:
+    field, column = match.groups()
+    return f"CAST(strftime('{_STRFTIME[field.upper()]}', {column}) AS INTEGER)"
+
+
+# (pattern, replacement) applied in order to every statement
+_REWRITES: Tuple[Tuple[re.Pattern, Any], ...] = (
+    # $1 -> ?1; SQLite numbered parameters keep PostgreSQL's reuse of the same index
+    (re.compile(r"\$(\d+)"), r"?\1"),
+    # value::jsonb, ::int[], ::timestamp ...
+    (re.compile(r"::\s*[A-Za-z_]+(?:\s*\[\])?"), ""),
+    # NOW() - INTERVAL '24 hours', CURRENT_DATE - INTERVAL '7 days'
+    (re.compile(r"(NOW\(\)|CURRENT_TIMESTAMP|LOCALTIMESTAMP|CURRENT_DATE)\s*([-+])\s*INTERVAL\s*'(\d+)\s*([A-Za-z]+)'",
+                re.IGNORECASE), _rewrite_interval),
+    (re.compile(r"\bNOW\(\)", re.IGNORECASE), "CURRENT_TIMESTAMP"),
+    (re.compile(r"\bLOCALTIMESTAMP\b", re.IGNORECASE), "datetime('now', 'localtime')"),
+    (re.compile(r"EXTRACT\s*\(\s*(HOUR|MINUTE|DAY|MONTH|YEAR|DOW)\s+FROM\s+([\w.]+)\s*\)", re.IGNORECASE), _rewrite_extract),
+    (re.compile(r"\bdate_trunc\s*\(\s*'hour'\s*,", re.IGNORECASE), "strftime('%Y-%m-%d %H:00:00',"),
+    (re.compile(r"\bdate_trunc\s*\(\s*'day'\s*,", re.IGNORECASE), "strftime('%Y-%m-%d 00:00:00',"),
+    (re.compile(r"\bILIKE\b", re.IGNORECASE), "LIKE"),
+    (re.compile(r"\bGREATEST\s*\(", re.IGNORECASE), "MAX("),
+    (re.compile(r"\bLEAST\s*\(", re.IGNORECASE), "MIN("),
+    (re.compile(r"\b(?:BIG)?SERIAL\s+PRIMARY\s+KEY", re.IGNORECASE), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bJSONB?\b", re.IGNORECASE), "TEXT"),
+    (re.compile(r"\bCONCURRENTLY\s+", re.IGNORECASE), ""),
+    (re.compile(r"\s+FOR\s+UPDATE(?:\s+SKIP\s+LOCKED)?", re.IGNORECASE), ""),
+)
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas outside parentheses and quotes"""
+    parts, depth, quote, current = [], 0, None, []
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if "".join(current).strip():
+        parts.append("".join(current).strip())
+    return parts
+
+
+@lru_cache(maxsize=1024)
+def translate(sql: str) -> Tuple[Tuple[str, bool], ...]:
+    """Translate a PostgreSQL statement to SQLite.
+
+    Returns (statement, tolerant) pairs; tolerant statements are ``ADD/DROP COLUMN``
+    pieces whose "already done" errors stand in for PostgreSQL's IF [NOT] EXISTS.
+    """
+    if _UNSUPPORTED.search(sql):
+        raise UnsupportedStatement("PostgreSQL-only statement")
+
+    for pattern, replacement in _REWRITES:
+        sql = pattern.sub(replacement, sql)
+
+    alter = _ALTER.match(sql)
+    if not alter:
+        return ((sql, False),)
+
+    # SQLite takes one column per ALTER TABLE and has no IF [NOT] EXISTS there
+    table, actions = alter.groups()
+    statements = []
+    for action in _split_top_level(actions):
+        column = _ALTER_ACTION.match(action)
+        if not column:
+            statements.append((f"ALTER TABLE {table} {action}", False))
+            continue
+        verb, definition = column.groups()
+        statements.append((f"ALTER TABLE {table} {verb.upper()} COLUMN {definition}", True))
+    return tuple(statements)
+
+
+def _is_tolerable(error: Exception) -> bool:
+    message = str(error).lower()
+    return "duplicate column name" in message or "no such column" in message
+
+
+def _is_read(sql: str) -> bool:
+    head = sql.lstrip()[:6].upper()
+    if head == "SELECT":
+        return True
+    return head.startswith("WITH") and not re.search(r"\b(INSERT|UPDATE|DELETE)\b", sql, re.IGNORECASE)
+
+
+def _convert_timestamp(value: bytes) -> Any:
+    text = value.decode()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def _convert_date(value: bytes) -> Any:
+    text = value.decode()
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        return text
+
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+for _declared in ("TIMESTAMP", "DATETIME"):
+    sqlite3.register_converter(_declared, _convert_timestamp)
+sqlite3.register_converter("DATE", _convert_date)
+
+
+class _WriteRequest:
+    """A write waiting for the writer"""
+
+    __slots__ = ("statements", "fetch", "future")
+
+    def __init__(self, statements: Tuple[Tuple[str, bool, Tuple[Any, ...]], ...], fetch: bool,
+                 future: asyncio.Future):
+        # (statement, tolerant, args); statements of one request commit or roll back together
+        self.statements = statements
+        self.fetch = fetch
+        self.future = future
+
+
+class SQLiteBackend:
+    """Reader connections plus one writer that commits queued writes in batches"""
+
+    def __init__(self, path: str, readers: int = 2, batch_size: int = 200):
+        self.path = path
+        self.readers_count = max(1, readers)
+        self.batch_size = batch_size
+
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._next_reader = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "reads": 0,
+            "writes": 0,
+            "batches": 0,
+            "max_batch": 0,
+            "failed_commits": 0
+        }
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.path, isolation_level=None,
+                                       detect_types=sqlite3.PARSE_DECLTYPES)
+        conn.row_factory = aiosqlite.Row
+        for pragma in PRAGMAS:
+            await conn.execute(pragma)
+        return conn
+
+    async def open(self):
+        """Open the writer and reader connections and start the writer"""
+        if self._writer is not None:
+            return
+        self._writer = await self._connect()
+        if self.path == ":memory:" or "mode=memory" in self.path:
+            # Every connection to :memory: is its own database
+            self._readers = [self._writer]
+        else:
+            self._readers = [await self._connect() for _ in range(self.readers_count)]
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._run_writer())
+        logger.info(f"SQLite backend opened at {self.path} (WAL, {len(self._readers)} readers)")
+
+    async def close(self):
+        """Commit queued writes and close all connections"""
+        if self._writer is None:
+            return
+        if self._writer_task:
+            await self._queue.put(None)
+            await asyncio.gather(self._writer_task, return_exceptions=True)
+            self._writer_task = None
+        for conn in {id(conn): conn for conn in self._readers + [self._writer]}.values():
+            try:
+                await conn.close()
+            except Exception as e:
+                logger.warning(f"Error closing SQLite connection: {e}")
+        self._readers = []
+        self._writer = None
+
+    async def fetch(self, sql: str, args: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """Run a query; reads go to a reader, writes with RETURNING go through the writer"""
+        statements = translate(sql)
+        if len(statements) == 1 and _is_read(statements[0][0]):
+            conn = self._readers[self._next_reader % len(self._readers)]
+            self._next_reader += 1
+            self.stats["reads"] += 1
+            statement = statements[0][0]
+            async with conn.execute(statement, tuple(args) if "?" in statement else ()) as cursor:
+                return [dict(row) for row in await cursor.fetchall()]
+        return await self._submit(statements, args, fetch=True)
+
+    async def execute(self, sql: str, args: Sequence[Any] = ()) -> str:
+        """Run a write through the writer; returns a PostgreSQL-style status such as ``UPDATE 3``"""
+        return await self._submit(translate(sql), args, fetch=False)
+
+    async def execute_many(self, steps: Sequence[Tuple[str, Sequence[Any]]]) -> str:
+        """Run several writes atomically, inside one savepoint of the writer's batch"""
+        statements = tuple(
+            (statement, tolerant, tuple(args))
+            for sql, args in steps
+            for statement, tolerant in translate(sql)
+        )
+        return await self._enqueue(statements, False)
+
+    async def _submit(self, statements: Tuple[Tuple[str, bool], ...], args: Sequence[Any], fetch: bool):
+        args = tuple(args)
+        return await self._enqueue(tuple((statement, tolerant, args) for statement, tolerant in statements), fetch)
+
+    async def _enqueue(self, statements: Tuple[Tuple[str, bool, Tuple[Any, ...]], ...], fetch: bool):
+        if self._queue is None:
+            raise RuntimeError("SQLite backend is not open")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_WriteRequest(statements, fetch, future))
+        return await future
+
+    async def _run_writer(self):
+        """Group whatever writes are queued into one transaction"""
+        stopping = False
+        while not stopping:
+            request = await self._queue.get()
+            if request is None:
+                break
+            batch = [request]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                queued = self._queue.get_nowait()
+                if queued is None:
+                    stopping = True
+                    break
+                batch.append(queued)
+            await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch: List[_WriteRequest]):
+        results: List[Tuple[_WriteRequest, Any, Optional[Exception]]] = []
+        try:
+            await self._writer.execute("BEGIN IMMEDIATE")
+            for request in batch:
+                # A savepoint per request, so one failing write does not undo the others
+                await self._writer.execute("SAVEPOINT write")
+                try:
+                    result = await self._apply(request)
+                    await self._writer.execute("RELEASE write")
+                    results.append((request, result, None))
+                except Exception as e:
+                    await self._writer.execute("ROLLBACK TO write")
+                    await self._writer.execute("RELEASE write")
+                    results.append((request, None, e))
+            await self._writer.execute("COMMIT")
+        except Exception as e:
+            self.stats["failed_commits"] += 1
+            logger.error(f"SQLite batch of {len(batch)} writes failed: {e}")
+            try:
+                await self._writer.execute("ROLLBACK")
+            except Exception:
+                pass
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        self.stats["batches"] += 1
+        self.stats["writes"] += len(batch)
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+        # Resolve only after COMMIT so callers never read their own write before it is durable
+        for request, result, error in results:
+            if request.future.done():
+                continue
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(result)
+
+    async def _apply(self, request: _WriteRequest) -> Any:
+        rows: List[Dict[str, Any]] = []
+        rowcount = 0
+        for statement, tolerant, args in request.statements:
+            try:
+                async with self._writer.execute(statement, args if "?" in statement else ()) as cursor:
+                    if request.fetch and cursor.description:
+                        rows = [dict(row) for row in await cursor.fetchall()]
+                    rowcount += max(0, cursor.rowcount)
+            except sqlite3.OperationalError as e:
+                if not (tolerant and _is_tolerable(e)):
+                    raise
+        if request.fetch:
+            return rows
+        verb = request.statements[0][0].lstrip().split(None, 1)[0].upper()
+        return f"INSERT 0 {rowcount}" if verb == "INSERT" else f"{verb} {rowcount}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get read/write counters and writer queue depth"""
+        batches = self.stats["batches"]
+        return {
+            "path": self.path,
+            "readers": len(self._readers),
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "avg_batch": round(self.stats["writes"] / batches, 2) if batches else 0.0,
+            **self.stats
+        }
@@ -6,14 +6,24 @@ to fix the dashboard performance issues.
 """
 
 # Core utilities for fixing dashboard issues
-from .callback_router import CallbackRouter
+from .callback_router import CallbackRouter, callback_route
 from .database_cache import DatabaseCache
 from .memory_manager import MemoryManager
+from .memory_profiler import MemoryProfiler
+from .memory_budget import MemoryBudget
+from .job_scheduler import JobScheduler, get_job_scheduler
+from .query_stats import QueryRegistry
 
 __all__ = [
     "CallbackRouter",
+    "callback_route",
     "DatabaseCache", 
-    "MemoryManager"
+    "MemoryManager",
+    "MemoryProfiler",
+    "MemoryBudget",
+    "JobScheduler",
+    "get_job_scheduler",
+    "QueryRegistry"
 ]
 
 __version__ = "1.0.0"
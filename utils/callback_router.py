@@ -2,13 +2,20 @@
 CallbackRouter - Performance-critical router to replace 365 elif statements
 
 This module addresses the critical performance issue where every callback
-was processed through 365+ elif statements in handlers/tasks.py
+was processed through 365+ elif statements in handlers/tasks.py. Task
+callbacks are declared with @callback_route and compiled into a RouteTable.
 """
 
+import inspect
+import re
 import time
-from typing import Dict, Callable, Optional, Any, List
+from collections import OrderedDict
+from typing import Dict, Callable, Optional, Any, List, Pattern, Tuple
 import logging
 logger = logging.getLogger(__name__)
+
+from .query_stats import StatementStats
+
 # Import aiogram types only when available
 try:
     from aiogram.types import CallbackQuery
@@ -23,38 +30,52 @@ class CallbackRouter:
     """
     High-performance callback router that replaces the 365+ elif statements
     in tasks handler with O(1) lookup time.
+    
+    Exact routes are a dict lookup, prefixes are matched longest-first through
+    a trie, and regex patterns are compiled when registered. Resolved routes
+    are kept in a bounded LRU cache, since callback data embeds task, source
+    and approval IDs and would otherwise grow the cache without limit.
     """
     
-    def __init__(self):
+    def __init__(self, max_cache_size: int = 1000, slow_route_ms: float = 100.0):
         self.handlers: Dict[str, Callable] = {}
-        self.prefix_handlers: Dict[str, Callable] = {}
-        self.pattern_handlers: List[tuple] = []  # (pattern, handler)
+        self.prefix_handlers = PrefixTrie()
+        self.pattern_handlers: List[Tuple[Pattern, str, Callable]] = []  # (compiled, pattern, handler)
         self.stats = {
             'total_routes': 0,
-            'routing_time': 0.0,
             'cache_hits': 0,
-            'cache_misses': 0
+            'cache_misses': 0,
+            'unmatched': 0
         }
-        self._route_cache: Dict[str, Callable] = {}
+        # Latency histogram per registered route, keyed by its pattern
+        self.route_stats: Dict[str, StatementStats] = {}
+        self.max_cache_size = max_cache_size
+        self.slow_route_ms = slow_route_ms
+        self._route_cache: "OrderedDict[str, Tuple[str, Callable]]" = OrderedDict()
         
     def register_exact(self, callback_data: str, handler: Callable):
         """Register exact callback match handler"""
         self.handlers[callback_data] = handler
-        self.stats['total_routes'] += 1
+        self._registered()
         logger.debug(f"Registered exact route: {callback_data}")
         
     def register_prefix(self, prefix: str, handler: Callable):
         """Register prefix-based handler"""
-        self.prefix_handlers[prefix] = handler
-        self.stats['total_routes'] += 1
+        self.prefix_handlers.insert(prefix, (prefix, handler))
+        self._registered()
         logger.debug(f"Registered prefix route: {prefix}")
         
     def register_pattern(self, pattern: str, handler: Callable):
         """Register pattern-based handler"""
-        self.pattern_handlers.append((pattern, handler))
-        self.stats['total_routes'] += 1
+        self.pattern_handlers.append((re.compile(pattern), pattern, handler))
+        self._registered()
         logger.debug(f"Registered pattern route: {pattern}")
         
+    def _registered(self):
+        self.stats['total_routes'] += 1
+        # A new route can change how already cached callback data resolves
+        self._route_cache.clear()
+        
     async def route(self, callback: CallbackQuery, state: FSMContext) -> bool:
         """
         Route callback to appropriate handler
@@ -62,77 +83,89 @@ class CallbackRouter:
         Returns:
             bool: True if handled, False if no handler found
         """
-        start_time = time.time()
         callback_data = callback.data
         
         if not callback_data:
             logger.warning("Empty callback data received")
             return False
             
-        try:
-            # Check cache first for performance
-            if callback_data in self._route_cache:
-                handler = self._route_cache[callback_data]
-                self.stats['cache_hits'] += 1
-                await handler(callback, state)
-                return True
-                
-            # Find handler
-            handler = self._find_handler(callback_data)
-            
-            if handler:
-                # Cache the route for future use
-                self._route_cache[callback_data] = handler
-                self.stats['cache_misses'] += 1
-                
-                # Execute handler
-                await handler(callback, state)
-                return True
-            else:
+        # Check cache first for performance
+        cached = self._route_cache.get(callback_data)
+        if cached is not None:
+            self._route_cache.move_to_end(callback_data)
+            self.stats['cache_hits'] += 1
+        else:
+            cached = self._find_route(callback_data)
+            if cached is None:
+                self.stats['unmatched'] += 1
                 logger.warning(f"No handler found for callback: {callback_data}")
                 return False
                 
+            self.stats['cache_misses'] += 1
+            self._route_cache[callback_data] = cached
+            if len(self._route_cache) > self.max_cache_size:
+                self._route_cache.popitem(last=False)
+                
+        label, handler = cached
+        start_time = time.perf_counter()
+        error = False
+        try:
+            await handler(callback, state)
+            return True
         except Exception as e:
+            error = True
             logger.error(f"Error routing callback '{callback_data}': {e}")
             return False
         finally:
-            routing_time = time.time() - start_time
-            self.stats['routing_time'] += routing_time
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            stats = self.route_stats.get(label)
+            if stats is None:
+                stats = self.route_stats[label] = StatementStats()
+            stats.record(elapsed_ms, error)
             
             # Log slow routes for performance monitoring
-            if routing_time > 0.1:  # 100ms threshold
-                logger.warning(f"Slow routing detected: {callback_data} took {routing_time:.3f}s")
+            if elapsed_ms >= self.slow_route_ms:
+                stats.slow += 1
+                logger.warning(f"Slow routing detected: {callback_data} took {elapsed_ms / 1000:.3f}s")
                 
-    def _find_handler(self, callback_data: str) -> Optional[Callable]:
-        """Find appropriate handler for callback data"""
+    def _find_route(self, callback_data: str) -> Optional[Tuple[str, Callable]]:
+        """(route pattern, handler) for callback data"""
         
         # 1. Exact match (fastest)
-        if callback_data in self.handlers:
-            return self.handlers[callback_data]
+        handler = self.handlers.get(callback_data)
+        if handler is not None:
+            return callback_data, handler
+            
+        # 2. Longest registered prefix
+        prefixes = self.prefix_handlers.matches(callback_data)
+        if prefixes:
+            return prefixes[0]
             
-        # 2. Prefix match
-        for prefix, handler in self.prefix_handlers.items():
-            if callback_data.startswith(prefix):
-                return handler
-                
         # 3. Pattern match (slowest but most flexible)
-        for pattern, handler in self.pattern_handlers:
-            import re
-            if re.match(pattern, callback_data):
-                return handler
+        for compiled, pattern, handler in self.pattern_handlers:
+            if compiled.match(callback_data):
+                return pattern, handler
                 
         return None
         
-    def get_stats(self) -> Dict[str, Any]:
+    def _find_handler(self, callback_data: str) -> Optional[Callable]:
+        """Find appropriate handler for callback data"""
+        found = self._find_route(callback_data)
+        return found[1] if found else None
+        
+    def get_stats(self, top: int = 10) -> Dict[str, Any]:
         """Get routing performance statistics"""
         total_requests = self.stats['cache_hits'] + self.stats['cache_misses']
+        busiest = sorted(self.route_stats.items(), key=lambda item: item[1].total_ms, reverse=True)
         
         return {
             'total_routes_registered': self.stats['total_routes'],
             'total_requests': total_requests,
+            'unmatched_requests': self.stats['unmatched'],
             'cache_hit_rate': (self.stats['cache_hits'] / total_requests * 100) if total_requests > 0 else 0,
-            'average_routing_time': (self.stats['routing_time'] / total_requests) if total_requests > 0 else 0,
-            'cache_size': len(self._route_cache)
+            'cache_size': len(self._route_cache),
+            'max_cache_size': self.max_cache_size,
+            'routes': {label: stats.to_dict() for label, stats in busiest[:top]}
         }
         
     def clear_cache(self):
@@ -140,123 +173,301 @@ class CallbackRouter:
         self._route_cache.clear()
         logger.info("Routing cache cleared")
         
+    def trim_cache(self, keep: int) -> int:
+        """Drop least recently used routes down to ``keep`` entries; returns how many were dropped"""
+        dropped = 0
+        while len(self._route_cache) > keep:
+            self._route_cache.popitem(last=False)
+            dropped += 1
+        return dropped
+        
     def preload_common_routes(self, common_routes: List[str]):
         """Preload common routes into cache"""
         for route in common_routes:
-            handler = self._find_handler(route)
-            if handler:
-                self._route_cache[route] = handler
+            found = self._find_route(route)
+            if found:
+                self._route_cache[route] = found
+        self.trim_cache(self.max_cache_size)
         logger.info(f"Preloaded {len(common_routes)} common routes")
 
 
-class TaskCallbackRouter(CallbackRouter):
+# Route parameter types: regex for the value and the converter applied to it
+PARAM_TYPES = {
+    'int': (r"-?\d+", int),
+    'word': (r"[^_]+", str),
+    'text': (r".+", str),
+}
+
+_PARAM = re.compile(r"\{(\w+)(?::(\w+))?\}")
+_ROUTES_ATTR = "_callback_routes"
+
+
+def callback_route(*patterns: str, **fixed: Any):
+    """
+    Declare the callback data a handler method serves
+    
+    Patterns are exact ("task_list"), prefixes ("kw_*") or parameterised
+    ("task_view_{task_id:int}"; types: int, word, text - word is the default).
+    Parameters and ``fixed`` values are passed to the handler as keyword arguments.
+    The decorator can be stacked to pass different fixed values per pattern.
+    """
+    def decorator(func):
+        routes = getattr(func, _ROUTES_ATTR, [])
+        setattr(func, _ROUTES_ATTR, routes + [(pattern, fixed) for pattern in patterns])
+        return func
+    return decorator
+
+
+def declared_routes(cls) -> List[Tuple[str, List[Tuple[str, Dict[str, Any]]]]]:
+    """(method name, routes) for every @callback_route method of a class, subclasses overriding bases"""
+    methods: Dict[str, Any] = {}
+    for klass in reversed(cls.__mro__):
+        methods.update(vars(klass))
+    return [(name, getattr(func, _ROUTES_ATTR)) for name, func in methods.items() if hasattr(func, _ROUTES_ATTR)]
+
+
+class CallbackRoute:
+    """A compiled route: how callback data is matched and how its handler is called"""
+    
+    __slots__ = ('pattern', 'handler', 'kind', 'prefix', 'regex', 'converters', 'fixed', '_arguments')
+    
+    def __init__(self, pattern: str, handler: Callable, fixed: Optional[Dict[str, Any]] = None):
+        self.pattern = pattern
+        self.handler = handler
+        self.fixed = dict(fixed or {})
+        self.regex = None
+        self.converters: Dict[str, Callable] = {}
+        
+        if pattern.endswith("*"):
+            self.kind = 'prefix'
+            self.prefix = pattern[:-1]
+        elif _PARAM.search(pattern):
+            self.kind = 'pattern'
+            self._compile(pattern)
+        else:
+            self.kind = 'exact'
+            self.prefix = pattern
+            
+        # Check the handler can be called with what the route provides, at startup rather than on a click
+        parameters = inspect.signature(handler).parameters
+        provided = {'callback', 'state'} | set(self.fixed) | set(self.converters)
+        missing = [
+            name for name, parameter in parameters.items()
+            if parameter.default is inspect.Parameter.empty and name not in provided
+        ]
+        unknown = (set(self.fixed) | set(self.converters)) - set(parameters)
+        if missing or unknown:
+            raise TypeError(f"Route {pattern!r} cannot call {handler.__name__}: missing {missing}, unknown {sorted(unknown)}")
+        self._arguments = [name for name in ('callback', 'state') if name in parameters]
+        
+    def _compile(self, pattern: str):
+        regex, position = [], 0
+        for param in _PARAM.finditer(pattern):
+            name, type_name = param.group(1), param.group(2) or 'word'
+            if type_name not in PARAM_TYPES:
+                raise ValueError(f"Unknown parameter type {type_name!r} in route {pattern!r}")
+            if not regex:
+                # Literal text before the first parameter places the route in the prefix trie
+                self.prefix = pattern[:param.start()]
+            value_regex, self.converters[name] = PARAM_TYPES[type_name]
+            regex.append(re.escape(pattern[position:param.start()]))
+            regex.append(f"(?P<{name}>{value_regex})")
+            position = param.end()
+        regex.append(re.escape(pattern[position:]))
+        self.regex = re.compile("".join(regex))
+        
+    def match(self, callback_data: str) -> Optional[Dict[str, Any]]:
+        """Typed parameters if the callback data matches, otherwise None"""
+        if self.kind == 'exact':
+            return {} if callback_data == self.pattern else None
+        if self.kind == 'prefix':
+            return {} if callback_data.startswith(self.prefix) else None
+        found = self.regex.fullmatch(callback_data)
+        if found is None:
+            return None
+        return {name: self.converters[name](value) for name, value in found.groupdict().items()}
+        
+    async def call(self, callback: CallbackQuery, state: FSMContext, params: Dict[str, Any]):
+        arguments = {'callback': callback, 'state': state}
+        kwargs = {name: arguments[name] for name in self._arguments}
+        kwargs.update(self.fixed)
+        kwargs.update(params)
+        return await self.handler(**kwargs)
+
+
+class _TrieNode:
+    __slots__ = ('children', 'value')
+    
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.value = None
+
+
+class PrefixTrie:
+    """Character trie from string prefixes to values"""
+    
+    def __init__(self):
+        self._root = _TrieNode()
+        
+    def _node(self, prefix: str, create: bool = False) -> Optional[_TrieNode]:
+        node = self._root
+        for char in prefix:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[char] = _TrieNode()
+            node = child
+        return node
+        
+    def get(self, prefix: str) -> Any:
+        node = self._node(prefix)
+        return node.value if node else None
+        
+    def insert(self, prefix: str, value: Any):
+        self._node(prefix, create=True).value = value
+        
+    def setdefault(self, prefix: str, factory: Callable[[], Any]) -> Any:
+        node = self._node(prefix, create=True)
+        if node.value is None:
+            node.value = factory()
+        return node.value
+        
+    def matches(self, text: str) -> List[Any]:
+        """Values of all stored prefixes of text, longest first"""
+        found = []
+        node = self._root
+        if node.value is not None:
+            found.append(node.value)
+        for char in text:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.value is not None:
+                found.append(node.value)
+        found.reverse()
+        return found
+
+
+class _PrefixBucket:
+    """Routes sharing a literal prefix: parameterised patterns first, then a plain prefix route"""
+    
+    __slots__ = ('patterns', 'catch_all')
+    
+    def __init__(self):
+        self.patterns: List[CallbackRoute] = []
+        self.catch_all: Optional[CallbackRoute] = None
+
+
+class RouteTable:
     """
-    Specialized callback router for task-related callbacks
-    This replaces the massive elif chain in handlers/tasks.py
+    Compiled callback routes
+    
+    Exact routes are a dict lookup. Prefix and parameterised routes hang off a
+    prefix trie keyed by their literal prefix; the longest matching prefix wins,
+    and within it a parameterised pattern wins over a plain prefix route.
+    """
+    
+    def __init__(self):
+        self.exact: Dict[str, CallbackRoute] = {}
+        self.trie = PrefixTrie()
+        self.routes: List[CallbackRoute] = []
+        
+    def add(self, route: CallbackRoute) -> bool:
+        """Add a route; returns False if the same pattern is already registered"""
+        if route.kind == 'exact':
+            if route.pattern in self.exact:
+                return False
+            self.exact[route.pattern] = route
+        else:
+            bucket = self.trie.setdefault(route.prefix, _PrefixBucket)
+            if route.kind == 'prefix':
+                if bucket.catch_all is not None:
+                    return False
+                bucket.catch_all = route
+            else:
+                if any(existing.pattern == route.pattern for existing in bucket.patterns):
+                    return False
+                bucket.patterns.append(route)
+        self.routes.append(route)
+        return True
+        
+    def resolve(self, callback_data: str) -> Optional[Tuple[CallbackRoute, Dict[str, Any]]]:
+        """The route for callback data and its typed parameters, or None"""
+        route = self.exact.get(callback_data)
+        if route is not None:
+            return route, {}
+            
+        for bucket in self.trie.matches(callback_data):
+            for route in bucket.patterns:
+                params = route.match(callback_data)
+                if params is not None:
+                    return route, params
+            if bucket.catch_all is not None:
+                return bucket.catch_all, {}
+        return None
+
+
+class TaskCallbackRouter:
+    """
+    Compiled router for task callbacks
+
+    Routes are declared with @callback_route on TaskHandlers methods and compiled
+    into a RouteTable once, so dispatch cost does not depend on how many task
+    buttons exist or in which order they were declared.
     """
     
     def __init__(self, task_handler):
-        super().__init__()
         self.task_handler = task_handler
+        self.routes = RouteTable()
+        self.stats = {
+            'total_routes': 0,
+            'routed': 0,
+            'unmatched': 0
+        }
         self._register_all_task_routes()
         
     def _register_all_task_routes(self):
-        """Register all task-related routes"""
+        """Compile every route declared on the task handler's class"""
+        for name, declared in declared_routes(type(self.task_handler)):
+            handler = getattr(self.task_handler, name)
+            for pattern, fixed in declared:
+                if self.routes.add(CallbackRoute(pattern, handler, fixed)):
+                    self.stats['total_routes'] += 1
+                else:
+                    logger.warning(f"Duplicate task route ignored: {pattern} -> {name}")
+                    
+        logger.info(f"TaskCallbackRouter initialized with {self.stats['total_routes']} routes")
         
-        # === EXACT MATCHES ===
-        exact_routes = {
-            "task_create": self.task_handler._handle_task_creation_start,
-            "task_list": self.task_handler._handle_task_list,
-            "task_refresh": self.task_handler._handle_task_refresh,
-            "task_stats": self.task_handler._handle_task_statistics_overview,
-        }
-        
-        for route, handler in exact_routes.items():
-            self.register_exact(route, handler)
-            
-        # === PREFIX MATCHES ===
-        prefix_routes = {
-            "task_create_": self.task_handler._handle_task_type_selection,
-            "task_view_": self.task_handler._handle_task_view,
-            "task_edit_": self.task_handler._handle_task_edit,
-            "task_toggle_": self.task_handler._handle_task_toggle,
-            "task_mode_toggle_": self.task_handler._handle_task_mode_toggle,
-            "task_delete_": self.task_handler._handle_task_delete,
-            "task_statistics_": self.task_handler._handle_task_statistics,
-            "task_settings_": self.task_handler._handle_task_settings,
-            "task_info_": self.task_handler._handle_task_info,
-            "task_edit_name_": self.task_handler._handle_task_edit_name,
-            "task_edit_desc_": self.task_handler._handle_task_edit_description,
-            "task_edit_type_": self.task_handler._handle_task_change_type,
-            "task_list_page_": self.task_handler._handle_task_list_pagination,
-            
-            # Settings routes
-            "setting_forward_mode_": self.task_handler._handle_forward_mode_setting,
-            "setting_delays_": self.task_handler._handle_delay_setting,
-            "setting_limits_": self.task_handler._handle_limits_setting,
-            "setting_filters_": self.task_handler._handle_filters_setting,
-            "setting_content_": self.task_handler._handle_content_setting,
-            "setting_forward_": self.task_handler._handle_forward_setting,
-            "setting_advanced_": self.task_handler._handle_advanced_setting,
-            
-            # Advanced features
-            "advanced_translation_": self.task_handler._handle_advanced_translation,
-            "advanced_working_hours_": self.task_handler._handle_advanced_working_hours,
-            "advanced_recurring_": self.task_handler._handle_advanced_recurring,
-            
-            # Content routes
-            "content_prefix_": self.task_handler._handle_prefix_suffix_setting,
-            "content_replace_": self.task_handler._handle_text_replace_setting,
-            "content_formatting_": self.task_handler._handle_formatting_setting,
-            "content_links_": self.task_handler._handle_links_setting,
-            "content_cleaner_": self.task_handler._handle_text_cleaner_setting,
-            "content_inline_buttons_": self.task_handler._handle_inline_buttons_setting,
-            
-            # Filter routes
-            "filter_keywords_": self.task_handler._handle_keyword_filter,
-            "filter_media_": self.task_handler._handle_media_filter,
-            "filter_length_": self.task_handler._handle_length_filter,
-            "filter_languages_": self.task_handler._handle_language_filter_management,
-            
-            # Toggle routes
-            "toggle_filter_forwarded_": self.task_handler._toggle_forwarded_filter,
-            "toggle_filter_links_": self.task_handler._toggle_links_filter,
-            "toggle_filter_buttons_": self.task_handler._toggle_buttons_filter,
-            "toggle_filter_duplicates_": self.task_handler._toggle_duplicates_filter,
-            "toggle_filter_language_": self.task_handler._toggle_language_filter,
-            "toggle_manual_mode_": self.task_handler._handle_toggle_manual_mode,
-            "toggle_link_preview_": self.task_handler._handle_toggle_link_preview,
-            "toggle_pin_messages_": self.task_handler._handle_toggle_pin_messages,
-            "toggle_silent_mode_": self.task_handler._handle_toggle_silent_mode,
-            "toggle_sync_edits_": self.task_handler._handle_toggle_sync_edits,
-            "toggle_sync_deletes_": self.task_handler._handle_toggle_sync_deletes,
-            "toggle_preserve_replies_": self.task_handler._handle_toggle_preserve_replies,
-        }
+    def handles(self, callback_data: str) -> bool:
+        """Whether some task route matches the callback data"""
+        return bool(callback_data) and self.routes.resolve(callback_data) is not None
         
-        for prefix, handler in prefix_routes.items():
-            self.register_prefix(prefix, handler)
-            
-        # === PATTERN MATCHES ===
-        pattern_routes = [
-            (r"^confirm_delete_task\d+$", self.task_handler._handle_confirm_task_delete),
-            (r"^cancel_delete_task\d+$", self.task_handler._handle_cancel_task_delete),
-            (r"^len_\d+_\d+$", self.task_handler._handle_length_setting),
-            (r"^set_min_\d+_\d+$", self.task_handler._handle_length_value_setting),
-            (r"^set_max_\d+_\d+$", self.task_handler._handle_length_value_setting),
-            (r"^set_action_\w+_\d+$", self.task_handler._handle_action_mode_setting),
-        ]
+    async def route(self, callback: CallbackQuery, state: FSMContext) -> bool:
+        """
+        Dispatch a task callback
         
-        for pattern, handler in pattern_routes:
-            self.register_pattern(pattern, handler)
+        Returns:
+            bool: True if handled, False if no route matches
+        """
+        match = self.routes.resolve(callback.data or "")
+        if match is None:
+            self.stats['unmatched'] += 1
+            return False
             
-        # Preload common routes for better performance
-        common_routes = [
-            "task_list", "task_create", "task_refresh",
-            "task_view_1", "task_settings_1", "task_edit_1"
-        ]
-        self.preload_common_routes(common_routes)
+        route, params = match
+        self.stats['routed'] += 1
+        await route.call(callback, state, params)
+        return True
         
-        logger.success(f"TaskCallbackRouter initialized with {self.stats['total_routes']} routes")
+    def get_stats(self) -> Dict[str, Any]:
+        """Get task routing statistics"""
+        return {
+            'total_routes_registered': self.stats['total_routes'],
+            'exact_routes': len(self.routes.exact),
+            'routed': self.stats['routed'],
+            'unmatched': self.stats['unmatched']
+        }
 
 
 # Global router instance
@@ -5,15 +5,19 @@ This module addresses the critical performance issue where 223 database
 queries were executed in handlers/tasks.py, many of them repetitive.
 """
 
+import sys
 import time
 import json
 import asyncio
-from typing import Dict, Any, Optional, List, Set
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Set, Tuple, Iterable, Callable, Awaitable, Union
 from datetime import datetime, timedelta
 import logging
 logger = logging.getLogger(__name__)
 from dataclasses import dataclass
 
+from .job_scheduler import get_job_scheduler
+
 
 @dataclass
 class CacheEntry:
@@ -23,31 +27,77 @@ class CacheEntry:
     access_count: int = 0
     last_access: float = 0.0
     ttl: int = 300  # 5 minutes default
+    size: int = 0  # Estimated bytes held by data
+    tags: Tuple[str, ...] = ()  # e.g. ("task:12", "user:3")
     
     def is_expired(self) -> bool:
         """Check if cache entry is expired"""
         return time.time() - self.timestamp > self.ttl
         
+    def is_dead(self, grace: float) -> bool:
+        """Check if entry is past its TTL plus the stale-while-revalidate grace"""
+        return time.time() - self.timestamp > self.ttl + grace
+        
     def touch(self):
         """Update access metadata"""
         self.access_count += 1
         self.last_access = time.time()
 
 
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Rough deep size in bytes of query results (dicts, lists and scalars)"""
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + estimate_size(item, _depth + 1)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            size += estimate_size(item, _depth + 1)
+    return size
+
+
+def task_tag(task_id: int) -> str:
+    return f"task:{task_id}"
+
+
+def user_tag(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def owner_tag(telegram_id: int) -> str:
+    """Carried by task lists keyed by the owner's Telegram ID, even empty ones"""
+    return f"owner:{telegram_id}"
+
+
 class DatabaseCache:
     """
     High-performance database cache that reduces repetitive queries
     from 223 to a minimal number by caching frequently accessed data.
     """
     
-    def __init__(self, database, default_ttl: int = 300, max_cache_size: int = 1000):
+    def __init__(self, database, default_ttl: int = 300, max_cache_size: int = 1000,
+                 max_cache_bytes: int = 32 * 1024 * 1024, stale_grace: int = 60, negative_ttl: int = 15):
         self.database = database
         self.default_ttl = default_ttl
         self.max_cache_size = max_cache_size
+        self.max_cache_bytes = max_cache_bytes
+        self.stale_grace = stale_grace  # Seconds an expired entry may still be served while refreshing
+        self.negative_ttl = negative_ttl  # TTL for "row not found" results
         
-        # Cache storage
-        self._cache: Dict[str, CacheEntry] = {}
+        # Cache storage in LRU order: least recently used first
+        self._cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
         self._dirty_keys: Set[str] = set()  # Keys that need DB sync
+        self._tags: Dict[str, Set[str]] = {}  # tag -> keys carrying it
+        self._bytes = 0
+        
+        # Single-flight loads: concurrent misses on a key await the same future (key -> (epoch, future))
+        self._inflight: Dict[str, Tuple[int, asyncio.Future]] = {}
+        # Bumped on every invalidation so loads started earlier do not store stale rows
+        self._epoch = 0
+        # Called with the task ID whenever a task's entries are invalidated, for caches derived from them
+        self._task_listeners: List[Callable[[int], None]] = []
         
         # Performance metrics
         self.stats = {
@@ -56,52 +106,187 @@ class DatabaseCache:
             'cache_misses': 0,
             'database_queries_saved': 0,
             'cache_evictions': 0,
-            'dirty_writes': 0
+            'dirty_writes': 0,
+            'stale_hits': 0,
+            'coalesced_requests': 0,
+            'background_refreshes': 0,
+            'negative_entries': 0
         }
         
-        # Auto-cleanup task
-        self._cleanup_task = None
+        # Auto-cleanup job
+        self._jobs = get_job_scheduler()
         self._start_cleanup_task()
         
     def _start_cleanup_task(self):
-        """Start automatic cache cleanup task"""
-        async def cleanup_loop():
-            while True:
-                await asyncio.sleep(60)  # Cleanup every minute
-                await self._cleanup_expired()
-                
-        self._cleanup_task = asyncio.create_task(cleanup_loop())
+        """Register automatic cache cleanup job"""
+        self._jobs.register("database_cache.cleanup", self._cleanup_expired, 60)  # Cleanup every minute
+        
+    def _stop_cleanup_task(self):
+        """Unregister this cache's cleanup job"""
+        self._jobs.unregister("database_cache.cleanup", self._cleanup_expired)
         
     async def _cleanup_expired(self):
-        """Remove expired cache entries"""
-        expired_keys = []
-        for key, entry in self._cache.items():
-            if entry.is_expired():
-                expired_keys.append(key)
+        """Remove entries past their TTL and stale grace"""
+        expired_keys = [key for key, entry in self._cache.items() if entry.is_dead(self.stale_grace)]
                 
         for key in expired_keys:
-            del self._cache[key]
+            self._remove(key)
             self.stats['cache_evictions'] += 1
             
         if expired_keys:
             logger.debug(f"Cleaned up {len(expired_keys)} expired cache entries")
             
-    def _evict_lru(self):
-        """Evict least recently used entries if cache is full"""
-        if len(self._cache) <= self.max_cache_size:
-            return
-            
-        # Sort by last access time and remove oldest
-        sorted_entries = sorted(
-            self._cache.items(),
-            key=lambda x: x[1].last_access
+    def _lookup(self, key: str) -> Optional[CacheEntry]:
+        """Live entry for key, marked most recently used; expired entries are dropped"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry.is_expired():
+            self._remove(key)
+            return None
+        self._cache.move_to_end(key)
+        entry.touch()
+        return entry
+        
+    def _store(self, key: str, data: Any, ttl: int, tags: Iterable[str] = ()):
+        """Insert or replace an entry, index its tags and evict down to the limits"""
+        self._remove(key)
+        entry = CacheEntry(
+            data=data,
+            timestamp=time.time(),
+            last_access=time.time(),
+            ttl=ttl,
+            size=estimate_size(data),
+            tags=tuple(tags)
         )
+        self._cache[key] = entry
+        self._bytes += entry.size
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+        self._evict_lru()
         
-        to_evict = len(self._cache) - self.max_cache_size + 10  # Evict extra for buffer
-        for i in range(to_evict):
-            key = sorted_entries[i][0]
-            del self._cache[key]
+    def _remove(self, key: str) -> bool:
+        """Drop an entry and its tag index and size accounting"""
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.size
+        self._dirty_keys.discard(key)
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+        
+    def _evict_lru(self):
+        """Evict least recently used entries until within the entry and byte limits"""
+        while self._cache and (len(self._cache) > self.max_cache_size or self._bytes > self.max_cache_bytes):
+            key = next(iter(self._cache))
+            self._remove(key)
+            self.stats['cache_evictions'] += 1
+            
+    def shrink(self, bytes_to_free: int) -> int:
+        """Evict least recently used entries until about bytes_to_free are released (memory budget)"""
+        freed = 0
+        while self._cache and freed < bytes_to_free:
+            key = next(iter(self._cache))
+            freed += self._cache[key].size
+            self._remove(key)
             self.stats['cache_evictions'] += 1
+        return freed
+            
+    async def _cached(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: int,
+                      tags: Union[Iterable[str], Callable[[Any], Iterable[str]]],
+                      force_refresh: bool = False) -> Any:
+        """Serve key from cache, loading it at most once at a time.
+
+        Fresh entries are returned directly. Entries within ``stale_grace`` of expiry
+        are returned as-is while one background load refreshes them. Misses await the
+        load already in flight for the key, if any. Loader errors propagate.
+        """
+        self.stats['total_requests'] += 1
+        
+        if force_refresh:
+            self.stats['cache_misses'] += 1
+            return await self._load_and_store(key, loader, ttl, tags)
+        
+        entry = self._cache.get(key)
+        if entry is not None and not entry.is_dead(self.stale_grace):
+            self._cache.move_to_end(key)
+            entry.touch()
+            self.stats['database_queries_saved'] += 1
+            if entry.is_expired():
+                self.stats['stale_hits'] += 1
+                if key not in self._inflight:
+                    self.stats['background_refreshes'] += 1
+                    self._start_load(key, loader, ttl, tags)
+            else:
+                self.stats['cache_hits'] += 1
+            return entry.data
+        
+        self.stats['cache_misses'] += 1
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] == self._epoch:
+            future = inflight[1]
+            self.stats['coalesced_requests'] += 1
+            self.stats['database_queries_saved'] += 1
+        else:
+            # A load started before an invalidation may return the old row; start a fresh one
+            future = self._start_load(key, loader, ttl, tags)
+        # Shielded so a cancelled caller does not cancel the load other callers share
+        return await asyncio.shield(future)
+        
+    def _start_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: int, tags) -> asyncio.Future:
+        """Run a load as the single in-flight future for key"""
+        future = asyncio.ensure_future(self._load_and_store(key, loader, ttl, tags))
+        self._inflight[key] = (self._epoch, future)
+        
+        def _done(done: asyncio.Future):
+            inflight = self._inflight.get(key)
+            if inflight is not None and inflight[1] is done:
+                del self._inflight[key]
+            if not done.cancelled() and done.exception() is not None:
+                logger.error(f"Cache load for {key} failed: {done.exception()}")
+                
+        future.add_done_callback(_done)
+        return future
+        
+    async def _load_and_store(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: int, tags) -> Any:
+        """Load a value and cache it, briefly if the row was not found"""
+        epoch = self._epoch
+        data = await loader()
+        if epoch == self._epoch:
+            if data is None:
+                ttl = self.negative_ttl
+                self.stats['negative_entries'] += 1
+            self._store(key, data, ttl, tags(data) if callable(tags) else tags)
+        return data
+        
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int] = None,
+                          tags: Union[Iterable[str], Callable[[Any], Iterable[str]]] = (),
+                          force_refresh: bool = False) -> Any:
+        """Cache any loader under key with the same single-flight and stale rules"""
+        return await self._cached(key, loader, ttl or self.default_ttl, tags, force_refresh)
+        
+    def peek(self, key: str) -> Optional[Any]:
+        """Fresh cached value for key without loading, touching or counting; None if absent or expired"""
+        entry = self._cache.get(key)
+        return None if entry is None or entry.is_expired() else entry.data
+        
+    def put(self, key: str, data: Any, ttl: Optional[int] = None, tags: Iterable[str] = ()):
+        """Write a value through to the cache; loads already in flight will not overwrite it"""
+        self._epoch += 1
+        self._store(key, data, ttl or self.default_ttl, tags)
+        
+    def invalidate_tag(self, tag: str) -> int:
+        """Remove every entry carrying the tag; returns how many were removed"""
+        self._epoch += 1
+        keys = self._tags.pop(tag, set())
+        for key in list(keys):
+            self._remove(key)
+        return len(keys)
             
     def _get_cache_key(self, operation: str, *args) -> str:
         """Generate cache key for operation and arguments"""
@@ -112,32 +297,14 @@ class DatabaseCache:
         """Get task settings with caching"""
         cache_key = self._get_cache_key("task_settings", task_id)
         
-        if not force_refresh and cache_key in self._cache:
-            entry = self._cache[cache_key]
-            if not entry.is_expired():
-                entry.touch()
-                self.stats['cache_hits'] += 1
-                self.stats['total_requests'] += 1
-                return entry.data
-                
-        # Cache miss - fetch from database
-        self.stats['cache_misses'] += 1
-        self.stats['total_requests'] += 1
-        self.stats['database_queries_saved'] += 1
-        
         try:
-            settings = await self.database.get_task_settings(task_id)
-            
-            # Cache the result
-            self._cache[cache_key] = CacheEntry(
-                data=settings,
-                timestamp=time.time(),
-                ttl=self.default_ttl
+            return await self._cached(
+                cache_key,
+                lambda: self.database.get_task_settings(task_id),
+                self.default_ttl,
+                (task_tag(task_id),),
+                force_refresh
             )
-            
-            self._evict_lru()
-            return settings
-            
         except Exception as e:
             logger.error(f"Error fetching task settings for task {task_id}: {e}")
             return None
@@ -149,13 +316,10 @@ class DatabaseCache:
             success = await self.database.update_task_settings(task_id, settings)
             
             if success:
-                # Update cache immediately for consistency
+                # Update cache immediately for consistency; loads already in flight must not overwrite it
+                self._epoch += 1
                 cache_key = self._get_cache_key("task_settings", task_id)
-                self._cache[cache_key] = CacheEntry(
-                    data=settings,
-                    timestamp=time.time(),
-                    ttl=self.default_ttl
-                )
+                self._store(cache_key, settings, self.default_ttl, (task_tag(task_id),))
                 
                 # Mark as dirty for tracking
                 self._dirty_keys.add(cache_key)
@@ -171,34 +335,18 @@ class DatabaseCache:
         """Get task data with caching"""
         cache_key = self._get_cache_key("task_data", task_id)
         
-        if not force_refresh and cache_key in self._cache:
-            entry = self._cache[cache_key]
-            if not entry.is_expired():
-                entry.touch()
-                self.stats['cache_hits'] += 1
-                self.stats['total_requests'] += 1
-                return entry.data
-                
-        # Cache miss - fetch from database
-        self.stats['cache_misses'] += 1
-        self.stats['total_requests'] += 1
+        async def load():
+            result = await self.database.execute_query("SELECT * FROM tasks WHERE id = $1", task_id)
+            return result[0] if result else None
+            
+        def tags(task_data):
+            if task_data and task_data.get("user_id") is not None:
+                return (task_tag(task_id), user_tag(task_data["user_id"]))
+            return (task_tag(task_id),)
         
         try:
-            query = "SELECT * FROM tasks WHERE id = $1"
-            result = await self.database.execute_query(query, task_id)
-            task_data = result[0] if result else None
-            
-            # Cache the result
-            if task_data:
-                self._cache[cache_key] = CacheEntry(
-                    data=task_data,
-                    timestamp=time.time(),
-                    ttl=600  # Tasks change less frequently, cache longer
-                )
-                
-            self._evict_lru()
-            return task_data
-            
+            # Tasks change less frequently, cache longer
+            return await self._cached(cache_key, load, 600, tags, force_refresh)
         except Exception as e:
             logger.error(f"Error fetching task data for task {task_id}: {e}")
             return None
@@ -207,19 +355,7 @@ class DatabaseCache:
         """Get user tasks with caching"""
         cache_key = self._get_cache_key("user_tasks", user_id)
         
-        if not force_refresh and cache_key in self._cache:
-            entry = self._cache[cache_key]
-            if not entry.is_expired():
-                entry.touch()
-                self.stats['cache_hits'] += 1
-                self.stats['total_requests'] += 1
-                return entry.data
-                
-        # Cache miss - fetch from database
-        self.stats['cache_misses'] += 1
-        self.stats['total_requests'] += 1
-        
-        try:
+        async def load():
             query = """
             SELECT t.*, 
                    COUNT(s.id) as source_count,
@@ -231,45 +367,39 @@ class DatabaseCache:
             GROUP BY t.id
             ORDER BY t.created_at DESC
             """
-            tasks = await self.database.execute_query(query, user_id)
-            
-            # Cache the result
-            self._cache[cache_key] = CacheEntry(
-                data=tasks,
-                timestamp=time.time(),
-                ttl=180  # Task lists change more frequently
+            return await self.database.execute_query(query, user_id)
+        
+        try:
+            # Task lists change more frequently; dropped when the user or any listed task changes
+            return await self._cached(
+                cache_key,
+                load,
+                180,
+                lambda tasks: [user_tag(user_id)] + [task_tag(task["id"]) for task in tasks or []],
+                force_refresh
             )
-            
-            self._evict_lru()
-            return tasks
-            
         except Exception as e:
             logger.error(f"Error fetching user tasks for user {user_id}: {e}")
             return []
             
     async def invalidate_task_cache(self, task_id: int):
         """Invalidate all cache entries related to a task"""
-        keys_to_remove = []
-        for key in self._cache.keys():
-            if f"task_{task_id}" in key or f":{task_id}" in key:
-                keys_to_remove.append(key)
+        removed = self.invalidate_tag(task_tag(task_id))
+        logger.debug(f"Invalidated {removed} cache entries for task {task_id}")
+        for listener in self._task_listeners:
+            try:
+                listener(task_id)
+            except Exception as e:
+                logger.error(f"Error in task invalidation listener: {e}")
                 
-        for key in keys_to_remove:
-            del self._cache[key]
-            
-        logger.debug(f"Invalidated {len(keys_to_remove)} cache entries for task {task_id}")
+    def add_task_listener(self, listener: Callable[[int], None]):
+        """Call listener(task_id) after every task invalidation, e.g. to drop rendered keyboards"""
+        self._task_listeners.append(listener)
         
     async def invalidate_user_cache(self, user_id: int):
         """Invalidate all cache entries related to a user"""
-        keys_to_remove = []
-        for key in self._cache.keys():
-            if f"user_{user_id}" in key or f":{user_id}" in key:
-                keys_to_remove.append(key)
-                
-        for key in keys_to_remove:
-            del self._cache[key]
-            
-        logger.debug(f"Invalidated {len(keys_to_remove)} cache entries for user {user_id}")
+        removed = self.invalidate_tag(user_tag(user_id))
+        logger.debug(f"Invalidated {removed} cache entries for user {user_id}")
         
     async def batch_get_task_settings(self, task_ids: List[int]) -> Dict[int, Dict[str, Any]]:
         """Get multiple task settings in a single optimized query"""
@@ -278,15 +408,10 @@ class DatabaseCache:
         
         # Check cache first
         for task_id in task_ids:
-            cache_key = self._get_cache_key("task_settings", task_id)
-            if cache_key in self._cache:
-                entry = self._cache[cache_key]
-                if not entry.is_expired():
-                    entry.touch()
-                    cache_results[task_id] = entry.data
-                    self.stats['cache_hits'] += 1
-                else:
-                    missing_ids.append(task_id)
+            entry = self._lookup(self._get_cache_key("task_settings", task_id))
+            if entry is not None:
+                cache_results[task_id] = entry.data
+                self.stats['cache_hits'] += 1
             else:
                 missing_ids.append(task_id)
                 
@@ -309,11 +434,7 @@ class DatabaseCache:
                     
                     # Cache the result
                     cache_key = self._get_cache_key("task_settings", task_id)
-                    self._cache[cache_key] = CacheEntry(
-                        data=settings_data,
-                        timestamp=time.time(),
-                        ttl=self.default_ttl
-                    )
+                    self._store(cache_key, settings_data, self.default_ttl, (task_tag(task_id),))
                     
                     cache_results[task_id] = settings_data
                     self.stats['cache_misses'] += 1
@@ -324,7 +445,6 @@ class DatabaseCache:
                 logger.error(f"Error batch fetching task settings: {e}")
                 
         self.stats['total_requests'] += len(task_ids)
-        self._evict_lru()
         return cache_results
         
     def get_stats(self) -> Dict[str, Any]:
@@ -340,13 +460,22 @@ class DatabaseCache:
             'database_queries_saved': self.stats['database_queries_saved'],
             'cache_evictions': self.stats['cache_evictions'],
             'dirty_entries': len(self._dirty_keys),
-            'memory_usage_estimate': len(self._cache) * 1024,  # Rough estimate in bytes
+            'memory_usage_estimate': self._bytes,  # Estimated bytes held by cached data
+            'max_cache_bytes': self.max_cache_bytes,
+            'indexed_tags': len(self._tags),
+            'stale_hits': self.stats['stale_hits'],
+            'coalesced_requests': self.stats['coalesced_requests'],
+            'background_refreshes': self.stats['background_refreshes'],
+            'inflight_loads': len(self._inflight),
         }
         
     async def clear_cache(self):
         """Clear all cache entries"""
+        self._epoch += 1
         self._cache.clear()
         self._dirty_keys.clear()
+        self._tags.clear()
+        self._bytes = 0
         logger.info("Database cache cleared")
         
     async def warm_up_cache(self, user_id: int):
@@ -368,8 +497,10 @@ class DatabaseCache:
             
     def __del__(self):
         """Cleanup when cache is destroyed"""
-        if self._cleanup_task:
-            self._cleanup_task.cancel()
+        try:
+            self._stop_cleanup_task()
+        except Exception:
+            pass
 
 
 # Global cache instance
@@ -386,5 +517,5 @@ def reset_database_cache():
     """Reset global database cache (useful for testing)"""
     global _database_cache
     if _database_cache:
-        _database_cache._cleanup_task.cancel()
+        _database_cache._stop_cleanup_task()
     _database_cache = None
\ No newline at end of file
@@ -0,0 +1,286 @@
+"""
+JobScheduler - Periodic job runner for background maintenance work
+
+Replaces ad-hoc ``while True: sleep()`` loops and wall-clock modulo checks
+with one managed loop that keeps jobs on a monotonic schedule.
+"""
+
+import asyncio
+import inspect
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+import logging
+logger = logging.getLogger(__name__)
+from dataclasses import dataclass, field
+
+
+@dataclass
+class JobStats:
+    """Execution statistics for a single job"""
+    runs: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    skipped_overlaps: int = 0
+    skipped_conditions: int = 0
+    missed_windows: int = 0
+    last_run: Optional[float] = None  # wall-clock time of the last start
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+    last_error: Optional[str] = None
+
+
+@dataclass
+class Job:
+    """A registered periodic job"""
+    name: str
+    func: Callable[[], Union[Awaitable[Any], Any]]
+    interval: float
+    jitter: float = 0.1  # fraction of the interval
+    max_runtime: Optional[float] = None
+    condition: Optional[Callable[[], bool]] = None
+    scheduled_at: float = 0.0  # un-jittered slot on the monotonic grid
+    next_run: float = 0.0
+    task: Optional[asyncio.Task] = None
+    stats: JobStats = field(default_factory=JobStats)
+
+    def schedule(self, base: float):
+        """Place the job at a grid slot, offset by jitter"""
+        self.scheduled_at = base
+        spread = self.interval * self.jitter
+        self.next_run = base + (random.uniform(-spread, spread) if spread > 0 else 0.0)
+
+    @property
+    def is_running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+
+class JobScheduler:
+    """
+    Runs registered jobs at fixed monotonic intervals. A job never overlaps
+    with its own previous run, can be bounded by a maximum runtime, and
+    keeps per-job statistics.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self.running = False
+        self._loop_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def register(self,
+                 name: str,
+                 func: Callable[[], Union[Awaitable[Any], Any]],
+                 interval: float,
+                 jitter: float = 0.1,
+                 max_runtime: Optional[float] = None,
+                 run_immediately: bool = False,
+                 condition: Optional[Callable[[], bool]] = None) -> Job:
+        """Register (or replace) a periodic job"""
+        if interval <= 0:
+            raise ValueError(f"Job '{name}' needs a positive interval")
+
+        if name in self.jobs:
+            logger.debug(f"Replacing job '{name}'")
+            self.unregister(name)
+
+        job = Job(
+            name=name,
+            func=func,
+            interval=float(interval),
+            jitter=max(0.0, min(jitter, 0.5)),
+            max_runtime=max_runtime,
+            condition=condition
+        )
+        now = time.monotonic()
+        if run_immediately:
+            job.scheduled_at = job.next_run = now
+        else:
+            job.schedule(now + job.interval)
+        self.jobs[name] = job
+
+        self._ensure_started()
+        if self._wakeup:
+            self._wakeup.set()
+        return job
+
+    def unregister(self, name: str, func: Optional[Callable] = None) -> bool:
+        """Remove a job; with ``func`` only if it is still that owner's job"""
+        job = self.jobs.get(name)
+        if job is None or (func is not None and job.func != func):
+            return False
+
+        del self.jobs[name]
+        if job.is_running:
+            job.task.cancel()
+        return True
+
+    def _ensure_started(self):
+        """Start the scheduler loop if an event loop is available"""
+        if self.running:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Jobs registered outside a loop start with the first start() call
+            return
+        self.running = True
+        self._wakeup = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._run())
+        logger.info("Job scheduler started")
+
+    async def start(self):
+        """Start running registered jobs"""
+        self._ensure_started()
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop the scheduler and wait briefly for running jobs"""
+        if not self.running:
+            return
+        self.running = False
+
+        if self._loop_task:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+
+        running = [job.task for job in self.jobs.values() if job.is_running]
+        if running:
+            _, pending = await asyncio.wait(running, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+        logger.info("Job scheduler stopped")
+
+    async def run_now(self, name: str) -> bool:
+        """Run a job immediately, outside its schedule"""
+        job = self.jobs.get(name)
+        if job is None or job.is_running:
+            return False
+        job.task = asyncio.create_task(self._execute(job))
+        await asyncio.gather(job.task, return_exceptions=True)
+        return True
+
+    async def _run(self):
+        """Sleep until the earliest job is due, then dispatch due jobs"""
+        while self.running:
+            try:
+                now = time.monotonic()
+                for job in list(self.jobs.values()):
+                    if job.next_run <= now:
+                        self._dispatch(job, now)
+
+                delay = min((job.next_run for job in self.jobs.values()), default=now + 3600) - time.monotonic()
+                if delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in job scheduler loop: {e}")
+                await asyncio.sleep(1)
+
+    def _dispatch(self, job: Job, now: float):
+        """Start a due job and move it to its next slot"""
+        if job.is_running:
+            job.stats.skipped_overlaps += 1
+            logger.warning(f"Job '{job.name}' still running, skipping this run")
+        elif job.condition is not None and not self._check_condition(job):
+            job.stats.skipped_conditions += 1
+        else:
+            job.task = asyncio.create_task(self._execute(job))
+
+        # Advance on the grid so the schedule never drifts; slots missed while
+        # the process was busy or suspended are skipped, not replayed
+        next_slot = job.scheduled_at + job.interval
+        if next_slot <= now:
+            missed = int((now - next_slot) // job.interval) + 1
+            job.stats.missed_windows += missed - 1
+            next_slot += missed * job.interval
+        job.schedule(next_slot)
+
+    def _check_condition(self, job: Job) -> bool:
+        try:
+            return bool(job.condition())
+        except Exception as e:
+            logger.error(f"Condition for job '{job.name}' failed: {e}")
+            return False
+
+    async def _execute(self, job: Job):
+        """Run one job invocation and record its outcome"""
+        stats = job.stats
+        stats.runs += 1
+        stats.last_run = time.time()
+        started = time.monotonic()
+        try:
+            result = job.func()
+            if inspect.isawaitable(result):
+                if job.max_runtime:
+                    await asyncio.wait_for(result, timeout=job.max_runtime)
+                else:
+                    await result
+            stats.last_error = None
+
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            stats.failures += 1
+            stats.last_error = f"timed out after {job.max_runtime}s"
+            logger.error(f"Job '{job.name}' exceeded its max runtime of {job.max_runtime}s")
+        except asyncio.CancelledError:
+            stats.last_error = "cancelled"
+            raise
+        except Exception as e:
+            stats.failures += 1
+            stats.last_error = str(e)
+            logger.error(f"Job '{job.name}' failed: {e}")
+        finally:
+            stats.last_duration = time.monotonic() - started
+            stats.max_duration = max(stats.max_duration, stats.last_duration)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler state and per-job statistics"""
+        now = time.monotonic()
+        return {
+            'running': self.running,
+            'jobs': {
+                name: {
+                    'interval': job.interval,
+                    'running': job.is_running,
+                    'next_run_in': round(max(0.0, job.next_run - now), 1),
+                    'runs': job.stats.runs,
+                    'failures': job.stats.failures,
+                    'timeouts': job.stats.timeouts,
+                    'skipped_overlaps': job.stats.skipped_overlaps,
+                    'skipped_conditions': job.stats.skipped_conditions,
+                    'missed_windows': job.stats.missed_windows,
+                    'last_run': job.stats.last_run,
+                    'last_duration': round(job.stats.last_duration, 3),
+                    'max_duration': round(job.stats.max_duration, 3),
+                    'last_error': job.stats.last_error
+                }
+                for name, job in self.jobs.items()
+            }
+        }
+
+
+# Global job scheduler instance
+_job_scheduler = None
+
+def get_job_scheduler() -> JobScheduler:
+    """Get or create global job scheduler instance"""
+    global _job_scheduler
+    if _job_scheduler is None:
+        _job_scheduler = JobScheduler()
+    return _job_scheduler
+
+def reset_job_scheduler():
+    """Reset global job scheduler (useful for testing)"""
+    global _job_scheduler
+    if _job_scheduler:
+        asyncio.create_task(_job_scheduler.stop())
+    _job_scheduler = None
@@ -0,0 +1,179 @@
+"""
+MemoryBudget - One byte budget shared by all in-process caches
+
+Each cache registers a size estimator, an evictor and a priority. When the
+caches together exceed the budget, the coordinator asks the lowest-priority
+(cheapest to rebuild) caches to give memory back first, down to a low
+watermark so it does not evict again on the next insert.
+"""
+
+import math
+import time
+from itertools import islice
+from typing import Any, Callable, Dict, Optional
+import logging
+logger = logging.getLogger(__name__)
+from dataclasses import dataclass
+
+from .memory_profiler import estimate_container_bytes
+
+
+# Priorities: caches with a lower value are evicted first
+PRIORITY_DERIVED = 10     # Rendered or computed views (keyboards, statistics, route lookups)
+PRIORITY_LOOKUP = 30      # Rows reloaded from the database on the next miss
+PRIORITY_TRACKING = 50    # Rate-limit windows and sessions; only idle entries may go
+PRIORITY_CORRECTNESS = 80  # Duplicate tracking; losing it can re-forward a message
+PRIORITY_PINNED = 100     # Reported only; never evicted (e.g. the active task registry)
+
+
+@dataclass
+class BudgetedCache:
+    """A registered cache: how to size it and how to shrink it"""
+    name: str
+    size: Callable[[], int]
+    evict: Optional[Callable[[int], int]]  # Asked to free about n bytes, returns bytes freed
+    priority: int
+    last_size: int = 0
+    evicted_bytes: int = 0
+    evictions: int = 0
+    errors: int = 0
+
+
+def ordered_evictor(get_container: Callable[[], Any],
+                    on_evict: Optional[Callable[[Any], None]] = None) -> Callable[[int], int]:
+    """Evictor for insertion-ordered dicts (LRU or FIFO): drops the oldest entries first"""
+    def evict(bytes_to_free: int) -> int:
+        container = get_container()
+        if not container:
+            return 0
+        average = max(estimate_container_bytes(container) / len(container), 1.0)
+        count = min(len(container), math.ceil(bytes_to_free / average))
+        for key in list(islice(iter(container), count)):
+            container.pop(key, None)
+            if on_evict:
+                on_evict(key)
+        return int(count * average)
+    return evict
+
+
+def container_size(get_container: Callable[[], Any]) -> Callable[[], int]:
+    """Size estimator for a dict, list or set attribute, sampled for large containers"""
+    def size() -> int:
+        container = get_container()
+        return estimate_container_bytes(container) if container is not None else 0
+    return size
+
+
+class MemoryBudget:
+    """
+    Process-wide budget for cache memory with coordinated, priority-ordered eviction.
+    """
+
+    def __init__(self, budget_bytes: int, low_watermark: float = 0.8):
+        self.budget_bytes = budget_bytes
+        self.low_watermark = low_watermark
+        self._caches: Dict[str, BudgetedCache] = {}
+
+        self.stats = {
+            'enforcements': 0,
+            'over_budget': 0,
+            'bytes_evicted': 0,
+            'last_total_bytes': 0,
+            'last_enforce_ms': 0.0
+        }
+
+    def register(self, name: str, size: Callable[[], int], evict: Optional[Callable[[int], int]] = None,
+                 priority: int = PRIORITY_LOOKUP):
+        """Register (or replace) a cache; without an evictor it is only reported"""
+        self._caches[name] = BudgetedCache(name, size, evict, priority if evict else PRIORITY_PINNED)
+        logger.debug(f"Registered cache '{name}' with memory budget (priority {priority})")
+
+    def unregister(self, name: str):
+        self._caches.pop(name, None)
+
+    def _measure(self) -> int:
+        total = 0
+        for cache in self._caches.values():
+            try:
+                cache.last_size = max(int(cache.size()), 0)
+            except Exception as e:
+                cache.errors += 1
+                logger.error(f"Error sizing cache '{cache.name}': {e}")
+            total += cache.last_size
+        self.stats['last_total_bytes'] = total
+        return total
+
+    def enforce(self, target_bytes: Optional[int] = None) -> int:
+        """Evict until the caches fit in target_bytes (the low watermark if over budget); returns bytes freed"""
+        started = time.perf_counter()
+        self.stats['enforcements'] += 1
+        total = self._measure()
+
+        if target_bytes is None:
+            if total <= self.budget_bytes:
+                self.stats['last_enforce_ms'] = (time.perf_counter() - started) * 1000
+                return 0
+            self.stats['over_budget'] += 1
+            target_bytes = int(self.budget_bytes * self.low_watermark)
+
+        freed = 0
+        # Cheapest first; within a priority, the largest cache gives back first
+        victims = sorted(
+            (cache for cache in self._caches.values() if cache.evict and cache.last_size),
+            key=lambda cache: (cache.priority, -cache.last_size)
+        )
+        for cache in victims:
+            excess = total - freed - target_bytes
+            if excess <= 0:
+                break
+            try:
+                released = max(int(cache.evict(min(excess, cache.last_size))), 0)
+            except Exception as e:
+                cache.errors += 1
+                logger.error(f"Error evicting from cache '{cache.name}': {e}")
+                continue
+            cache.evicted_bytes += released
+            cache.evictions += 1
+            cache.last_size = max(cache.last_size - released, 0)
+            freed += released
+
+        self.stats['bytes_evicted'] += freed
+        self.stats['last_enforce_ms'] = (time.perf_counter() - started) * 1000
+        if freed:
+            logger.info(f"Memory budget: freed ~{freed / 1024:.0f} KB "
+                        f"({total / 1024:.0f} KB -> {(total - freed) / 1024:.0f} KB, target {target_bytes / 1024:.0f} KB)")
+        return freed
+
+    async def enforce_job(self):
+        """Periodic job wrapper around enforce()"""
+        self.enforce()
+
+    def shrink(self, fraction: float = 0.5) -> int:
+        """Emergency relief: cut cache memory to a fraction of its current size, cheapest caches first"""
+        total = self._measure()
+        return self.enforce(int(total * fraction))
+
+    def get_usage(self, measure: bool = False) -> Dict[str, Any]:
+        """Per-cache usage as of the last measurement (or a fresh one)"""
+        if measure:
+            self._measure()
+        caches = [
+            {
+                'name': cache.name,
+                'bytes': cache.last_size,
+                'priority': cache.priority,
+                'evictable': cache.evict is not None,
+                'evictions': cache.evictions,
+                'evicted_bytes': cache.evicted_bytes,
+                'errors': cache.errors,
+            }
+            for cache in sorted(self._caches.values(), key=lambda cache: cache.last_size, reverse=True)
+        ]
+        total = sum(cache['bytes'] for cache in caches)
+        return {
+            'budget_bytes': self.budget_bytes,
+            'total_bytes': total,
+            'usage_percent': total / self.budget_bytes * 100 if self.budget_bytes else 0.0,
+            'caches': caches,
+            'stats': self.stats.copy(),
+        }
@@ -9,13 +9,17 @@ import gc
 import time
 import asyncio
 import os
-import resource
 from typing import Dict, Any, Set, List, Optional
 from datetime import datetime, timedelta
 import logging
 logger = logging.getLogger(__name__)
 from dataclasses import dataclass, field
 
+from .job_scheduler import get_job_scheduler
+from .memory_profiler import MemoryProfiler, cache_footprint, process_memory
+from .memory_budget import (MemoryBudget, PRIORITY_DERIVED, PRIORITY_LOOKUP, PRIORITY_TRACKING,
+                            container_size, ordered_evictor)
+
 
 @dataclass
 class MemoryStats:
@@ -24,6 +28,7 @@ class MemoryStats:
     used_memory: float = 0.0
     available_memory: float = 0.0
     memory_percent: float = 0.0
+    process_rss_mb: float = 0.0
     active_sessions: int = 0
     cached_objects: int = 0
     gc_collections: int = 0
@@ -40,12 +45,16 @@ class MemoryManager:
                  cleanup_interval: int = 300,  # 5 minutes
                  max_session_age: int = 3600,  # 1 hour
                  max_cache_size: int = 1000,
-                 memory_threshold: float = 80.0):  # 80% memory usage threshold
+                 memory_threshold: float = 80.0,  # 80% memory usage threshold
+                 profile_interval: int = 600,  # Allocation snapshot every 10 minutes while tracing
+                 budget_interval: int = 30):
         
         self.cleanup_interval = cleanup_interval
         self.max_session_age = max_session_age
         self.max_cache_size = max_cache_size
         self.memory_threshold = memory_threshold
+        self.profile_interval = profile_interval
+        self.budget_interval = budget_interval
         
         # Memory tracking
         self.memory_stats: List[MemoryStats] = []
@@ -66,9 +75,21 @@ class MemoryManager:
         self._cache_managers: Set[Any] = set()
         self._callback_routers: Set[Any] = set()
         
-        # Background tasks
-        self._cleanup_task: Optional[asyncio.Task] = None
-        self._monitoring_task: Optional[asyncio.Task] = None
+        # Allocation-site profiling, off unless MEMORY_PROFILING is set or an admin starts it
+        try:
+            frames = max(int(os.getenv("MEMORY_PROFILING_FRAMES", "1")), 1)
+        except ValueError:
+            logger.warning("Invalid MEMORY_PROFILING_FRAMES, using 1 frame per trace")
+            frames = 1
+        self.profiler = MemoryProfiler(frames=frames)
+        if os.getenv("MEMORY_PROFILING", "").lower() in ("1", "true", "yes"):
+            self.profiler.start()
+        
+        # Shared byte budget for every registered cache
+        self.budget = MemoryBudget(int(float(os.getenv("MEMORY_BUDGET_MB", "128")) * 1024 * 1024))
+        
+        # Background jobs
+        self._jobs = get_job_scheduler()
         
         # Emergency cleanup thresholds
         self.emergency_memory_threshold = 90.0  # 90%
@@ -77,63 +98,50 @@ class MemoryManager:
         self._start_background_tasks()
         
     def _start_background_tasks(self):
-        """Start background memory management tasks"""
-        self._cleanup_task = asyncio.create_task(self._cleanup_loop())
-        self._monitoring_task = asyncio.create_task(self._monitoring_loop())
-        logger.info("MemoryManager background tasks started")
-        
-    async def _cleanup_loop(self):
-        """Main cleanup loop"""
-        while True:
-            try:
-                await asyncio.sleep(self.cleanup_interval)
-                await self.perform_cleanup()
-                
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Error in cleanup loop: {e}")
-                
-    async def _monitoring_loop(self):
-        """Memory monitoring loop"""
-        while True:
-            try:
-                await asyncio.sleep(60)  # Monitor every minute
-                await self._update_memory_stats()
-                await self._check_memory_pressure()
+        """Register background memory management jobs"""
+        self._jobs.register("memory_manager.cleanup", self.perform_cleanup, self.cleanup_interval,
+                            max_runtime=120)
+        self._jobs.register("memory_manager.monitoring", self._monitor_memory, 60,  # Monitor every minute
+                            max_runtime=30)
+        self._jobs.register("memory_manager.profile_snapshot", self.profiler.sample, self.profile_interval,
+                            max_runtime=60)
+        self._jobs.register("memory_manager.budget", self.budget.enforce_job, self.budget_interval,
+                            max_runtime=30)
+        logger.info("MemoryManager background jobs registered")
+        
+    def _stop_background_tasks(self):
+        """Unregister this manager's jobs"""
+        self._jobs.unregister("memory_manager.cleanup", self.perform_cleanup)
+        self._jobs.unregister("memory_manager.monitoring", self._monitor_memory)
+        self._jobs.unregister("memory_manager.profile_snapshot", self.profiler.sample)
+        self._jobs.unregister("memory_manager.budget", self.budget.enforce_job)
                 
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Error in monitoring loop: {e}")
+    async def _monitor_memory(self):
+        """Memory monitoring job"""
+        await self._update_memory_stats()
+        await self._check_memory_pressure()
                 
     async def _update_memory_stats(self):
         """Update memory usage statistics"""
         try:
-            # Get process memory info using resource module
-            usage = resource.getrusage(resource.RUSAGE_SELF)
-            max_memory = usage.ru_maxrss  # Peak memory usage in KB (Linux) or bytes (macOS)
-            
-            # Convert to MB for consistency
-            if os.name == 'posix':
-                max_memory_mb = max_memory / 1024  # KB to MB on Linux
-            else:
-                max_memory_mb = max_memory / (1024 * 1024)  # bytes to MB on other systems
+            # Current RSS of this process (not the peak getrusage reports)
+            rss_mb = process_memory()['rss_mb']
             
-            # Get current memory from /proc/meminfo if available (Linux)
+            # System-wide memory from /proc/meminfo if available (Linux)
             try:
+                meminfo = {}
                 with open('/proc/meminfo', 'r') as f:
-                    meminfo = f.read()
-                    total_kb = int([line for line in meminfo.split('\n') if 'MemTotal:' in line][0].split()[1])
-                    available_kb = int([line for line in meminfo.split('\n') if 'MemAvailable:' in line][0].split()[1])
-                    total_gb = total_kb / (1024 * 1024)
-                    available_gb = available_kb / (1024 * 1024)
-                    used_gb = total_gb - available_gb
-                    memory_percent = (used_gb / total_gb) * 100
-            except:
+                    for line in f:
+                        name, value = line.split(':', 1)
+                        meminfo[name] = int(value.split()[0])
+                total_gb = meminfo['MemTotal'] / (1024 * 1024)
+                available_gb = meminfo['MemAvailable'] / (1024 * 1024)
+                used_gb = total_gb - available_gb
+                memory_percent = (used_gb / total_gb) * 100
+            except (OSError, KeyError, ValueError):
                 # Fallback values if /proc/meminfo is not available
                 total_gb = 8.0  # Default assumption
-                used_gb = max_memory_mb / 1024
+                used_gb = rss_mb / 1024
                 available_gb = total_gb - used_gb
                 memory_percent = (used_gb / total_gb) * 100
             
@@ -142,9 +150,11 @@ class MemoryManager:
                 used_memory=used_gb,
                 available_memory=available_gb,
                 memory_percent=memory_percent,
+                process_rss_mb=rss_mb,
                 active_sessions=sum(len(sm.user_sessions) for sm in self._session_managers if hasattr(sm, 'user_sessions')),
                 cached_objects=sum(len(cm._cache) for cm in self._cache_managers if hasattr(cm, '_cache')),
-                gc_collections=len(gc.get_objects())
+                # Collections run so far; counting gc.get_objects() would walk the whole heap
+                gc_collections=sum(generation['collections'] for generation in gc.get_stats())
             )
             
             self.memory_stats.append(stats)
@@ -186,11 +196,8 @@ class MemoryManager:
             # Clean up callback router caches
             routers_cleaned = await self._cleanup_router_caches()
             
-            # Force garbage collection
-            objects_before = len(gc.get_objects())
-            gc.collect()
-            objects_after = len(gc.get_objects())
-            objects_collected = objects_before - objects_after
+            # Force garbage collection (returns the number of unreachable objects found)
+            objects_collected = gc.collect()
             
             # Update cleanup stats
             final_memory = self._get_memory_usage()
@@ -223,15 +230,9 @@ class MemoryManager:
         logger.warning("Performing emergency memory cleanup")
         
         try:
-            # Clear all router caches
-            for router in self._callback_routers:
-                if hasattr(router, 'clear_cache'):
-                    router.clear_cache()
-                    
-            # Clear all database caches
-            for cache in self._cache_managers:
-                if hasattr(cache, 'clear_cache'):
-                    await cache.clear_cache()
+            # Halve cache memory, taking it from the cheapest caches first
+            freed = self.budget.shrink(0.5)
+            logger.warning(f"Emergency cleanup released ~{freed / (1024 * 1024):.1f}MB of cache memory")
                     
             # Expire old sessions aggressively
             for session_manager in self._session_managers:
@@ -299,9 +300,12 @@ class MemoryManager:
         total_cleaned = 0
         
         for router in self._callback_routers:
-            if hasattr(router, '_route_cache'):
+            if hasattr(router, 'trim_cache'):
+                # Keep only 100 most recent routes
+                total_cleaned += router.trim_cache(100)
+            elif hasattr(router, '_route_cache'):
                 cache_size = len(router._route_cache)
-                if cache_size > 100:  # Keep only 100 most recent routes
+                if cache_size > 100:
                     # Clear cache if too large
                     router.clear_cache()
                     total_cleaned += cache_size
@@ -311,32 +315,82 @@ class MemoryManager:
     def register_session_manager(self, session_manager):
         """Register a session manager for cleanup"""
         self._session_managers.add(session_manager)
+        if hasattr(session_manager, 'user_sessions'):
+            self.budget.register(f"{type(session_manager).__name__}.user_sessions",
+                                 container_size(lambda: session_manager.user_sessions),
+                                 lambda n: self._expire_idle_sessions(session_manager, n),
+                                 PRIORITY_TRACKING)
         logger.debug(f"Registered session manager: {type(session_manager).__name__}")
         
     def register_cache_manager(self, cache_manager):
         """Register a cache manager for cleanup"""
         self._cache_managers.add(cache_manager)
+        if hasattr(cache_manager, 'shrink') and hasattr(cache_manager, '_bytes'):
+            self.budget.register(type(cache_manager).__name__, lambda: cache_manager._bytes,
+                                 cache_manager.shrink, PRIORITY_LOOKUP)
         logger.debug(f"Registered cache manager: {type(cache_manager).__name__}")
         
     def register_callback_router(self, router):
         """Register a callback router for cleanup"""
         self._callback_routers.add(router)
+        if hasattr(router, '_route_cache'):
+            self.budget.register(f"{type(router).__name__}.route_cache",
+                                 container_size(lambda: router._route_cache),
+                                 ordered_evictor(lambda: router._route_cache), PRIORITY_DERIVED)
         logger.debug(f"Registered callback router: {type(router).__name__}")
         
+    def _expire_idle_sessions(self, session_manager, bytes_to_free: int) -> int:
+        """Budget evictor for user_sessions: drop the longest-idle sessions first"""
+        sessions = session_manager.user_sessions
+        if not sessions:
+            return 0
+        average = max(container_size(lambda: sessions)() / len(sessions), 1.0)
+        idle_first = sorted(sessions, key=lambda user_id: sessions[user_id].get('last_activity', 0))
+        freed = 0
+        for user_id in idle_first:
+            # Sessions active in the last 15 minutes are kept even under pressure
+            if freed >= bytes_to_free or time.time() - sessions[user_id].get('last_activity', 0) <= 900:
+                break
+            del sessions[user_id]
+            freed += int(average)
+        return freed
+        
     def _get_memory_usage(self) -> float:
         """Get current memory usage in MB"""
         try:
-            usage = resource.getrusage(resource.RUSAGE_SELF)
-            max_memory = usage.ru_maxrss  # Peak memory usage in KB (Linux) or bytes (macOS)
-            
-            # Convert to MB for consistency
-            if os.name == 'posix':
-                return max_memory / 1024  # KB to MB on Linux
-            else:
-                return max_memory / (1024 * 1024)  # bytes to MB on other systems
-        except:
+            return process_memory()['rss_mb']
+        except Exception:
             return 0.0
             
+    def get_cache_footprints(self) -> List[Dict[str, Any]]:
+        """Entry counts and byte estimates for every registered session manager, cache and router"""
+        footprints = []
+        for kind, managers in (('session_manager', self._session_managers),
+                               ('cache_manager', self._cache_managers),
+                               ('callback_router', self._callback_routers)):
+            for manager in list(managers):
+                try:
+                    footprint = cache_footprint(manager)
+                    footprint['kind'] = kind
+                    footprints.append(footprint)
+                except Exception as e:
+                    logger.error(f"Error sizing {type(manager).__name__}: {e}")
+        return sorted(footprints, key=lambda footprint: footprint['bytes'], reverse=True)
+        
+    async def get_profile_report(self, limit: int = 10) -> Dict[str, Any]:
+        """Process memory, per-cache footprints and allocation sites (when tracing)
+
+        Footprints and budget usage walk live caches, so they are read on the event
+        loop; only the tracemalloc statistics run in a worker thread.
+        """
+        report = {
+            'process': process_memory(),
+            'caches': self.get_cache_footprints(),
+            'budget': self.budget.get_usage(measure=True),
+        }
+        report['allocations'] = await asyncio.to_thread(self.profiler.get_report, limit)
+        return report
+        
     def get_memory_stats(self) -> Dict[str, Any]:
         """Get comprehensive memory statistics"""
         current_stats = self.memory_stats[-1] if self.memory_stats else MemoryStats()
@@ -347,6 +401,7 @@ class MemoryManager:
                 'used_gb': current_stats.used_memory,
                 'available_gb': current_stats.available_memory,
                 'usage_percent': current_stats.memory_percent,
+                'process_rss_mb': current_stats.process_rss_mb,
             },
             'managed_objects': {
                 'active_sessions': current_stats.active_sessions,
@@ -363,6 +418,7 @@ class MemoryManager:
                 'emergency_threshold': self.emergency_memory_threshold,
             },
             'memory_history_size': len(self.memory_stats),
+            'budget': self.budget.get_usage(),
         }
         
     async def get_memory_trend(self, minutes: int = 30) -> Dict[str, Any]:
@@ -400,11 +456,8 @@ class MemoryManager:
         
     async def shutdown(self):
         """Shutdown memory manager and cleanup tasks"""
-        if self._cleanup_task:
-            self._cleanup_task.cancel()
-            
-        if self._monitoring_task:
-            self._monitoring_task.cancel()
+        self._stop_background_tasks()
+        self.profiler.stop()
             
         # Final cleanup
         await self.perform_cleanup()
@@ -413,11 +466,10 @@ class MemoryManager:
         
     def __del__(self):
         """Cleanup when memory manager is destroyed"""
-        if self._cleanup_task and not self._cleanup_task.done():
-            self._cleanup_task.cancel()
-            
-        if self._monitoring_task and not self._monitoring_task.done():
-            self._monitoring_task.cancel()
+        try:
+            self._stop_background_tasks()
+        except Exception:
+            pass
 
 
 # Global memory manager instance
@@ -0,0 +1,246 @@
+"""
+MemoryProfiler - Process memory readings and opt-in allocation-site profiling
+
+Current RSS is read from /proc/self/statm, a single short read, instead of the
+peak RSS reported by getrusage. Allocation sites come from tracemalloc, which
+is off by default because it slows every allocation; once started, snapshots
+are taken on demand or on the sampling job, and each one is compared with the
+previous snapshot to show where memory is growing.
+"""
+
+import asyncio
+import os
+import sys
+import time
+import resource
+import tracemalloc
+from itertools import islice
+from typing import Any, Dict, List, Optional
+import logging
+logger = logging.getLogger(__name__)
+from dataclasses import dataclass, asdict
+
+
+# Allocations made by the import system and by tracemalloc itself are noise in every report
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+)
+
+_MB = 1024 * 1024
+
+# Attributes holding the bulk of a registered manager's memory, in lookup order
+FOOTPRINT_ATTRIBUTES = ("user_sessions", "_cache", "_route_cache", "_entries")
+
+
+@dataclass
+class AllocationSite:
+    """Memory allocated from one source line (or traceback), with growth since the previous snapshot"""
+    location: str
+    size_bytes: int
+    count: int
+    size_diff: int = 0
+    count_diff: int = 0
+
+
+def process_memory() -> Dict[str, Any]:
+    """Current resident and virtual size of this process in MB"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            fields = f.read().split()
+        page_mb = os.sysconf("SC_PAGE_SIZE") / _MB
+        return {
+            "rss_mb": int(fields[1]) * page_mb,
+            "vms_mb": int(fields[0]) * page_mb,
+            "shared_mb": int(fields[2]) * page_mb,
+            "source": "statm",
+        }
+    except (OSError, ValueError, IndexError):
+        # No procfs (macOS, Windows): the peak is the best number available
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_mb = peak / _MB if sys.platform == "darwin" else peak / 1024
+        return {"rss_mb": peak_mb, "vms_mb": 0.0, "shared_mb": 0.0, "source": "ru_maxrss"}
+
+
+def deep_size(value: Any, _seen: Optional[set] = None, _depth: int = 0) -> int:
+    """Approximate bytes reachable from value through containers and instance attributes"""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value, 0)
+    if _depth > 6 or isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return size
+
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += deep_size(key, _seen, _depth + 1) + deep_size(item, _seen, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += deep_size(item, _seen, _depth + 1)
+    else:
+        if hasattr(value, "__dict__"):
+            size += deep_size(vars(value), _seen, _depth + 1)
+        for slot in getattr(type(value), "__slots__", ()):
+            if hasattr(value, slot):
+                size += deep_size(getattr(value, slot), _seen, _depth + 1)
+    return size
+
+
+def estimate_container_bytes(container: Any, sample_size: int = 200) -> int:
+    """Bytes held by a dict or sequence, sizing at most sample_size entries and scaling up"""
+    try:
+        length = len(container)
+    except TypeError:
+        return deep_size(container)
+
+    size = sys.getsizeof(container, 0)
+    if not length:
+        return size
+
+    items = container.items() if isinstance(container, dict) else container
+    sampled = 0
+    sampled_bytes = 0
+    for item in islice(iter(items), sample_size):
+        sampled_bytes += deep_size(item)
+        sampled += 1
+    if sampled:
+        size += int(sampled_bytes * length / sampled)
+    return size
+
+
+def cache_footprint(manager: Any, sample_size: int = 200) -> Dict[str, Any]:
+    """Entry count and byte estimate for a registered session manager, cache or router"""
+    footprint = {"name": type(manager).__name__, "attribute": None, "entries": 0, "bytes": 0, "accounted": False}
+    for attribute in FOOTPRINT_ATTRIBUTES:
+        container = getattr(manager, attribute, None)
+        if container is None:
+            continue
+        footprint["attribute"] = attribute
+        footprint["entries"] = len(container)
+        # Caches that already account for their bytes (DatabaseCache) are not re-walked
+        accounted = getattr(manager, "_bytes", None)
+        if attribute == "_cache" and isinstance(accounted, int):
+            footprint["bytes"] = accounted
+            footprint["accounted"] = True
+        else:
+            footprint["bytes"] = estimate_container_bytes(container, sample_size)
+        break
+    return footprint
+
+
+class MemoryProfiler:
+    """
+    Opt-in tracemalloc profiling: top allocation sites of the latest snapshot
+    and growth between the last two snapshots.
+    """
+
+    def __init__(self, frames: int = 1, top_limit: int = 15):
+        self.frames = frames
+        self.top_limit = top_limit
+
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._latest: Optional[tracemalloc.Snapshot] = None
+        self._latest_time: Optional[float] = None
+        self._owns_tracing = False
+
+        self.stats = {
+            'snapshots_taken': 0,
+            'last_snapshot_ms': 0.0
+        }
+
+    @property
+    def is_tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: Optional[int] = None) -> bool:
+        """Start tracing allocations; returns False if tracing was already on"""
+        if tracemalloc.is_tracing():
+            return False
+        if frames is not None:
+            self.frames = frames
+        tracemalloc.start(self.frames)
+        self._owns_tracing = True
+        logger.info(f"Allocation tracing started ({self.frames} frame(s) per trace)")
+        return True
+
+    def stop(self) -> bool:
+        """Stop tracing (only if started here) and drop the stored snapshots"""
+        self._previous = self._latest = self._latest_time = None
+        if not (tracemalloc.is_tracing() and self._owns_tracing):
+            return False
+        tracemalloc.stop()
+        self._owns_tracing = False
+        logger.info("Allocation tracing stopped")
+        return True
+
+    def take_snapshot(self) -> Optional[tracemalloc.Snapshot]:
+        """Take a filtered snapshot and keep it with the previous one; None when not tracing"""
+        if not tracemalloc.is_tracing():
+            return None
+        started = time.perf_counter()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        self._previous, self._latest = self._latest, snapshot
+        self._latest_time = time.time()
+        self.stats['snapshots_taken'] += 1
+        self.stats['last_snapshot_ms'] = (time.perf_counter() - started) * 1000
+        return snapshot
+
+    async def sample(self):
+        """Sampling job: snapshot only while tracing is on, off the event loop"""
+        if tracemalloc.is_tracing():
+            await asyncio.to_thread(self.take_snapshot)
+
+    def _key_type(self) -> str:
+        return "traceback" if self.frames > 1 else "lineno"
+
+    @staticmethod
+    def _location(traceback: tracemalloc.Traceback) -> str:
+        # Innermost frame first, callers after it
+        return " <- ".join(f"{os.path.basename(frame.filename)}:{frame.lineno}" for frame in traceback)
+
+    def top(self, limit: Optional[int] = None) -> List[AllocationSite]:
+        """Largest allocation sites in the latest snapshot"""
+        if self._latest is None and self.take_snapshot() is None:
+            return []
+        statistics = self._latest.statistics(self._key_type())
+        return [
+            AllocationSite(self._location(stat.traceback), stat.size, stat.count)
+            for stat in statistics[:limit or self.top_limit]
+        ]
+
+    def growth(self, limit: Optional[int] = None) -> List[AllocationSite]:
+        """Sites that grew the most between the last two snapshots"""
+        if self._previous is None or self._latest is None:
+            return []
+        differences = self._latest.compare_to(self._previous, self._key_type())
+        growing = [stat for stat in differences if stat.size_diff > 0]
+        return [
+            AllocationSite(self._location(stat.traceback), stat.size, stat.count, stat.size_diff, stat.count_diff)
+            for stat in growing[:limit or self.top_limit]
+        ]
+
+    def get_report(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Tracing state, traced totals, top sites and growth since the previous snapshot"""
+        report: Dict[str, Any] = {
+            'tracing': tracemalloc.is_tracing(),
+            'frames': self.frames,
+            'stats': self.stats.copy(),
+        }
+        if not report['tracing']:
+            return report
+
+        current, peak = tracemalloc.get_traced_memory()
+        report.update({
+            'traced_current_mb': current / _MB,
+            'traced_peak_mb': peak / _MB,
+            'tracemalloc_overhead_mb': tracemalloc.get_tracemalloc_memory() / _MB,
+            'top': [asdict(site) for site in self.top(limit)],
+            'growth': [asdict(site) for site in self.growth(limit)],
+            'snapshot_age_seconds': time.time() - self._latest_time if self._latest_time else None,
+        })
+        return report
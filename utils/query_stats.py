@@ -0,0 +1,169 @@
+"""
+QueryRegistry - Named SQL statements with per-statement instrumentation
+
+Hot queries are registered once under a stable name so every call sends the
+same SQL text (and hits the connection's prepared statement). Every call,
+named or ad-hoc, is counted with a latency histogram, and calls over the
+slow-query threshold are logged and kept for inspection.
+"""
+
+import re
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+import logging
+logger = logging.getLogger(__name__)
+from dataclasses import dataclass, field
+
+
+# Upper bounds of the latency buckets in milliseconds; the last bucket is open-ended
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_ADHOC_VERB = re.compile(
+    r"^\s*(select|with|insert\s+into|update|delete\s+from|create|alter|drop)\s+"
+    r"(?:(?:unique\s+)?(?:table|index)\s+)?(?:if\s+(?:not\s+)?exists\s+)?([A-Za-z_]\w*)?",
+    re.IGNORECASE
+)
+_ADHOC_FROM = re.compile(r"\bfrom\s+([A-Za-z_]\w*)", re.IGNORECASE)
+
+
+@dataclass
+class StatementStats:
+    """Counters and latency histogram for one statement"""
+    calls: int = 0
+    errors: int = 0
+    slow: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+
+    def record(self, elapsed_ms: float, error: bool = False):
+        self.calls += 1
+        if error:
+            self.errors += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of calls"""
+        if not self.calls:
+            return 0.0
+        rank = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "slow": self.slow,
+            "total_ms": round(self.total_ms, 1),
+            "avg_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 1),
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99)
+        }
+
+
+class QueryRegistry:
+    """Named statements plus call statistics for every statement the database runs"""
+
+    def __init__(self, slow_query_ms: float = 200.0, slow_log_size: int = 50,
+                 max_adhoc_labels: int = 500):
+        self.statements: Dict[str, str] = {}
+        self.stats: Dict[str, StatementStats] = {}
+        self.slow_query_ms = slow_query_ms
+        self.slow_log: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        self.started_at = time.time()
+
+        # SQL text -> label for ad-hoc statements, bounded so dynamic SQL cannot grow it
+        self._adhoc_labels: Dict[str, str] = {}
+        self._max_adhoc_labels = max_adhoc_labels
+
+    def register(self, name: str, sql: str):
+        """Register a named statement; re-registering the same name needs the same SQL"""
+        existing = self.statements.get(name)
+        if existing is not None and existing != sql:
+            raise ValueError(f"Statement '{name}' is already registered with different SQL")
+        self.statements[name] = sql
+
+    def register_all(self, statements: Dict[str, str]):
+        for name, sql in statements.items():
+            self.register(name, sql)
+
+    def get(self, name: str) -> str:
+        """SQL text of a named statement"""
+        try:
+            return self.statements[name]
+        except KeyError:
+            raise KeyError(f"Unknown statement '{name}'") from None
+
+    def label_for(self, sql: str) -> str:
+        """Stable label for an ad-hoc statement, e.g. ``adhoc.select.tasks``"""
+        label = self._adhoc_labels.get(sql)
+        if label is not None:
+            return label
+
+        match = _ADHOC_VERB.match(sql)
+        if match:
+            verb = match.group(1).split()[0].lower()
+            if verb in ("select", "with"):
+                source = _ADHOC_FROM.search(sql)
+                table = source.group(1) if source else ""
+            else:
+                table = match.group(2) or ""
+            label = f"adhoc.{verb}.{table.lower()}" if table else f"adhoc.{verb}"
+        else:
+            label = "adhoc.other"
+
+        if len(self._adhoc_labels) < self._max_adhoc_labels:
+            self._adhoc_labels[sql] = label
+        return label
+
+    def record(self, label: str, elapsed_ms: float, error: bool = False,
+               args: Optional[Sequence[Any]] = None):
+        """Record one call; calls over the slow threshold are logged"""
+        stats = self.stats.get(label)
+        if stats is None:
+            stats = self.stats[label] = StatementStats()
+        stats.record(elapsed_ms, error)
+
+        if elapsed_ms >= self.slow_query_ms:
+            stats.slow += 1
+            self.slow_log.append({
+                "statement": label,
+                "ms": round(elapsed_ms, 1),
+                "at": time.time(),
+                "error": error,
+                # Parameter values can be message text; keep only their shape
+                "args": [type(arg).__name__ for arg in args] if args else []
+            })
+            logger.warning(f"Slow query {label}: {elapsed_ms:.0f}ms")
+
+    def reset(self):
+        """Clear statistics, keeping registered statements"""
+        self.stats.clear()
+        self.slow_log.clear()
+        self.started_at = time.time()
+
+    def get_stats(self, top: int = 10) -> Dict[str, Any]:
+        """Per-statement statistics, heaviest first, and the recent slow queries"""
+        ordered = sorted(self.stats.items(), key=lambda item: item[1].total_ms, reverse=True)
+        calls = sum(stats.calls for stats in self.stats.values())
+        return {
+            "since": self.started_at,
+            "calls": calls,
+            "errors": sum(stats.errors for stats in self.stats.values()),
+            "slow_query_ms": self.slow_query_ms,
+            "registered": len(self.statements),
+            "statements": {label: stats.to_dict() for label, stats in ordered[:top]},
+            "slow_queries": list(self.slow_log)[-top:]
+        }